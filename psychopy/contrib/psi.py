@@ -12,7 +12,7 @@
 #
 #   Please see <http://www.gnu.org/licenses/> for a copy of the GNU General Public License.
 
-__all__ = ['PsiObject']
+__all__ = ['PsiObject', 'FastPsiObject']
 
 from numpy import *
 
@@ -98,3 +98,102 @@ class PsiObject():
         
     def savePosterior(self, file):
         save(file, self._probLambda)
+
+
+class FastPsiObject(PsiObject):
+
+    """PsiObject with a faster update, for fine grids.
+
+    The expected entropy of the posterior for each stimulus is calculated in
+    the log domain from two matrix-vector products with arrays made once
+    (P(r=1 | lambda, x) and sum over r of P(r | lambda, x) * log P(r | lambda, x)),
+    instead of building new 4D arrays over [r, alpha, beta, x] every trial.
+    The posterior is kept as log probabilities and updated in place, and the
+    work buffers are allocated once.
+
+    Options:
+        dtype - 'float64' (default) or 'float32' for the precomputed arrays,
+            which halves their size and roughly doubles the speed. The
+            posterior itself is always kept as float64.
+        intensSubsample - consider only every nth stimulus intensity as the
+            next intensity (default 1, all of them). The posterior is still
+            updated exactly for the intensities presented.
+
+    Gives the same intensities and posterior as PsiObject (to rounding),
+    other than where PsiObject's posterior has underflowed to zero.
+    """
+
+    def __init__(self, x, alpha, beta, xPrecision, aPrecision, bPrecision, delta=0, stepType='lin', TwoAFC=False, prior=None, dtype='float64', intensSubsample=1):
+        PsiObject.__init__(self, x, alpha, beta, xPrecision, aPrecision, bPrecision, delta=delta, stepType=stepType, TwoAFC=TwoAFC, prior=prior)
+        self.dtype = str(dtype)
+        self.intensSubsample = int(intensSubsample)
+        nLambda = len(self.alpha) * len(self.beta)
+
+        # P(r=1 | lambda, x) as [lambda, x]; the 4D array isn't needed again
+        probCorrect = self._probResponseGivenLambdaX[1].reshape((nLambda, len(self.x)))
+        del self._probResponseGivenLambdaX
+        self._probCorrect = ascontiguousarray(probCorrect)
+
+        # candidates for the next intensity, with [P(r=1 | lambda, x), sum_r P log P]
+        self._candidates = arange(0, len(self.x), max(self.intensSubsample, 1))
+        probs = probCorrect[:, self._candidates]
+        with errstate(divide='ignore', invalid='ignore'):
+            plogp = where(probs > 0, probs * log(probs), 0) + where(probs < 1, (1 - probs) * log(1 - probs), 0)
+        self._candidateArrays = ascontiguousarray(hstack([probs, plogp]), dtype=self.dtype)
+
+        # posterior as log probabilities
+        with errstate(divide='ignore'):
+            self._logProbLambda = log(self._probLambda.reshape(nLambda).astype(float64))
+        self._probLambda = self._probLambda.reshape(nLambda).astype(float64).reshape((1, len(self.alpha), len(self.beta), 1))
+
+        # work buffers
+        nCandidates = len(self._candidates)
+        self._posterior = zeros(nLambda, dtype=self.dtype)
+        self._products = zeros(2 * nCandidates, dtype=self.dtype)
+        self._probCorrectX = zeros(nCandidates)
+        self._expectedEntropy = zeros(nCandidates)
+        self._work = zeros(nCandidates)
+
+    def update(self, response=None):
+        probLambda = self._probLambda.reshape(-1)
+        if response is not None:    #response should only be None when Psi is first initialized
+            # P(lambda | x, r) is proportional to P(lambda) * P(r | lambda, x)
+            probCorrect = self._probCorrect[:, self.nextIntensityIndex]
+            with errstate(divide='ignore'):
+                if response:
+                    self._logProbLambda += log(probCorrect)
+                else:
+                    self._logProbLambda += log(1 - probCorrect)
+            self._logProbLambda -= self._logProbLambda.max()
+            exp(self._logProbLambda, out=probLambda)
+            total = probLambda.sum()
+            probLambda /= total
+            self._logProbLambda -= log(total)
+
+        # P(r=1 | x) and sum over lambda of P(lambda) * sum_r P log P
+        self._posterior[:] = probLambda
+        dot(self._posterior, self._candidateArrays, out=self._products)
+        nCandidates = len(self._candidates)
+        probCorrectX = self._probCorrectX
+        probCorrectX[:] = self._products[:nCandidates]
+        clip(probCorrectX, 0, 1, out=probCorrectX)
+
+        # E[H(x)] = sum_r P(r|x) log P(r|x) - sum_lambda P(lambda) log P(lambda) - sum_lambda P(lambda) sum_r P log P
+        entropy = self._expectedEntropy
+        work = self._work
+        entropy[:] = self._products[nCandidates:]
+        negative(entropy, out=entropy)
+        with errstate(divide='ignore', invalid='ignore'):
+            log(probCorrectX, out=work)
+            multiply(work, probCorrectX, out=work)
+            entropy += where(probCorrectX > 0, work, 0)
+            subtract(1, probCorrectX, out=work)
+            log(work, out=work)
+            multiply(work, 1 - probCorrectX, out=work)
+            entropy += where(probCorrectX < 1, work, 0)
+        entropy -= sum(where(probLambda > 0, probLambda * self._logProbLambda, 0))
+        entropy /= log(10)  # to match PsiObject
+
+        #Generate next intensity
+        self.nextIntensityIndex = int(self._candidates[argmin(entropy)])
+        self.nextIntensity = self.x[self.nextIntensityIndex]
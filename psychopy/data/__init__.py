@@ -6,6 +6,7 @@ import sys
 from pkg_resources import parse_version
 
 from .base import DataHandler
+from .columnar import ColumnarStore, StreamingWriter
 from .experiment import ExperimentHandler
 from .trial import TrialHandler, TrialHandler2, TrialHandlerExt, TrialType
 from .staircase import (StairHandler, QuestHandler, PsiHandler,
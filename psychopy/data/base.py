@@ -18,7 +18,6 @@ from psychopy import logging
 from psychopy.tools.filetools import (openOutputFile, genDelimiter,
                                       genFilenameFromDelimiter, pathToString)
 from psychopy.tools.fileerrortools import handleFileCollision
-from psychopy.tools.arraytools import extendArr
 from .utils import _getExcelCellName
 
 try:
@@ -443,6 +442,146 @@ class _BaseTrialHandler(_ComparisonMixin):
         return originPath, origin
 
 
+class _DataColumn():
+    """Storage for a single data type of a :class:`DataHandler`.
+
+    While all its values are numeric they are kept in a float64 array with a
+    separate validity map (`True` where a value has been added). Once a
+    non-numeric value is added the column switches to keeping Python
+    objects, keyed by their position: the numbers added so far become
+    strings (e.g. '1.0', as DataHandler has always converted them) and
+    later values are kept as they are, so the values don't depend on when
+    the arrays were built. The arrays grow geometrically if a position
+    beyond their current shape is added to, so that adding values is O(1)
+    amortised.
+    """
+
+    def __init__(self, shape, masked=True):
+        self.shape = [int(n) for n in shape]  # logical shape
+        self.values = np.zeros(self.shape, dtype=np.float64)
+        self.valid = np.full(self.shape, not masked, dtype=bool)
+        self.objects = None  # position (tuple) -> value, once non-numeric
+        self.exposed = False  # whether arrays built from it were handed out
+
+    def __eq__(self, other):
+        if not isinstance(other, _DataColumn):
+            return False
+        sl = self._slices()
+        if (self.shape != other.shape or
+                (self.objects is None) != (other.objects is None) or
+                not np.array_equal(self.valid[sl], other.valid[sl])):
+            return False
+        if self.objects is None:
+            return np.array_equal(self.values[sl], other.values[sl])
+        return (self.objects.keys() == other.objects.keys() and
+                all(np.all(np.asarray(self.objects[k] == other.objects[k]))
+                    for k in self.objects))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def _slices(self):
+        return tuple(slice(0, n) for n in self.shape)
+
+    def _ensureSize(self, position):
+        """Make sure `position` is within the column, growing it if not.
+        Returns `True` if the logical shape changed."""
+        capacity = self.values.shape
+        if all(p < n for p, n in zip(position, self.shape)):
+            return False
+        if any(p >= n for p, n in zip(position, capacity)):
+            # grow (at least) geometrically so that repeated growth is cheap
+            newCapacity = [max(n, p + 1, 2 * n) if p >= n else n
+                           for p, n in zip(position, capacity)]
+            sl = tuple(slice(0, n) for n in capacity)
+            values = np.zeros(newCapacity, dtype=np.float64)
+            values[sl] = self.values
+            valid = np.zeros(newCapacity, dtype=bool)
+            valid[sl] = self.valid
+            self.values, self.valid = values, valid
+        self.shape = [max(n, p + 1) for p, n in zip(position, self.shape)]
+        return True
+
+    def set(self, position, value, numeric):
+        """Set the value at `position`. Returns `True` if the column had to
+        grow to hold it."""
+        position = tuple(int(p) for p in position)
+        grown = self._ensureSize(position)
+        if not numeric:
+            self.toObjects()
+        if self.objects is not None:
+            self.objects[position] = value
+        else:
+            self.values[position] = value
+        self.valid[position] = True
+        return grown
+
+    def toObjects(self):
+        """Keep the values as Python objects from now on (as needed once
+        there are non-numeric values)."""
+        if self.objects is not None:
+            return
+        sl = self._slices()
+        valid = self.valid[sl]
+        # the same conversion (via float32 and str) as DataHandler has
+        # always made, so that saved data don't change
+        converted = np.where(~valid, '--', self.values[sl].astype('f'))
+        self.objects = {}
+        for position in zip(*np.nonzero(valid)):
+            position = tuple(int(p) for p in position)
+            self.objects[position] = str(converted[position])
+
+    def asArray(self):
+        """The column in the format DataHandler has always provided: a
+        float32 masked array (masked where missing) while all values are
+        numeric, otherwise an object array with missing values as '--'.
+        """
+        sl = self._slices()
+        if self.objects is None:
+            return np.ma.MaskedArray(self.values[sl].astype('f'),
+                                     mask=~self.valid[sl])
+        arr = np.full(self.shape, '--', dtype='O')
+        for position, value in self.objects.items():
+            arr[position] = value
+        return arr
+
+    def update(self, arr):
+        """Take in any changes made directly to an array that was built by
+        :meth:`asArray` (or from which the column was made)."""
+        sl = tuple(slice(0, n) for n in arr.shape)
+        if self.objects is None:
+            valid = ~np.ma.getmaskarray(arr)
+            data = np.ma.getdata(arr)
+            values = self.values[sl]
+            unchanged = self.valid[sl] & (data == values.astype(data.dtype))
+            changed = valid & ~unchanged
+            values[changed] = data[changed]
+            self.valid[sl] = valid
+            return
+        for position in np.ndindex(arr.shape):
+            value = arr[position]
+            if isinstance(value, str) and value == '--':
+                self.objects.pop(position, None)
+                self.valid[position] = False
+            elif (position not in self.objects or
+                    self.objects[position] is not value):
+                self.objects[position] = value
+                self.valid[position] = True
+
+    @classmethod
+    def fromArray(cls, arr):
+        """Create a column from an array as provided by DataHandler."""
+        arr = np.asanyarray(arr)
+        column = cls(arr.shape)
+        if arr.dtype == object:
+            column.objects = {}
+            column.update(arr)
+        else:
+            column.valid[...] = ~np.ma.getmaskarray(arr)
+            column.values[...] = np.ma.getdata(arr)
+        return column
+
+
 class DataHandler(_ComparisonMixin, dict):
     """For handling data (used by TrialHandler, principally, rather than
     by users directly)
@@ -453,6 +592,14 @@ class DataHandler(_ComparisonMixin, dict):
     to a standard (not masked) numpy array with dtype='O' and where missing
     entries have value = "--".
 
+    Internally each data type is held in a growable column (numeric values
+    and a validity map, or the original values once any are non-numeric)
+    and the arrays above are built from it when they are accessed, so
+    adding data is cheap even when types are mixed or the trial matrix has
+    to grow. Arrays that are already built are updated in place where
+    possible, and direct changes to them (e.g. to their mask) are copied
+    back into the column before it needs rebuilding.
+
     Attributes:
         - ['key']=data arrays containing values for that key
             (e.g. data['accuracy']=...)
@@ -464,6 +611,8 @@ class DataHandler(_ComparisonMixin, dict):
         self.trials = trials
         self.dataTypes = []  # names will be added during addDataType
         self.isNumeric = {}
+        self._columns = {}
+        self._stale = set()  # data types whose arrays need rebuilding
         # if given dataShape use it - otherwise guess!
         if dataShape:
             self.dataShape = dataShape
@@ -493,31 +642,171 @@ class DataHandler(_ComparisonMixin, dict):
                    'comparison.')
             logging.warning(msg)
         else:
+            self._sync()
+            if isinstance(other, DataHandler):
+                other._sync()
             result = super(DataHandler, self).__eq__(other)
 
         return result
 
-    def addDataType(self, names, shape=None):
+    def _sync(self, thisType=None):
+        """Rebuild the arrays of data types that have changed (or just
+        `thisType`) from their columns.
+        """
+        if not self.__dict__.get('_stale'):
+            return
+        names = list(self._stale) if thisType is None else [thisType]
+        for name in names:
+            if name in self._stale:
+                self._stale.discard(name)
+                dict.__setitem__(self, name, self._columns[name].asArray())
+
+    def _markStale(self, thisType):
+        """Flag that the array of `thisType` needs rebuilding, keeping any
+        changes that were made to it directly.
+        """
+        if thisType in self._stale:
+            return
+        column = self._columns[thisType]
+        if column.exposed:
+            column.update(dict.__getitem__(self, thisType))
+            column.exposed = False
+        self._stale.add(thisType)
+
+    def _expose(self, names):
+        """Note that the arrays of `names` have been handed out (and so
+        might be changed directly).
+        """
+        for name in names:
+            if name in self._columns:
+                self._columns[name].exposed = True
+
+    def __getitem__(self, key):
+        self._sync(key)
+        self._expose([key])
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        # NB this is also used when unpickling, before __dict__ is restored
+        if '_columns' not in self.__dict__:
+            self._columns = {}
+            self._stale = set()
+        self._columns[key] = _DataColumn.fromArray(value)
+        self._columns[key].exposed = True
+        self._stale.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def __getstate__(self):
+        # columns are rebuilt from the arrays (which are pickled as items)
+        self._sync()
+        state = self.__dict__.copy()
+        state.pop('_columns', None)
+        state.pop('_stale', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if '_columns' not in self.__dict__:
+            self._columns = {}
+            self._stale = set()
+
+    def __reduce_ex__(self, protocol):
+        self._sync()  # items need to be up to date for pickle/copy
+        return super(DataHandler, self).__reduce_ex__(protocol)
+
+    def get(self, key, default=None):
+        self._sync(key)
+        self._expose([key])
+        return dict.get(self, key, default)
+
+    def items(self):
+        self._sync()
+        self._expose(self._columns)
+        return dict.items(self)
+
+    def values(self):
+        self._sync()
+        self._expose(self._columns)
+        return dict.values(self)
+
+    def copy(self):
+        self._sync()
+        self._expose(self._columns)
+        return dict.copy(self)
+
+    def __iter__(self):
+        # NB also makes dict(self) and {**self} go through __getitem__
+        self._sync()
+        return dict.__iter__(self)
+
+    def __repr__(self):
+        self._sync()
+        return dict.__repr__(self)
+
+    def __or__(self, other):
+        return dict.__or__(dict(self), other)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        self._sync(key)
+        self._columns.pop(key, None)
+        self._stale.discard(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._sync()
+        key, value = dict.popitem(self)
+        self._columns.pop(key, None)
+        return key, value
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._columns.pop(key, None)
+        self._stale.discard(key)
+
+    def clear(self):
+        dict.clear(self)
+        self._columns.clear()
+        self._stale.clear()
+
+    def addDataType(self, names, shape=None, masked=True):
         """Add a new key to the data dictionary of particular shape if
         specified (otherwise the shape of the trial matrix in the trial
         handler. Data are initialised to be zero everywhere. Not needed
         by user: appropriate types will be added during initialisation
         and as each xtra type is needed.
+
+        If `masked` is False then all entries are valid (initially zero)
+        rather than missing.
         """
         if not shape:
             shape = self.dataShape
         if not isinstance(names, str):
             # recursively call this function until we have a string
             for thisName in names:
-                self.addDataType(thisName)
+                self.addDataType(thisName, shape=shape, masked=masked)
         else:
             # create the appropriate array in the dict
             # initially use numpy masked array of floats with mask=True
             # for missing vals. convert to a numpy array with dtype='O'
             # if non-numeric data given. NB don't use masked array with
             # dytpe='O' together - they don't unpickle
-            self[names] = np.ma.zeros(shape, 'f')  # masked array of floats
-            self[names].mask = True
+            column = _DataColumn(shape, masked=masked)
+            self._columns[names] = column
+            self._stale.discard(names)
+            dict.__setitem__(self, names, column.asArray())
             # add the name to the list
             self.dataTypes.append(names)
             self.isNumeric[names] = True  # until we need otherwise
@@ -529,7 +818,8 @@ class DataHandler(_ComparisonMixin, dict):
             self.addDataType(thisType)
         if position is None:
             # 'ran' is always the first thing to update
-            repN = sum(self['ran'][self.trials.thisIndex])
+            ran = self._columns['ran']
+            repN = int(np.sum(ran.values[self.trials.thisIndex]))
             if thisType != 'ran':
                 # because it has already been updated
                 repN -= 1
@@ -537,30 +827,25 @@ class DataHandler(_ComparisonMixin, dict):
             position = [self.trials.thisIndex]
             position.append(repN)
 
-        # check whether data falls within bounds
-        posArr = np.asarray(position)
-        shapeArr = np.asarray(self.dataShape)
-        if not np.alltrue(posArr < shapeArr):
-            # array isn't big enough
-            logging.warning('need a bigger array for: ' + thisType)
-            # not implemented yet!
-            self[thisType] = extendArr(self[thisType], posArr)
         # check for ndarrays with more than one value and for non-numeric data
-        if (self.isNumeric[thisType] and
-                ((type(value) == np.ndarray and len(value) > 1) or
-                     (type(value) not in [float, int]))):
+        numeric = not ((type(value) == np.ndarray and len(value) > 1) or
+                       (type(value) not in [float, int]))
+        if self.isNumeric[thisType] and not numeric:
             self._convertToObjectArray(thisType)
-        # insert the value
-        self[thisType][position[0], int(position[1])] = value
+        position = (position[0], int(position[1]))
+        column = self._columns[thisType]
+        if column.set(position, value, numeric=numeric):
+            # array isn't big enough, it will be rebuilt when next needed
+            self._markStale(thisType)
+        if thisType not in self._stale:
+            # update the existing array too
+            dict.__getitem__(self, thisType)[position] = value
 
     def _convertToObjectArray(self, thisType):
         """Convert this datatype from masked numeric array to unmasked
         object array
         """
-        dat = self[thisType]
-        # create an array of Object type
-        self[thisType] = np.array(dat.data, dtype='O')
-        # masked vals should be "--", others keep data
-        # we have to repeat forcing to 'O' or text gets truncated to 4chars
-        self[thisType] = np.where(dat.mask, '--', dat).astype('O')
+        # the array is rebuilt (as dtype='O') from the column when needed
+        self._markStale(thisType)
+        self._columns[thisType].toObjects()
         self.isNumeric[thisType] = False
@@ -0,0 +1,638 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019-2022 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+"""Compact, append-only storage of trial entries and incremental writers for
+streaming them to disk while an experiment is running.
+
+These are used by :class:`~psychopy.data.ExperimentHandler` when it is
+created with ``columnar=True`` and/or ``streamFormat=...`` but can also be
+used on their own.
+"""
+
+import os
+import array
+import queue
+import shutil
+import threading
+
+import numpy as np
+
+from psychopy import logging
+from psychopy.tools.filetools import openOutputFile
+
+__all__ = ['ColumnarStore', 'StreamingWriter', 'formatWideTextRow']
+
+# kinds of column held by the store
+_INT = 'int'  # exact python ints, stored in array('q')
+_FLOAT = 'float'  # exact python floats, stored in array('d')
+_CATEGORY = 'category'  # hashable values (str, bool, None...), interned
+_OBJECT = 'object'  # anything else (lists, dicts, arrays), stored as-is
+_INT_MIN, _INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def formatWideTextRow(entry, names, delim):
+    """Format a single entry (dict) as one row of a wide-text data file.
+
+    Values are written with `str()` and quoted if they contain a comma or a
+    new line. Every cell is followed by `delim` (including the last one), as
+    in :meth:`~psychopy.data.ExperimentHandler.saveAsWideText`.
+    """
+    cells = []
+    for name in names:
+        if name in entry:
+            value = entry[name]
+            ename = str(value)
+            if ',' in ename or '\n' in ename:
+                cells.append(u'"%s"%s' % (value, delim))
+            else:
+                cells.append(u'%s%s' % (value, delim))
+        else:
+            cells.append(delim)
+    return u''.join(cells) + '\n'
+
+
+def _kindOf(value):
+    """The narrowest column kind able to hold `value` without changing how
+    it is represented when written out."""
+    valueType = type(value)
+    if valueType is float:
+        return _FLOAT
+    if valueType is int and _INT_MIN <= value <= _INT_MAX:
+        return _INT
+    try:
+        hash(value)
+    except TypeError:
+        return _OBJECT
+    return _CATEGORY
+
+
+class _Column:
+    """A single typed column with a validity map (1 = has a value)."""
+
+    __slots__ = ('kind', 'values', 'valid', 'categories', 'lookup')
+
+    def __init__(self, kind, nMissing=0):
+        self.kind = kind
+        self.categories = None
+        self.lookup = None
+        if kind == _INT:
+            self.values = array.array('q', bytes(8 * nMissing))
+        elif kind == _FLOAT:
+            self.values = array.array('d', bytes(8 * nMissing))
+        elif kind == _CATEGORY:
+            self.values = array.array('l', bytes(
+                array.array('l').itemsize * nMissing))
+            self.categories = []
+            self.lookup = {}
+        else:
+            self.values = [None] * nMissing
+        self.valid = bytearray(nMissing)
+
+    def __len__(self):
+        return len(self.valid)
+
+    def _code(self, value):
+        # key on the type too, otherwise True/1/1.0 would share a code
+        key = (type(value), value)
+        code = self.lookup.get(key)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self.lookup[key] = code
+        return code
+
+    def append(self, value):
+        kind = _kindOf(value)
+        if kind != self.kind and self.kind != _OBJECT and not (
+                self.kind == _CATEGORY and kind != _OBJECT):
+            self._promote(kind)
+        if self.kind == _CATEGORY:
+            self.values.append(self._code(value))
+        else:
+            self.values.append(value)
+        self.valid.append(1)
+
+    def appendMissing(self):
+        if self.kind == _OBJECT:
+            self.values.append(None)
+        else:
+            self.values.append(0)
+        self.valid.append(0)
+
+    def get(self, index):
+        if self.kind == _CATEGORY:
+            return self.categories[self.values[index]]
+        return self.values[index]
+
+    def discard(self, n):
+        del self.values[:n]
+        del self.valid[:n]
+
+    def _promote(self, kind):
+        """Change the column kind so that it can hold values of `kind`. This
+        copies the column once, so only happens when types are mixed."""
+        old = [self.get(ii) if self.valid[ii] else None
+               for ii in range(len(self.valid))]
+        if kind == _OBJECT or self.kind == _OBJECT:
+            self.kind = _OBJECT
+            self.values = old
+            self.categories = self.lookup = None
+            return
+        # any other mix of kinds can be held as (interned) categories
+        self.kind = _CATEGORY
+        self.categories = []
+        self.lookup = {}
+        self.values = array.array(
+            'l', [self._code(v) if ok else 0 for v, ok in zip(old, self.valid)])
+
+
+class ColumnarStore:
+    """An append-only, column-oriented table of trial entries.
+
+    Behaves like a list of dicts (it can be appended to, indexed, sliced and
+    iterated) but holds each column as a typed array: exact ints and floats
+    are packed into :mod:`array` buffers, hashable values (strings, bools,
+    `None`...) are interned so that repeated values are only stored once, and
+    only unhashable values are kept as Python objects. Missing cells are
+    tracked with a per-column validity map, so rows with different keys can
+    be mixed freely.
+
+    Rows can be dropped from the front of the store with :meth:`discard`
+    (e.g. once they have been written to disk) to keep memory bounded.
+
+    Examples
+    --------
+    Storing some entries and reading them back::
+
+        store = ColumnarStore()
+        store.append({'resp.keys': 'left', 'resp.rt': 0.53})
+        store.append({'resp.keys': 'right'})
+        store[1]  # {'resp.keys': 'right'}
+        store.getColumn('resp.rt')  # masked array [0.53, --]
+
+    """
+
+    def __init__(self, entries=None):
+        self._columns = {}  # insertion ordered, name -> _Column
+        self._nRows = 0
+        self.nDiscarded = 0  # rows dropped from the front so far
+        if entries is not None:
+            self.extend(entries)
+
+    def __len__(self):
+        return self._nRows
+
+    def __repr__(self):
+        return '<%s: %i rows, %i columns>' % (
+            self.__class__.__name__, self._nRows, len(self._columns))
+
+    def __iter__(self):
+        for ii in range(self._nRows):
+            yield self._getRow(ii)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._getRow(ii) for ii in range(*index.indices(self._nRows))]
+        if index < 0:
+            index += self._nRows
+        if not 0 <= index < self._nRows:
+            raise IndexError('ColumnarStore index out of range')
+        return self._getRow(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (ColumnarStore, list)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __copy__(self):
+        return ColumnarStore(self)
+
+    @property
+    def columnNames(self):
+        """Names of all columns seen so far, in the order they first
+        appeared (`list`)."""
+        return list(self._columns)
+
+    def _getRow(self, index):
+        row = {}
+        for name, column in self._columns.items():
+            if column.valid[index]:
+                row[name] = column.get(index)
+        return row
+
+    def append(self, entry):
+        """Add an entry (a `dict` of name/value pairs) as a new row."""
+        columns = self._columns
+        for name, value in entry.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = _Column(_kindOf(value), self._nRows)
+            column.append(value)
+        self._nRows += 1
+        if len(entry) < len(columns):
+            for column in columns.values():
+                if len(column) < self._nRows:
+                    column.appendMissing()
+
+    def extend(self, entries):
+        """Add several entries as new rows."""
+        for entry in entries:
+            self.append(entry)
+
+    def discard(self, n):
+        """Drop the oldest `n` rows from the store.
+
+        Column names and interned values are kept, so writers that rely on
+        :attr:`columnNames` are unaffected.
+        """
+        n = min(n, self._nRows)
+        if n <= 0:
+            return
+        for column in self._columns.values():
+            column.discard(n)
+        self._nRows -= n
+        self.nDiscarded += n
+
+    def getColumn(self, name):
+        """Get all values of a column as a `numpy.ma.MaskedArray`, with
+        missing cells masked. Int and float columns keep their dtype, other
+        columns are returned as object arrays.
+        """
+        column = self._columns[name]
+        mask = np.frombuffer(bytes(column.valid), dtype=np.uint8) == 0
+        if column.kind == _INT:
+            values = np.frombuffer(column.values, dtype=np.int64).copy()
+        elif column.kind == _FLOAT:
+            values = np.frombuffer(column.values, dtype=np.float64).copy()
+        elif column.kind == _CATEGORY:
+            categories = np.empty(max(len(column.categories), 1), dtype='O')
+            categories[:len(column.categories)] = column.categories
+            codes = np.frombuffer(column.values, dtype=column.values.typecode)
+            values = categories[codes]
+        else:
+            values = np.empty(len(column.values), dtype='O')
+            values[:] = column.values
+        return np.ma.MaskedArray(values, mask=mask)
+
+
+class _StreamWriterThread(threading.Thread):
+    """Thread that drains the entry queue of a :class:`StreamingWriter` and
+    writes them out in batches.
+
+    If writing fails the error is kept for the writer to raise, and later
+    entries are dropped, but the thread keeps draining the queue so that
+    flushing and closing the writer don't wait forever.
+    """
+
+    def __init__(self, writer):
+        threading.Thread.__init__(self, daemon=True)
+        self._writer = writer
+
+    def run(self):
+        entryQueue = self._writer._queue
+        stop = False
+        while not stop:
+            batch = []
+            item = entryQueue.get()
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    self._write(batch)
+                    batch = []
+                    item.set()
+                else:
+                    batch.append(item)
+                try:
+                    item = entryQueue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        if self._writer._error is not None:
+            return
+        try:
+            self._writer._writeBatch(batch)
+        except Exception as err:
+            self._writer._error = err
+
+
+class StreamingWriter:
+    """Writes trial entries to disk incrementally, on a background thread.
+
+    Entries passed to :meth:`write` are queued and written out in batches
+    by a worker thread, so the data file on disk stays up to date while the
+    experiment runs without the file I/O happening in the trial loop.
+
+    Parameters
+    ----------
+    fileName : str
+        Name of the file to write to. The extension is added from
+        `fileType` if not given.
+    fileType : str
+        One of 'csv', 'tsv' or 'parquet'. Parquet files need the `pyarrow`
+        package to be installed.
+    encoding : str
+        Encoding for text files.
+    fileCollisionMethod : str
+        Collision method passed to
+        :func:`~psychopy.tools.fileerrortools.handleFileCollision` if the
+        file exists already.
+    threaded : bool
+        If `False`, entries are written immediately in the calling thread
+        (mostly useful for debugging). If writing on the background thread
+        fails (e.g. the disk is full) later entries are not written, and
+        the error is raised by the next call to :meth:`write`,
+        :meth:`flush` or :meth:`close`.
+
+    Notes
+    -----
+    Columns are written in the order they are first seen. For text files a
+    column appearing for the first time causes the header line to be
+    rewritten, and each row has cells for the columns seen up to and
+    including its own entry (so rows written before a column first
+    appeared simply end early, which is read as missing values). Parquet
+    files have a fixed schema, in which all columns are nullable. Columns
+    with only missing values so far have the null type, numbers of mixed
+    types are stored as floats and other mixed values as text. When a new
+    column appears (or a column's type has to be widened) the rows written
+    so far are copied into a new file with the wider schema, which then
+    replaces the original on the next change of schema or on :meth:`close`,
+    so the data always end up in a single file.
+    """
+
+    fileTypes = {'csv': ',', 'tsv': '\t', 'parquet': None}
+
+    def __init__(self, fileName, fileType='csv', encoding='utf-8-sig',
+                 fileCollisionMethod='rename', threaded=True):
+        if fileType not in self.fileTypes:
+            raise ValueError("Unknown fileType %r for StreamingWriter, "
+                             "should be one of %s" % (fileType,
+                                                      list(self.fileTypes)))
+        if fileType == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Streaming data to parquet requires the "
+                                  "`pyarrow` package to be installed.")
+        ext = '.' + fileType
+        if not fileName.endswith(ext):
+            fileName += ext
+        self.fileType = fileType
+        self.delim = self.fileTypes[fileType]
+        self.encoding = encoding
+        self.fileCollisionMethod = fileCollisionMethod
+        self.names = []  # column names, in order of appearance
+        self.nWritten = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error = None  # exception raised on the writer thread
+        self._file = None
+        self._headerLen = 0  # length of the header line currently on disk
+        self._parquet = None  # pyarrow.parquet.ParquetWriter
+        self._parquetName = None  # file the ParquetWriter writes to
+        self.fileNames = []
+        self._baseName = fileName
+        self._open(fileName)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        if threaded:
+            self._thread = _StreamWriterThread(self)
+            self._thread.start()
+
+    @property
+    def fileName(self):
+        """Name of the file currently being written to (`str`)."""
+        return self.fileNames[-1]
+
+    def _open(self, fileName):
+        if self.fileType == 'parquet':
+            # opened lazily, once the schema of the first batch is known
+            if os.path.exists(fileName):
+                from psychopy.tools.fileerrortools import handleFileCollision
+                fileName = handleFileCollision(fileName,
+                                               self.fileCollisionMethod)
+            self.fileNames.append(fileName)
+        else:
+            self._file = openOutputFile(
+                fileName, append=False,
+                fileCollisionMethod=self.fileCollisionMethod,
+                encoding=self.encoding)
+            self.fileNames.append(self._file.name)
+
+    def _raiseError(self):
+        """Raise the error that stopped the writer thread, if any."""
+        if self._error is not None:
+            raise self._error
+
+    def write(self, entry):
+        """Queue an entry (`dict`) to be written."""
+        if self._closed:
+            logging.warning("Entry sent to a closed StreamingWriter (%s) will "
+                            "not be written" % self._baseName)
+            return
+        self._raiseError()
+        if self._thread is None:
+            self._writeBatch([entry])
+        else:
+            self._queue.put(entry)
+
+    def flush(self, timeout=None):
+        """Block until all queued entries have been written to disk.
+
+        Returns `False` if `timeout` (s) expired first.
+        """
+        if self._thread is None or self._closed:
+            return True
+        self._raiseError()
+        done = threading.Event()
+        self._queue.put(done)
+        flushed = done.wait(timeout)
+        self._raiseError()
+        return flushed
+
+    @property
+    def queueDepth(self):
+        """Approximate number of entries waiting to be written (`int`)."""
+        return self._queue.qsize()
+
+    def close(self):
+        """Write any remaining entries and close the file."""
+        if self._closed:
+            return
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+        self._closed = True
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._parquet is not None:
+                self._closeParquet()
+        self._raiseError()
+        logging.info('saved data to %r' % self.fileName)
+
+    def _writeBatch(self, batch):
+        if not batch:
+            return
+        with self._lock:
+            if self.fileType == 'parquet':
+                self._writeParquet(batch)
+            else:
+                self._writeText(batch)
+            self.nWritten += len(batch)
+
+    def _updateNames(self, batch):
+        """Add names not seen before, returns True if there were any."""
+        known = set(self.names)
+        nBefore = len(self.names)
+        for entry in batch:
+            if len(entry) > len(known) or not known.issuperset(entry):
+                for name in entry:
+                    if name not in known:
+                        known.add(name)
+                        self.names.append(name)
+        return len(self.names) != nBefore
+
+    def _writeText(self, batch):
+        # each row has cells for the columns seen up to and including its
+        # entry, so the output doesn't depend on how entries were batched
+        delim = self.delim
+        nBefore = len(self.names)
+        rows = []
+        for entry in batch:
+            self._updateNames([entry])
+            rows.append(formatWideTextRow(entry, self.names, delim))
+        if len(self.names) != nBefore:
+            self._rewriteHeader()
+        self._file.write(u''.join(rows))
+        self._file.flush()
+
+    def _rewriteHeader(self):
+        header = u''.join(u'%s%s' % (name, self.delim)
+                          for name in self.names) + '\n'
+        fileName = self._file.name
+        if self._headerLen:
+            # swap the header line of what we have written so far, in a copy
+            # which then replaces the file, so a crash part way through
+            # can't lose the data already written
+            self._file.close()
+            tmpName = fileName + '.tmp'
+            with open(fileName, 'r', encoding=self.encoding,
+                      newline='') as src, \
+                    open(tmpName, 'w', encoding=self.encoding,
+                         newline='') as dst:
+                src.read(self._headerLen)
+                dst.write(header)
+                shutil.copyfileobj(src, dst)
+            os.replace(tmpName, fileName)
+            self._file = open(fileName, 'a', encoding=self.encoding,
+                              newline='')
+        else:
+            self._file.write(header)
+        self._headerLen = len(header)
+
+    def _writeParquet(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._updateNames(batch)
+        arrays = []
+        for name in self.names:
+            values = [entry.get(name) for entry in batch]
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                # mixed or unsupported types, store the text representation
+                arrays.append(_textArray(values))
+        if self._parquet is None:
+            schema = pa.schema(
+                [(name, arr.type) for name, arr in zip(self.names, arrays)])
+        else:
+            old = self._parquet.schema
+            schema = pa.schema([
+                (name, _widestType(old.field(name).type, arr.type)
+                 if name in old.names else arr.type)
+                for name, arr in zip(self.names, arrays)])
+            if not schema.equals(old):
+                self._widenParquet(schema)
+        table = pa.Table.from_arrays(
+            [_castArray(arr, field.type) for arr, field in zip(arrays, schema)],
+            schema=schema)
+        if self._parquet is None:
+            self._parquetName = self.fileName
+            self._parquet = pq.ParquetWriter(self._parquetName, schema)
+        self._parquet.write_table(table)
+
+    def _widenParquet(self, schema):
+        """Copy the rows written so far into a new file with `schema`."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._closeParquet()
+        old = pq.read_table(self.fileName)
+        columns = []
+        for field in schema:
+            if field.name in old.column_names:
+                columns.append(_castArray(
+                    old.column(field.name).combine_chunks(), field.type))
+            else:
+                columns.append(pa.nulls(old.num_rows, field.type))
+        self._parquetName = self.fileName + '.tmp'
+        self._parquet = pq.ParquetWriter(self._parquetName, schema)
+        self._parquet.write_table(
+            pa.Table.from_arrays(columns, schema=schema))
+
+    def _closeParquet(self):
+        self._parquet.close()
+        self._parquet = None
+        if self._parquetName != self.fileName:
+            # the widened copy is complete, so it can replace the original
+            os.replace(self._parquetName, self.fileName)
+        self._parquetName = None
+
+
+def _textArray(values):
+    import pyarrow as pa
+    return pa.array([None if v is None else str(v) for v in values],
+                    type=pa.string())
+
+
+def _widestType(type1, type2):
+    """Arrow type that can hold values of both `type1` and `type2`."""
+    import pyarrow as pa
+    if type1.equals(type2) or pa.types.is_null(type2):
+        return type1
+    if pa.types.is_null(type1):
+        return type2
+
+    def isNumber(t):
+        return pa.types.is_integer(t) or pa.types.is_floating(t)
+
+    if isNumber(type1) and isNumber(type2):
+        return pa.float64()
+    return pa.string()
+
+
+def _castArray(array, type):
+    import pyarrow as pa
+    if array.type.equals(type):
+        return array
+    if pa.types.is_string(type) and not pa.types.is_null(array.type):
+        # same text as for values that were mixed within a batch
+        return _textArray(array.to_pylist())
+    return array.cast(type)
@@ -12,6 +12,7 @@ from psychopy.tools.filetools import (openOutputFile, genDelimiter,
                                       genFilenameFromDelimiter)
 from .utils import checkValidFilePath
 from .base import _ComparisonMixin
+from .columnar import ColumnarStore, StreamingWriter, formatWideTextRow
 
 
 class ExperimentHandler(_ComparisonMixin):
@@ -36,7 +37,10 @@ class ExperimentHandler(_ComparisonMixin):
                  saveWideText=True,
                  dataFileName='',
                  autoLog=True,
-                 appendFiles=False):
+                 appendFiles=False,
+                 columnar=False,
+                 streamFormat=None,
+                 maxEntries=None):
         """
         :parameters:
 
@@ -71,6 +75,29 @@ class ExperimentHandler(_ComparisonMixin):
             saveWideText : True (default) or False
 
             autoLog : True (default) or False
+
+            columnar : True or False (default)
+                Hold completed entries in a compact
+                :class:`~psychopy.data.columnar.ColumnarStore` (typed
+                columns, repeated strings interned) rather than a list of
+                dicts. Recommended for long sessions with many trials.
+
+            streamFormat : None (default), 'csv', 'tsv' or 'parquet'
+                If given, each completed entry is also written to
+                `dataFileName` (plus extension) by a background thread, so
+                the data file on disk is kept up to date during the session.
+                The streamed file replaces the wide-text file that would
+                otherwise be saved at the end. The most recent entry is
+                written on the following nextEntry() call (so that times
+                stamped on the next screen flip are included), when the
+                data are saved, or when `entries` is read (so values
+                stamped after that are not included in it).
+
+            maxEntries : None (default) or int
+                When streaming, only keep this many of the most recent
+                entries in memory (older ones are only on disk). This keeps
+                memory use bounded but means that saveAsWideText() and
+                saveAsPickle() will only contain those entries.
         """
         self.loops = []
         self.loopsUnfinished = []
@@ -86,7 +113,13 @@ class ExperimentHandler(_ComparisonMixin):
         self.saveWideText = saveWideText
         self.dataFileName = dataFileName
         self.thisEntry = {}
-        self.entries = []  # chronological list of entries
+        if columnar:
+            self._entries = ColumnarStore()  # chronological entries
+        else:
+            self._entries = []  # chronological list of entries
+        self._pendingEntry = None  # completed, not yet committed
+        self._dataWriter = None  # StreamingWriter, if streaming
+        self.maxEntries = maxEntries
         self._paramNamesSoFar = []
         self.dataNames = []  # names of all the data (eg. resp.keys)
         self.autoLog = autoLog
@@ -99,11 +132,52 @@ class ExperimentHandler(_ComparisonMixin):
         else:
             # fail now if we fail at all!
             checkValidFilePath(dataFileName, makeValid=True)
+
+        if streamFormat is not None:
+            if dataFileName in ['', None]:
+                raise ValueError("ExperimentHandler needs a dataFileName to "
+                                 "stream data to")
+            self._dataWriter = StreamingWriter(dataFileName,
+                                               fileType=streamFormat)
+        elif maxEntries is not None:
+            raise ValueError("ExperimentHandler can only limit maxEntries "
+                             "when streaming data (streamFormat) or the "
+                             "older entries would be lost")
         atexit.register(self.close)
 
     def __del__(self):
         self.close()
 
+    def __getstate__(self):
+        # the stream writer (thread and open file) can't be pickled
+        state = self.__dict__.copy()
+        state['_dataWriter'] = None
+        state['entries'] = state.pop('_entries')
+        return state
+
+    def __setstate__(self, state):
+        state['_entries'] = state.pop('entries')
+        # files saved by older versions won't have these
+        state.setdefault('_pendingEntry', None)
+        state.setdefault('_dataWriter', None)
+        state.setdefault('maxEntries', None)
+        self.__dict__.update(state)
+
+    @property
+    def entries(self):
+        """The completed entries, in chronological order.
+
+        When entries are held in columnar form or streamed, the most recent
+        entry is only stored on the following nextEntry() call. Reading
+        `entries` stores it straight away, so it is always included.
+        """
+        self._commitPendingEntry()
+        return self._entries
+
+    @entries.setter
+    def entries(self, entries):
+        self._entries = entries
+
     @property
     def currentLoop(self):
         """
@@ -263,9 +337,35 @@ class ExperimentHandler(_ComparisonMixin):
         # add the extraInfo dict to the data
         if type(self.extraInfo) == dict:
             this.update(self.extraInfo)
-        self.entries.append(this)
+        if isinstance(self._entries, list) and self._dataWriter is None:
+            self._entries.append(this)
+        else:
+            # entries are converted/written once complete, which is only
+            # after the next flip (see timestampOnFlip) so commit the
+            # previous one and keep this one pending
+            self._commitPendingEntry()
+            self._pendingEntry = this
         self.thisEntry = {}
 
+    def _commitPendingEntry(self):
+        """Store (and stream) the last completed entry, if it hasn't been
+        already.
+        """
+        this = self._pendingEntry
+        if this is None:
+            return
+        self._pendingEntry = None
+        self._entries.append(this)
+        if self._dataWriter is not None:
+            self._dataWriter.write(this)
+            nExtra = len(self._entries) - self.maxEntries \
+                if self.maxEntries is not None else 0
+            if nExtra > 0:
+                if isinstance(self._entries, ColumnarStore):
+                    self._entries.discard(nExtra)
+                else:
+                    del self._entries[:nExtra]
+
     def getAllEntries(self):
         """Fetches a copy of all the entries including a final (orphan) entry
         if that exists. This allows entries to be saved even if nextEntry() is
@@ -273,8 +373,9 @@ class ExperimentHandler(_ComparisonMixin):
 
         :return: copy (not pointer) to entries
         """
+        self._commitPendingEntry()
         # check for orphan final data (not committed as a complete entry)
-        entries = copy.copy(self.entries)
+        entries = list(self.entries)
         if self.thisEntry:  # thisEntry is not empty
             entries.append(self.thisEntry)
         return entries
@@ -368,17 +469,7 @@ class ExperimentHandler(_ComparisonMixin):
 
         # write the data for each entry
         for entry in self.getAllEntries():
-            for name in names:
-                if name in entry:
-                    ename = str(entry[name])
-                    if ',' in ename or '\n' in ename:
-                        fmt = u'"%s"%s'
-                    else:
-                        fmt = u'%s%s'
-                    f.write(fmt % (entry[name], delim))
-                else:
-                    f.write(delim)
-            f.write('\n')
+            f.write(formatWideTextRow(entry, names, delim))
         if f != sys.stdout:
             f.close()
         logging.info('saved data to %r' % f.name)
@@ -428,14 +519,37 @@ class ExperimentHandler(_ComparisonMixin):
         self.savePickle = savePickle
         self.saveWideText = saveWideText
         
+    def flushStream(self, timeout=None):
+        """Write all completed entries to the streamed data file now and
+        wait until that has finished. Does nothing unless the handler was
+        created with a `streamFormat`.
+
+        Returns `False` if the `timeout` (s) expired before the data were
+        written. If writing the file failed, the error is raised here.
+        """
+        if self._dataWriter is None:
+            return True
+        self._commitPendingEntry()
+        return self._dataWriter.flush(timeout)
+
     def close(self):
         if self.dataFileName not in ['', None]:
             if self.autoLog:
                 msg = 'Saving data for %s ExperimentHandler' % self.name
                 logging.debug(msg)
+            streamed = self._dataWriter is not None
+            if streamed:
+                try:
+                    self._commitPendingEntry()
+                    if self.thisEntry:  # orphan final entry
+                        self._dataWriter.write(self.thisEntry)
+                finally:
+                    # closes the file even if writing it failed
+                    writer, self._dataWriter = self._dataWriter, None
+                    writer.close()
             if self.savePickle:
                 self.saveAsPickle(self.dataFileName)
-            if self.saveWideText:
+            if self.saveWideText and not streamed:
                 self.saveAsWideText(self.dataFileName + '.csv')
         self.abort()
         self.autoLog = False
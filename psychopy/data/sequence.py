@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019-2022 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+"""Precomputed trial schedules, as used by
+:class:`~psychopy.data.TrialHandler2`.
+"""
+
+import numpy as np
+
+__all__ = ['TrialSequence']
+
+
+def _occurrenceCounts(indices):
+    """For each element of `indices`, how many times the same value occurred
+    earlier in the array (vectorised, O(n log n))."""
+    indices = np.asarray(indices)
+    counts = np.zeros(len(indices), dtype=np.int64)
+    if not len(indices):
+        return counts
+    order = np.argsort(indices, kind='stable')
+    sortedVals = indices[order]
+    # position at which each run of equal values starts
+    newRun = np.empty(len(indices), dtype=bool)
+    newRun[0] = True
+    newRun[1:] = sortedVals[1:] != sortedVals[:-1]
+    runStarts = np.maximum.accumulate(
+        np.where(newRun, np.arange(len(indices)), 0))
+    counts[order] = np.arange(len(indices)) - runStarts
+    return counts
+
+
+class TrialSequence:
+    """The complete schedule of a loop, generated up front.
+
+    For every trial of the loop this holds the index into the conditions
+    list (:attr:`indices`), the repeat number (:attr:`repNs`) and the trial
+    number within the repeat (:attr:`trialNs`) as NumPy arrays, so that
+    moving to the next trial and looking trials ahead or behind are O(1).
+
+    Parameters
+    ----------
+    nConds : int
+        Number of conditions.
+    nReps : int
+        Number of repeats of the conditions.
+    method : str
+        'sequential', 'random' or 'fullRandom' (see
+        :class:`~psychopy.data.TrialHandler2`).
+    rng : numpy.random.Generator or None
+        Generator used for randomisation. The same generator calls are made
+        as when the repeats were shuffled one at a time, so a seed gives the
+        same order of trials as before the schedule was precomputed.
+    sequence : array-like or None
+        A user-defined order of condition indices, which overrides `method`.
+        A 1-D sequence is treated as one block (like 'fullRandom', so that
+        the repeat number of a trial is the number of times its condition
+        occurred before). A 2-D sequence has one row per repeat (like
+        'random').
+
+    """
+
+    def __init__(self, nConds, nReps, method='random', rng=None,
+                 sequence=None):
+        self.nConds = int(nConds)
+        self.method = method
+        if rng is None:
+            rng = np.random.default_rng()
+
+        if sequence is not None:
+            sequence = np.asarray(sequence, dtype=np.int64)
+            if sequence.size and (sequence.min() < 0 or
+                                  sequence.max() >= self.nConds):
+                raise ValueError("TrialSequence `sequence` contains indices "
+                                 "outside the range of the conditions")
+            if sequence.ndim == 1:
+                self.blockWise = False
+                indices = sequence.copy()
+            elif sequence.ndim == 2:
+                self.blockWise = True
+                blocks = sequence
+            else:
+                raise ValueError("TrialSequence `sequence` should be 1-D or "
+                                 "2-D")
+        elif method == 'fullRandom':
+            self.blockWise = False
+            indices = rng.permutation(
+                np.tile(np.arange(self.nConds, dtype=np.int64), nReps))
+        elif method in ('sequential', 'random'):
+            self.blockWise = True
+            blocks = np.tile(np.arange(self.nConds, dtype=np.int64),
+                             (max(int(nReps), 0), 1))
+            if method == 'random' and blocks.size:
+                blocks = rng.permuted(blocks, axis=1)
+        else:
+            raise ValueError("Unknown method %r for TrialSequence" % method)
+
+        if self.blockWise:
+            nBlocks, blockLen = blocks.shape
+            self.indices = blocks.ravel()
+            # NB repeats are numbered from 1 by TrialHandler2
+            self.repNs = np.repeat(
+                np.arange(1, nBlocks + 1, dtype=np.int64), blockLen)
+            self.trialNs = np.tile(
+                np.arange(blockLen, dtype=np.int64), nBlocks)
+        else:
+            self.indices = indices
+            self.repNs = _occurrenceCounts(indices)
+            self.trialNs = np.arange(len(indices), dtype=np.int64)
+
+        self.pos = -1  # position of the current trial in the schedule
+
+    @classmethod
+    def resume(cls, nConds, nReps, method, rng, previous, remaining, repN,
+               trialN):
+        """Rebuild the schedule of a loop that was run without one (e.g. by
+        an older :class:`~psychopy.data.TrialHandler2` that was pickled).
+
+        Parameters
+        ----------
+        nConds, nReps, method, rng
+            As for :class:`TrialSequence`. Repeats which haven't started yet
+            are made with `rng`, as the loop would have.
+        previous : list
+            Condition indices of the trials run so far, including the
+            current one.
+        remaining : list
+            Condition indices still to come in the current repeat (or the
+            whole loop for 'fullRandom').
+        repN, trialN : int
+            Repeat number and trial number within the repeat of the current
+            trial.
+
+        """
+        self = cls.__new__(cls)
+        self.nConds = int(nConds)
+        self.method = method
+        self.blockWise = method != 'fullRandom'
+        previous = np.asarray(previous, dtype=np.int64)
+        remaining = np.asarray(remaining, dtype=np.int64)
+        self.pos = len(previous) - 1
+        if not self.blockWise:
+            self.indices = np.concatenate([previous, remaining])
+            self.repNs = _occurrenceCounts(self.indices)
+            self.trialNs = np.arange(len(self.indices), dtype=np.int64)
+            return self
+
+        # earlier repeats are assumed to have had one trial per condition
+        blockStart = max(self.pos - int(trialN), 0)
+        nEarlier = np.arange(blockStart, dtype=np.int64)
+        nCurrent = len(previous) - blockStart + len(remaining)
+        indices = [previous, remaining]
+        repNs = [np.minimum(nEarlier // max(self.nConds, 1) + 1, repN),
+                 np.full(nCurrent, repN, dtype=np.int64)]
+        trialNs = [nEarlier % max(self.nConds, 1),
+                   np.arange(nCurrent, dtype=np.int64) + int(trialN) -
+                   (self.pos - blockStart)]
+        for futureRepN in range(int(repN) + 1, int(nReps) + 1):
+            block = np.arange(self.nConds, dtype=np.int64)
+            if method == 'random':
+                rng.shuffle(block)
+            indices.append(block)
+            repNs.append(np.full(self.nConds, futureRepN, dtype=np.int64))
+            trialNs.append(np.arange(self.nConds, dtype=np.int64))
+        self.indices = np.concatenate(indices)
+        self.repNs = np.concatenate(repNs)
+        self.trialNs = np.concatenate(trialNs)
+        return self
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def nReps(self):
+        """Number of repeats in the schedule (for 1-D sequences, the most
+        times any condition occurs)."""
+        if not len(self.indices):
+            return 0
+        if self.blockWise:
+            return int(self.repNs[-1])
+        return int(self.repNs.max()) + 1
+
+    def __eq__(self, other):
+        if not isinstance(other, TrialSequence):
+            return False
+        return (self.pos == other.pos and self.method == other.method and
+                np.array_equal(self.indices, other.indices) and
+                np.array_equal(self.repNs, other.repNs) and
+                np.array_equal(self.trialNs, other.trialNs))
+
+    def __ne__(self, other):
+        return not self == other
+
+    @property
+    def finished(self):
+        """`True` once the schedule has been advanced past its last
+        trial."""
+        return self.pos >= len(self.indices)
+
+    @property
+    def nRemaining(self):
+        """Number of trials after the current one."""
+        return max(len(self.indices) - self.pos - 1, 0)
+
+    def advance(self):
+        """Move on to the next trial.
+
+        Returns
+        -------
+        bool
+            `False` if there are no trials left.
+        """
+        self.pos += 1
+        return self.pos < len(self.indices)
+
+    def getIndex(self, n=0):
+        """Condition index of the trial `n` steps from the current one (may
+        be negative), or `None` if that is outside of the schedule."""
+        pos = self.pos + n
+        if 0 <= pos < len(self.indices):
+            return int(self.indices[pos])
+        return None
+
+    def _blockEnd(self):
+        """Position just after the last trial of the current block."""
+        if not self.blockWise:
+            return len(self.indices)
+        pos = max(self.pos, 0)
+        return int(np.searchsorted(self.repNs, self.repNs[pos], side='right'))
+
+    def remaining(self):
+        """Condition indices still to come in the current repeat (or the
+        whole loop for 'fullRandom'), as a `list`."""
+        if self.pos < 0:
+            return []
+        return self.indices[self.pos + 1:self._blockEnd()].tolist()
+
+    def previous(self):
+        """Condition indices of all trials before the current one, as a
+        `list`."""
+        return self.indices[:max(self.pos, 0)].tolist()
+
+    def insert(self, offset, condIndex):
+        """Insert a trial of `condIndex` into the remainder of the current
+        repeat, `offset` trials after the current one (0 = next). This is
+        used to re-run aborted trials; it is O(n) so shouldn't be called on
+        every trial.
+        """
+        pos = self.pos + 1 + offset
+        end = self._blockEnd()
+        if not self.pos + 1 <= pos <= end:
+            raise IndexError("TrialSequence can only insert trials into the "
+                             "remainder of the current repeat")
+        self.indices = np.insert(self.indices, pos, condIndex)
+        if self.blockWise:
+            repN = self.repNs[max(self.pos, 0)]
+            self.repNs = np.insert(self.repNs, pos, repN)
+            # later trials of this repeat are now one further on
+            self.trialNs = np.insert(self.trialNs, pos, self.trialNs[pos - 1] + 1
+                                     if pos > 0 else 0)
+            self.trialNs[pos + 1:end + 1] += 1
+        else:
+            self.repNs = _occurrenceCounts(self.indices)
+            self.trialNs = np.arange(len(self.indices), dtype=np.int64)
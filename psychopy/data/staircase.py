@@ -6,6 +6,7 @@ import os
 import pickle
 import copy
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from pkg_resources import parse_version
 
@@ -14,7 +15,7 @@ from psychopy import logging
 from psychopy.tools.filetools import openOutputFile, genDelimiter
 from psychopy.tools.fileerrortools import handleFileCollision
 from psychopy.contrib.quest import QuestObject
-from psychopy.contrib.psi import PsiObject
+from psychopy.contrib.psi import PsiObject, FastPsiObject
 from .base import _BaseTrialHandler, _ComparisonMixin
 from .utils import _getExcelCellName
 
@@ -1091,7 +1092,136 @@ class PsiObject_(PsiObject, _ComparisonMixin):
     pass
 
 
-class PsiHandler(StairHandler):
+class FastPsiObject_(FastPsiObject, _ComparisonMixin):
+    """A FastPsiObject that implements the == and != operators.
+    """
+    pass
+
+
+_precomputePool = None
+
+
+def _getPrecomputePool():
+    """The threads used by staircases to find their next intensity in the
+    background (see `precompute` in :class:`PsiHandler`).
+    """
+    global _precomputePool
+    if _precomputePool is None:
+        _precomputePool = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='StairPrecompute')
+    return _precomputePool
+
+
+class _PrecomputeMixin():
+    """Updates the model of a Bayesian staircase in the background.
+
+    With `precompute='background'` the (slow) update of the model and the
+    choice of the next intensity are started in a worker thread when the
+    response is added, and `__next__` only waits if they haven't finished.
+    With `precompute='speculative'` the updates for both possible
+    responses are also started as soon as the intensity is given out, each
+    on its own copy of the model, so the work is done while the stimulus
+    is on screen; the copy for the actual response then replaces the model.
+
+    Subclasses give the name of the model attribute, the (large, never
+    changed in place) model attributes the copies can share, and implement
+    `_updateModel` and `_speculativeResponses`.
+    """
+    _modelName = None
+    _sharedModelAttrs = ()
+
+    def _initPrecompute(self, precompute):
+        if precompute not in [None, 'background', 'speculative']:
+            raise ValueError("`precompute` must be None, 'background' or "
+                             "'speculative'.")
+        self.precompute = precompute
+        self._pendingUpdate = None  # future giving (model, next intensity)
+        self._speculation = None  # (key, {response: future})
+
+    def _updateModel(self, model, response, key):
+        """Apply the response to the model and return the next intensity.
+        """
+        raise NotImplementedError
+
+    def _speculativeResponses(self):
+        """The responses to precompute updates for, in speculative mode.
+        """
+        return ()
+
+    def _backgroundUpdate(self, model, response, key, copyModel=False):
+        if copyModel:
+            memo = {}
+            for name in self._sharedModelAttrs:
+                value = getattr(model, name, None)
+                memo[id(value)] = value
+            model = copy.deepcopy(model, memo)
+        return model, self._updateModel(model, response, key)
+
+    def _startUpdate(self, response, key=None):
+        """Apply the response to the model in the background, or take the
+        speculative update for this response if there is one.
+
+        `key` identifies the trial the speculative updates were made for (if
+        it differs, for example because the intensity presented was changed,
+        they are discarded).
+        """
+        self._waitForUpdate()
+        speculation, self._speculation = self._speculation, None
+        if (speculation is not None and speculation[0] == key and
+                response in speculation[1]):
+            self._pendingUpdate = speculation[1][response]
+            return
+        self._pendingUpdate = _getPrecomputePool().submit(
+            self._backgroundUpdate, getattr(self, self._modelName), response,
+            key)
+
+    def _startSpeculation(self, key=None):
+        """Start updating copies of the model for each possible response.
+        """
+        futures = {}
+        for response in self._speculativeResponses():
+            futures[response] = _getPrecomputePool().submit(
+                self._backgroundUpdate, getattr(self, self._modelName),
+                response, key, copyModel=True)
+        if futures:
+            self._speculation = (key, futures)
+
+    def _waitForUpdate(self):
+        """Wait for any update in progress, so the model is up to date.
+        Returns the next intensity it found, or None if there was no update.
+        """
+        if self._pendingUpdate is None:
+            return None
+        model, nextIntensity = self._pendingUpdate.result()
+        setattr(self, self._modelName, model)
+        return nextIntensity
+
+    def _takeNextIntensity(self):
+        """The next intensity found by the update in progress (waiting for it
+        if needed), or None if there was no update.
+        """
+        nextIntensity = self._waitForUpdate()
+        self._pendingUpdate = None
+        return nextIntensity
+
+    def __getstate__(self):
+        # the worker threads can't be copied or saved, so finish the update
+        # in progress; speculative updates are dropped
+        self._waitForUpdate()
+        state = self.__dict__.copy()
+        state['_pendingUpdate'] = None
+        state['_speculation'] = None
+        return state
+
+    def __setstate__(self, state):
+        # files saved by older versions won't have these
+        state.setdefault('precompute', None)
+        state.setdefault('_pendingUpdate', None)
+        state.setdefault('_speculation', None)
+        self.__dict__.update(state)
+
+
+class PsiHandler(_PrecomputeMixin, StairHandler):
     """Handler to implement the "Psi" adaptive psychophysical method
     (Kontsevich & Tyler, 1999).
 
@@ -1127,7 +1257,18 @@ class PsiHandler(StairHandler):
     Y(x) = .5 * delta + (1 - delta) * _normCdf
 
     Y(x) = .5 * delta + (1 - delta) * (.5 + .5 * _normCdf)
+
+    For fine grids, `engine='fast'` updates the posterior and chooses the
+    next intensity with precomputed arrays in the log domain, which is
+    much faster and needs far less memory per trial than the default
+    engine, while giving the same intensities. With `precompute` the
+    update after each response is made in a worker thread, so that it
+    doesn't hold up the trial loop.
     """
+    _modelName = '_psi'
+    _sharedModelAttrs = ('_probResponseGivenLambdaX',
+                         '_probLambdaGivenXResponse', '_entropyXResponse',
+                         '_probCorrect', '_candidateArrays', '_candidates')
 
     def __init__(self,
                  nTrials,
@@ -1139,7 +1280,10 @@ class PsiHandler(StairHandler):
                  prior=None,
                  fromFile=False,
                  extraInfo=None,
-                 name=''):
+                 name='',
+                 engine='default',
+                 engineOptions=None,
+                 precompute=None):
         """Initializes the handler and creates an internal Psi Object for
         grid approximation.
 
@@ -1212,12 +1356,38 @@ class PsiHandler(StairHandler):
                 Optional name for the PsiHandler used in PsychoPy's built-in
                 logging system.
 
+            engine  (str)
+                The Psi implementation to use: `'default'`, or `'fast'` for
+                the optimised engine (see
+                :class:`~psychopy.contrib.psi.FastPsiObject`).
+
+            engineOptions   (dict)
+                Options for the fast engine: `dtype` (`'float64'`, the
+                default, or `'float32'` for the precomputed arrays) and
+                `intensSubsample` (only consider every nth intensity when
+                choosing the next one; defaults to 1).
+
+            precompute  (None or str)
+                If `'background'`, the posterior is updated and the next
+                intensity chosen in a worker thread after each response,
+                and the next trial only waits for it if it hasn't finished.
+                If `'speculative'`, the updates for both responses are also
+                started as soon as an intensity is given out (while the
+                stimulus is presented), and the one for the actual response
+                is kept. The intensities are the same as with the default,
+                `None`, which updates when the response is added.
+
         :Raises:
 
             NotImplementedError
                 If the supplied `minVal` parameter implies an experimental
                 design other than Yes/No or 2-AFC.
 
+            ValueError
+                If `engine` is not `'default'` or `'fast'`, if
+                `engineOptions` are given for the default engine, or if
+                `precompute` is not None, `'background'` or `'speculative'`.
+
         """
         if expectedMin not in [0, 0.5]:
             raise NotImplementedError(
@@ -1225,6 +1395,17 @@ class PsiHandler(StairHandler):
                 'supported. Please specify either `expectedMin=0` '
                 '(Yes/No) or `expectedMin=0.5` (2-AFC).')
 
+        if engine not in ['default', 'fast']:
+            raise ValueError("`engine` must be 'default' or 'fast'.")
+        if engineOptions is None:
+            engineOptions = dict()
+        elif engine == 'default':
+            raise ValueError('`engineOptions` can only be used with '
+                             "`engine='fast'`.")
+        self.engine = engine
+        self.engineOptions = dict(engineOptions)
+        self._initPrecompute(precompute)
+
         StairHandler.__init__(
             self, startVal=None, nTrials=nTrials, extraInfo=extraInfo,
             stepType=stepType, minVal=intensRange[0],
@@ -1241,10 +1422,17 @@ class PsiHandler(StairHandler):
                 prior = None
 
         twoAFC = True if expectedMin == 0.5 else False
-        self._psi = PsiObject_(
-            intensRange, alphaRange, betaRange, intensPrecision,
-            alphaPrecision, betaPrecision, delta=delta,
-            stepType=stepType, TwoAFC=twoAFC, prior=prior)
+        if engine == 'fast':
+            self._psi = FastPsiObject_(
+                intensRange, alphaRange, betaRange, intensPrecision,
+                alphaPrecision, betaPrecision, delta=delta,
+                stepType=stepType, TwoAFC=twoAFC, prior=prior,
+                **self.engineOptions)
+        else:
+            self._psi = PsiObject_(
+                intensRange, alphaRange, betaRange, intensPrecision,
+                alphaPrecision, betaPrecision, delta=delta,
+                stepType=stepType, TwoAFC=twoAFC, prior=prior)
 
         self._psi.update(None)
 
@@ -1265,7 +1453,17 @@ class PsiHandler(StairHandler):
         if self.getExp() is not None:
             # update the experiment handler too
             self.getExp().addData(self.name + ".response", result)
-        self._psi.update(result)
+        if self.precompute is None:
+            self._psi.update(result)
+        else:
+            self._startUpdate(result)
+
+    def _updateModel(self, model, response, key):
+        model.update(response)
+        return model.nextIntensity
+
+    def _speculativeResponses(self):
+        return (0, 1)
 
     def __next__(self):
         """Advances to next trial and returns it.
@@ -1274,7 +1472,11 @@ class PsiHandler(StairHandler):
         if self.finished == False:
             # update pointer for next trial
             self.thisTrialN += 1
+            if self.precompute is not None:
+                self._takeNextIntensity()
             self.intensities.append(self._psi.nextIntensity)
+            if self.precompute == 'speculative':
+                self._startSpeculation()
             return self._psi.nextIntensity
         else:
             self._terminate()
@@ -1293,6 +1495,7 @@ class PsiHandler(StairHandler):
     def estimateLambda(self):
         """Returns a tuple of (location, slope)
         """
+        self._waitForUpdate()
         return self._psi.estimateLambda()
 
     def estimateThreshold(self, thresh, lamb=None):
@@ -1313,6 +1516,7 @@ class PsiHandler(StairHandler):
                        "estimate of lambda will be computed.")
                 warnings.warn(msg, SyntaxWarning)
                 lamb = None
+        self._waitForUpdate()
         return self._psi.estimateThreshold(thresh, lamb)
 
     def savePosterior(self, fileName, fileCollisionMethod='rename'):
@@ -1331,13 +1535,17 @@ class PsiHandler(StairHandler):
                     fileName,
                     fileCollisionMethod=fileCollisionMethod
                 )
+            self._waitForUpdate()
             self._psi.savePosterior(fileName)
         except IOError:
             warnings.warn("An error occurred while trying to save the "
                           "posterior array. Continuing without saving...")
 
 
-class QuestPlusHandler(StairHandler):
+class QuestPlusHandler(_PrecomputeMixin, StairHandler):
+    _modelName = '_qp'
+    _sharedModelAttrs = ('likelihoods', 'prior', 'posterior')
+
     def __init__(self,
                  nTrials,
                  intensityVals, thresholdVals, slopeVals,
@@ -1347,7 +1555,8 @@ class QuestPlusHandler(StairHandler):
                  psychometricFunc='weibull', stimScale='log10',
                  stimSelectionMethod='minEntropy',
                  stimSelectionOptions=None, paramEstimationMethod='mean',
-                 extraInfo=None, name='', label='', **kwargs):
+                 extraInfo=None, name='', label='', precompute=None,
+                 **kwargs):
         """
         QUEST+ implementation. Currently only supports parameter estimation of
         a Weibull-shaped psychometric function.
@@ -1457,12 +1666,27 @@ class QuestPlusHandler(StairHandler):
         label : str
             Only used by :class:`MultiStairHandler`, and otherwise ignored.
 
+        precompute : {None, 'background', 'speculative'}
+            With `'background'`, the posterior is updated and the next
+            intensity chosen in a worker thread after each response, and
+            the next trial only waits for it if it hasn't finished. With
+            `'speculative'` and two `responseVals`, the updates for both
+            responses are also started as soon as an intensity is given out
+            (while the stimulus is presented), and the one for the actual
+            response is kept. The default, `None`, chooses the next
+            intensity when the next trial starts.
+
         kwargs : dict
             Additional keyword arguments. These might be passed, for example,
             through a :class:`MultiStairHandler`, and will be ignored. A
             warning will be emitted whenever additional keyword arguments
             have been passed.
 
+        Raises
+        ------
+        ValueError
+            If `precompute` is not None, `'background'` or `'speculative'`.
+
         Warns
         -----
         RuntimeWarning
@@ -1504,6 +1728,7 @@ class QuestPlusHandler(StairHandler):
 
         super().__init__(startVal=startIntensity, nTrials=nTrials,
                          stepType=stimScale, extraInfo=extraInfo, name=name)
+        self._initPrecompute(precompute)
 
         # We  don't use these attributes that were inherited from StairHandler.
         self.currentDirection = None
@@ -1613,18 +1838,37 @@ class QuestPlusHandler(StairHandler):
         if self.getExp() is not None:
             # update the experiment handler too
             self.getExp().addData(self.name + ".response", response)
-        self._qp.update(intensity=self.intensities[-1],
-                        response=response)
+        if self.precompute is None:
+            self._qp.update(intensity=self.intensities[-1],
+                            response=response)
+        else:
+            self._startUpdate(response, key=self.intensities[-1])
+
+    def _updateModel(self, model, response, key):
+        model.update(intensity=key, response=response)
+        return model.next_intensity
+
+    def _speculativeResponses(self):
+        if len(self.responseVals) == 2:
+            return tuple(self.responseVals)
+        return ()
 
     def __next__(self):
         self._checkFinished()
         if not self.finished:
             # update pointer for next trial
             self.thisTrialN += 1
+            nextIntensity = None
+            if self.precompute is not None:
+                nextIntensity = self._takeNextIntensity()
             if self.thisTrialN == 0 and self.startIntensity is not None:
                 self.intensities.append(self.startVal)
+            elif nextIntensity is not None:
+                self.intensities.append(nextIntensity)
             else:
                 self.intensities.append(self._qp.next_intensity)
+            if self.precompute == 'speculative':
+                self._startSpeculation(key=self.intensities[-1])
 
             # We never actually use self._nextIntensity in the
             # QuestPlusHandler; it's mere purpose here is to make the
@@ -1654,6 +1898,7 @@ class QuestPlusHandler(StairHandler):
             parameters.
 
         """
+        self._waitForUpdate()
         qp_estimate = self._qp.param_estimate
         estimate = dict(threshold=qp_estimate['threshold'],
                         slope=qp_estimate['slope'],
@@ -1672,6 +1917,7 @@ class QuestPlusHandler(StairHandler):
             A dictionary whose keys correspond to the names of the parameters.
 
         """
+        self._waitForUpdate()
         qp_prior = self._qp.prior
 
         threshold = qp_prior.sum(dim=('slope', 'lower_asymptote', 'lapse_rate'))
@@ -1697,6 +1943,7 @@ class QuestPlusHandler(StairHandler):
             parameters.
 
         """
+        self._waitForUpdate()
         qp_posterior = self._qp.posterior
 
         threshold = qp_posterior.sum(dim=('slope', 'lower_asymptote', 'lapse_rate'))
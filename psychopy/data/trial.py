@@ -12,6 +12,7 @@ from psychopy.tools.filetools import (openOutputFile, genDelimiter,
                                       genFilenameFromDelimiter)
 from .utils import importConditions
 from .base import _BaseTrialHandler, DataHandler
+from .sequence import TrialSequence
 
 
 class TrialType(dict):
@@ -160,8 +161,8 @@ class TrialHandler(_BaseTrialHandler):
         self.data = DataHandler(trials=self)
         if dataTypes != None:
             self.data.addDataType(dataTypes)
-        self.data.addDataType('ran')
-        self.data['ran'].mask = False  # this is a bool; all entries are valid
+        # this is a bool; all entries are valid
+        self.data.addDataType('ran', masked=False)
         self.data.addDataType('order')
         # generate stimulus sequence
         if self.method in ['random', 'sequential', 'fullRandom']:
@@ -642,7 +643,6 @@ class TrialHandler(_BaseTrialHandler):
         if self.extraInfo is not None:
             for key in self.extraInfo:
                 header.insert(0, key)
-        df = pd.DataFrame(columns=header)
 
         # loop through each trial, gathering the actual values:
         dataOut = []
@@ -691,7 +691,8 @@ class TrialHandler(_BaseTrialHandler):
 
                 # store this trial's data
                 dataOut.append(nextEntry)
-                df = df.append(nextEntry, ignore_index=True)
+        # build the frame in one go (appending row by row is quadratic)
+        df = pd.DataFrame(dataOut, columns=header)
 
         if not matrixOnly:
             # write the header row:
@@ -760,7 +761,8 @@ class TrialHandler2(_BaseTrialHandler):
                  seed=None,
                  originPath=None,
                  name='',
-                 autoLog=True):
+                 autoLog=True,
+                 sequence=None):
         """
 
         :Parameters:
@@ -799,6 +801,12 @@ class TrialHandler2(_BaseTrialHandler):
                 copy of the script where it was
                 created. If `OriginPath==-1` then nothing will be stored.
 
+            sequence: (optional) a user-defined order of indices into the
+                trialList, overriding `method`. Either a flat list, run
+                once (thisRepN then counts previous occurrences of each
+                condition, as for 'fullRandom'), or a list of lists with
+                one list per repeat. `nReps` is then set from the sequence.
+
         :Attributes (after creation):
 
             .data - a dictionary of numpy arrays, one for each data type
@@ -852,10 +860,6 @@ class TrialHandler2(_BaseTrialHandler):
             if type(entry) == dict:
                 self.trialList[n] = TrialType(entry)
         self.nReps = int(nReps)
-        self.nTotal = self.nReps * len(self.trialList)
-        self.nRemaining = self.nTotal  # subtract 1 each trial
-        self.remainingIndices = []
-        self.prevIndices = []
         self.method = method
         self.thisRepN = 0  # records which repetition or pass we are on
         self.thisTrialN = -1  # records trial number within this repetition
@@ -867,6 +871,14 @@ class TrialHandler2(_BaseTrialHandler):
         self.seed = seed
         self._rng = np.random.default_rng(seed=seed)
         self._trialAborted = False
+        # the whole schedule of trials is generated up front
+        self._sequence = TrialSequence(len(self.trialList), self.nReps,
+                                       method=method, rng=self._rng,
+                                       sequence=sequence)
+        if sequence is not None:
+            self.nReps = self._sequence.nReps
+        self.nTotal = len(self._sequence)
+        self.nRemaining = self.nTotal  # subtract 1 each trial
 
         # store a list of dicts, convert to pandas DataFrame on access
         self._data = []
@@ -930,6 +942,26 @@ class TrialHandler2(_BaseTrialHandler):
         result = super(TrialHandler2, self_copy).__eq__(other_copy)
         return result
 
+    def __setstate__(self, state):
+        # files saved by older versions have the trials still to come and
+        # those run so far in lists, rather than a precomputed schedule
+        if '_sequence' not in state:
+            remaining = state.pop('remainingIndices', [])
+            previous = state.pop('prevIndices', [])
+            nConds = len(state['trialList'])
+            if state['thisIndex'] is None:  # not started
+                sequence = TrialSequence(nConds, state['nReps'],
+                                         method=state['method'],
+                                         rng=state['_rng'])
+            else:
+                sequence = TrialSequence.resume(
+                    nConds, state['nReps'], state['method'], state['_rng'],
+                    previous=list(previous) + [state['thisIndex']],
+                    remaining=remaining, repN=state['thisRepN'],
+                    trialN=state['thisTrialN'])
+            state['_sequence'] = sequence
+        self.__dict__.update(state)
+
     @property
     def data(self):
         """Returns a pandas DataFrame of the trial data so far
@@ -964,44 +996,21 @@ class TrialHandler2(_BaseTrialHandler):
         self.thisTrialN += 1  # number of trial this pass
         self.thisN += 1  # number of trial in total
         self.nRemaining -= 1
-        if self.thisIndex is not None:
-            self.prevIndices.append(self.thisIndex)
-
-        # thisRepN has exceeded nReps
-        if self.remainingIndices == []:
-            # we've just started, or just starting a new repeat
-            sequence = list(range(len(self.trialList)))
-            if (self.method == 'fullRandom' and
-                        self.thisN < (self.nReps * len(self.trialList))):
-                # we've only just started on a fullRandom sequence
-                sequence *= self.nReps
-                # NB permutation *returns* a shuffled array
-                self.remainingIndices = list(self._rng.permutation(sequence))
-            elif (self.method in ('sequential', 'random') and
-                          self.thisRepN < self.nReps):
-                # start a new repetition
-                self.thisTrialN = 0
-                self.thisRepN += 1
-                if self.method == 'random':
-                    self._rng.shuffle(sequence)  # shuffle (is in-place)
-                self.remainingIndices = list(sequence)
-            else:
-                # we've finished
-                self.finished = True
-                self._terminate()  # raises Stop (code won't go beyond here)
 
-        # fetch the trial info
-        if len(self.trialList) == 0:
-            self.thisIndex = 0
-            self.thisTrial = {}
-        else:
-            self.thisIndex = self.remainingIndices.pop(0)
-            # if None then use empty dict
-            thisTrial = self.trialList[self.thisIndex] or {}
-            self.thisTrial = copy.copy(thisTrial)
-        # for fullRandom check how many times this has come up before
-        if self.method == 'fullRandom':
-            self.thisRepN = self.prevIndices.count(self.thisIndex)
+        sequence = self._sequence
+        if not sequence.advance():
+            # we've finished
+            self.finished = True
+            self._terminate()  # raises Stop (code won't go beyond here)
+
+        # fetch the trial info from the precomputed schedule
+        pos = sequence.pos
+        self.thisIndex = int(sequence.indices[pos])
+        self.thisTrialN = int(sequence.trialNs[pos])
+        self.thisRepN = int(sequence.repNs[pos])
+        # if None then use empty dict
+        thisTrial = self.trialList[self.thisIndex] or {}
+        self.thisTrial = copy.copy(thisTrial)
 
         # update data structure with new info
         self._data.append(self.thisTrial)  # update the data list of dicts
@@ -1020,6 +1029,20 @@ class TrialHandler2(_BaseTrialHandler):
 
     next = __next__  # allows user to call without a loop `val = trials.next()`
 
+    @property
+    def remainingIndices(self):
+        """Indices (into the trialList) of the trials still to come in the
+        current repeat (or the whole loop for 'fullRandom').
+        """
+        return self._sequence.remaining()
+
+    @property
+    def prevIndices(self):
+        """Indices (into the trialList) of the trials run so far, before
+        the current one.
+        """
+        return self._sequence.previous()
+
     @property
     def trialAborted(self):
         """`True` if the trial has been aborted an should end.
@@ -1059,12 +1082,13 @@ class TrialHandler2(_BaseTrialHandler):
                 "'append'.")
 
         # use the appropriate action for the current sampling method
-        if action == 'random':  # insert trial into random index
+        nRemaining = len(self._sequence.remaining())
+        if action == 'random' and nRemaining:  # insert trial into random index
             # use numpy RNG to sample a new index
-            newIndex = np.random.randint(0, len(self.remainingIndices))
-            self.remainingIndices.insert(newIndex, self.thisIndex)
-        elif action == 'append':  # insert at end of trial block
-            self.remainingIndices.append(self.thisIndex)
+            newIndex = np.random.randint(0, nRemaining)
+        else:  # insert at end of trial block
+            newIndex = nRemaining
+        self._sequence.insert(newIndex, self.thisIndex)
 
         # flag that the trial has been aborted, user can take approriate action
         self._trialAborted = True  
@@ -1074,12 +1098,11 @@ class TrialHandler2(_BaseTrialHandler):
         advancing the trials. Returns 'None' if attempting to go beyond
         the last trial.
         """
-        # check that we don't go out of bounds for either positive or negative
-        # offsets:
-        if n > self.nRemaining or self.thisN + n < 0:
+        # the schedule is precomputed so this is just a lookup (or None if
+        # out of bounds for either positive or negative offsets)
+        condIndex = self._sequence.getIndex(n)
+        if condIndex is None:
             return None
-        seqs = np.array(self.sequenceIndices).transpose().flat
-        condIndex = seqs[self.thisN + n]
         return self.trialList[condIndex]
 
     def getEarlierTrial(self, n=-1):
@@ -1401,8 +1424,8 @@ class TrialHandlerExt(TrialHandler):
                                     dataShape=[sum(self.trialWeights), nReps])
         if dataTypes is not None:
             self.data.addDataType(dataTypes)
-        self.data.addDataType('ran')
-        self.data['ran'].mask = False  # bool - all entries are valid
+        # bool - all entries are valid
+        self.data.addDataType('ran', masked=False)
         self.data.addDataType('order')
         # generate stimulus sequence
         if self.method in ('random', 'sequential', 'fullRandom'):
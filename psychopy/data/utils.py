@@ -8,6 +8,7 @@
 import os
 import re
 import ast
+import hashlib
 import pickle
 import time, datetime
 import numpy as np
@@ -213,6 +214,310 @@ def listFromString(val, excludeEmpties=False):
     return asList
 
 
+# Conditions files parsed by importConditions, keyed by a hash of the file
+# contents, most recently used first, for up to `conditionsCacheSize` files.
+# Set `conditionsCacheDir` to a folder to also keep them on disk, so that they
+# are only parsed once across sessions.
+conditionsCacheSize = 32
+_conditionsCache = OrderedDict()
+conditionsCacheDir = None
+_conditionsCacheVersion = 1
+# condition values of these types can be shared between copies of a trialList
+_immutableTypes = (str, bytes, int, float, complex, type(None), np.generic)
+
+
+def clearConditionsCache():
+    """Forget the conditions files parsed by :func:`importConditions`, so
+    that they are read again (files cached in `conditionsCacheDir` are kept).
+    """
+    _conditionsCache.clear()
+
+
+def _keepInMemory(key, entry):
+    """Store a parsed conditions file in the cache in memory, dropping the
+    least recently used files once there are more than `conditionsCacheSize`.
+    """
+    if conditionsCacheSize > 0:
+        _conditionsCache[key] = entry
+        while len(_conditionsCache) > conditionsCacheSize:
+            _conditionsCache.popitem(last=False)
+    return entry
+
+
+def _conditionsCacheKey(fileName):
+    """The key of a conditions file in the cache: a hash of its contents,
+    plus its extension and the Excel reader in use, which change how it is
+    parsed.
+    """
+    with open(fileName, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    ext = os.path.splitext(fileName)[1].lstrip('.')
+    return "{}_{}_{}".format(digest, ext, 'xlrd' if haveXlrd else 'openpyxl')
+
+
+def _mutableFields(trialList):
+    """Names of the parameters with values (e.g. lists) that must be copied
+    rather than shared when handing out a cached trialList.
+    """
+    return {name for thisTrial in trialList for name, val in thisTrial.items()
+            if not isinstance(val, _immutableTypes)}
+
+
+def _getCachedConditions(key):
+    """Returns a copy of the (trialList, fieldNames) cached under `key`, or
+    None if the file has not been parsed yet.
+    """
+    entry = _conditionsCache.get(key)
+    if entry is not None:
+        _conditionsCache.move_to_end(key)
+    elif conditionsCacheDir:
+        cacheFile = os.path.join(conditionsCacheDir, key + '.pkl')
+        if not os.path.isfile(cacheFile):
+            return None
+        try:
+            with open(cacheFile, 'rb') as f:
+                version, trialList, fieldNames = pickle.load(f)
+        except Exception as err:
+            logging.warning("Could not load cached conditions {}: {}"
+                            .format(cacheFile, err))
+            return None
+        if version != _conditionsCacheVersion:
+            return None
+        entry = _keepInMemory(
+            key, (trialList, fieldNames, _mutableFields(trialList)))
+    if entry is None:
+        return None
+
+    trialList, fieldNames, mutable = entry
+    copies = [thisTrial.copy() for thisTrial in trialList]
+    if mutable:
+        # a pickle round trip is a much faster deep copy of many small lists
+        values = pickle.loads(pickle.dumps(
+            [[thisTrial[name] for name in mutable] for thisTrial in trialList],
+            protocol=pickle.HIGHEST_PROTOCOL))
+        for thisTrial, trialValues in zip(copies, values):
+            thisTrial.update(zip(mutable, trialValues))
+    return copies, list(fieldNames)
+
+
+def _cacheConditions(key, trialList, fieldNames):
+    """Keep a parsed conditions file in the cache (and in
+    `conditionsCacheDir`, if set).
+    """
+    _keepInMemory(key, (trialList, fieldNames, _mutableFields(trialList)))
+    if not conditionsCacheDir:
+        return
+    cacheFile = os.path.join(conditionsCacheDir, key + '.pkl')
+    tmpName = "{}.{}.tmp".format(cacheFile, os.getpid())
+    try:
+        os.makedirs(conditionsCacheDir, exist_ok=True)
+        with open(tmpName, 'wb') as f:
+            pickle.dump((_conditionsCacheVersion, trialList, fieldNames), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpName, cacheFile)
+    except (OSError, pickle.PicklingError) as err:
+        logging.warning("Could not cache conditions in {}: {}"
+                        .format(cacheFile, err))
+
+
+def _assertValidVarNames(fieldNames, fileName):
+    """screens a list of names as candidate variable names. if all
+    names are OK, return silently; else raise  with msg
+    """
+    fileName = pathToString(fileName)
+    if not all(fieldNames):
+        raise exceptions.ConditionsImportError(
+            "Conditions file %s: Missing parameter name(s); empty cell(s) in the first row?" % fileName,
+            translated=_translate("Conditions file %s: Missing parameter name(s); empty cell(s) in the first row?") % fileName
+        )
+    for name in fieldNames:
+        OK, msg, translated = isValidVariableName(name)
+        if not OK:
+            # tailor message to importConditions
+            msg = msg.replace('Variables', 'Parameters (column headers)')
+            translated = msg.replace('Variables', 'Parameters (column headers)')
+            raise exceptions.ConditionsImportError(
+                'Bad name: %s%s"%s"' % (name, os.linesep, msg),
+                translated='Bad name: %s%s"%s"' % (name, os.linesep, translated)
+            )
+
+
+def _convertTextCell(val):
+    """Conversion of a string read from a delimited text file: numbers with
+    either decimal mark become floats, escaped line breaks are replaced.
+    """
+    try:
+        val = float(val.replace(",", "."))
+    except ValueError:
+        return val.replace('\\n', '\n')
+    return None if np.isnan(val) else val
+
+
+def _unescapeTextCell(val):
+    """Conversion of a string read from an Excel file by pandas: escaped
+    line breaks are replaced.
+    """
+    return val.replace('\\n', '\n')
+
+
+def _convertExcelCell(val):
+    """Conversion of a string read from an Excel file by openpyxl. Lists and
+    tuples are left as they are, to be evaluated.
+    """
+    if val[:1] + val[-1:] in ('[]', '()'):
+        return val
+    # if it has any line breaks correct them
+    val = val.replace('\\n', '\n')
+    # Convert from eu style decimals: replace , with . and try to make it a float
+    try:
+        return float(val.replace(",", "."))
+    except ValueError:
+        return val
+
+
+def _convertColumn(values, convertText=None, brackets=('[]',)):
+    """Converts a column of cells to the values of a condition.
+
+    Missing values become None, and each distinct string in the column is
+    converted once with `convertText`, rather than cell by cell. Strings
+    enclosed in one of the pairs of `brackets` (e.g. '[1, 2]') are evaluated
+    in every cell, so that no two conditions share the same list.
+    """
+    if values.dtype.kind != 'O':
+        if values.dtype.kind not in 'fcmM':
+            return values  # numbers can't be missing
+        column = np.empty(len(values), dtype=object)
+        column[:] = list(values)  # keep the numpy scalars, as to_records did
+        column[np.isnan(values)] = None
+        return column
+
+    column = values.copy()
+    column[pd.isnull(values)] = None
+    isText = np.fromiter((isinstance(val, str) for val in values), dtype=bool,
+                         count=len(values))
+    codes, uniques = pd.factorize(values[isText])
+    converted = np.empty(len(uniques), dtype=object)
+    evaluate = np.zeros(len(uniques), dtype=bool)
+    for n, val in enumerate(uniques):
+        if convertText is not None:
+            val = convertText(val)
+        converted[n] = val
+        evaluate[n] = isinstance(val, str) and val[:1] + val[-1:] in brackets
+    text = converted[codes]
+    for n in np.flatnonzero(evaluate[codes]):
+        text[n] = eval(text[n])
+    column[isText] = text
+    return column
+
+
+def _dataFrameToDictList(dataframe, fileName, convertText=None):
+    """Convert a pandas dataframe to a list of dicts, column by column.
+    This helper function is used by csv or excel imports via pandas
+    """
+    unnamed = dataframe.columns.to_series().str.contains('^Unnamed: ')
+    dataframe = dataframe.loc[:, ~unnamed]  # clear unnamed cols
+    logging.debug(u"Clearing unnamed columns from {}".format(fileName))
+    fieldNames = [str(name) for name in dataframe.columns]
+    _assertValidVarNames(fieldNames, fileName)
+
+    columns = [_convertColumn(dataframe.iloc[:, n].to_numpy(), convertText)
+               for n in range(len(fieldNames))]
+    trialList = [OrderedDict(zip(fieldNames, values))
+                 for values in zip(*columns)]
+    return trialList, fieldNames
+
+
+def _importDelimitedFile(fileName):
+    """Import a delimited text file, trying the common separators and
+    decimal marks. Only the header is read to check each format, so the
+    file is fully parsed once.
+    """
+    error = None
+    for sep, dec in [(',', '.'), (';', ','),  # most common in US, EU
+                     ('\t', '.'), ('\t', ','), (';', '.')]:
+        try:
+            header = pd.read_csv(fileName, encoding='utf-8-sig',
+                                 sep=sep, decimal=dec, nrows=0)
+            _dataFrameToDictList(header, fileName)
+            trialsArr = pd.read_csv(fileName, encoding='utf-8-sig',
+                                    sep=sep, decimal=dec)
+            logging.debug(u"Read csv file with pandas: {}".format(fileName))
+            return _dataFrameToDictList(trialsArr, fileName,
+                                        convertText=_convertTextCell)
+        except exceptions.ConditionsImportError as err:
+            error = err  # try a different format
+    raise error
+
+
+def _importExcelFile(fileName):
+    """Import the first sheet of an .xlsx file with openpyxl"""
+    if not haveOpenpyxl:
+        raise exceptions.ConditionsImportError(
+            "openpyxl or xlrd is required for loading excel files, but neither was found.",
+            _translate("openpyxl or xlrd is required for loading excel files, but neither was found.")
+        )
+
+    wb = load_workbook(filename=fileName, data_only=True, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        logging.debug(u"Read excel file with openpyxl: {}".format(fileName))
+        if ws.max_row is None:
+            # the file doesn't say how big the sheet is
+            ws.reset_dimensions()
+            ws.calculate_dimension(force=True)
+        nCols = ws.max_column
+        nRows = ws.max_row
+        rows = list(ws.iter_rows(min_row=1, max_row=nRows, max_col=nCols,
+                                 values_only=True))
+    finally:
+        wb.close()
+
+    # get parameter names from the first row header, ignoring unnamed columns
+    header = rows[0] if rows else ()
+    namedCols = [colN for colN, fieldName in enumerate(header) if fieldName]
+    fieldNames = [header[colN] for colN in namedCols]
+    _assertValidVarNames(fieldNames, fileName)
+
+    cells = np.empty((len(rows) - 1, nCols), dtype=object)
+    cells[:] = rows[1:]  # skip header first row
+    columns = [_convertColumn(cells[:, colN], _convertExcelCell,
+                              brackets=('[]', '()'))
+               for colN in namedCols]
+    trialList = [dict(zip(fieldNames, values)) for values in zip(*columns)]
+    return trialList, fieldNames
+
+
+def _importPickleFile(fileName):
+    """Import a pickle file holding a list of lists (header + row x col)"""
+    f = open(fileName, 'rb')
+    # Converting newline characters.
+    # 'b' is necessary in Python3 because byte object is
+    # returned when file is opened in binary mode.
+    buffer = f.read().replace(b'\r\n',b'\n').replace(b'\r',b'\n')
+    try:
+        trialsArr = pickle.loads(buffer)
+    except Exception:
+        raise exceptions.ConditionsImportError(
+            'Could not open %s as conditions' % fileName,
+            translated=_translate('Could not open %s as conditions') % fileName
+        )
+    f.close()
+    trialList = []
+    # In Python3, strings returned by pickle() are unhashable so we have to
+    # convert them to str.
+    trialsArr = [[str(item) if isinstance(item, str) else item
+                  for item in row] for row in trialsArr]
+    fieldNames = trialsArr[0]  # header line first
+    _assertValidVarNames(fieldNames, fileName)
+    for row in trialsArr[1:]:
+        thisTrial = {}
+        for fieldN, fieldName in enumerate(fieldNames):
+            # type is correct, being .pkl
+            thisTrial[fieldName] = row[fieldN]
+        trialList.append(thisTrial)
+    return trialList, fieldNames
+
+
 def importConditions(fileName, returnFieldNames=False, selection=""):
     """Imports a list of conditions from an .xlsx, .csv, or .pkl file
 
@@ -248,64 +553,12 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
     - slice(-10, 2, None)  # the same as above
     - random(5) * 8  # five random vals 0-7
 
-    """
-
-    def _attemptImport(fileName, sep=',', dec='.'):
-        """Attempts to import file with specified settings and raises
-        ConditionsImportError if fails due to invalid format
-
-        :param filename: str
-        :param sep: str indicating the separator for cells (',', ';' etc)
-        :param dec: str indicating the decimal point ('.', '.')
-        :return: trialList, fieldNames
-        """
-        if fileName.endswith(('.csv', '.tsv')):
-            trialsArr = pd.read_csv(fileName, encoding='utf-8-sig',
-                                    sep=sep, decimal=dec)
-            for col in trialsArr.columns:
-                for row, cell in enumerate(trialsArr[col]):
-                    if isinstance(cell, str):
-                        tryVal = cell.replace(",", ".")
-                        try:
-                            trialsArr[col][row] = float(tryVal)
-                        except ValueError:
-                            pass
-            logging.debug(u"Read csv file with pandas: {}".format(fileName))
-        elif fileName.endswith(('.xlsx', '.xlsm')):
-            trialsArr = pd.read_excel(fileName, engine='openpyxl')
-            logging.debug(u"Read Excel file with pandas: {}".format(fileName))
-        elif fileName.endswith('.xls'):
-            trialsArr = pd.read_excel(fileName, engine='xlrd')
-            logging.debug(u"Read Excel file with pandas: {}".format(fileName))
-        # then try to convert array to trialList and fieldnames
-        unnamed = trialsArr.columns.to_series().str.contains('^Unnamed: ')
-        trialsArr = trialsArr.loc[:, ~unnamed]  # clear unnamed cols
-        logging.debug(u"Clearing unnamed columns from {}".format(fileName))
-        trialList, fieldNames = pandasToDictList(trialsArr)
-
-        return trialList, fieldNames
-
-    def _assertValidVarNames(fieldNames, fileName):
-        """screens a list of names as candidate variable names. if all
-        names are OK, return silently; else raise  with msg
-        """
-        fileName = pathToString(fileName)
-        if not all(fieldNames):
-            raise exceptions.ConditionsImportError(
-                "Conditions file %s: Missing parameter name(s); empty cell(s) in the first row?" % fileName,
-                translated=_translate("Conditions file %s: Missing parameter name(s); empty cell(s) in the first row?") % fileName
-            )
-        for name in fieldNames:
-            OK, msg, translated = isValidVariableName(name)
-            if not OK:
-                # tailor message to importConditions
-                msg = msg.replace('Variables', 'Parameters (column headers)')
-                translated = msg.replace('Variables', 'Parameters (column headers)')
-                raise exceptions.ConditionsImportError(
-                    'Bad name: %s%s"%s"' % (name, os.linesep, msg),
-                    translated='Bad name: %s%s"%s"' % (name, os.linesep, translated)
-                )
+    Each file is only parsed once: the conditions are cached, keyed by the
+    contents of the file, and later calls get a copy of them. Set
+    `psychopy.data.utils.conditionsCacheDir` to a folder to keep the cache
+    on disk too, or call :func:`clearConditionsCache` to empty it.
 
+    """
     if fileName in ['None', 'none', None]:
         if returnFieldNames:
             return [], []
@@ -316,162 +569,33 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
             translated=_translate("Conditions file not found: %s") % fileName
         )
 
-    def pandasToDictList(dataframe):
-        """Convert a pandas dataframe to a list of dicts.
-        This helper function is used by csv or excel imports via pandas
-        """
-        # convert the resulting dataframe to a numpy recarray
-        trialsArr = dataframe.to_records(index=False)
-        # Check for new line characters in strings, and replace escaped characters
-        for record in trialsArr:
-            for idx, element in enumerate(record):
-                if isinstance(element, str):
-                    record[idx] = element.replace('\\n', '\n')
-        if trialsArr.shape == ():
-            # convert 0-D to 1-D with one element:
-            trialsArr = trialsArr[np.newaxis]
-        fieldNames = list(trialsArr.dtype.names)
-        _assertValidVarNames(fieldNames, fileName)
-
-        # convert the record array into a list of dicts
-        trialList = []
-        for trialN, trialType in enumerate(trialsArr):
-            thisTrial = OrderedDict()
-            for fieldN, fieldName in enumerate(fieldNames):
-                val = trialsArr[trialN][fieldN]
-
-                if isinstance(val, str):
-                    if val.startswith('[') and val.endswith(']'):
-                        # val = eval('%s' %unicode(val.decode('utf8')))
-                        val = eval(val)
-                elif type(val) == np.string_:
-                    val = str(val.decode('utf-8-sig'))
-                    # if it looks like a list, convert it:
-                    if val.startswith('[') and val.endswith(']'):
-                        # val = eval('%s' %unicode(val.decode('utf8')))
-                        val = eval(val)
-                elif np.isnan(val):
-                    val = None
-                thisTrial[fieldName] = val
-            trialList.append(thisTrial)
-        return trialList, fieldNames
-
-    if (fileName.endswith(('.csv', '.tsv'))
-            or (fileName.endswith(('.xlsx', '.xls', '.xlsm')) and haveXlrd)):
-        if fileName.endswith(('.csv', '.tsv', '.dlm')):  # delimited text file
-            for sep, dec in [ (',', '.'), (';', ','),  # most common in US, EU
-                              ('\t', '.'), ('\t', ','), (';', '.')]:
-                try:
-                    trialList, fieldNames = _attemptImport(fileName=fileName,
-                                                           sep=sep, dec=dec)
-                    break  # seems to have worked
-                except exceptions.ConditionsImportError as e:
-                    continue  # try a different format
-        else:
-            trialList, fieldNames = _attemptImport(fileName=fileName)
-
-    elif fileName.endswith(('.xlsx','.xlsm')):  # no xlsread so use openpyxl
-        if not haveOpenpyxl:
-            raise exceptions.ConditionsImportError(
-                "openpyxl or xlrd is required for loading excel files, but neither was found.",
-                _translate("openpyxl or xlrd is required for loading excel files, but neither was found.")
-            )
-
-        # data_only was added in 1.8
-        if parse_version(openpyxl.__version__) < parse_version('1.8'):
-            wb = load_workbook(filename=fileName)
+    cacheKey = _conditionsCacheKey(fileName)
+    cached = _getCachedConditions(cacheKey)
+    if cached is not None:
+        trialList, fieldNames = cached
+        logging.debug(u"Using cached conditions for {}".format(fileName))
+    else:
+        if fileName.endswith(('.csv', '.tsv')):
+            trialList, fieldNames = _importDelimitedFile(fileName)
+        elif fileName.endswith(('.xlsx', '.xls', '.xlsm')) and haveXlrd:
+            engine = 'xlrd' if fileName.endswith('.xls') else 'openpyxl'
+            trialsArr = pd.read_excel(fileName, engine=engine)
+            logging.debug(u"Read Excel file with pandas: {}".format(fileName))
+            trialList, fieldNames = _dataFrameToDictList(
+                trialsArr, fileName, convertText=_unescapeTextCell)
+        elif fileName.endswith(('.xlsx', '.xlsm')):  # no xlsread so use openpyxl
+            trialList, fieldNames = _importExcelFile(fileName)
+        elif fileName.endswith('.pkl'):
+            trialList, fieldNames = _importPickleFile(fileName)
         else:
-            wb = load_workbook(filename=fileName, data_only=True)
-        ws = wb.worksheets[0]
-
-        logging.debug(u"Read excel file with openpyxl: {}".format(fileName))
-        try:
-            # in new openpyxl (2.3.4+) get_highest_xx is deprecated
-            nCols = ws.max_column
-            nRows = ws.max_row
-        except Exception:
-            # version openpyxl 1.5.8 (in Standalone 1.80) needs this
-            nCols = ws.get_highest_column()
-            nRows = ws.get_highest_row()
-
-        # get parameter names from the first row header
-        fieldNames = []
-        rangeCols = list(range(nCols))
-        for colN in range(nCols):
-            if parse_version(openpyxl.__version__) < parse_version('2.0'):
-                fieldName = ws.cell(_getExcelCellName(col=colN, row=0)).value
-            else:
-                # From 2.0, cells are referenced with 1-indexing: A1 == cell(row=1, column=1)
-                fieldName = ws.cell(row=1, column=colN + 1).value
-            if fieldName:
-                # If column is named, add its name to fieldNames
-                fieldNames.append(fieldName)
-            else:
-                # Otherwise, ignore the column
-                rangeCols.remove(colN)
-        _assertValidVarNames(fieldNames, fileName)
-
-        # loop trialTypes
-        trialList = []
-        for rowN in range(1, nRows):  # skip header first row
-            thisTrial = {}
-            for colN in rangeCols:
-                if parse_version(openpyxl.__version__) < parse_version('2.0'):
-                    val = ws.cell(_getExcelCellName(col=colN, row=0)).value
-                else:
-                    # From 2.0, cells are referenced with 1-indexing: A1 == cell(row=1, column=1)
-                    val = ws.cell(row=rowN + 1, column=colN + 1).value
-                # if it looks like a list or tuple, convert it
-                if (isinstance(val, str) and
-                        (val.startswith('[') and val.endswith(']') or
-                                 val.startswith('(') and val.endswith(')'))):
-                    val = eval(val)
-                # if it has any line breaks correct them
-                if isinstance(val, str):
-                    val = val.replace('\\n', '\n')
-                # Convert from eu style decimals: replace , with . and try to make it a float
-                if isinstance(val, str):
-                    tryVal = val.replace(",", ".")
-                    try:
-                        val = float(tryVal)
-                    except ValueError:
-                        pass
-                fieldName = fieldNames[colN]
-                thisTrial[fieldName] = val
-            trialList.append(thisTrial)
-
-    elif fileName.endswith('.pkl'):
-        f = open(fileName, 'rb')
-        # Converting newline characters.
-        # 'b' is necessary in Python3 because byte object is
-        # returned when file is opened in binary mode.
-        buffer = f.read().replace(b'\r\n',b'\n').replace(b'\r',b'\n')
-        try:
-            trialsArr = pickle.loads(buffer)
-        except Exception:
             raise exceptions.ConditionsImportError(
-                'Could not open %s as conditions' % fileName,
-                translated=_translate('Could not open %s as conditions') % fileName
+                'Your conditions file should be an xlsx, csv, dlm, tsv or pkl file',
+                translated=_translate('Your conditions file should be an xlsx, csv, dlm, tsv or pkl file')
             )
-        f.close()
-        trialList = []
-        # In Python3, strings returned by pickle() are unhashable so we have to
-        # convert them to str.
-        trialsArr = [[str(item) if isinstance(item, str) else item
-                      for item in row] for row in trialsArr]
-        fieldNames = trialsArr[0]  # header line first
-        _assertValidVarNames(fieldNames, fileName)
-        for row in trialsArr[1:]:
-            thisTrial = {}
-            for fieldN, fieldName in enumerate(fieldNames):
-                # type is correct, being .pkl
-                thisTrial[fieldName] = row[fieldN]
-            trialList.append(thisTrial)
-    else:
-        raise exceptions.ConditionsImportError(
-            'Your conditions file should be an xlsx, csv, dlm, tsv or pkl file',
-            translated=_translate('Your conditions file should be an xlsx, csv, dlm, tsv or pkl file')
-        )
+        _cacheConditions(cacheKey, trialList, fieldNames)
+        cached = _getCachedConditions(cacheKey)
+        if cached is not None:  # don't hand out the lists in the cache
+            trialList, fieldNames = cached
 
     # if we have a selection then try to parse it
     if isinstance(selection, str) and len(selection) > 0:
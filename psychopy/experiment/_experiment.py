@@ -18,9 +18,12 @@ The code that writes out a *_lastrun.py experiment file is (in order):
 
 import os
 import codecs
+import time
 import xml.etree.ElementTree as xml
 from xml.dom import minidom
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy, copy
+from itertools import chain
 from pathlib import Path
 from pkg_resources import parse_version
 
@@ -98,6 +101,39 @@ forceType = {
 #             forceType[(Comp.__name__, key)] = 'list'
 
 
+# The strings in each conditions file searched by getResourceFiles, keyed by
+# the file path, with the file's modification time and size when it was read
+_conditionsStrings = {}
+# Candidate paths in a conditions file are checked in chunks of this size, in
+# a pool of threads when there is more than one chunk (each check is a
+# filesystem call, which can be slow on network drives)
+_chunkSize = 512
+
+
+def _getConditionsStrings(filePath):
+    """Returns the unique, non-empty strings in a conditions file, in the
+    order they appear. These are remembered until the file changes.
+    """
+    stat = os.stat(filePath)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _conditionsStrings.get(filePath)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    strings = OrderedDict()
+    for thisCond in data.importConditions(filePath):  # thisCond is a dict
+        for val in thisCond.values():
+            if isinstance(val, str) and len(val):
+                strings[val] = None
+    strings = list(strings)
+    _conditionsStrings[filePath] = (stamp, strings)
+    return strings
+
+
+def _resourceKey(thisFile):
+    """A hashable key for a resource dict, equal for equal dicts"""
+    return frozenset(thisFile.items())
+
+
 class Experiment:
     """
     An experiment contains a single Flow and at least one
@@ -899,6 +935,7 @@ class Experiment:
         Interrogates each loop looking for conditions files and each
 
         """
+        t0 = time.perf_counter()
         join = os.path.join
         abspath = os.path.abspath
         srcRoot = os.path.split(self.filename)[0]
@@ -919,7 +956,7 @@ class Experiment:
             #    Path('C:/test/test.xlsx').is_absolute() returns False
             #    Path('/folder/file.xlsx').relative_to('/Applications') gives error
             #    but os.path.relpath('/folder/file.xlsx', '/Applications') correctly uses ../
-            if filePath in list(ft.defaultStim):
+            if filePath in ft.defaultStim:
                 # Default/asset stim are a special case as the file doesn't exist in the usual path
                 thisFile['rel'] = thisFile['abs'] = "https://pavlovia.org/assets/default/" + ft.defaultStim[filePath]
                 thisFile['name'] = filePath
@@ -940,6 +977,23 @@ class Experiment:
                 if len(thisFile['abs']) <= 256 and os.path.isfile(thisFile['abs']):
                     return thisFile
 
+        spreadsheets = []
+
+        def getSpreadsheets():
+            """All xlsx and csv files in the experiment folder (looked for
+            once)"""
+            if not spreadsheets:
+                expFolder = Path(self.filename).parent
+                for pattern in ['*.xlsx', '*.xls', '*.csv', '*.tsv']:
+                    # NB potentially make this search recursive with
+                    # '**/*.xlsx' but then need to exclude 'data/*.xlsx'
+                    spreadsheets.extend(expFolder.glob(pattern))
+            return spreadsheets
+
+        def getPathsList(filePaths):
+            """getPaths for each of a list of potential file paths"""
+            return [getPaths(filePath) for filePath in filePaths]
+
         def findPathsInFile(filePath):
             """Recursively search a conditions file (xlsx or csv)
              extracting valid file paths in any param/cond
@@ -947,6 +1001,18 @@ class Experiment:
             :param filePath: str to a potential file path (rel or abs)
             :return: list of dicts{'rel','abs'} of valid file paths
             """
+            found = OrderedDict()  # only add unique entries
+            addPathsInFile(filePath, found)
+            return list(found.values())
+
+        def addPathsInFile(filePath, found, thisFile=None):
+            """Add the valid file paths in a potential file path (and, for a
+            conditions file, in its params/conds) to the dict `found`
+
+            :param filePath: str to a potential file path (rel or abs)
+            :param found: OrderedDict of the dicts{'rel','abs'} found so far
+            :param thisFile: the result of getPaths(filePath), if known
+            """
             # Clean up filePath that cannot be eval'd
             if filePath.startswith('$'):
                 try:
@@ -955,43 +1021,44 @@ class Experiment:
                 except NameError:
                     # List files in directory and get condition files
                     if 'xlsx' in filePath or 'xls' in filePath or 'csv' in filePath:
-                        # Get all xlsx and csv files
-                        expFolder = Path(self.filename).parent
-                        spreadsheets = []
-                        for pattern in ['*.xlsx', '*.xls', '*.csv', '*.tsv']:
-                            # NB potentially make this search recursive with
-                            # '**/*.xlsx' but then need to exclude 'data/*.xlsx'
-                            spreadsheets.extend(expFolder.glob(pattern))
-                        files = []
-                        for condFile in spreadsheets:
+                        for condFile in getSpreadsheets():
                             # call the function recursively for each excel file
-                            files.extend(findPathsInFile(str(condFile)))
-                        return files
+                            addPathsInFile(str(condFile), found)
+                        return
 
-            paths = []
             # is it a file?
-            thisFile = getPaths(filePath)  # get the abs/rel paths
+            if thisFile is None:
+                thisFile = getPaths(filePath)  # get the abs/rel paths
             # does it exist?
             if not thisFile:
-                return paths
-            # OK, this file itself is valid so add to resources
-            if thisFile not in paths:
-                paths.append(thisFile)
+                return
+            # OK, this file itself is valid so add to resources (once, which
+            # also stops conditions files that refer to each other)
+            key = _resourceKey(thisFile)
+            if key in found:
+                return
+            found[key] = thisFile
             # does it look at all like an excel file?
             if (not isinstance(filePath, str)
                     or not os.path.splitext(filePath)[1] in ['.csv', '.xlsx',
                                                              '.xls']):
-                return paths
-            conds = data.importConditions(thisFile['abs'])  # load the abs path
-            for thisCond in conds:  # thisCond is a dict
-                for param, val in list(thisCond.items()):
-                    if isinstance(val, str) and len(val):
-                        # only add unique entries (can't use set() on a dict)
-                        for thisFile in findPathsInFile(val):
-                            if thisFile not in paths:
-                                paths.append(thisFile)
-
-            return paths
+                return
+            strings = _getConditionsStrings(thisFile['abs'])  # the abs path
+            # check which of them are files, in parallel if there are many
+            candidates = [val for val in strings if not val.startswith('$')]
+            chunks = [candidates[n:n + _chunkSize]
+                      for n in range(0, len(candidates), _chunkSize)]
+            if len(chunks) > 1:
+                with ThreadPoolExecutor() as pool:
+                    checked = pool.map(getPathsList, chunks)
+            else:
+                checked = map(getPathsList, chunks)
+            paths = dict(zip(candidates, chain.from_iterable(checked)))
+            for val in strings:
+                if val not in paths:
+                    addPathsInFile(val, found)
+                elif paths[val]:
+                    addPathsInFile(val, found, thisFile=paths[val])
 
         # Get resources for components
         compResources = []
@@ -1101,6 +1168,9 @@ class Experiment:
                                              "so will not be copied to Pavlovia"
                                              .format(res['rel']))
 
+        logging.info("Found {} resource files for {} in {:.3f}s"
+                     .format(len(resources), self.name,
+                             time.perf_counter() - t0))
         return resources
 
 
@@ -12,6 +12,7 @@ import json
 import signal
 from weakref import proxy
 
+import numpy
 import psutil
 
 try:
@@ -273,6 +274,10 @@ class ioHubConnection():
         # udp port setup
         self.udp_client = None
 
+        # shared memory ring buffer used for getEvents() if the
+        # event_transport setting is 'shared_memory'
+        self._eventRing = None
+
         # the dynamically generated object that contains an attribute for
         # each device registered for monitoring with the ioHub server so
         # that devices can be accessed experiment process side by device name.
@@ -366,7 +371,10 @@ class ioHubConnection():
         """
         r = None
         if device_label is None:
-            events = self._sendToHubServer(('GET_EVENTS',))[1]
+            if self._eventRing is not None:
+                events = self._getEventListsFromRing()
+            else:
+                events = self._sendToHubServer(('GET_EVENTS',))[1]
             if events is None:
                 r = self.allEvents
             else:
@@ -394,6 +402,56 @@ class ioHubConnection():
 
         return []
 
+    def getEventArrays(self):
+        """Retrieve any events that have been collected by the ioHub Process
+        from monitored devices since the last call to getEvents() or
+        getEventArrays(), as numpy structured arrays.
+
+        One array is returned for each event type, with the fields of the
+        event type's NUMPY_DTYPE (the same as used for the event's table in
+        the ioDataStore). Events are in the order they were received by the
+        ioHub Process.
+
+        If the iohub event_transport setting is 'shared_memory', the arrays
+        are read-only views of the shared memory the events were written to
+        by the ioHub Process, so no copy or conversion of the events is made.
+        These views are only valid until the next call to getEvents() or
+        getEventArrays(); use array.copy() to keep the events for longer.
+        Otherwise the events are received over UDP and converted to arrays.
+
+        Returns:
+            dict: Event type id (the EventConstants value) : numpy array.
+        """
+        arrays = {}
+        events = self.allEvents
+        self.allEvents = []
+        if self._eventRing is not None:
+            records, unsent = self._readEventRing()
+            for etype, earray in records:
+                if etype in arrays:
+                    earray = numpy.concatenate((arrays[etype], earray))
+                arrays[etype] = earray
+            if unsent:
+                events.extend(unsent)
+        else:
+            unsent = self._sendToHubServer(('GET_EVENTS',))[1]
+            if unsent:
+                events.extend(unsent)
+
+        eventsByType = {}
+        for evt in events:
+            # text fields are UTF-8 bytes in the arrays, as in the datastore
+            evt = tuple(v.encode('utf-8') if isinstance(v, str) else v for v in evt)
+            eventsByType.setdefault(evt[DeviceEvent.EVENT_TYPE_ID_INDEX], []).append(evt)
+        for etype, elist in eventsByType.items():
+            earray = numpy.array(elist, dtype=EventConstants.getClass(etype).NUMPY_DTYPE)
+            if etype in arrays:
+                # merge with the events from the shared memory, by hub time
+                earray = numpy.concatenate((arrays[etype], earray))
+                earray = earray[numpy.argsort(earray['time'], kind='stable')]
+            arrays[etype] = earray
+        return arrays
+
     def clearEvents(self, device_label='all'):
         """Clears unread events from the ioHub Server's Event Buffer(s)
         so that unneeded events are not discarded.
@@ -826,6 +884,21 @@ class ioHubConnection():
         r = self._sendToHubServer(('RPC', 'flushIODataStoreFile'))
         return r
 
+    def getDataStoreStats(self):
+        """Return a dict of counters for the iohub datastore event write
+        buffers, or None if the datastore is not enabled. This includes the
+        number of events waiting to be written (queued_rows) and the
+        duration of the bulk table appends (write_latency_last, _mean and
+        _max, in sec.).
+
+        Args:
+            None
+
+        Returns:
+            dict or None
+        """
+        return self._sendToHubServer(('RPC', 'getIODataStoreStats'))[2]
+
     def startCustomTasklet(self, task_name, task_class_path, **class_kwargs):
         """
         Instruct the iohub server to start running a custom tasklet given
@@ -994,6 +1067,8 @@ class ioHubConnection():
         self.udp_client = UDPClientConnection(remote_port=server_udp_port)
         # <<<<< Done Creating open UDP port to ioHub Server
 
+        self._initEventTransport()
+
         # <<<<< Done starting iohub subprocess
 
         ioHubConnection.ACTIVE_CONNECTION = proxy(self)
@@ -1108,6 +1183,66 @@ class ioHubConnection():
             printExceptionDetailsToStdErr()
         return None
 
+    def _initEventTransport(self):
+        """Create the shared memory event ring buffer and have the iohub
+        server attach to it, if the event_transport setting is
+        'shared_memory'. If this is not possible events are received over
+        UDP."""
+        if self._iohub_server_config.get('event_transport', 'udp') != 'shared_memory':
+            return False
+        from ..sharedmem import EventRingBuffer, SHARED_MEMORY_AVAILABLE, DEFAULT_RING_SIZE
+        if not SHARED_MEMORY_AVAILABLE:
+            print2err('Warning: shared memory is not available, '
+                      'iohub events will be received over UDP.')
+            return False
+        ring = None
+        try:
+            ring_size = self._iohub_server_config.get('event_shared_memory_size', DEFAULT_RING_SIZE)
+            ring = EventRingBuffer(size=ring_size, create=True)
+            r = self._sendToHubServer(('RPC', 'attachEventSharedMemory', (ring.name,)))
+            if r and r[2] is True:
+                self._eventRing = ring
+                return True
+        except Exception: # pylint: disable=broad-except
+            printExceptionDetailsToStdErr()
+        print2err('Warning: iohub server could not attach to shared memory, '
+                  'iohub events will be received over UDP.')
+        if ring is not None:
+            ring.close()
+        return False
+
+    @staticmethod
+    def _eventDtype(etype):
+        return EventConstants.getClass(etype).NUMPY_DTYPE
+
+    def _readEventRing(self):
+        """Ask the iohub server to write its buffered events to the shared
+        memory ring, and read them. Returns the list of (event type id,
+        structured array) records and the list of any events sent over UDP
+        because they did not fit in the ring."""
+        r = self._sendToHubServer(('GET_EVENTS_SHM',))
+        records = self._eventRing.read(self._eventDtype)
+        return records, r[2]
+
+    def _getEventListsFromRing(self):
+        """Equivalent of GET_EVENTS using the shared memory ring; returns
+        the events as lists, sorted by hub time, or None."""
+        records, events = self._readEventRing()
+        if not records:
+            return events
+        events = events or []
+        for _, earray in records:
+            str_fields = [i for i, fname in enumerate(earray.dtype.names)
+                          if earray.dtype[fname].kind == 'S']
+            for evt in earray.tolist():
+                evt = list(evt)
+                for i in str_fields:
+                    evt[i] = str(evt[i], 'utf-8')
+                events.append(evt)
+        if len(records) > 1 or len(events) > len(records[0][1]):
+            events.sort(key=lambda evt: evt[DeviceEvent.EVENT_HUB_TIME_INDEX])
+        return events
+
     def _convertDict(self, d):
         r = {}
         for k, v in d.items():
@@ -1306,6 +1441,9 @@ class ioHubConnection():
                     Computer.iohub_process.kill()
                 printExceptionDetailsToStdErr()
             finally:
+                if self._eventRing is not None:
+                    self._eventRing.close()
+                    self._eventRing = None
                 ioHubConnection.ACTIVE_CONNECTION = None
                 self._server_process = None
                 Computer.iohub_process_id = None
@@ -5,7 +5,11 @@
 # Distributed under the terms of the GNU General Public License (GPL).
 
 import os
+import time
 import atexit
+import functools
+import threading
+from collections import deque
 import numpy as np
 from pkg_resources import parse_version
 from ..server import DeviceEvent
@@ -43,6 +47,131 @@ FILE_VERSION = '0.9.1.2'
 SCHEMA_AUTHORS = 'Sol Simpson'
 SCHEMA_MODIFIED_DATE = 'October 27, 2021'
 
+# Defaults for the event write buffer; see the data_store section of
+# default_datastore.yaml.
+DEFAULT_WRITE_BUFFER_SIZE = 256
+DEFAULT_WRITE_BUFFER_BLOCKS = 4
+DEFAULT_WRITE_INTERVAL = 0.25
+
+
+def _lockedFileAccess(method):
+    """Decorator for DataStoreFile methods that use the pytables file, so
+    they never run at the same time as the background writer thread."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._fileLock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class EventTableBuffer():
+    """
+    In memory buffer for the rows of one event table.
+
+    Events are copied into a ring of preallocated numpy structured arrays
+    (blocks) of blockSize rows. Once a block is full, or its first row is
+    older than the datastore write interval, it is sealed and handed to the
+    writer, which appends the whole block to the table with one pytables
+    call and then returns the block to the ring.
+
+    If the writer falls behind and the ring runs out of free blocks, a new
+    block is allocated so no events are dropped; overflowCount is
+    incremented each time this happens.
+    """
+    def __init__(self, table, dtype, blockSize=DEFAULT_WRITE_BUFFER_SIZE,
+                 nBlocks=DEFAULT_WRITE_BUFFER_BLOCKS):
+        self.table = table
+        self.dtype = np.dtype(dtype)
+        self.blockSize = max(int(blockSize), 1)
+        self.nBlocks = max(int(nBlocks), 1)
+        self._free = deque(np.empty(self.blockSize, dtype=self.dtype)
+                           for _ in range(self.nBlocks))
+        self._ready = deque()
+        self._block = self._free.popleft()
+        self._count = 0
+        self._firstTime = 0.0
+        self.overflowCount = 0
+
+    def add(self, row, now):
+        """Copy row (a tuple) into the current block. Returns True if this
+        filled and sealed the block."""
+        if self._count == 0:
+            self._firstTime = now
+        self._block[self._count] = row
+        self._count += 1
+        if self._count == self.blockSize:
+            self.seal()
+            return True
+        return False
+
+    def seal(self):
+        """Queue the current block for writing, if it holds any rows, and
+        start a new one."""
+        if self._count == 0:
+            return
+        self._ready.append((self._block, self._count))
+        if self._free:
+            self._block = self._free.popleft()
+        else:
+            self._block = np.empty(self.blockSize, dtype=self.dtype)
+            self.overflowCount += 1
+        self._count = 0
+
+    def sealIfOlderThan(self, now, maxAge):
+        if self._count and now - self._firstTime >= maxAge:
+            self.seal()
+
+    def takeReady(self):
+        """Return the list of sealed (block, rowCount) tuples waiting to be
+        written, removing them from the buffer."""
+        ready = list(self._ready)
+        self._ready.clear()
+        return ready
+
+    def release(self, block):
+        """Return a written block to the ring of free blocks."""
+        if len(self._free) + len(self._ready) + 1 < self.nBlocks:
+            self._free.append(block)
+
+    @property
+    def queuedRows(self):
+        """Number of rows in the buffer that have not been written yet."""
+        return self._count + sum(n for b, n in self._ready)
+
+
+class DataStoreWriterThread(threading.Thread):
+    """
+    Appends the sealed blocks of a DataStoreFile's event buffers to the
+    pytables file, so this does not happen on the ioHub server event loop.
+    The thread wakes up when a block has been filled, and at least every
+    write interval sec. so partially filled blocks are also written.
+    """
+    def __init__(self, datastore, interval=DEFAULT_WRITE_INTERVAL):
+        threading.Thread.__init__(self, name='ioHubDataStoreWriter')
+        self.daemon = True
+        self._datastore = datastore
+        self._interval = interval
+        self._wake = threading.Event()
+        self._running = True
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        while self._running:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            try:
+                self._datastore._writeBufferedEvents()
+            except Exception:
+                printExceptionDetailsToStdErr()
+
+    def stop(self, timeout=None):
+        self._running = False
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout)
+
 
 class DataStoreFile():
     def __init__(self, fileName, folderPath, fmode='a', iohub_settings=None):
@@ -61,10 +190,28 @@ class DataStoreFile():
         self.flushCounter = self.settings.get('flush_interval', 32)
         self._eventCounter = 0
 
+        # Events are buffered per table and appended in blocks.
+        # A write_buffer_size of 1 appends each event as it is received.
+        self.writeBufferSize = self.settings.get('write_buffer_size', DEFAULT_WRITE_BUFFER_SIZE)
+        self.writeBufferBlocks = self.settings.get('write_buffer_blocks', DEFAULT_WRITE_BUFFER_BLOCKS)
+        self.writeInterval = self.settings.get('write_interval', DEFAULT_WRITE_INTERVAL)
+        self.tableOptions = self.settings.get('event_table_options') or dict()
+        self._eventBuffers = dict()
+        self._nextWriteCheck = 0.0
+        self._bufferLock = threading.Lock()
+        self._fileLock = threading.RLock()
+        self._writeStats = dict(rows_written=0, append_calls=0, write_latency_last=0.0,
+                                write_latency_total=0.0, write_latency_max=0.0)
+
         self.TABLES = dict()
         self._eventGroupMappings = dict()
         self.emrtFile = open_file(self.filePath, mode=fmode)
 
+        self._writerThread = None
+        if self.settings.get('threaded_writer', False):
+            self._writerThread = DataStoreWriterThread(self, self.writeInterval)
+            self._writerThread.start()
+
         atexit.register(close_open_data_files, False)
 
         if len(self.emrtFile.title) == 0:
@@ -137,9 +284,37 @@ class DataStoreFile():
             self.emrtFile.createGroup(datevts_node, evt_group_label, title=egtitle)
             return datevts_node._f_get_child(evt_group_label)
 
+    def eventTableOptions(self, table_label):
+        """
+        Return the pytables Filters and chunkshape to use when creating the
+        event table table_label. These are read from the event_table_options
+        data_store setting, where the options for each table label are
+        updated from those given for 'default'; for example:
+
+            event_table_options:
+                default:
+                    complevel: 0
+                BINOCULAR_EYETRACKER_SAMPLE:
+                    complevel: 1
+                    complib: blosc:lz4
+                    shuffle: True
+                    chunkshape: 1024
+
+        Supported options are complevel, complib, shuffle, fletcher32 and
+        chunkshape. A chunkshape of None lets pytables choose one.
+        """
+        options = dict(complevel=0, complib='zlib', shuffle=False, fletcher32=False, chunkshape=None)
+        options.update(self.tableOptions.get('default') or {})
+        options.update(self.tableOptions.get(table_label) or {})
+        chunkshape = options.pop('chunkshape')
+        if isinstance(chunkshape, int):
+            chunkshape = (chunkshape,)
+        elif chunkshape is not None:
+            chunkshape = tuple(chunkshape)
+        return tables.Filters(**options), chunkshape
+
+    @_lockedFileAccess
     def updateDataStoreStructure(self, device_instance, event_class_dict):
-        dfilter = tables.Filters(complevel=0, complib='zlib', shuffle=False, fletcher32=False)
-
         for event_cls_name, event_cls in event_class_dict.items():
             if event_cls.IOHUB_DATA_TABLE:
                 table_label = event_cls.IOHUB_DATA_TABLE
@@ -148,11 +323,13 @@ class DataStoreFile():
                         tc_name = self.eventTableLabel2ClassName(table_label)
                         create_table_func = getattr(self.emrtFile, create_table)
                         dc_name = device_instance.__class__.__name__
+                        dfilter, chunkshape = self.eventTableOptions(table_label)
                         self.TABLES[table_label] = create_table_func(self.groupNodeForEvent(event_cls),
                                                                      tc_name,
                                                                      event_cls.NUMPY_DTYPE,
                                                                      title='%s Data' % dc_name,
-                                                                     filters=dfilter.copy())
+                                                                     filters=dfilter,
+                                                                     chunkshape=chunkshape)
                         self.flush()
                     except tables.NodeError:
                         self.TABLES[table_label] = self.groupNodeForEvent(event_cls)._f_get_child(tc_name)
@@ -178,6 +355,7 @@ class DataStoreFile():
                     print2err('\teventTableLabel2ClassName: {0}'.format(self.eventTableLabel2ClassName(table_label)))
                     print2err('----------------------------------------------')
 
+    @_lockedFileAccess
     def addClassMapping(self, ioClass, ctable):
         cmtable = self.TABLES['CLASS_TABLE_MAPPINGS']
         names = [x['class_id'] for x in cmtable.where('(class_id == %d)' % ioClass.EVENT_TYPE_ID)]
@@ -190,6 +368,7 @@ class DataStoreFile():
             trow.append()
             self.flush()
 
+    @_lockedFileAccess
     def createOrUpdateExperimentEntry(self, experimentInfoList):
         experiment_metadata = self.TABLES['EXPERIMENT_METADETA']
         result = [row for row in experiment_metadata.iterrows() if row['code'] == experimentInfoList[1]]
@@ -207,6 +386,7 @@ class DataStoreFile():
         self.flush()
         return self.active_experiment_id
 
+    @_lockedFileAccess
     def createExperimentSessionEntry(self, sessionInfoDict):
         session_metadata = self.TABLES['SESSION_METADETA']
         max_id = 0
@@ -222,6 +402,7 @@ class DataStoreFile():
         self.flush()
         return self.active_session_id
 
+    @_lockedFileAccess
     def initConditionVariableTable(
             self, experiment_id, session_id, np_dtype):
         expcv_table = None
@@ -268,6 +449,7 @@ class DataStoreFile():
         self._activeRunTimeConditionVariableTable = expcv_table
         return True
 
+    @_lockedFileAccess
     def extendConditionVariableTable(self, experiment_id, session_id, data):
         if self._EXP_COND_DTYPE is None:
             return False
@@ -299,6 +481,7 @@ class DataStoreFile():
             return False
         return True
 
+    @_lockedFileAccess
     def checkIfSessionCodeExists(self, sessionCode):
         if self.emrtFile:
             wclause = 'experiment_id == %d' % (self.active_experiment_id,)
@@ -308,19 +491,29 @@ class DataStoreFile():
                 return True
             return False
 
+    def _eventBuffer(self, eventClass):
+        table_label = eventClass.IOHUB_DATA_TABLE
+        ebuffer = self._eventBuffers.get(table_label)
+        if ebuffer is None:
+            ebuffer = EventTableBuffer(self.TABLES[table_label], eventClass.NUMPY_DTYPE,
+                                       self.writeBufferSize, self.writeBufferBlocks)
+            self._eventBuffers[table_label] = ebuffer
+        return ebuffer
+
     def _handleEvent(self, event):
         try:
             if self.checkForExperimentAndSessionIDs(event) is False:
                 return False
             etype = event[DeviceEvent.EVENT_TYPE_ID_INDEX]
             eventClass = EventConstants.getClass(etype)
-            etable = self.TABLES[eventClass.IOHUB_DATA_TABLE]
             event[DeviceEvent.EVENT_EXPERIMENT_ID_INDEX] = self.active_experiment_id
             event[DeviceEvent.EVENT_SESSION_ID_INDEX] = self.active_session_id
 
-            np_array = np.array([tuple(event), ], dtype=eventClass.NUMPY_DTYPE)
-            etable.append(np_array)
-            self.bufferedFlush()
+            now = time.perf_counter()
+            with self._bufferLock:
+                ebuffer = self._eventBuffer(eventClass)
+                sealed = ebuffer.add(tuple(event), now)
+            self._bufferedEventsAdded(sealed, now)
         except Exception:
             print2err("Error saving event: ", event)
             printExceptionDetailsToStdErr()
@@ -334,22 +527,117 @@ class DataStoreFile():
 
             etype = event[DeviceEvent.EVENT_TYPE_ID_INDEX]
             eventClass = EventConstants.getClass(etype)
-            etable = self.TABLES[eventClass.IOHUB_DATA_TABLE]
-
-            np_events = []
-            for event in events:
-                event[DeviceEvent.EVENT_EXPERIMENT_ID_INDEX] = self.active_experiment_id
-                event[DeviceEvent.EVENT_SESSION_ID_INDEX] = self.active_session_id
-                np_events.append(tuple(event))
 
-            np_array = np.array(np_events, dtype=eventClass.NUMPY_DTYPE)
-            etable.append(np_array)
-            self.bufferedFlush(len(np_events))
+            now = time.perf_counter()
+            sealed = False
+            with self._bufferLock:
+                ebuffer = self._eventBuffer(eventClass)
+                for event in events:
+                    event[DeviceEvent.EVENT_EXPERIMENT_ID_INDEX] = self.active_experiment_id
+                    event[DeviceEvent.EVENT_SESSION_ID_INDEX] = self.active_session_id
+                    sealed = ebuffer.add(tuple(event), now) or sealed
+            self._bufferedEventsAdded(sealed, now)
         except ioHubError as e:
             print2err(e)
         except Exception:
             printExceptionDetailsToStdErr()
 
+    def _bufferedEventsAdded(self, sealed, now):
+        # Without a writer thread, blocks are written from here when one has
+        # been filled, and partially filled blocks are checked for age once
+        # every write interval (see also writeAgedEvents).
+        if self._writerThread is not None:
+            if sealed:
+                self._writerThread.wake()
+        elif sealed:
+            self._nextWriteCheck = now + self.writeInterval
+            self._writeBufferedEvents()
+        else:
+            self.writeAgedEvents(now)
+
+    def writeAgedEvents(self, now=None):
+        """
+        Write the partially filled blocks whose first event is older than the
+        write interval, checking at most once every write interval. The
+        ioHub server calls this from its event loop, so events are written
+        even when no more events of their type are received. Does nothing
+        if a writer thread is used, as the thread does this itself.
+
+        Returns the number of events written.
+        """
+        if self._writerThread is not None:
+            return 0
+        if now is None:
+            now = time.perf_counter()
+        if now < self._nextWriteCheck:
+            return 0
+        self._nextWriteCheck = now + self.writeInterval
+        return self._writeBufferedEvents()
+
+    @_lockedFileAccess
+    def _writeBufferedEvents(self, writeAll=False):
+        """
+        Append the sealed blocks of each event buffer to their tables. Blocks
+        that have not been filled are sealed first if writeAll is True, or if
+        their first event is older than the write interval.
+
+        The file lock is held while blocks are taken from the buffers and
+        appended, so the rows of a table are always written in order.
+        """
+        now = time.perf_counter()
+        with self._bufferLock:
+            ready = []
+            for ebuffer in self._eventBuffers.values():
+                if writeAll:
+                    ebuffer.seal()
+                else:
+                    ebuffer.sealIfOlderThan(now, self.writeInterval)
+                ready.extend((ebuffer, block, count) for block, count in ebuffer.takeReady())
+        if not ready:
+            return 0
+
+        stats = self._writeStats
+        row_count = 0
+        for ebuffer, block, count in ready:
+            stime = time.perf_counter()
+            ebuffer.table.append(block[:count])
+            latency = time.perf_counter() - stime
+            stats['append_calls'] += 1
+            stats['write_latency_last'] = latency
+            stats['write_latency_total'] += latency
+            stats['write_latency_max'] = max(stats['write_latency_max'], latency)
+            row_count += count
+        stats['rows_written'] += row_count
+        with self._bufferLock:
+            for ebuffer, block, count in ready:
+                ebuffer.release(block)
+        self.bufferedFlush(row_count)
+        return row_count
+
+    def getWriteStats(self):
+        """
+        Return a dict of counters for the event write buffers:
+
+            queued_rows: events received that have not been written yet.
+            queued_rows_by_table: queued_rows for each event table label.
+            rows_written: events appended to the file so far.
+            append_calls: number of bulk appends made to event tables.
+            write_latency_last/mean/max: duration of the bulk appends, in sec.
+            buffer_overflows: times a buffer ran out of preallocated blocks.
+            threaded_writer: True if a writer thread is being used.
+        """
+        with self._bufferLock:
+            by_table = dict((label, ebuffer.queuedRows) for label, ebuffer in self._eventBuffers.items())
+            overflows = sum(ebuffer.overflowCount for ebuffer in self._eventBuffers.values())
+        stats = dict(self._writeStats)
+        latency_total = stats.pop('write_latency_total')
+        stats['write_latency_mean'] = latency_total / stats['append_calls'] if stats['append_calls'] else 0.0
+        stats['queued_rows'] = sum(by_table.values())
+        stats['queued_rows_by_table'] = by_table
+        stats['buffer_overflows'] = overflows
+        stats['threaded_writer'] = self._writerThread is not None
+        return stats
+
     def bufferedFlush(self, eventCount=1):
         """
         If flushCounter threshold is >=0 then do some checks. If it is < 0,
@@ -358,16 +646,26 @@ class DataStoreFile():
         """
         if self.flushCounter >= 0:
             if self.flushCounter == 0:
-                self.flush()
+                self._flushFile()
                 return True
             if self.flushCounter <= self._eventCounter:
-                self.flush()
+                self._flushFile()
                 self._eventCounter = 0
                 return True
             self._eventCounter += eventCount
             return False
 
+    @_lockedFileAccess
     def flush(self):
+        """Write all buffered events to their tables and flush the file."""
+        try:
+            if self.emrtFile and self.emrtFile.isopen:
+                self._writeBufferedEvents(writeAll=True)
+        except Exception:
+            printExceptionDetailsToStdErr()
+        self._flushFile()
+
+    def _flushFile(self):
         try:
             if self.emrtFile:
                 self.emrtFile.flush()
@@ -377,9 +675,13 @@ class DataStoreFile():
             printExceptionDetailsToStdErr()
 
     def close(self):
-        self.flush()
-        self._activeRunTimeConditionVariableTable = None
-        self.emrtFile.close()
+        if self._writerThread is not None:
+            self._writerThread.stop()
+            self._writerThread = None
+        with self._fileLock:
+            self.flush()
+            self._activeRunTimeConditionVariableTable = None
+            self.emrtFile.close()
 
     def __del__(self):
         try:
@@ -4,7 +4,9 @@
 # Distributed under the terms of the GNU General Public License (GPL).
 
 import numpy as np
+from bisect import bisect_left, insort
 from collections import deque
+from numpy.lib.stride_tricks import as_strided
 
 from ..util import NumPyRingBuffer
 from . import Device, DeviceEvent, Computer
@@ -142,6 +144,11 @@ class MovingWindowFilter():
     To change the filter used, extend this class and replace the filteredValue
     method.
 
+    filterValues() and filterEvents() are block mode versions of add(), that
+    filter a whole array of values or events at once. Subclasses that replace
+    filteredValue can also replace filterValues with a vectorised version;
+    otherwise each window is filtered using filteredValue.
+
     """
 
     def __init__(self, **kwargs):
@@ -170,6 +177,7 @@ class MovingWindowFilter():
             self._active_index = knot_pos
 
         self._event_field_index = None
+        self._event_field_name = event_field_name
         self._events = None
         if event_type and event_field_name:
             self._event_field_index = EventConstants.getClass(
@@ -200,19 +208,90 @@ class MovingWindowFilter():
 
         """
         if isinstance(event, (list, tuple)):
-            self._filtering_buffer.append(event[self._event_field_index])
+            self._appendValue(event[self._event_field_index])
             self._events.append(event)
             if self.isFull():
+                filtered_value = self.filteredValue()
                 if self._inplace:
                     self._events[
                         self._active_index][
-                        self._event_field_index] = self.filteredValue()
-                return self._events[self._active_index], self.filteredValue()
+                        self._event_field_index] = filtered_value
+                return self._events[self._active_index], filtered_value
         else:
-            self._filtering_buffer.append(event)
+            self._appendValue(event)
             if self.isFull():
                 return None, self.filteredValue()
 
+    def _appendValue(self, value):
+        """Add a value to the filtering buffer. Filters that keep running
+        statistics of the window update them here."""
+        self._filtering_buffer.append(value)
+
+    def filterValues(self, values):
+        """Block mode version of add() for a sequence of values, filtering
+        every window of the values in one go.
+
+        Returns a numpy array of the filtered values that add() would have
+        returned after each value once the window was full, so
+        len(values) - length + 1 values, where value i is the filtered value
+        of input value i + knot_pos. The filter's window is not changed.
+        """
+        windows = self._valueWindows(values)
+        if len(windows) == 0:
+            return np.zeros(0)
+        if type(self).filteredValue is MovingWindowFilter.filteredValue:
+            return windows.mean(axis=1)
+        # filteredValue has been replaced, so use it for each window
+        window_buffer = self._filtering_buffer
+        self._filtering_buffer = NumPyRingBuffer(window_buffer.max_size,
+                                                 window_buffer._dtype)
+        try:
+            filtered_values = []
+            for window in windows:
+                for value in window:
+                    self._filtering_buffer.append(value)
+                filtered_values.append(self.filteredValue())
+        finally:
+            self._filtering_buffer = window_buffer
+        return np.asarray(filtered_values, dtype=np.float64)
+
+    def filterEvents(self, events):
+        """Block mode version of add() for a numpy structured array of events,
+        for example read from an ioHub DataStore event table, filtering the
+        event_field_name field of the events.
+
+        Returns the events that add() would have returned as a new structured
+        array, and the numpy array of their filtered values (see
+        filterValues). If the filter is inplace, the field of the returned
+        events is set to the filtered values.
+        """
+        filtered_values = self.filterValues(events[self._event_field_name])
+        start = self._eventOffset()
+        filtered_events = events[start:start + len(filtered_values)].copy()
+        if self._inplace:
+            filtered_events[self._event_field_name] = filtered_values
+        return filtered_events, filtered_values
+
+    def _eventOffset(self):
+        """Index of the value that the first filtered value is for."""
+        return self._active_index
+
+    def _bufferedValues(self, values):
+        """Return values as a float64 array, rounded to the data type of the
+        filtering buffer as add() would."""
+        values = np.asarray(values, dtype=self._filtering_buffer._dtype)
+        return np.ascontiguousarray(values, dtype=np.float64)
+
+    def _valueWindows(self, values):
+        """Return a read only (n, length) view of all the windows of values
+        (see _bufferedValues)."""
+        length = self._filtering_buffer.max_size
+        values = self._bufferedValues(values)
+        count = max(len(values) - length + 1, 0)
+        stride = values.strides[0]
+        return as_strided(values, shape=(count, length),
+                          strides=(stride, stride), writeable=False)
+
     def isFull(self):
         return self._filtering_buffer.isFull()
 
@@ -238,6 +317,9 @@ class PassThroughFilter(MovingWindowFilter):
     def filteredValue(self):
         return self._filtering_buffer[0]
 
+    def filterValues(self, values):
+        return self._valueWindows(values)[:, 0].copy()
+
 # ------
 
 
@@ -254,6 +336,91 @@ class MedianFilter(MovingWindowFilter):
     def filteredValue(self):
         return np.median(self._filtering_buffer.getElements())
 
+    def filterValues(self, values):
+        return np.median(self._valueWindows(values), axis=1)
+
+# ------
+
+
+class RunningMeanFilter(MovingWindowFilter):
+    """Returns the average value of the moving window, like
+    MovingWindowFilter, but keeps a running sum of the window so each
+    filtered value takes constant time regardless of the window length.
+
+    The running sum is recalculated from the window every 100 * length
+    values, so rounding errors do not build up.
+    """
+
+    def __init__(self, **kwargs):
+        MovingWindowFilter.__init__(self, **kwargs)
+        self._sum = 0.0
+        self._added = 0
+
+    def _appendValue(self, value):
+        window = self._filtering_buffer
+        if window.isFull():
+            self._sum -= window[0]
+        window.append(value)
+        self._added += 1
+        if self._added >= 100 * window.max_size:
+            self._sum = window.getElements().sum(dtype=np.float64)
+            self._added = 0
+        else:
+            self._sum += window[-1]
+
+    def filteredValue(self):
+        return self._sum / len(self._filtering_buffer)
+
+    def filterValues(self, values):
+        values = self._bufferedValues(values)
+        length = self._filtering_buffer.max_size
+        if len(values) < length:
+            return np.zeros(0)
+        sums = np.cumsum(values)
+        window_sums = sums[length - 1:].copy()
+        window_sums[1:] -= sums[:-length]
+        return window_sums / length
+
+    def clear(self):
+        MovingWindowFilter.clear(self)
+        self._sum = 0.0
+        self._added = 0
+
+# ------
+
+
+class RunningMedianFilter(MovingWindowFilter):
+    """Returns the median value of the moving window, like MedianFilter, but
+    keeps a sorted copy of the window that is updated by bisection as
+    values are added and removed, rather than sorting the window for every
+    filtered value.
+    """
+
+    def __init__(self, **kwargs):
+        MovingWindowFilter.__init__(self, **kwargs)
+        self._sorted = []
+
+    def _appendValue(self, value):
+        window = self._filtering_buffer
+        if window.isFull():
+            del self._sorted[bisect_left(self._sorted, window[0])]
+        window.append(value)
+        insort(self._sorted, window[-1])
+
+    def filteredValue(self):
+        values = self._sorted
+        middle = len(values) // 2
+        if len(values) % 2:
+            return values[middle]
+        return (values[middle - 1] + values[middle]) / 2.0
+
+    def filterValues(self, values):
+        return np.median(self._valueWindows(values), axis=1)
+
+    def clear(self):
+        MovingWindowFilter.clear(self)
+        self._sorted = []
+
 # ------
 
 
@@ -274,12 +441,19 @@ class WeightedAverageFilter(MovingWindowFilter):
         MovingWindowFilter.__init__(self, **kwargs)
         weights = np.asanyarray(weights)
         self._weights = weights / np.sum(weights)
+        # np.convolve reverses the weights, so the dot product with the
+        # reversed weights gives the same (scalar) value
+        self._reversed_weights = self._weights[::-1].copy()
 
     def filteredValue(self):
-        return np.convolve(
-            self._filtering_buffer.getElements(),
-            self._weights,
-            'valid')
+        return np.dot(self._filtering_buffer.getElements(),
+                      self._reversed_weights)
+
+    def filterValues(self, values):
+        values = self._bufferedValues(values)
+        if len(values) < len(self._weights):
+            return np.zeros(0)
+        return np.convolve(values, self._weights, 'valid')
 
 
 # ------
@@ -295,7 +469,10 @@ class StampFilter(MovingWindowFilter):
     applied before starting to return filtered data. Default = 1.
 
     If levels = 2, then the filter would use data returned from a sub filter
-    instance of the Stampe filter., Etc.
+    instance of the Stampe filter., Etc. Each level filters the values
+    returned by the level below it, so add() returns a filtered value once
+    2 * level + 1 values have been added, and filterValues() returns
+    len(values) - 2 * level values.
     """
 
     def __init__(self, **kwargs):
@@ -312,21 +489,43 @@ class StampFilter(MovingWindowFilter):
             self.sub_filter = StampFilter(**kwargs)
 
     def filteredValue(self):
-        if self.sub_filter:
-            return self.sub_filter.filteredValue()
-
         e1, e2, e3 = self._filtering_buffer[0:3]
         if not(e1 < e2 and e2 < e3) or not (e3 < e2 and e2 < e1):
             return (e1 + e3) / 2.0
         return e2
 
+    def filterValues(self, values):
+        if self.sub_filter:
+            values = self.sub_filter.filterValues(values)
+        return MovingWindowFilter.filterValues(self, values)
+
+    def _eventOffset(self):
+        return self._level  # the centre of the window at each level
+
     def add(self, event):
+        if not self.sub_filter:
+            return MovingWindowFilter.add(self, event)
+        sub_result = self.sub_filter.add(event)
+        if not sub_result:
+            return None
+        event, value = sub_result
+        if event is None:
+            return MovingWindowFilter.add(self, value)
+        # filter the value from the level below, for the event it is from
+        self._appendValue(value)
+        self._events.append(event)
+        if self.isFull():
+            filtered_value = self.filteredValue()
+            if self._inplace:
+                self._events[
+                    self._active_index][
+                    self._event_field_index] = filtered_value
+            return self._events[self._active_index], filtered_value
+
+    def clear(self):
+        MovingWindowFilter.clear(self)
         if self.sub_filter:
-            sub_result = self.sub_filter.add(event)
-            if sub_result:
-                self._filtering_buffer.append(sub_result[1])
-                self._events.append(event)
-        return MovingWindowFilter.add(self, event)
+            self.sub_filter.clear()
 
 # ------
 
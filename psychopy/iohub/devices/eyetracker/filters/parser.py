@@ -82,6 +82,18 @@ Sample position fields are filtered by the median value of three samples, those
 being the current sample and the two following samples (so the current sample is
 at index 0.
 
+eventfilters.RunningMeanFilter and eventfilters.RunningMedianFilter
+-------------------------------------------------------------------
+
+The same as MovingWindowFilter and MedianFilter, with the same parameters, but
+keeping a running sum or sorted copy of the window, so filtering each sample
+does not recalculate the mean or median of the whole window. These are faster
+for long windows.
+
+Example:
+
+POSITION_FILTER = eventfilters.RunningMedianFilter, {length: 9, knot_pos: 'center'}
+
 eventfilters.WeightedAverageFilter
 -----------------------------------
 
@@ -129,11 +141,49 @@ POSITION_FILTER = eventfilters.StampFilter, {level: 1}
 Data is filtered once, similar to what a 'normal' filter level would be in the
   eyelink<tm> system. Level = 2 would be similar to the 'extra' filter level
   setting of eyelink<tm>.
+
+ADAPTIVE_VEL_THRESH_METHOD
+---------------------------
+
+Saccade velocity thresholds are calculated from the last
+ADAPTIVE_VEL_THRESH_HISTORY seconds of sample velocities, starting at
+min + 3 * SD of the velocities and then iterating mean + 3 * SD of the
+velocities below the threshold until the threshold changes by less than
+1 deg/s. How often this is done is set by adaptive_vel_thresh_method:
+
+    * 'full': The threshold is calculated from the whole velocity history
+      for every sample. This is the default.
+    * 'periodic': The threshold is calculated from the whole velocity history
+      every adaptive_vel_thresh_update_interval samples (default 10), and the
+      last threshold calculated is used for the samples in between.
+    * 'incremental': The velocity history is kept sorted, along with the count,
+      sum and sum of squares of the velocities below the threshold. Each
+      sample only updates these for the velocity added and the velocity
+      removed, and the iteration starts from the threshold of the previous
+      sample, so usually only a few velocities need to be looked at.
+      Because the iteration stops once the threshold changes by less than
+      1 deg/s, the thresholds are approximate: they usually differ from
+      those of 'full' by less than 1 deg/s, but can differ by a few deg/s,
+      so samples with velocities close to the threshold may be classified
+      differently.
+
+Example:
+
+ADAPTIVE_VEL_THRESH_METHOD = 'periodic', {adaptive_vel_thresh_update_interval: 25}
+
+The time taken by the parser to process each sample is available from
+EyeTrackerEventParser.getProcessingStats().
 """
+from bisect import bisect_left, insort
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 from ....constants import EventConstants
 from ....errors import print2err
-from ... import DeviceEvent, eventfilters
+from ... import Computer, DeviceEvent, eventfilters
+from ..eye_events import (MonocularEyeSampleEvent, BinocularEyeSampleEvent,
+                          FixationStartEvent, FixationEndEvent,
+                          SaccadeStartEvent, SaccadeEndEvent,
+                          BlinkStartEvent, BlinkEndEvent)
 from collections import OrderedDict
 from ....util.visualangle import VisualAngleCalc
 
@@ -151,6 +201,180 @@ LEFT_EYE = 1
 RIGHT_EYE = 2
 BOTH_EYE = 3
 
+# sample categories used by EyeTrackerEventParser.parseSampleArray
+_FIX, _SAC, _MIS = 0, 1, 2
+
+
+def adaptiveVelocityThresholds(velocities, length, chunk_size=2 ** 21):
+    """
+    Vectorised version of the adaptive velocity threshold calculated by
+    EyeTrackerEventParser.addVelocityToAdaptiveThreshold, for all the
+    velocities that would be added to the threshold buffer in one call.
+
+    For each velocity, once the buffer of the last `length` velocities is
+    full, the threshold starts at min + 3 * SD of the buffer and is then
+    repeatedly set to mean + 3 * SD of the buffer values below the
+    threshold, until it changes by less than 1.0. This is done for all
+    windows at once, chunk_size window values at a time, with the mean and
+    SD of the values below each threshold calculated from their count, sum
+    and sum of squares.
+
+    Args:
+        velocities (ndarray): Velocities (all > 0) in the order they were added
+            to the buffer.
+        length (int): Length of the threshold buffer.
+
+    Returns:
+        ndarray: Threshold for each velocity; NaN while the buffer was not
+        full yet.
+    """
+    velocities = np.ascontiguousarray(velocities, dtype=np.float64)
+    count = len(velocities)
+    thresholds = np.full(count, np.nan)
+    if length < 1 or count <= length:
+        return thresholds
+
+    # windows[j] holds the buffer when velocity j + length is added
+    stride = velocities.strides[0]
+    windows = as_strided(velocities[1:], shape=(count - length, length),
+                         strides=(stride, stride), writeable=False)
+    step = max(1, chunk_size // length)
+    for start in range(0, len(windows), step):
+        wins = windows[start:start + step]
+        sq_wins = wins * wins
+        prev = wins.min(axis=1) + wins.std(axis=1) * 3.0
+        result = np.empty(len(wins))
+        active = np.arange(len(wins))
+        while len(active):
+            below = (wins[active] < prev[:, None]).astype(np.float64)
+            n = below.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.einsum('ij,ij->i', below, wins[active]) / n
+                var = np.einsum('ij,ij->i', below, sq_wins[active]) / n - mean * mean
+                pt = mean + 3.0 * np.sqrt(np.maximum(var, 0.0))
+            result[active] = pt
+            # NaN thresholds stop iterating, as in the online parser
+            changing = np.abs(pt - prev) >= 1.0
+            active = active[changing]
+            prev = pt[changing]
+        thresholds[start + length:start + length + len(wins)] = result
+    return thresholds
+
+
+def fullVelocityThreshold(velocities):
+    """
+    Adaptive velocity threshold of a full velocity buffer, as calculated
+    for each sample by the 'full' adaptive_vel_thresh_method.
+    """
+    PT = velocities.min() + velocities.std() * 3.0
+    velocity_below_thresh = velocities[velocities < PT]
+    PTd = 2.0
+    pt_list = [PT, ]
+    while PTd >= 1.0:
+        if len(pt_list) > 0:
+            PT = velocity_below_thresh.mean() + 3.0 * velocity_below_thresh.std()
+            velocity_below_thresh = velocities[velocities < PT]
+            PTd = np.abs(PT - pt_list[-1])
+        pt_list.append(PT)
+    return PT
+
+
+class IncrementalVelocityThreshold():
+    """
+    Adaptive velocity threshold of a velocity buffer that is updated one
+    velocity at a time, used by the 'incremental' adaptive_vel_thresh_method.
+
+    The buffer velocities are kept in a sorted list, along with the count,
+    sum and sum of squares of the velocities below the current threshold.
+    Adding a velocity updates these for the velocity added and the one it
+    replaces, and the threshold iteration starts from the last threshold,
+    only adding or removing the velocities between the old and new
+    thresholds. The sums are recalculated from the sorted velocities once per
+    buffer length of updates so that rounding errors do not build up.
+
+    Args:
+        length (int): Length of the velocity buffer.
+        max_iterations (int): Maximum number of threshold iterations per
+            update.
+    """
+    def __init__(self, length, max_iterations=50):
+        self.length = length
+        self.max_iterations = max_iterations
+        self.clear()
+
+    def clear(self):
+        self._sorted = []
+        self._threshold = np.NaN
+        self._n = 0
+        self._sum = 0.0
+        self._sq_sum = 0.0
+        self._updates = 0
+
+    @property
+    def threshold(self):
+        return self._threshold
+
+    def update(self, added, removed=None):
+        """
+        Add a velocity to the buffer, replacing removed (if the buffer is
+        full), and return the updated threshold. NaN is returned until the
+        buffer is full.
+        """
+        values = self._sorted
+        if removed is not None:
+            del values[bisect_left(values, removed)]
+            if removed < self._threshold:
+                self._addBelow(-1, -removed)
+        insort(values, added)
+        if added < self._threshold:
+            self._addBelow(1, added)
+        if len(values) < self.length:
+            return np.NaN
+
+        self._updates += 1
+        if self._n == 0 or self._updates >= self.length:
+            self._restart()
+        for _ in range(self.max_iterations):
+            if self._n == 0:
+                # no velocities below the threshold, restart next update
+                self._threshold = np.NaN
+                break
+            mean = self._sum / self._n
+            var = self._sq_sum / self._n - mean * mean
+            pt = mean + 3.0 * np.sqrt(max(var, 0.0))
+            last_pt = self._threshold
+            self._moveThreshold(pt)
+            if abs(pt - last_pt) < 1.0:
+                break
+        return self._threshold
+
+    def _addBelow(self, count, value):
+        self._n += count
+        self._sum += value
+        self._sq_sum += value * value * count
+
+    def _restart(self):
+        # start from min + 3 * SD of the whole buffer, with exact sums
+        values = np.asarray(self._sorted)
+        self._threshold = values[0] + values.std() * 3.0
+        below = values[:bisect_left(self._sorted, self._threshold)]
+        self._n = len(below)
+        self._sum = below.sum()
+        self._sq_sum = (below * below).sum()
+        self._updates = 0
+
+    def _moveThreshold(self, pt):
+        old_pt, self._threshold = self._threshold, pt
+        lo = bisect_left(self._sorted, min(old_pt, pt))
+        hi = bisect_left(self._sorted, max(old_pt, pt))
+        if lo == hi:
+            return
+        moved = np.asarray(self._sorted[lo:hi])
+        sign = 1 if pt > old_pt else -1
+        self._n += sign * (hi - lo)
+        self._sum += sign * moved.sum()
+        self._sq_sum += sign * (moved * moved).sum()
+
 
 class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
 
@@ -192,12 +416,33 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             vel_filter_class, vel_filter_kwargs = eventfilters.PassThroughFilter, {}
 
         self.adaptive_x_vthresh_buffer = np.zeros(
-            self.vel_thresh_history_dur * sampling_rate)
+            int(self.vel_thresh_history_dur * sampling_rate))
         self.x_vthresh_buffer_index = 0
         self.adaptive_y_vthresh_buffer = np.zeros(
-            self.vel_thresh_history_dur * sampling_rate)
+            int(self.vel_thresh_history_dur * sampling_rate))
         self.y_vthresh_buffer_index = 0
 
+        self.vel_thresh_method = kwargs.get(
+            'adaptive_vel_thresh_method', 'full')
+        if self.vel_thresh_method not in ('full', 'periodic', 'incremental'):
+            raise ValueError('Unknown adaptive_vel_thresh_method: %s' %
+                             self.vel_thresh_method)
+        self.vel_thresh_update_interval = int(kwargs.get(
+            'adaptive_vel_thresh_update_interval', 10))
+        self.incremental_vthresholds = None
+        if self.vel_thresh_method == 'incremental':
+            buffer_length = len(self.adaptive_x_vthresh_buffer)
+            self.incremental_vthresholds = [
+                IncrementalVelocityThreshold(buffer_length),
+                IncrementalVelocityThreshold(buffer_length)]
+        self.periodic_vthresholds = [np.NaN, np.NaN]
+
+        # per sample processing times, see getProcessingStats()
+        self._processed_sample_count = 0
+        self._total_processing_time = 0.0
+        self._max_sample_processing_time = 0.0
+        self._last_sample_processing_time = 0.0
+
         pos_filter_kwargs['event_type'] = MONOCULAR_EYE_SAMPLE
         pos_filter_kwargs['inplace'] = True
         pos_filter_kwargs['event_field_name'] = 'angle_x'
@@ -238,8 +483,10 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
 
     def process(self):
         """"""
+        process_start = Computer.getTime()
+        input_events = self.getInputEvents()
         samples_for_processing = []
-        for in_evt in self.getInputEvents():
+        for in_evt in input_events:
             if self.sample_type is None:
                 self.initializeForSampleType(in_evt)
 
@@ -288,6 +535,31 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                 self.addOutputEvent(s)
 
         self.clearInputEvents()
+        if input_events:
+            self._addProcessingTime(len(input_events),
+                                    Computer.getTime() - process_start)
+
+    def _addProcessingTime(self, sample_count, duration):
+        sample_duration = duration / sample_count
+        self._processed_sample_count += sample_count
+        self._total_processing_time += duration
+        self._last_sample_processing_time = sample_duration
+        if sample_duration > self._max_sample_processing_time:
+            self._max_sample_processing_time = sample_duration
+
+    def getProcessingStats(self):
+        """
+        Return a dict of the time taken by process() per input sample, in
+        seconds: sample_count, mean_sample_time, max_sample_time and
+        last_sample_time. When process() handles more than one sample, the
+        time of the call is divided between them.
+        """
+        count = self._processed_sample_count
+        return dict(sample_count=count,
+                    mean_sample_time=self._total_processing_time / count if count else 0.0,
+                    max_sample_time=self._max_sample_processing_time,
+                    last_sample_time=self._last_sample_processing_time,
+                    vel_thresh_method=self.vel_thresh_method)
 
     def parseEvent(self, sample):
         if self._last_parser_sample:
@@ -419,30 +691,268 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             blen = len(current_velocity_buffer)
             if velocity > 0.0:
                 i = current_vbuffer_index % blen
-                current_velocity_buffer[i] = velocity
                 full = current_vbuffer_index >= blen
+                replaced = current_velocity_buffer[i] if full else None
+                current_velocity_buffer[i] = velocity
                 if v == 0:
                     self.x_vthresh_buffer_index += 1
                 else:
                     self.y_vthresh_buffer_index += 1
-                if full:
-                    PT = current_velocity_buffer.min() + current_velocity_buffer.std() * 3.0
-                    velocity_below_thresh = current_velocity_buffer[
-                        current_velocity_buffer < PT]
-                    PTd = 2.0
-                    pt_list = [PT, ]
-                    while PTd >= 1.0:
-                        if len(pt_list) > 0:
-                            PT = velocity_below_thresh.mean() + 3.0 * velocity_below_thresh.std()
-                            velocity_below_thresh = current_velocity_buffer[
-                                current_velocity_buffer < PT]
-                            PTd = np.abs(PT - pt_list[-1])
-                        pt_list.append(PT)
+                if self.incremental_vthresholds:
+                    PT = self.incremental_vthresholds[v].update(velocity, replaced)
+                    if full:
+                        vthresh_values.append(PT)
+                elif full:
+                    if self.vel_thresh_method == 'periodic':
+                        if (current_vbuffer_index - blen) % self.vel_thresh_update_interval == 0:
+                            self.periodic_vthresholds[v] = fullVelocityThreshold(
+                                current_velocity_buffer)
+                        PT = self.periodic_vthresholds[v]
+                    else:
+                        PT = fullVelocityThreshold(current_velocity_buffer)
                     vthresh_values.append(PT)
             if len(vthresh_values) != v + 1:
                 vthresh_values.append(np.NaN)
         return vthresh_values
 
+    ################### Offline Parsing ##########################
+
+    def parseSampleArray(self, samples):
+        """
+        Parse a whole recording of eye samples at once, for example the
+        MonocularEyeSampleEvent or BinocularEyeSampleEvent table of an ioHub
+        hdf5 file, creating the same fixation, saccade and blink events as
+        the online parser would for the samples, but with each processing
+        step done for all samples in a few numpy calls:
+
+            * binocular samples are averaged to monocular samples, and
+              positions converted to visual angles, column wise.
+            * position and pupil data of missing samples are linearly
+              interpolated between the valid samples either side.
+            * velocities are the differences of consecutive positions.
+            * adaptive velocity thresholds are calculated for all windows of
+              the threshold buffer at once (see adaptiveVelocityThresholds).
+            * samples are categorised and the runs of fixation, saccade and
+              missing (blink) samples are found by run-length segmentation.
+
+        As in the online parser, no events are created for the samples before
+        the first change of sample category, and no end event is created for
+        the last run of samples. Only the PassThroughFilter position and
+        velocity filters are supported. The event_id of each event is that
+        of the sample it was created from, and the parser state used by
+        process() is not changed. Velocity thresholds are always calculated
+        with the 'full' adaptive_vel_thresh_method.
+
+        Args:
+            samples (ndarray): Numpy structured array of monocular or
+                binocular samples, or a pytables Table to read them from.
+
+        Returns:
+            OrderedDict: EventConstants event type : numpy structured array
+            with that event type's NUMPY_DTYPE, for FIXATION_START,
+            FIXATION_END, SACCADE_START, SACCADE_END, BLINK_START and
+            BLINK_END events.
+        """
+        for field_filter in (self.x_position_filter, self.x_velocity_filter):
+            if type(field_filter) is not eventfilters.PassThroughFilter:
+                raise ValueError('parseSampleArray only supports the '
+                                 'PassThroughFilter position and velocity '
+                                 'filters, not %s.' % field_filter.__class__.__name__)
+        if hasattr(samples, 'read'):
+            samples = samples.read()
+        samples = np.asarray(samples)
+
+        cols, valid = self._monoSampleColumns(samples)
+        valid_ix = np.flatnonzero(valid)
+        tables = OrderedDict((cls.EVENT_TYPE_ID, np.zeros(0, dtype=cls.NUMPY_DTYPE))
+                             for cls in (FixationStartEvent, FixationEndEvent,
+                                         SaccadeStartEvent, SaccadeEndEvent,
+                                         BlinkStartEvent, BlinkEndEvent))
+        if len(valid_ix) == 0:
+            return tables
+
+        # Samples before the first and after the last valid sample are never
+        # parsed.
+        first, last = valid_ix[0], valid_ix[-1]
+        cols = dict((name, col[:last + 1]) for name, col in cols.items())
+        valid = valid[:last + 1]
+
+        ax = cols['angle_x']
+        ay = cols['angle_y']
+        ax[valid], ay[valid] = self.pix2deg(cols['gaze_x'][valid], cols['gaze_y'][valid])
+        self._interpolateMissingArrays(cols, valid, first)
+
+        # Velocity from the previous sample, as done by _addVelocity. The
+        # field filters hold their values as float32, so the previous sample
+        # has filtered (float32) angles and the current sample does not yet.
+        t = cols['time']
+        dt = t[1:] - t[:-1]
+        fx = ax.astype(np.float32)
+        fy = ay.astype(np.float32)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vx = np.abs(ax[1:] - fx[:-1]) / dt
+            vy = np.abs(ay[1:] - fy[:-1]) / dt
+        cols['velocity_x'][1:] = vx.astype(np.float32)
+        cols['velocity_y'][1:] = vy.astype(np.float32)
+        cols['velocity_xy'][1:] = np.hypot(vx, vy).astype(np.float32)
+        ax[:] = fx
+        ay[:] = fy
+
+        cols = dict((name, col[first:]) for name, col in cols.items())
+        valid = valid[first:]
+        category = self._categoriseSampleArrays(cols, valid)
+
+        # run-length segmentation of the sample categories
+        run_starts = np.flatnonzero(np.diff(category)) + 1
+        if len(run_starts) == 0:
+            return tables
+        run_ends = np.append(run_starts[1:], len(category)) - 1
+        run_category = category[run_starts]
+        # the last run is still open, so has no end event
+        closed = np.ones(len(run_starts), dtype=bool)
+        closed[-1] = False
+
+        run_bounds = np.append(run_starts, len(category))
+        for cat, start_cls, end_cls in ((_FIX, FixationStartEvent, FixationEndEvent),
+                                        (_SAC, SaccadeStartEvent, SaccadeEndEvent),
+                                        (_MIS, BlinkStartEvent, BlinkEndEvent)):
+            is_cat = run_category == cat
+            tables[start_cls.EVENT_TYPE_ID] = self._eventArray(
+                start_cls, cols, run_starts[is_cat], None, None)
+            is_cat &= closed
+            tables[end_cls.EVENT_TYPE_ID] = self._eventArray(
+                end_cls, cols, run_starts[is_cat], run_ends[is_cat],
+                (run_bounds, np.flatnonzero(is_cat)))
+        return tables
+
+    def _monoSampleColumns(self, samples):
+        """Return a dict of float64 arrays for each MonocularEyeSampleEvent
+        field, converting binocular samples as _convertToMonoAveraged does,
+        and the array of sample validity."""
+        mono_fields = MonocularEyeSampleEvent.CLASS_ATTRIBUTE_NAMES
+        in_fields = samples.dtype.names
+        status = samples['status']
+        cols = dict()
+        if 'left_gaze_x' in in_fields:
+            valid = status != 22
+            right_only = status == 20
+            for field in mono_fields:
+                if field in in_fields:
+                    col = samples[field].astype(np.float64)
+                elif field == 'eye':
+                    col = np.full(len(samples), float(LEFT_EYE))
+                elif field.endswith('_type'):
+                    col = samples['left_%s' % field].astype(np.int64).astype(np.float64)
+                else:
+                    left = samples['left_%s' % field].astype(np.float64)
+                    right = samples['right_%s' % field].astype(np.float64)
+                    col = np.where(status == 0, (left + right) / 2.0,
+                                   np.where(right_only, right, left))
+                cols[field] = col
+        else:
+            valid = status == 0
+            for field in mono_fields:
+                cols[field] = samples[field].astype(np.float64)
+        cols['type'][:] = MONOCULAR_EYE_SAMPLE
+        return cols, valid
+
+    @staticmethod
+    def _interpolateMissingArrays(cols, valid, first):
+        """Linearly interpolate the angle and pupil data of the missing
+        samples after the first valid sample, in the same way as
+        interpolateMissingData."""
+        missing = np.flatnonzero(~valid[first:]) + first
+        if len(missing) == 0:
+            return
+        index = np.arange(len(valid))
+        prev_valid = np.maximum.accumulate(np.where(valid, index, 0))[missing]
+        next_valid = np.minimum.accumulate(
+            np.where(valid, index, len(valid))[::-1])[::-1][missing]
+        # same arithmetic as np.linspace(start, end, run_length + 2)
+        steps = (missing - prev_valid).astype(np.float64)
+        divs = (next_valid - prev_valid).astype(np.float64)
+        for field in ('angle_x', 'angle_y', 'pupil_measure1'):
+            col = cols[field]
+            start = col[prev_valid]
+            if field != 'pupil_measure1':
+                # the previous valid sample has been through the float32
+                # position filters
+                start = start.astype(np.float32).astype(np.float64)
+            col[missing] = steps * ((col[next_valid] - start) / divs) + start
+
+    def _categoriseSampleArrays(self, cols, valid):
+        """Store the adaptive velocity thresholds of valid samples in the
+        raw_x and raw_y columns, and return the category of each sample, as
+        getSampleEventCategory would."""
+        buffer_length = len(self.adaptive_x_vthresh_buffer)
+        exceeded = np.zeros(len(valid), dtype=bool)
+        for vfield, tfield in (('velocity_x', 'raw_x'), ('velocity_y', 'raw_y')):
+            velocity = cols[vfield]
+            threshold = np.full(len(valid), np.nan)
+            added = np.flatnonzero(valid & (velocity > 0.0))
+            threshold[added] = adaptiveVelocityThresholds(velocity[added], buffer_length)
+            cols[tfield][valid] = threshold[valid]
+            exceeded |= velocity >= threshold
+        category = np.where(exceeded, _SAC, _FIX)
+        category[~valid] = _MIS
+        return category
+
+    def _eventArray(self, event_cls, cols, start_ix, end_ix, runs):
+        """Create the structured array of event_cls events from the samples
+        at start_ix (and end_ix for end events), in the same way as the
+        create*EventArray methods do for one event."""
+        events = np.zeros(len(start_ix), dtype=event_cls.NUMPY_DTYPE)
+        if len(start_ix) == 0:
+            return events
+        last_ix = start_ix if end_ix is None else end_ix
+        for field in ('experiment_id', 'session_id', 'device_id', 'event_id',
+                      'device_time', 'logged_time', 'time', 'eye', 'status'):
+            events[field] = cols[field][last_ix]
+        events['type'] = event_cls.EVENT_TYPE_ID
+        events['filter_id'] = self.filter_id
+        if event_cls in (BlinkStartEvent, BlinkEndEvent):
+            if end_ix is not None:
+                events['duration'] = cols['time'][end_ix] - cols['time'][start_ix]
+            return events
+
+        copied = ('gaze_x', 'gaze_y', 'angle_x', 'angle_y', 'raw_x', 'raw_y',
+                  'pupil_measure1', 'pupil_measure1_type', 'velocity_x',
+                  'velocity_y', 'velocity_xy')
+        if end_ix is None:
+            for field in copied:
+                events[field] = cols[field][start_ix]
+            return events
+
+        events['duration'] = cols['time'][end_ix] - cols['time'][start_ix]
+        for field in copied:
+            events['start_%s' % field] = cols[field][start_ix]
+            events['end_%s' % field] = cols[field][end_ix]
+
+        run_bounds, run_ix = runs
+        # per run sums and peaks over all samples of the run
+        def runMean(field):
+            sums = np.add.reduceat(cols[field], run_bounds[:-1])[run_ix]
+            return sums / (run_bounds[run_ix + 1] - run_bounds[run_ix])
+
+        def runPeak(field):
+            return np.maximum.reduceat(cols[field], run_bounds[:-1])[run_ix]
+
+        if event_cls is FixationEndEvent:
+            events['average_gaze_x'] = runMean('gaze_x')
+            events['average_gaze_y'] = runMean('gaze_y')
+            events['average_pupil_measure1'] = runMean('pupil_measure1')
+            events['average_pupil_measure1_type'] = cols['pupil_measure1_type'][end_ix]
+        else:
+            x_diff = cols['gaze_x'][end_ix] - cols['gaze_x'][start_ix]
+            y_diff = cols['gaze_y'][end_ix] - cols['gaze_y'][start_ix]
+            events['amplitude_x'] = x_diff
+            events['amplitude_y'] = y_diff
+            events['angle'] = np.rad2deg(np.arctan2(y_diff, x_diff))
+        for field in ('velocity_x', 'velocity_y', 'velocity_xy'):
+            events['average_%s' % field] = runMean(field)
+            events['peak_%s' % field] = runPeak(field)
+        return events
+
     def reset(self):
         eventfilters.DeviceEventFilter.reset(self)
         self._last_parser_sample = None
@@ -457,6 +967,10 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
         self.xy_velocity_filter.clear()
         self.x_vthresh_buffer_index = 0
         self.y_vthresh_buffer_index = 0
+        self.periodic_vthresholds = [np.NaN, np.NaN]
+        if self.incremental_vthresholds:
+            for vthreshold in self.incremental_vthresholds:
+                vthreshold.clear()
 
     def initializeForSampleType(self, in_evt):
         # in_evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
@@ -550,9 +1064,10 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
 
     def _convertMonoFields(self, prev_event, current_event):
         if self.isValidSample(current_event):
-            self._convertPosToAngles(self, current_event)
+            self._convertPosToAngles(current_event)
             if prev_event:
                 self._addVelocity(prev_event, current_event)
+        return current_event
 
     def _convertToMonoAveraged(self, prev_event, current_event):
         mono_evt = []
@@ -825,7 +1340,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                     'time')] - existing_start_event[self.io_event_ix('time')],
                 xDiff,
                 yDiff,
-                np.rad2deg(np.arctan(yDiff, xDiff)),
+                np.rad2deg(np.arctan2(yDiff, xDiff)),
                 existing_start_event[gx],
                 existing_start_event[gy],
                 0.0,
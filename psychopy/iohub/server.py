@@ -102,6 +102,8 @@ class udpServer(DatagramServer):
             return True
         elif request_type == 'GET_EVENTS':
             return self.handleGetEvents(replyTo)
+        elif request_type == 'GET_EVENTS_SHM':
+            return self.handleGetEventsShm(replyTo)
         elif request_type == 'EXP_DEVICE':
             return self.handleExperimentDeviceRequest(request, replyTo)
         elif request_type == 'CUSTOM_TASK':
@@ -234,6 +236,57 @@ class udpServer(DatagramServer):
             self.sendResponse('IOHUB_GET_EVENTS_ERROR', replyTo)
             return False
 
+    def handleGetEventsShm(self, replyTo):
+        """
+        Write the events in the global event buffer to the shared memory
+        event ring, one record per event type, and reply with the number of
+        records written. Events that do not fit in the ring, that have text
+        too long for their event type's NUMPY_DTYPE or that can not be
+        converted to it are sent in the reply as event lists instead, as for
+        GET_EVENTS, so the events received are the same either way.
+        """
+        try:
+            ring = self.iohub.eventRing
+            if ring is None:
+                return self.handleGetEvents(replyTo)
+            from .sharedmem import splitEvents
+
+            self.iohub.processDeviceEvents()
+            currentEvents = list(self.iohub.eventBuffer)
+            self.iohub.eventBuffer.clear()
+
+            eventsByType = OrderedDict()
+            for evt in currentEvents:
+                etype = evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
+                eventsByType.setdefault(etype, []).append(evt)
+
+            record_count = 0
+            unsent = []
+            for etype, events in eventsByType.items():
+                try:
+                    dtype = EventConstants.getClass(etype).NUMPY_DTYPE
+                    events, others = splitEvents(dtype, events)
+                    unsent.extend(others)
+                    if not events:
+                        continue
+                    written = ring.write(etype, dtype, events)
+                except Exception:
+                    written = False
+                if written:
+                    record_count += 1
+                else:
+                    unsent.extend(events)
+
+            if unsent:
+                unsent = sorted(unsent, key=itemgetter(DeviceEvent.EVENT_HUB_TIME_INDEX))
+            self.sendResponse(('GET_EVENTS_SHM_RESULT', record_count, unsent or None), replyTo)
+            return True
+        except Exception:
+            print2err('IOHUB_GET_EVENTS_ERROR')
+            printExceptionDetailsToStdErr()
+            self.sendResponse('IOHUB_GET_EVENTS_ERROR', replyTo)
+            return False
+
     def handleExperimentDeviceRequest(self, request, replyTo):
         request_type = request.pop(0)
         if not isinstance(request_type, str):
@@ -529,10 +582,29 @@ class udpServer(DatagramServer):
     def flushIODataStoreFile(self):
         dsfile = self.iohub.dsfile
         if dsfile:
-            dsfile.emrtFile.flush()
+            dsfile.flush()
             return True
         return False
 
+    def attachEventSharedMemory(self, name):
+        """Attach to the shared memory event ring created by the experiment
+        process. Returns False if shared memory can not be used, in which
+        case the experiment process keeps using GET_EVENTS over UDP."""
+        self.iohub.detachEventSharedMemory()
+        try:
+            from .sharedmem import EventRingBuffer
+            self.iohub.eventRing = EventRingBuffer(name)
+            return True
+        except Exception:
+            printExceptionDetailsToStdErr()
+            return False
+
+    def getIODataStoreStats(self):
+        dsfile = self.iohub.dsfile
+        if dsfile:
+            return dsfile.getWriteStats()
+        return None
+
     def shutDown(self):
         try:
             self.setPriority('normal')
@@ -567,6 +639,7 @@ class DeviceMonitor(Greenlet):
 
 class ioServer():
     eventBuffer = None
+    eventRing = None
     deviceDict = {}
     _logMessageBuffer = deque(maxlen=128)
     _psychopy_windows = {}
@@ -927,6 +1000,11 @@ class ioServer():
             self.closeDataStoreFile()
             self.dsfile = DataStoreFile(fname, fpath, fmode, iohub_settings)
 
+    def detachEventSharedMemory(self):
+        if self.eventRing is not None:
+            self.eventRing.close()
+            self.eventRing = None
+
     def closeDataStoreFile(self):
         if self.dsfile:
             pytablesfile = self.dsfile
@@ -938,6 +1016,11 @@ class ioServer():
         while self._running:
             stime = Computer.getTime()
             self.processDeviceEvents()
+            if self.dsfile:
+                try:
+                    self.dsfile.writeAgedEvents()
+                except Exception:
+                    printExceptionDetailsToStdErr()
             dur = sleep_interval - (Computer.getTime() - stime)
             gevent.sleep(max(0, dur))
 
@@ -1022,6 +1105,8 @@ class ioServer():
 
             self.closeDataStoreFile()
 
+            self.detachEventSharedMemory()
+
             while self.devices:
                 self.devices.pop(0)._close()
         except Exception:
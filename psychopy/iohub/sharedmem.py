@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+# Part of the PsychoPy library
+# Copyright (C) 2012-2020 iSolver Software Solutions (C) 2021 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+"""
+Shared memory transport used to send events from the ioHub server to the
+experiment process.
+
+Events are written into a ring buffer in a shared memory block as packed
+numpy records, one record per event type, using the NUMPY_DTYPE of the
+event class. The experiment process can then view the events as numpy
+structured arrays without them being copied, msgpack encoded or split into
+UDP packets.
+
+Requests and replies are still sent over UDP, so the ring only ever has one
+writer (the ioHub server, while handling a GET_EVENTS_SHM request) and one
+reader (the experiment process, after receiving the reply).
+
+Text is stored UTF-8 encoded in the fixed width byte fields of the dtype.
+Events with text that doesn't fit (see splitEvents) have to be sent some
+other way, so that they arrive unchanged.
+"""
+import struct
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+SHARED_MEMORY_AVAILABLE = shared_memory is not None
+
+DEFAULT_RING_SIZE = 4 * 1024 * 1024
+
+# Byte positions are counted from the creation of the ring and never wrap,
+# so the number of unread bytes is always write_pos - read_pos.
+_HEADER_DTYPE = np.dtype([('write_pos', np.uint64),
+                          ('read_pos', np.uint64),
+                          ('capacity', np.uint64),
+                          ('overflows', np.uint64)])
+_HEADER_SIZE = _HEADER_DTYPE.itemsize
+# event type id, number of events, payload size in bytes
+_RECORD_HEADER = struct.Struct('<IIQ')
+# type id of a record used to skip the unused space at the end of the ring
+_PADDING_RECORD = 0
+_ALIGNMENT = 8
+
+# names of the shared memory blocks created by this process
+_createdNames = set()
+
+
+def _alignedSize(nbytes):
+    return (nbytes + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _textFields(dtype):
+    """(index, size) of each fixed width byte field of dtype."""
+    return [(i, dtype[i].itemsize) for i in range(len(dtype))
+            if dtype[i].kind == 'S']
+
+
+def _fitsField(value, size):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    elif not isinstance(value, bytes):
+        return True  # left to numpy to convert
+    # numpy drops trailing null bytes when the field is read
+    return len(value) <= size and not value.endswith(b'\0')
+
+
+def _encodeText(event, textFields):
+    event = list(event)
+    for i, _ in textFields:
+        if isinstance(event[i], str):
+            event[i] = event[i].encode('utf-8')
+    return tuple(event)
+
+
+def splitEvents(dtype, events):
+    """
+    Split a list of events into those that can be written to the ring as
+    records of dtype without changing them, and those with text that would
+    be truncated by the fixed width fields of dtype.
+
+    Returns:
+        tuple: (events that fit, events that do not), in their original
+        order.
+    """
+    textFields = _textFields(np.dtype(dtype))
+    if not textFields:
+        return list(events), []
+    fitting = []
+    others = []
+    for evt in events:
+        if all(_fitsField(evt[i], size) for i, size in textFields):
+            fitting.append(evt)
+        else:
+            others.append(evt)
+    return fitting, others
+
+
+class EventRingBuffer():
+    """
+    Single writer, single reader ring buffer of event records held in a
+    multiprocessing.shared_memory block.
+
+    The process that creates the ring (create=True) owns the shared memory
+    and unlinks it when closed; other processes attach to it using its name.
+
+    Args:
+        name (str): Name of the shared memory block to attach to, or to
+                    create. If None, a unique name is chosen.
+        size (int): Number of bytes available for event records. Only used
+                    when creating the ring.
+        create (bool): Create the shared memory block, rather than attach
+                       to an existing one.
+    """
+    def __init__(self, name=None, size=DEFAULT_RING_SIZE, create=False):
+        if not SHARED_MEMORY_AVAILABLE:
+            raise RuntimeError('EventRingBuffer needs multiprocessing.'
+                               'shared_memory (Python 3.8 or later).')
+        self._owner = create
+        if create:
+            size = _alignedSize(int(size))
+            self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                                   size=_HEADER_SIZE + size)
+            _createdNames.add(self._shm.name)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.name not in _createdNames:
+                _untrackSharedMemory(self._shm)
+        self._header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self._shm.buf)
+        if create:
+            self._header['write_pos'] = 0
+            self._header['read_pos'] = 0
+            self._header['capacity'] = size
+            self._header['overflows'] = 0
+        self.capacity = int(self._header['capacity'])
+        # read position to publish on the next call to read(), once the
+        # views returned by the previous call are no longer needed
+        self._nextReadPos = int(self._header['read_pos'])
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def overflowCount(self):
+        """Number of times a record was not written because the ring was
+        full."""
+        return int(self._header['overflows'])
+
+    @property
+    def unreadBytes(self):
+        return int(self._header['write_pos']) - int(self._header['read_pos'])
+
+    def write(self, eventTypeId, dtype, events):
+        """
+        Write a list of events of one type (each a list or tuple of values
+        in the order of dtype) to the ring as a single record. Text values
+        are UTF-8 encoded and are truncated if they don't fit their field,
+        use splitEvents() to find events for which that would be the case.
+
+        Returns False, without writing anything, if the ring does not have
+        room for the record. Raises an exception if the events can not be
+        converted to dtype.
+        """
+        dtype = np.dtype(dtype)
+        nbytes = len(events) * dtype.itemsize
+        record_size = _alignedSize(_RECORD_HEADER.size + nbytes)
+        header = self._header
+        write_pos = int(header['write_pos'])
+        free = self.capacity - (write_pos - int(header['read_pos']))
+
+        offset = write_pos % self.capacity
+        tail = self.capacity - offset
+        padding = tail if tail < record_size else 0
+        if record_size + padding > free:
+            header['overflows'] = int(header['overflows']) + 1
+            return False
+
+        buf = self._shm.buf
+        if padding:
+            if tail >= _RECORD_HEADER.size:
+                _RECORD_HEADER.pack_into(buf, _HEADER_SIZE + offset,
+                                         _PADDING_RECORD, 0,
+                                         tail - _RECORD_HEADER.size)
+            write_pos += padding
+            offset = 0
+
+        records = np.ndarray(len(events), dtype=dtype, buffer=buf,
+                             offset=_HEADER_SIZE + offset + _RECORD_HEADER.size)
+        textFields = _textFields(dtype)
+        records[:] = [_encodeText(e, textFields) for e in events]
+        del records
+        _RECORD_HEADER.pack_into(buf, _HEADER_SIZE + offset, eventTypeId,
+                                 len(events), nbytes)
+        # publish the record only once it has been written
+        header['write_pos'] = write_pos + record_size
+        return True
+
+    def read(self, getDtype):
+        """
+        Return a list of (eventTypeId, array) tuples for the records written
+        since the last call, where each array is a read-only numpy structured
+        array viewing the shared memory.
+
+        The arrays are only valid until the next call to read(), when their
+        space in the ring is handed back to the writer; copy them if they
+        are needed for longer.
+
+        Args:
+            getDtype (callable): Returns the numpy dtype for an event type id.
+        """
+        header = self._header
+        header['read_pos'] = self._nextReadPos
+        read_pos = self._nextReadPos
+        write_pos = int(header['write_pos'])
+        buf = self._shm.buf
+        records = []
+        while read_pos < write_pos:
+            offset = read_pos % self.capacity
+            tail = self.capacity - offset
+            if tail < _RECORD_HEADER.size:
+                read_pos += tail
+                continue
+            etype, count, nbytes = _RECORD_HEADER.unpack_from(buf, _HEADER_SIZE + offset)
+            if etype == _PADDING_RECORD:
+                read_pos += tail
+                continue
+            events = np.ndarray(count, dtype=getDtype(etype), buffer=buf,
+                                offset=_HEADER_SIZE + offset + _RECORD_HEADER.size)
+            events.flags.writeable = False
+            records.append((etype, events))
+            read_pos += _alignedSize(_RECORD_HEADER.size + nbytes)
+        self._nextReadPos = read_pos
+        return records
+
+    def close(self):
+        """Close the shared memory, unlinking it if this ring created it."""
+        shm = self._shm
+        if shm is None:
+            return
+        self._shm = None
+        self._header = None
+        try:
+            shm.close()
+        except BufferError:
+            # arrays returned by read() are still in use; the mapping is
+            # released when they are garbage collected.
+            pass
+        if self._owner:
+            _createdNames.discard(shm.name)
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _untrackSharedMemory(shm):
+    # Before Python 3.13 the resource tracker of a process that attaches to
+    # a shared memory block unlinks it when that process exits, even though
+    # the block is owned by another process.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
@@ -26,18 +26,29 @@ messages, (which PsychoPy doesn't use) using the commands::
     from psychopy import logging
     logging.console.setLevel(logging.CRITICAL)
 
+Messages are written to the targets when :func:`flush` is called (e.g. by
+`Window.flip()` when `autoLog` is used). For long experiments, the writing
+can be moved to a background thread with `logging.root.setAsync(True)`, and
+the number of written messages kept in memory can be limited with
+`logging.root.setRetention()`.
+
 """
 
 # Much of the code below is based conceptually, if not syntactically, on the
-# python logging module but it's simpler (no threading) and maintaining a
-# stack of log entries for later writing (don't want files written while
-# drawing)
+# python logging module but it's simpler and maintaining a stack of log
+# entries for later writing (don't want files written while drawing). The
+# only thread is the optional writer thread, which only ever sees entries
+# that have been flushed.
 
 from os import path
+from collections import deque
 import atexit
 import sys
 import codecs
+import json
 import locale
+import queue
+import threading
 from pathlib import Path
 
 from psychopy import clock
@@ -132,6 +143,8 @@ class _LogEntry():
         self.levelname = getLevel(level)
         self.message = message
         self.obj = obj
+        # text of the entry, formatted by the first target that writes it
+        self.text = None
 
 
 class LogFile():
@@ -185,6 +198,14 @@ class LogFile():
 
         self.logger.addTarget(self)
 
+    def formatEntry(self, entry):
+        """Return the line of text (without a newline) written to this target
+        for a log entry, using the format of the logger.
+        """
+        if entry.text is None:
+            entry.text = self.logger.format % entry.__dict__
+        return entry.text
+
     def setLevel(self, level):
         """Set a new minimal level for the log file/stream
         """
@@ -224,6 +245,20 @@ class LogFile():
             pass
 
 
+class JsonLogFile(LogFile):
+    """A log target that writes entries as JSON lines (one JSON object per
+    line, with keys t, level, levelname and message), which can be read back
+    without having to parse the text format of the logger.
+
+    Takes the same arguments as :class:`LogFile`.
+    """
+
+    def formatEntry(self, entry):
+        return json.dumps({'t': entry.t, 'level': entry.level,
+                           'levelname': entry.levelname,
+                           'message': str(entry.message)})
+
+
 class _Logger():
     """Maintains a set of log targets (text streams such as files of stdout)
 
@@ -242,9 +277,12 @@ class _Logger():
         self.toFlush = []
         self.format = format
         self.lowestTarget = 50
+        self._writeQueue = None
+        self._writer = None
 
     def __del__(self):
         self.flush()
+        self.setAsync(False)
         # unicode logged to coder output window can cause logger failure, with
         # error message pointing here. this is despite it being ok to log to
         # terminal or Builder output. proper fix: fix coder unicode bug #97
@@ -287,22 +325,95 @@ class _Logger():
 
     def flush(self):
         """Process all current messages to each target
+
+        If the logger is asynchronous (see :meth:`setAsync`) the messages are
+        passed to the writer thread, waiting only if it already has
+        `maxQueueSize` batches of messages to write.
         """
-        # loop through targets then entries in toFlush
-        # so that stream.flush can be called just once
-        formatted = {}  # keep a dict - so only do the formatting once
-        for target in self.targets:
-            for thisEntry in self.toFlush:
-                if thisEntry.level >= target.level:
-                    if not thisEntry in formatted:
-                        # convert the entry into a formatted string
-                        formatted[thisEntry] = self.format % thisEntry.__dict__
-                    target.write(formatted[thisEntry] + '\n')
-            if hasattr(target.stream, 'flush'):
-                target.stream.flush()
+        entries, self.toFlush = self.toFlush, []  # a new empty list
+        if not entries:
+            return
+        if self._writeQueue is not None:
+            self._writeQueue.put(entries)
+        else:
+            self._writeEntries(entries)
         # finished processing entries - move them to self.flushed
-        self.flushed.extend(self.toFlush)
-        self.toFlush = []  # a new empty list
+        if self.flushed is not None:
+            self.flushed.extend(entries)
+
+    def _writeEntries(self, entries):
+        # loop through targets then entries so that each target is written
+        # (and its stream flushed) just once. Entries are only formatted for
+        # targets that accept their level, and once for all text targets.
+        for target in list(self.targets):
+            lines = [target.formatEntry(thisEntry) + '\n'
+                     for thisEntry in entries
+                     if thisEntry.level >= target.level]
+            if lines:
+                target.write(''.join(lines))
+
+    def setRetention(self, maxEntries=None):
+        """Set how many of the most recently written entries are kept in
+        `self.flushed`.
+
+        :parameters:
+
+            - maxEntries:
+                None keeps every entry (the default), 0 keeps none and
+                any other number keeps that many of the latest entries.
+        """
+        if maxEntries is None:
+            self.flushed = list(self.flushed or [])
+        else:
+            # an empty deque for 0, so `flushed` can still be iterated
+            self.flushed = deque(self.flushed or [], maxlen=maxEntries)
+
+    def setAsync(self, enabled=True, maxQueueSize=100):
+        """Write messages to the targets from a background thread, so that
+        :meth:`flush` does not have to wait for them to be formatted and
+        written. Setting `enabled` to False writes any queued messages and
+        stops the thread.
+
+        :parameters:
+
+            - enabled:
+                Use a writer thread or not.
+
+            - maxQueueSize:
+                The number of flushed batches of messages that can be waiting
+                to be written before :meth:`flush` waits for the writer.
+        """
+        if enabled and self._writer is None:
+            self._writeQueue = queue.Queue(maxsize=maxQueueSize)
+            self._writer = threading.Thread(target=self._writeQueued,
+                                            args=(self._writeQueue,),
+                                            name='psychopy.logging writer',
+                                            daemon=True)
+            self._writer.start()
+        elif not enabled and self._writer is not None:
+            writeQueue, writer = self._writeQueue, self._writer
+            self._writeQueue = self._writer = None
+            writeQueue.put(None)
+            writer.join()
+
+    def waitForWriter(self):
+        """Wait until all flushed messages have been written to the targets.
+        """
+        writeQueue = self._writeQueue
+        if writeQueue is not None:
+            writeQueue.join()
+
+    def _writeQueued(self, writeQueue):
+        while True:
+            entries = writeQueue.get()
+            try:
+                if entries is None:
+                    return
+                self._writeEntries(entries)
+            except Exception as e:
+                sys.stderr.write('psychopy.logging writer failed: %s\n' % e)
+            finally:
+                writeQueue.task_done()
 
 root = _Logger()
 console = LogFile()
@@ -313,8 +424,14 @@ def flush(logger=root):
     """
     logger.flush()
 
+
+def _flushAtExit():
+    root.flush()
+    # write anything still queued for the writer thread
+    root.setAsync(False)
+
 # make sure this function gets called as python closes
-atexit.register(flush)
+atexit.register(_flushAtExit)
 
 
 def critical(msg, t=None, obj=None):
@@ -23,6 +23,7 @@ __all__ = [
     'AUDIO_EAR_COUNT'
 ]
 
+import tempfile
 from pathlib import Path
 
 import numpy as np
@@ -42,6 +43,27 @@ AUDIO_CHANNEL_LEFT = AUDIO_EAR_LEFT = 0
 AUDIO_CHANNEL_RIGHT = AUDIO_EAR_RIGHT = 1
 AUDIO_CHANNEL_COUNT = AUDIO_EAR_COUNT = 2
 
+# sample arrays larger than this many bytes (e.g. recordings lasting hours) are
+# memory-mapped to a temporary file in `memmapDir` (`None` for the system
+# default) instead of being held in RAM, `None` to always hold them in RAM
+memmapThreshold = None
+memmapDir = None
+
+
+def _allocSamples(nSamples, channels):
+    """Allocate a zeroed C-contiguous array of `nSamples` by `channels` 32-bit
+    float samples, memory-mapped to a temporary file if its size exceeds
+    `memmapThreshold`.
+    """
+    nBytes = nSamples * channels * np.dtype(np.float32).itemsize
+    if memmapThreshold is None or nBytes <= memmapThreshold:
+        return np.zeros((nSamples, channels), dtype=np.float32, order='C')
+
+    # the file is removed by the OS once the map is closed
+    with tempfile.TemporaryFile(dir=memmapDir) as f:
+        return np.memmap(f, dtype=np.float32, mode='w+',
+                         shape=(nSamples, channels))
+
 
 class AudioClip:
     """Class for storing audio clip data.
@@ -101,9 +123,9 @@ class AudioClip:
     """
     def __init__(self, samples, sampleRateHz=SAMPLE_RATE_48kHz, userData=None):
         # samples should be a 2D array where columns represent channels
+        # (`asanyarray` keeps memory-mapped samples mapped)
         self._samples = np.atleast_2d(
-            np.asarray(samples, dtype=np.float32, order='C'))
-        self._samples.clip(-1, 1)  # force values to be clipped
+            np.asanyarray(samples, dtype=np.float32, order='C'))
 
         # set the sample rate of the clip
         self._sampleRateHz = int(sampleRateHz)
@@ -414,9 +436,11 @@ class AudioClip:
         assert other.sampleRateHz == self._sampleRateHz
         assert other.channels == self.channels
 
-        newSamples = np.ascontiguousarray(
-            np.vstack((self._samples, other.samples)),
-            dtype=np.float32)
+        nSamples = len(self._samples)
+        newSamples = _allocSamples(
+            nSamples + len(other.samples), self.channels)
+        newSamples[:nSamples] = self._samples
+        newSamples[nSamples:] = other.samples
 
         toReturn = AudioClip(
             samples=newSamples,
@@ -429,12 +453,33 @@ class AudioClip:
         assert other.sampleRateHz == self._sampleRateHz
         assert other.channels == self.channels
 
-        self._samples = np.ascontiguousarray(
-            np.vstack((self._samples, other.samples)),
-            dtype=np.float32)
+        self._appendSamples(other.samples)
 
         return self
 
+    def _appendSamples(self, samples):
+        """Copy samples to the end of this clip.
+
+        Samples are stored at the start of a buffer with spare room after them,
+        which is doubled in size when full. Most appends only copy the new
+        samples, so building a clip from many short segments takes time
+        proportional to its final length.
+
+        """
+        start = self._length
+        end = start + len(samples)
+        if end > len(self._buffer):
+            buffer = _allocSamples(
+                max(end, 2 * len(self._buffer)), self._buffer.shape[1])
+            buffer[:start] = self._buffer[:start]
+            self._buffer = buffer
+
+        self._buffer[start:end] = samples
+        self._length = end
+
+        # recompute the duration of the new clip
+        self._duration = end / float(self._sampleRateHz)
+
     def append(self, clip):
         """Append samples from another sound clip to the end of this one.
 
@@ -467,12 +512,7 @@ class AudioClip:
         assert self.channels == clip.channels
         assert self._sampleRateHz == clip.sampleRateHz
 
-        self._samples = np.ascontiguousarray(
-            np.vstack((self._samples, clip.samples)),
-            dtype=np.float32)
-
-        # recompute the duration of the new clip
-        self._duration = len(self.samples) / float(self.sampleRateHz)
+        self._appendSamples(clip.samples)
 
         return self
 
@@ -551,6 +591,23 @@ class AudioClip:
     # Properties
     #
 
+    @property
+    def _samples(self):
+        # samples in the clip, which are at the start of the storage buffer
+        return self._buffer[:self._length]
+
+    @_samples.setter
+    def _samples(self, value):
+        self._buffer = value
+        self._length = len(value)
+
+    def __getstate__(self):
+        # pickle the samples only, without the spare room in the buffer or a
+        # memory map
+        state = self.__dict__.copy()
+        state['_buffer'] = np.array(self._samples)
+        return state
+
     @property
     def samples(self):
         """Nx1 or Nx2 array of audio samples (`~numpy.ndarray`).
@@ -702,8 +759,8 @@ class AudioClip:
 
         Speech-to-text conversion blocks the main application thread when used
         on Python. Don't transcribe audio during time-sensitive parts of your
-        experiment! This issue is known to the developers and will be fixed in a
-        later release.
+        experiment! Use :func:`~psychopy.sound.transcribe.transcribeAsync` to
+        transcribe in a background process instead.
 
         Parameters
         ----------
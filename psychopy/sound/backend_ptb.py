@@ -8,7 +8,9 @@ import sys
 import os
 import time
 import re
+import threading
 import weakref
+from collections import OrderedDict, namedtuple
 from pathlib import Path
 
 from psychopy import prefs, logging, exceptions
@@ -264,6 +266,195 @@ class _MasterStream(audio.Stream):
         self._tSoundRequestPlay = 0
 
 
+# Sounds decoded from files are cached, most recently used first, up to this
+# many bytes of samples so that files played again (e.g. on every trial) are
+# only read from disk once. Set to 0 to disable the cache.
+soundCacheSize = 256 * 1024 ** 2
+
+_soundCache = OrderedDict()
+_soundCacheLock = threading.Lock()
+
+_DecodedSound = namedtuple(
+    '_DecodedSound', ['samples', 'sampleRate', 'channels', 't', 'duration'])
+
+
+def clearSoundCache():
+    """Remove all decoded sounds from the cache used by `SoundPTB`.
+    """
+    with _soundCacheLock:
+        _soundCache.clear()
+
+
+def _soundCacheKey(filename, startTime, stopTime, channels):
+    """Key for a decoded sound, which changes if the file is modified."""
+    filename = os.path.abspath(str(filename))
+    stat = os.stat(filename)
+    return (filename, stat.st_mtime_ns, stat.st_size, startTime, stopTime,
+            channels)
+
+
+def _matchChannels(samples, channels):
+    """Return 2D float32 samples, with mono made stereo if `channels` is 2.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+    if channels == 2 and samples.shape[1] == 1:
+        samples = samples.repeat(2, axis=1)
+    return samples
+
+
+def _soundSection(sndFile, startTime, stopTime):
+    """Start time and duration (s) of the part of `sndFile` to play."""
+    fileDuration = float(len(sndFile)) / sndFile.samplerate
+    t = startTime if startTime and startTime > 0 else 0
+    if stopTime and stopTime > 0:
+        duration = min(stopTime - t, fileDuration)
+    else:
+        duration = fileDuration - t
+    return t, duration
+
+
+def _decodeSoundFile(filename, startTime, stopTime, channels):
+    """Read the samples to play from a sound file, using the cache if
+    possible.
+
+    Returns a `_DecodedSound`, whose samples must not be modified.
+    """
+    key = _soundCacheKey(filename, startTime, stopTime, channels)
+    with _soundCacheLock:
+        if key in _soundCache:
+            _soundCache.move_to_end(key)
+            return _soundCache[key]
+
+    with sf.SoundFile(filename) as f:
+        t, duration = _soundSection(f, startTime, stopTime)
+        if t:
+            f.seek(int(t * f.samplerate))
+        samples = _matchChannels(
+            f.read(frames=int(f.samplerate * duration), dtype='float32'),
+            channels)
+        decoded = _DecodedSound(samples, f.samplerate, f.channels, t, duration)
+    samples.flags.writeable = False  # shared by all sounds using the file
+
+    if samples.nbytes <= soundCacheSize:
+        with _soundCacheLock:
+            _soundCache[key] = decoded
+            cacheBytes = sum(d.samples.nbytes for d in _soundCache.values())
+            while cacheBytes > soundCacheSize:
+                _, oldest = _soundCache.popitem(last=False)
+                cacheBytes -= oldest.samples.nbytes
+
+    return decoded
+
+
+class _SoundFileStreamer:
+    """Reads a sound file ahead of its playback in a background thread.
+
+    The first `readAhead` seconds are read by `prime()`, to fill the track
+    before playback starts. Once `start()` is called, a thread reads the
+    following blocks and passes them to `write`, keeping up to `readAhead`
+    seconds ahead of the number of frames given by `getPlayedFrames`. Disk
+    access never happens when playback starts or on the audio thread.
+    """
+    def __init__(self, filename, startTime, stopTime, channels, readAhead,
+                 blockSecs=0.05):
+        self.sndFile = sf.SoundFile(filename)
+        self.sampleRate = self.sndFile.samplerate
+        self.t, self.duration = _soundSection(self.sndFile, startTime, stopTime)
+        self.channels = channels
+        self._startFrame = int(self.t * self.sampleRate)
+        self._nFrames = int(self.sampleRate * self.duration)
+        self._readAheadFrames = max(int(readAhead * self.sampleRate), 1)
+        self._blockFrames = max(int(blockSecs * self.sampleRate), 1)
+        self._frameN = 0  # next frame to read, from the start of the section
+        self._written = 0  # frames written since `prime()`
+        self._thread = None
+        self._stopEvent = threading.Event()
+        self.error = None  # set if reading fails in the thread
+
+    def _read(self, nFrames):
+        nFrames = min(nFrames, self._nFrames - self._frameN)
+        self.sndFile.seek(self._startFrame + self._frameN)
+        samples = self.sndFile.read(frames=nFrames, dtype='float32')
+        self._frameN += len(samples)
+        return _matchChannels(samples, self.channels)
+
+    def prime(self, frameN=0):
+        """Return samples from `frameN` up to `readAhead` seconds later, to
+        fill the track with before playback starts.
+        """
+        self.stop()
+        self._frameN = min(frameN, self._nFrames)
+        samples = self._read(self._readAheadFrames)
+        self._written = len(samples)
+        return samples
+
+    def start(self, write, getPlayedFrames, loops=0):
+        """Start reading the rest of the file in a background thread.
+
+        `loops` is the number of times to repeat the section once finished
+        (-1 to repeat until stopped).
+        """
+        self.stop()
+        self.error = None
+        # a new flag for each thread, so one that didn't stop in time (see
+        # `stop()`) still finishes
+        self._stopEvent = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(write, getPlayedFrames, loops, self._stopEvent),
+            name='SoundFileStreamer', daemon=True)
+        self._thread.start()
+
+    def _run(self, write, getPlayedFrames, loops, stopEvent):
+        pollSecs = self._blockFrames / float(self.sampleRate) / 2
+        try:
+            while not stopEvent.is_set():
+                if self._frameN >= self._nFrames:
+                    if loops == 0:
+                        break
+                    loops -= 1
+                    self._frameN = 0
+                if self._written - getPlayedFrames() >= self._readAheadFrames:
+                    stopEvent.wait(pollSecs)
+                    continue
+                samples = self._read(self._blockFrames)
+                write(samples)
+                if stopEvent.is_set():
+                    break  # the streamer may have been primed again since
+                self._written += len(samples)
+        except Exception as err:
+            self.error = err
+            logging.error("Failed to stream sound from {}: {}"
+                          .format(self.sndFile.name, err))
+
+    @property
+    def isStreaming(self):
+        """`True` while the background thread is reading the file."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=1.0):
+        """Stop the background thread, if running.
+
+        Waits up to `timeout` seconds for the thread to finish writing the
+        block it has read. Writing can wait for the track to play, so stop
+        the streamer before the track. If the thread hasn't finished in time
+        it's left to, but it won't read anything more.
+        """
+        if self._thread is not None:
+            self._stopEvent.set()
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logging.warning("Streaming {} didn't stop within {}s"
+                                .format(self.sndFile.name, timeout))
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.sndFile.close()
+
+
 class SoundPTB(_SoundBase):
     """Play a variety of sounds using the new PsychPortAudio library
     """
@@ -288,9 +479,11 @@ class SoundPTB(_SoundBase):
         :param blockSize: the size of the buffer on the sound card
                          (small for low latency, large for stability)
         :param preBuffer: integer to control streaming/buffering
-                           - -1 means store all
+                           - -1 means store all (decoded sounds are cached,
+                             see `soundCacheSize`)
                            - 0 (no buffer) means stream from disk
-                           - potentially we could buffer a few secs(!?)
+                           - a number of secs to stream from disk, reading
+                             that far ahead of playback in a background thread
         :param hamming: boolean (default True) to indicate if the sound should
                         be apodized (i.e., the onset and offset smoothly ramped up from
                         down to zero). The function apodize uses a Hanning window, but
@@ -325,6 +518,8 @@ class SoundPTB(_SoundBase):
         self.sourceType = 'unknown'  # set to be file, array or freq
         self.sndFile = None
         self.sndArr = None
+        self._streamer = None  # `_SoundFileStreamer` if streaming from disk
+        self._streamerPrimed = False
         self.hamming = hamming
         self._hammingWindow = None  # will be created during setSound
         self.win=syncToWin
@@ -436,37 +631,43 @@ class SoundPTB(_SoundBase):
         # alias default names (so it always points to default.png)
         if filename in ft.defaultStim:
             filename = Path(prefs.paths['resources']) / ft.defaultStim[filename]
-        self.sndFile = f = sf.SoundFile(filename)
+        if self._streamer is not None:
+            self._streamer.close()
+            self._streamer = None
         self.sourceType = 'file'
-        self.sampleRate = f.samplerate
-        if self.channels == -1:  # if channels was auto then set to file val
-            self.channels = f.channels
-        fileDuration = float(len(f)) / f.samplerate  # needed for duration?
-        # process start time
-        if self.startTime and self.startTime > 0:
-            startFrame = self.startTime * self.sampleRate
-            self.sndFile.seek(int(startFrame))
-            self.t = self.startTime
-        else:
-            self.t = 0
-        # process stop time
-        if self.stopTime and self.stopTime > 0:
-            requestedDur = self.stopTime - self.t
-            self.duration = min(requestedDur, fileDuration)
-        else:
-            self.duration = fileDuration - self.t
-        # can now calculate duration in frames
-        self.durationFrames = int(round(self.duration * self.sampleRate))
         # are we preloading or streaming?
-        if self.preBuffer == 0:
-            # no buffer - stream from disk on each call to nextBlock
-            pass
-        elif self.preBuffer == -1:
+        if self.preBuffer == -1:
             # full pre-buffer. Load requested duration to memory
-            sndArr = self.sndFile.read(
-                frames=int(self.sampleRate * self.duration))
-            self.sndFile.close()
-            self._setSndFromArray(sndArr)
+            decoded = _decodeSoundFile(filename, self.startTime, self.stopTime,
+                                       self.channels)
+            self.sndFile = None
+            self.sampleRate = decoded.sampleRate
+            if self.channels == -1:  # if channels was auto then set to file val
+                self.channels = decoded.channels
+            self.t = decoded.t
+            self.duration = decoded.duration
+            self.durationFrames = int(round(self.duration * self.sampleRate))
+            self._setSndFromArray(decoded.samples)
+        else:
+            # stream from disk, reading ahead in a background thread (a couple
+            # of blocks if there's no buffer)
+            readAhead = self.preBuffer if self.preBuffer > 0 else 0.1
+            streamer = _SoundFileStreamer(filename, self.startTime,
+                                          self.stopTime, self.channels,
+                                          readAhead=readAhead)
+            self.sndFile = streamer.sndFile
+            self.sampleRate = streamer.sampleRate
+            if self.channels == -1:  # if channels was auto then set to file val
+                self.channels = streamer.channels = self.sndFile.channels
+            self._setSndFromArray(streamer.prime())
+            # match the stream the track was created on
+            streamer.channels = self.channels
+            self._streamer = streamer
+            self._streamerPrimed = True
+            self.sourceType = 'file'
+            # the whole section, not just what was read ahead
+            self.duration = streamer.duration
+            self.durationFrames = int(round(self.duration * self.sampleRate))
         self._channelCheck(
             self.sndArr)  # Check for fewer channels in stream vs data array
 
@@ -540,7 +741,21 @@ class SoundPTB(_SoundBase):
             when = self.win.getFutureFlipTime(clock='ptb')
         else:
             logTime = None
-        self.track.start(repetitions=loops, when=when)
+        if self._streamer is not None:
+            # the track only holds what was read ahead, the streamer adds
+            # the rest of the file (and repeats it) once playback starts
+            if not self._streamerPrimed:
+                self.seek(0)
+            self._streamerPrimed = False
+            self.track.start(repetitions=1, when=when)
+            track = self.track
+            self._streamer.start(
+                write=lambda samples: ptb.PsychPortAudio(
+                    'FillBuffer', track.handle, samples, 1),
+                getPlayedFrames=lambda: track.status['ElapsedOutSamples'],
+                loops=self.loops)
+        else:
+            self.track.start(repetitions=loops, when=when)
         self._isPlaying = True
         # time.sleep(0.)
         if log and self.autoLog:
@@ -549,7 +764,15 @@ class SoundPTB(_SoundBase):
     def pause(self):
         """Stop the sound but play will continue from here if needed
         """
-        if self.isPlaying:
+        if self.isPlaying and self._streamer is not None:
+            # refill the track from where playback got to, when resumed
+            self._streamer.stop()  # before the track, its writes may wait on it
+            played = self.track.status['ElapsedOutSamples']
+            self.track.stop()
+            self._isPlaying = False
+            self.seek((self.t + played / float(self.sampleRate))
+                      % self.duration)
+        elif self.isPlaying:
             self.track.stop(reset=False)
             self._isPlaying = False
         else:
@@ -562,6 +785,8 @@ class SoundPTB(_SoundBase):
         if not self.isPlaying:
             return
 
+        if self._streamer is not None:
+            self._streamer.stop()  # before the track, its writes may wait on it
         self.track.stop()
         self._isPlaying = False
 
@@ -573,8 +798,17 @@ class SoundPTB(_SoundBase):
     def seek(self, t):
         self.t = t
         self.frameN = int(round(t * self.sampleRate))
-        if self.sndFile and not self.sndFile.closed:
-            self.sndFile.seek(self.frameN)
+        if self._streamer is not None and self.track:
+            # refill the track from the new position
+            wasPlaying = self.isPlaying
+            if wasPlaying:
+                self._streamer.stop()
+                self.track.stop()
+                self._isPlaying = False
+            self.track.fill_buffer(self._streamer.prime(self.frameN))
+            self._streamerPrimed = True
+            if wasPlaying:
+                self.play(log=False)
 
     def _EOS(self, reset=True, log=True):
         """Function called on End Of Stream
@@ -618,6 +852,8 @@ class SoundPTB(_SoundBase):
         return streams[self.streamLabel]
 
     def __del__(self):
+        if getattr(self, '_streamer', None) is not None:
+            self._streamer.close()
         if self.track:
             self.track.close()
         self.track = None
@@ -11,10 +11,13 @@
 __all__ = ['Microphone']
 
 import sys
+import threading
+from concurrent import futures
 import psychopy.logging as logging
 from psychopy.constants import NOT_STARTED
 from psychopy.preferences import prefs
 from .audioclip import *
+from .audioclip import _allocSamples
 from .audiodevice import *
 from .exceptions import *
 import numpy as np
@@ -92,8 +95,7 @@ class RecordingBuffer:
         nBytes = self._maxRecordingSize * 1000
         recArraySize = int((nBytes / self._channels) / (np.float32()).itemsize)
 
-        self._samples = np.zeros(
-            (recArraySize, self._channels), dtype=np.float32, order='C')
+        self._samples = _allocSamples(recArraySize, self._channels)
 
         # sanity check
         assert self._samples.nbytes == nBytes
@@ -301,10 +303,11 @@ class RecordingBuffer:
         idxEnd = self._lastSample if end is None else int(
             end * self._sampleRateHz)
 
-        return AudioClip(
-            np.array(self._samples[idxStart:idxEnd, :],
-                     dtype=np.float32, order='C'),
-            sampleRateHz=self._sampleRateHz)
+        samples = self._samples[idxStart:idxEnd, :]
+        segment = _allocSamples(len(samples), self._channels)
+        segment[:] = samples
+
+        return AudioClip(segment, sampleRateHz=self._sampleRateHz)
 
 
 class Microphone:
@@ -521,6 +524,8 @@ class Microphone:
         self.lastClip = None
         self.scripts = {}
         self.lastScript = None
+        self._pendingScripts = {}  # background transcriptions not yet filled
+        self._scriptsLock = threading.Lock()  # callbacks run in other threads
         self._isStarted = False  # internal state
 
         logging.debug('Audio capture device #{} ready'.format(
@@ -904,7 +909,7 @@ class Microphone:
 
         return overruns
 
-    def bank(self, tag=None, transcribe=False, **kwargs):
+    def bank(self, tag=None, transcribe=False, block=True, **kwargs):
         """Store current buffer as a clip within the microphone object.
 
         This method is used internally by the Microphone component in Builder,
@@ -918,6 +923,17 @@ class Microphone:
         transcribe : bool or str
             Set to the name of a transcription engine (e.g. "GOOGLE") to
             transcribe using that engine, or set as `False` to not transcribe.
+        block : bool
+            Wait for the transcription to finish if `True`. If `False`, the
+            clip is transcribed in a background process (see
+            :func:`~psychopy.sound.transcribe.transcribeAsync`) so that the
+            frame loop isn't held up, and a :class:`~concurrent.futures.Future`
+            is returned in place of the transcript. The transcript replaces it
+            in `scripts` (and `lastScript`) once it is done. Call
+            :meth:`waitForScripts` (e.g. at the end of the routine) to wait for
+            them. Coder scripts using this need an
+            ``if __name__ == '__main__':`` guard, see
+            :func:`~psychopy.sound.transcribe.transcribeAsync`.
         kwargs : dict
             Additional keyword arguments to pass to
             :class:`~psychopy.sound.AudioClip.transcribe()`.
@@ -952,12 +968,23 @@ class Microphone:
                     "Invalid transcription engine {} specified.".format(
                         transcribe))
 
-            self.lastScript = self.lastClip.transcribe(
-                engine=engine, **kwargs)
+            if block:
+                self.lastScript = self.lastClip.transcribe(
+                    engine=engine, **kwargs)
+            else:
+                # avoid circular import
+                from psychopy.sound.transcribe import transcribeAsync
+                self.lastScript = transcribeAsync(
+                    self.lastClip, engine=engine, **kwargs)
         else:
             self.lastScript = "Transcription disabled."
 
         self.scripts[tag].append(self.lastScript)
+        if transcribe and not block:
+            with self._scriptsLock:
+                self._pendingScripts[self.lastScript] = (
+                    self.scripts[tag], len(self.scripts[tag]) - 1)
+            self.lastScript.add_done_callback(self._fillScript)
 
         # clear recording buffer
         self._recording.clear()
@@ -984,6 +1011,66 @@ class Microphone:
 
         return clips
 
+    def _fillScript(self, pending):
+        """Put the result of a background transcription in place of its
+        handle in `scripts` (and `lastScript`), once it is done. This is
+        called from the thread which completed the transcription.
+        """
+        if not pending.done() or pending.cancelled() or pending.exception():
+            return  # the handle stays, and `waitForScripts` raises the error
+        with self._scriptsLock:
+            location = self._pendingScripts.pop(pending, None)
+            if location is None:
+                return  # already filled
+            scripts, index = location
+            scripts[index] = pending.result()
+            if self.lastScript is pending:
+                self.lastScript = scripts[index]
+
+    @property
+    def pendingScripts(self):
+        """Number of clips banked with `block=False` that are still being
+        transcribed (`int`).
+        """
+        with self._scriptsLock:
+            pending = list(self._pendingScripts)
+        return sum(not thisScript.done() for thisScript in pending)
+
+    def waitForScripts(self, timeout=None):
+        """Wait for the clips banked with `block=False` to be transcribed.
+
+        Call this where timing doesn't matter, e.g. at the end of a routine,
+        so that all transcripts are in `scripts` before saving data.
+
+        Parameters
+        ----------
+        timeout : float or None
+            Maximum time to wait in seconds, or `None` to wait until all are
+            done.
+
+        Returns
+        -------
+        bool
+            `True` if all transcriptions are done, `False` if the timeout
+            expired first.
+
+        """
+        with self._scriptsLock:
+            pending = list(self._pendingScripts)
+        done, notDone = futures.wait(pending, timeout=timeout)
+        for thisScript in pending:
+            if thisScript in done:
+                self._fillScript(thisScript)
+        for thisScript in pending:
+            if thisScript in done and not thisScript.cancelled() \
+                    and thisScript.exception():
+                # forget it, so the error is only raised once
+                with self._scriptsLock:
+                    self._pendingScripts.pop(thisScript, None)
+                raise thisScript.exception()
+
+        return not notDone
+
     def getRecording(self):
         """Get audio data from the last microphone recording.
 
@@ -11,6 +11,9 @@
 __all__ = [
     'TranscriptionResult',
     'transcribe',
+    'transcribeAsync',
+    'getTranscriptionPool',
+    'shutdownTranscriptionPool',
     'TRANSCR_LANG_DEFAULT',
     'recognizerEngineValues',
     'recognizeSphinx',
@@ -18,6 +21,9 @@ __all__ = [
 ]
 
 import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import psychopy.logging as logging
 from psychopy.alerts import alert
 from pathlib import Path
@@ -78,6 +84,12 @@ recognizerEngineValues = {
 if _hasSpeechRecognition:
     _recogBase = sr.Recognizer()
 
+# Pool of processes for transcribing in the background, created on first use
+# by `getTranscriptionPool()`.
+_transcriptionPool = None
+_queuedTranscriptions = set()  # futures from transcribeAsync not yet done
+_queuedLock = threading.Lock()
+
 
 # ------------------------------------------------------------------------------
 # Classes and functions for speech-to-text transcription
@@ -234,8 +246,8 @@ def transcribe(audioClip, engine='sphinx', language='en-US', expectedWords=None,
 
     Speech-to-text conversion blocks the main application thread when used on
     Python. Don't transcribe audio during time-sensitive parts of your
-    experiment! This issue is known to the developers and will be fixed in a
-    later release.
+    experiment! Use :func:`transcribeAsync` to transcribe in a background
+    process instead.
 
     Parameters
     ----------
@@ -654,3 +666,137 @@ def recognizeGoogle(audioClip=None, language='en-US', expectedWords=None,
 
 if __name__ == "__main__":
     pass
+
+
+# ------------------------------------------------------------------------------
+# Transcribing in the background
+#
+
+def _loadTranscriber():
+    """Run in a new worker process, so that it imports the transcription
+    engines before the first clip arrives."""
+    return haveSphinx
+
+
+def getTranscriptionPool(maxWorkers=1):
+    """Get the pool of processes used by :func:`transcribeAsync`, starting it
+    if needed.
+
+    Transcription engines like Pocket Sphinx are CPU-bound, so clips are
+    transcribed in separate processes rather than threads, which would still
+    hold up the main thread while they run. Workers are started with
+    `spawn`, since forking a process with open audio streams isn't safe.
+
+    Starting the workers (which import PsychoPy and the transcription
+    engines) takes a while, so call this early in your experiment (e.g. at
+    the start of the experiment rather than in a trial) to avoid a delay
+    when the first clip is transcribed.
+
+    Parameters
+    ----------
+    maxWorkers : int
+        Number of worker processes, if the pool is started by this call. One
+        worker leaves the other cores free for the experiment itself.
+
+    Returns
+    -------
+    :class:`~concurrent.futures.ProcessPoolExecutor`
+        Pool of transcription processes.
+
+    """
+    global _transcriptionPool
+    if _transcriptionPool is None:
+        _transcriptionPool = ProcessPoolExecutor(
+            max_workers=maxWorkers,
+            mp_context=multiprocessing.get_context('spawn'))
+        # start the workers now, rather than on the first clip
+        for i in range(maxWorkers):
+            _transcriptionPool.submit(_loadTranscriber)
+        logging.debug(
+            "Started {} transcription worker(s)".format(maxWorkers))
+
+    return _transcriptionPool
+
+
+def shutdownTranscriptionPool(wait=True):
+    """Stop the worker processes used by :func:`transcribeAsync`.
+
+    Parameters
+    ----------
+    wait : bool
+        Wait for clips already queued to be transcribed before returning. If
+        `False`, clips which have not started transcribing are cancelled.
+
+    """
+    global _transcriptionPool
+    if _transcriptionPool is None:
+        return
+
+    pool = _transcriptionPool
+    _transcriptionPool = None
+    if not wait:
+        # `shutdown(cancel_futures=True)` needs Python 3.9, so cancel them
+        # here (those already running can't be and will still complete)
+        with _queuedLock:
+            queued = list(_queuedTranscriptions)
+        for pending in queued:
+            pending.cancel()
+    pool.shutdown(wait=wait)
+
+
+def _forgetTranscription(pending):
+    with _queuedLock:
+        _queuedTranscriptions.discard(pending)
+
+
+def transcribeAsync(audioClip, engine='sphinx', language='en-US',
+                    expectedWords=None, config=None):
+    """Convert speech in audio to text in a background process.
+
+    This queues the audio clip to be transcribed by :func:`transcribe` in the
+    pool of processes from :func:`getTranscriptionPool` and returns at once,
+    so that transcription doesn't hold up the frame loop. Parameters are the
+    same as for :func:`transcribe`.
+
+    Returns
+    -------
+    :class:`~concurrent.futures.Future`
+        Handle for the pending transcription. Call its `result()` method to
+        wait for the :class:`~psychopy.sound.transcribe.TranscriptionResult`,
+        or `done()` to check if it is ready without waiting. Errors raised
+        while transcribing are raised again by `result()`.
+
+    Examples
+    --------
+    Transcribe a recording while the next trial runs::
+
+        pending = transcribeAsync(mic.getRecording())
+        # ... run the next trial ...
+        transcribeResults = pending.result()  # waits if not done yet
+
+    The worker processes are spawned, so they import the script that started
+    them. In a Coder script, put the experiment under an
+    ``if __name__ == '__main__':`` guard so that the workers don't run it
+    too::
+
+        if __name__ == '__main__':
+            mic = Microphone()
+            # ... run the experiment ...
+
+    """
+    if isinstance(audioClip, (tuple, list,)):
+        samples, sampleRateHz = audioClip
+        audioClip = AudioClip(samples, sampleRateHz)
+
+    pending = getTranscriptionPool().submit(
+        transcribe,
+        audioClip,
+        engine=engine,
+        language=language,
+        expectedWords=expectedWords,
+        config=config)
+    with _queuedLock:
+        _queuedTranscriptions.add(pending)
+    pending.add_done_callback(_forgetTranscription)
+
+    return pending
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+py.test hooks shared by the whole test suite
+"""
+
+import os
+
+import pytest
+
+
+def pytest_collection_modifyitems(config, items):
+    # Benchmarks (test_speed_*) compare wall-clock times, so they are slow
+    # and can fail on a loaded machine. They are skipped unless the
+    # PSYCHOPY_BENCHMARKS environment variable is set.
+    runBenchmarks = bool(os.environ.get('PSYCHOPY_BENCHMARKS'))
+    skip = pytest.mark.skip(reason="benchmark, set PSYCHOPY_BENCHMARKS=1 "
+                                   "to run it")
+    for item in items:
+        if item.name.startswith('test_speed_'):
+            item.add_marker(pytest.mark.benchmark)
+            if not runBenchmarks:
+                item.add_marker(skip)
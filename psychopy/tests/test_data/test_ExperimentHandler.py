@@ -4,6 +4,7 @@ from psychopy import data, logging
 import numpy as np
 import os, glob, shutil
 import io
+import pytest
 from tempfile import mkdtemp
 
 from psychopy.tools.filetools import openOutputFile
@@ -165,6 +166,145 @@ class TestExperimentHandler():
                 # If failed, remove and store character which failed
                 raise UnicodeEncodeError(*err.args[:4], "character failing to save to csv")
 
+    def test_columnar_entries(self):
+        # columnar store should give back exactly the entries we put in
+        exp = data.ExperimentHandler(columnar=True)
+        exp.addData('resp.rt', 0.5)
+        exp.addData('resp.keys', 'left')
+        exp.nextEntry()
+        exp.addData('resp.keys', 'right')
+        exp.addData('mutable', [1, 2])
+        exp.nextEntry()
+        assert isinstance(exp.entries, data.ColumnarStore)
+        assert exp.getAllEntries() == [
+            {'resp.rt': 0.5, 'resp.keys': 'left'},
+            {'resp.keys': 'right', 'mutable': [1, 2]}]
+        rts = exp.entries.getColumn('resp.rt')
+        assert rts[0] == 0.5 and rts.mask[1]
+
+    def test_columnar_matches_list(self):
+        # wide-text output shouldn't depend on how entries are stored
+        contents = []
+        for columnar in (False, True):
+            exp = data.ExperimentHandler(
+                savePickle=False, saveWideText=False, columnar=columnar,
+                extraInfo={'participant': 'jwp'})
+            trials = data.TrialHandler(
+                trialList=[{'ori': 0}, {'ori': 90.0}], nReps=5,
+                method='random', seed=self.random_seed)
+            exp.addLoop(trials)
+            for trial in trials:
+                exp.addData('resp.keys', ['left', 'right'][trial['ori'] > 0])
+                exp.addData('resp.corr', True)
+                exp.nextEntry()
+            fileName = os.path.join(self.tmpDir, 'columnar%s.csv' % columnar)
+            exp.saveAsWideText(fileName, delim=',')
+            with io.open(fileName, 'r', encoding='utf-8-sig') as f:
+                contents.append(f.read())
+        assert contents[0] == contents[1]
+
+    def test_stream_csv(self):
+        fileName = os.path.join(self.tmpDir, 'streamed')
+        exp = data.ExperimentHandler(
+            dataFileName=fileName, savePickle=False, saveWideText=True,
+            columnar=True, streamFormat='csv', maxEntries=2)
+        for n in range(5):
+            exp.addData('n', n)
+            if n == 3:
+                exp.addData('late', 'a,b')
+            exp.nextEntry()
+        # the last entry is held back until the next one (or a flush)
+        assert exp.flushStream(timeout=5)
+        assert len(exp.entries) == 2
+        with io.open(fileName + '.csv', 'r', encoding='utf-8-sig') as f:
+            assert f.read() == 'n,late,\n0,\n1,\n2,\n3,"a,b",\n4,,\n'
+        exp.addData('n', 5)
+        exp.close()
+        with io.open(fileName + '.csv', 'r', encoding='utf-8-sig') as f:
+            assert f.read().endswith('4,,\n5,,\n')
+        # streamed file replaces the final wide-text file
+        assert not glob.glob(fileName + '_*.csv')
+
+    def test_stream_batching(self):
+        # the rows written don't depend on how entries were batched
+        from psychopy.data.columnar import StreamingWriter
+        entries = [{'n': 0}, {'n': 1, 'late': 'x'}, {'n': 2}, {'other': 3}]
+        contents = []
+        for sizes in ([4], [1, 1, 1, 1], [1, 3], [2, 2]):
+            fileName = os.path.join(self.tmpDir, 'batch%i' % len(contents))
+            writer = StreamingWriter(fileName, threaded=False)
+            start = 0
+            for size in sizes:
+                writer._writeBatch(entries[start:start + size])
+                start += size
+            writer.close()
+            with io.open(writer.fileName, 'r', encoding='utf-8-sig') as f:
+                contents.append(f.read())
+        assert contents[0] == 'n,late,other,\n0,\n1,x,\n2,,\n,,3,\n'
+        assert all(c == contents[0] for c in contents)
+
+    def test_stream_parquet(self):
+        # new columns and changing types widen the schema of a single file
+        pq = pytest.importorskip('pyarrow.parquet')
+        from psychopy.data.columnar import StreamingWriter
+        fileName = os.path.join(self.tmpDir, 'streamed')
+        writer = StreamingWriter(fileName, fileType='parquet', threaded=False)
+        for entry in [{'n': 1, 'key': None}, {'n': 2, 'key': 'a'},
+                      {'n': 2.5, 'rt': 0.5}, {'n': 3, 'rt': [1, 2]}]:
+            writer.write(entry)
+        writer.close()
+        assert os.listdir(self.tmpDir).count('streamed.parquet') == 1
+        assert not glob.glob(fileName + '*.tmp')
+        assert pq.read_table(writer.fileName).to_pydict() == {
+            'n': [1.0, 2.0, 2.5, 3.0],
+            'key': [None, 'a', None, None],
+            'rt': [None, None, '0.5', '[1, 2]']}
+
+    def test_entries_include_last(self):
+        # reading entries commits the entry held back for streaming
+        exp = data.ExperimentHandler(columnar=True)
+        for n in range(3):
+            exp.addData('n', n)
+            exp.nextEntry()
+            assert len(exp.entries) == n + 1
+        assert [e['n'] for e in exp.entries] == [0, 1, 2]
+
+    def test_stream_write_error(self):
+        # an error on the writer thread is raised, rather than flushing and
+        # closing waiting forever
+        from psychopy.data.columnar import StreamingWriter
+        fileName = os.path.join(self.tmpDir, 'failing')
+        writer = StreamingWriter(fileName)
+
+        def diskFull(batch):
+            raise OSError("No space left on device")
+
+        writer._writeText = diskFull
+        writer.write({'n': 0})
+        with pytest.raises(OSError):
+            writer.flush(timeout=5)
+        with pytest.raises(OSError):
+            writer.write({'n': 1})
+        with pytest.raises(OSError):
+            writer.close()
+        assert not writer._thread.is_alive()
+        # the handler's file is closed as well
+        exp = data.ExperimentHandler(
+            dataFileName=fileName, savePickle=False, saveWideText=True,
+            columnar=True, streamFormat='csv')
+        exp._dataWriter._writeText = diskFull
+        exp.addData('n', 0)
+        exp.nextEntry()
+        exp.addData('n', 1)
+        with pytest.raises(OSError):
+            exp.close()
+        assert exp._dataWriter is None
+        exp.abort()
+
+    def test_maxEntries_needs_stream(self):
+        with pytest.raises(ValueError):
+            data.ExperimentHandler(maxEntries=10)
+
 
 if __name__ == '__main__':
     import pytest
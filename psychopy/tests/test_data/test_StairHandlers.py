@@ -2,6 +2,7 @@
 
 import numpy as np
 import shutil
+import time
 import json_tricks
 from tempfile import mkdtemp, mkstemp
 from operator import itemgetter
@@ -746,6 +747,151 @@ class TestPsiHandler(_BaseTestStairHandler):
         p_loaded = fromFile(path)
         assert p == p_loaded
 
+    @pytest.mark.parametrize('expectedMin', [0, 0.5])
+    def test_fast_engine(self, expectedMin):
+        kwargs = dict(nTrials=30, intensRange=[0.1, 10],
+                      alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                      intensPrecision=0.1, alphaPrecision=0.1,
+                      betaPrecision=0.1, delta=0.01, expectedMin=expectedMin)
+        p1 = data.PsiHandler(**kwargs)
+        p2 = data.PsiHandler(engine='fast', **kwargs)
+        p3 = data.PsiHandler(engine='fast',
+                             engineOptions=dict(dtype='float32'), **kwargs)
+        responses = np.random.RandomState(0).rand(30) < 0.7
+        for response, i1, i2, i3 in zip(responses, p1, p2, p3):
+            assert i1 == i2 == i3
+            assert np.allclose(p1._psi._expectedEntropyX.ravel(),
+                               p2._psi._expectedEntropy)
+            p1.addResponse(int(response))
+            p2.addResponse(int(response))
+            p3.addResponse(int(response))
+            assert np.allclose(p1._psi._probLambda, p2._psi._probLambda,
+                               atol=1e-12)
+        assert np.allclose(p1.estimateLambda(), p2.estimateLambda())
+        assert np.allclose(p1.estimateThreshold(0.75),
+                           p2.estimateThreshold(0.75))
+
+        # only every other intensity is presented when subsampling
+        p4 = data.PsiHandler(engine='fast',
+                             engineOptions=dict(intensSubsample=2), **kwargs)
+        for response, intensity in zip(responses, p4):
+            assert p4._psi.nextIntensityIndex % 2 == 0
+            p4.addResponse(int(response))
+
+    def test_fast_engine_json_dump(self):
+        p = data.PsiHandler(nTrials=10, intensRange=[0.1, 10],
+                            alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                            intensPrecision=1, alphaPrecision=1,
+                            betaPrecision=0.5, delta=0.01, engine='fast')
+        p.addResponse(1)
+        p.__next__()
+        dump = p.saveAsJson()
+
+        p.origin = ''
+        assert p == json_tricks.loads(dump)
+
+    def test_engine_invalid(self):
+        kwargs = dict(nTrials=10, intensRange=[0.1, 10],
+                      alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                      intensPrecision=1, alphaPrecision=1,
+                      betaPrecision=0.5, delta=0.01)
+        with pytest.raises(ValueError):
+            data.PsiHandler(engine='foo', **kwargs)
+        with pytest.raises(ValueError):
+            data.PsiHandler(engineOptions=dict(dtype='float32'), **kwargs)
+
+    @pytest.mark.parametrize('precompute', ['background', 'speculative'])
+    @pytest.mark.parametrize('engine', ['default', 'fast'])
+    def test_precompute(self, precompute, engine):
+        kwargs = dict(nTrials=20, intensRange=[0.1, 10],
+                      alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                      intensPrecision=0.1, alphaPrecision=0.1,
+                      betaPrecision=0.1, delta=0.01, engine=engine)
+        p1 = data.PsiHandler(**kwargs)
+        p2 = data.PsiHandler(precompute=precompute, **kwargs)
+        responses = np.random.RandomState(0).rand(20) < 0.7
+        for trialN, (response, i1, i2) in enumerate(zip(responses, p1, p2)):
+            assert i1 == i2
+            # a changed intensity doesn't change the Psi update
+            intensity = i1 * 2 if trialN == 5 else None
+            p1.addResponse(int(response), intensity=intensity)
+            p2.addResponse(int(response), intensity=intensity)
+            assert p1.estimateLambda() == p2.estimateLambda()
+        assert p1.intensities == p2.intensities
+        assert np.allclose(p1._psi._probLambda, p2._psi._probLambda)
+
+    def test_precompute_json_dump(self):
+        p = data.PsiHandler(nTrials=10, intensRange=[0.1, 10],
+                            alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                            intensPrecision=1, alphaPrecision=1,
+                            betaPrecision=0.5, delta=0.01,
+                            precompute='background')
+        p.addResponse(1)
+        p.__next__()
+        dump = p.saveAsJson()
+
+        p.origin = ''
+        loaded = json_tricks.loads(dump)
+        assert p == loaded
+        p.addResponse(0)
+        loaded.addResponse(0)
+        assert loaded.__next__() == p.__next__()
+        with pytest.raises(ValueError):
+            data.PsiHandler(nTrials=10, intensRange=[0.1, 10],
+                            alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                            intensPrecision=1, alphaPrecision=1,
+                            betaPrecision=0.5, delta=0.01, precompute='foo')
+
+    def test_speed_precompute(self):
+        responses = np.random.RandomState(0).rand(10) < 0.7
+        kwargs = dict(nTrials=10, intensRange=[0.1, 10],
+                      alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                      intensPrecision=0.1, alphaPrecision=0.1,
+                      betaPrecision=0.1, delta=0.01)
+        times = {}
+        for precompute in (None, 'background', 'speculative'):
+            p = data.PsiHandler(precompute=precompute, **kwargs)
+            waiting = 0
+            for response in responses:
+                t0 = time.perf_counter()
+                p.__next__()
+                waiting += time.perf_counter() - t0
+                time.sleep(0.05)  # the stimulus is presented
+                t0 = time.perf_counter()
+                p.addResponse(int(response))
+                waiting += time.perf_counter() - t0
+                time.sleep(0.05)  # the inter-trial interval
+            times[precompute] = waiting / 10
+            logging.info("PsiHandler: precompute=%s, %.2fms per trial in "
+                         "addResponse() and __next__()"
+                         % (precompute, times[precompute] * 1000))
+        assert times['background'] < times[None]
+        assert times['speculative'] < times[None]
+
+    def test_speed_fast_engine(self):
+        responses = np.random.RandomState(0).rand(10) < 0.7
+        for precision in (0.2, 0.1, 0.05):
+            kwargs = dict(nTrials=10, intensRange=[0.1, 10],
+                          alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                          intensPrecision=precision, alphaPrecision=precision,
+                          betaPrecision=precision, delta=0.01)
+            times = {}
+            for engine, options in [('default', None),
+                                    ('fast', None),
+                                    ('fast', dict(dtype='float32'))]:
+                p = data.PsiHandler(engine=engine, engineOptions=options,
+                                    **kwargs)
+                t0 = time.perf_counter()
+                for response, intensity in zip(responses, p):
+                    p.addResponse(int(response))
+                times[engine, str(options)] = (time.perf_counter() - t0) / 10
+            logging.info("PsiHandler: grid of %i x %i x %i, %.2fms per trial, "
+                         "fast engine %.2fms (float32 %.2fms)"
+                         % ((len(p._psi.x), len(p._psi.alpha),
+                             len(p._psi.beta)) +
+                            tuple(t * 1000 for t in times.values())))
+            assert times['fast', 'None'] < times['default', 'None']
+
 
 class TestMultiStairHandler(_BaseTestMultiStairHandler):
     """
@@ -1227,6 +1373,36 @@ def test_QuesPlusHandler_unknown_stimSelectionOptions():
                              stimSelectionOptions=stim_selection_options)
 
 
+@pytest.mark.parametrize('precompute', ['background', 'speculative'])
+def test_QuesPlusHandler_precompute(precompute):
+    from psychopy.data.staircase import QuestPlusHandler
+
+    thresholds = np.arange(-40, 0 + 1)
+    kwargs = dict(nTrials=20,
+                  intensityVals=thresholds.copy(),
+                  thresholdVals=thresholds,
+                  slopeVals=3.5,
+                  lowerAsymptoteVals=0.5,
+                  lapseRateVals=0.02,
+                  responseVals=['Correct', 'Incorrect'],
+                  stimScale='dB',
+                  stimSelectionMethod='minNEntropy',
+                  stimSelectionOptions=dict(N=3, randomSeed=0))
+    q1 = QuestPlusHandler(**kwargs)
+    q2 = QuestPlusHandler(precompute=precompute, **kwargs)
+    responses = np.random.RandomState(0).rand(20) < 0.7
+    for trialN, (response, i1, i2) in enumerate(zip(responses, q1, q2)):
+        assert i1 == i2
+        response = 'Correct' if response else 'Incorrect'
+        # a changed intensity means the speculative updates aren't used
+        intensity = i1 - 5 if trialN == 5 else None
+        q1.addResponse(response, intensity=intensity)
+        q2.addResponse(response, intensity=intensity)
+    assert q1.intensities == q2.intensities
+    assert q1.paramEstimate == q2.paramEstimate
+    assert np.allclose(q1.posterior['threshold'], q2.posterior['threshold'])
+
+
 if __name__ == '__main__':
     test_QuestPlusHandler()
     test_QuestPlusHandler_startIntensity()
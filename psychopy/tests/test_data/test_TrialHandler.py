@@ -5,9 +5,11 @@ import shutil
 from tempfile import mkdtemp, mkstemp
 import numpy as np
 import io
+import pickle
+import time
 import pytest
 
-from psychopy import data
+from psychopy import data, logging
 from psychopy.tools.filetools import fromFile
 from psychopy.tests import utils
 
@@ -331,5 +333,127 @@ class TestTrialHandlerOutput():
         assert header == expected_header
 
 
+
+class TestDataHandler():
+    def setup_class(self):
+        self.temp_dir = mkdtemp(prefix='psychopy-tests-testdata')
+        self.random_seed = 100
+
+    def teardown_class(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_mixed_types(self):
+        dat = data.DataHandler(dataShape=[2, 3])
+        dat.add('resp', 0.5, position=[0, 0])
+        assert dat.isNumeric['resp']
+        assert np.ma.is_masked(dat['resp'][1, 0])
+        dat.add('resp', 'left', position=[1, 0])
+        # now an object array, with '--' for missing values
+        assert not dat.isNumeric['resp']
+        assert dat['resp'].dtype == object
+        assert dat['resp'][0, 0] == '0.5'  # converted to str, as always
+        assert dat['resp'][1, 0] == 'left'
+        assert dat['resp'][0, 1] == '--'
+        dat.add('resp', [1, 2], position=[1, 2])
+        assert dat['resp'][1, 2] == [1, 2]
+
+    @pytest.mark.parametrize('values, expected', [
+        (['a', 1, 2], ['a', 1, 2]),
+        # numbers added before the column became non-numeric are strings
+        ([1, 2.5, 'a'], ['1.0', '2.5', 'a'])])
+    def test_mixed_types_keep_values(self, values, expected):
+        # values shouldn't depend on whether the array was read in between
+        results = []
+        for readEach in (False, True):
+            dat = data.DataHandler(dataShape=[1, 3])
+            for repN, value in enumerate(values):
+                dat.add('x', value, position=[0, repN])
+                if readEach:
+                    dat['x']
+            results.append(list(dat['x'][0]))
+        for result in results:
+            assert result == expected
+            assert [type(v) for v in result] == [type(v) for v in expected]
+
+    def test_all_access_up_to_date(self):
+        # however the arrays are read, they include values added since they
+        # were last read (as the column was converted and grown)
+        def makeData():
+            dat = data.DataHandler(dataShape=[2, 1])
+            dat.add('x', 1.0, position=[0, 0])
+            dat.add('x', 1.0, position=[1, 0])
+            dat['x']
+            dat.add('x', 'left', position=[0, 1])
+            dat.add('x', 1, position=[1, 1])
+            return dat
+
+        expected = [['1.0', 'left'], ['1.0', 1]]
+        assert "'left'" in repr(makeData())
+        assert dict(makeData())['x'].tolist() == expected
+        assert {**makeData()}['x'].tolist() == expected
+        assert makeData().setdefault('x').tolist() == expected
+        dat = makeData()
+        assert dat.pop('x').tolist() == expected
+        assert 'x' not in dat
+        dat.add('x', 2, position=[0, 0])
+        assert np.ma.is_masked(dat['x'][1, 0])
+
+    def test_direct_changes_kept(self):
+        dat = data.DataHandler(dataShape=[2, 2])
+        dat.add('rt', 0.5, position=[0, 0])
+        dat['rt'][1, 0] = 0.25
+        dat['rt'].mask[0, 0] = True
+        # growing and converting the column rebuild the array
+        dat.add('rt', 1, position=[0, 3])
+        assert dat['rt'][1, 0] == 0.25 and np.ma.is_masked(dat['rt'][0, 0])
+        dat['rt'][1, 1] = 2
+        dat.add('rt', 'none', position=[0, 1])
+        assert list(dat['rt'][0]) == ['--', 'none', '--', '1.0']
+        assert list(dat['rt'][1]) == ['0.25', '2.0', '--', '--']
+        dat['rt'][0, 0] = 'skipped'
+        dat.add('rt', 'late', position=[1, 5])
+        assert dat['rt'][0, 0] == 'skipped'
+
+    def test_grows_beyond_shape(self):
+        dat = data.DataHandler(dataShape=[2, 2])
+        for repN in range(10):
+            dat.add('rt', repN, position=[1, repN])
+        assert dat['rt'].shape == (2, 10)
+        assert list(dat['rt'][1]) == list(range(10))
+        assert dat['rt'][0].mask.all()
+
+    def test_pickle_and_compare(self):
+        trials = data.TrialHandler([dict(ori=0), dict(ori=90)], nReps=3,
+                                   autoLog=False, seed=self.random_seed)
+        for trial in trials:
+            trials.addData('resp', 'left' if trials.thisN % 2 else 1)
+            trials.addData('rt', trials.thisN * 0.1)
+        dat = pickle.loads(pickle.dumps(trials.data))
+        for name in ('ran', 'order', 'resp', 'rt'):
+            assert np.all(dat[name] == trials.data[name])
+        assert dat.isNumeric == trials.data.isNumeric
+        assert not dat['ran'].mask.any()
+
+    def test_speed_save(self):
+        """Benchmark adding data and saving with TrialHandler(Ext)"""
+        conditions = [dict(ori=n) for n in range(100)]
+        for TrialsClass in (data.TrialHandler, data.TrialHandlerExt):
+            start = time.perf_counter()
+            trials = TrialsClass(conditions, nReps=50, method='random',
+                                 autoLog=False, seed=self.random_seed)
+            for trial in trials:
+                trials.addData('rt', 0.5)
+                trials.addData('key', 'left' if trials.thisN % 3 else 2)
+            addDur = time.perf_counter() - start
+            start = time.perf_counter()
+            base = pjoin(self.temp_dir, TrialsClass.__name__)
+            trials.saveAsText(base, delim=',', dataOut=['rt_mean', 'key_raw'])
+            trials.saveAsWideText(base + '_wide.csv')
+            saveDur = time.perf_counter() - start
+            logging.info("%s 5000 trials: adding data %.3fs, saving %.3fs" %
+                         (TrialsClass.__name__, addDur, saveDur))
+            assert addDur < 10 and saveDur < 10
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -8,8 +8,9 @@ import numpy as np
 import io
 import json_tricks
 import pytest
+import time
 
-from psychopy import data
+from psychopy import data, logging
 from psychopy.tools.filetools import fromFile
 from psychopy.tests import utils
 
@@ -404,5 +405,156 @@ class TestTrialHandler2Output():
             pass
 
 
+
+def _legacyOrder(nConds, nReps, method, seed):
+    """The list-based sequencing that TrialHandler2 used before its schedule
+    was precomputed (pop(0) per trial, list.count() for fullRandom), kept
+    here as a reference for the order of trials and for speed comparisons.
+    """
+    rng = np.random.default_rng(seed=seed)
+    remaining, prev, out = [], [], []
+    thisIndex, thisRepN, thisTrialN, thisN = None, 0, -1, -1
+    while True:
+        thisTrialN += 1
+        thisN += 1
+        if thisIndex is not None:
+            prev.append(thisIndex)
+        if remaining == []:
+            sequence = list(range(nConds))
+            if method == 'fullRandom' and thisN < nReps * nConds:
+                remaining = list(rng.permutation(sequence * nReps))
+            elif method in ('sequential', 'random') and thisRepN < nReps:
+                thisTrialN = 0
+                thisRepN += 1
+                if method == 'random':
+                    rng.shuffle(sequence)
+                remaining = list(sequence)
+            else:
+                return out
+        thisIndex = remaining.pop(0)
+        if method == 'fullRandom':
+            thisRepN = prev.count(thisIndex)
+        out.append((thisIndex, thisTrialN, thisRepN))
+
+
+class TestTrialHandler2Sequence:
+    def setup_class(self):
+        self.conditions = [dict(foo=n) for n in range(7)]
+        self.random_seed = 100
+
+    @pytest.mark.parametrize('method', ['sequential', 'random', 'fullRandom'])
+    def test_same_order_as_legacy(self, method):
+        trials = data.TrialHandler2(self.conditions, nReps=5, method=method,
+                                    seed=self.random_seed, autoLog=False)
+        order = [(trials.thisIndex, trials.thisTrialN, trials.thisRepN)
+                 for _ in trials]
+        assert order == _legacyOrder(7, 5, method, self.random_seed)
+        assert trials.finished
+
+    def test_future_and_earlier_trials(self):
+        trials = data.TrialHandler2(self.conditions, nReps=2, method='random',
+                                    seed=self.random_seed, autoLog=False)
+        order = _legacyOrder(7, 2, 'random', self.random_seed)
+        trials.__next__()
+        assert trials.getEarlierTrial() is None
+        assert trials.getFutureTrial(3) == self.conditions[order[3][0]]
+        assert trials.getFutureTrial(13) == self.conditions[order[13][0]]
+        assert trials.getFutureTrial(14) is None
+        trials.__next__()
+        assert trials.getEarlierTrial(1) == self.conditions[order[0][0]]
+        assert trials.prevIndices == [order[0][0]]
+        assert trials.remainingIndices == [o[0] for o in order[2:7]]
+
+    def test_user_sequence(self):
+        # one list per repeat
+        trials = data.TrialHandler2(self.conditions[:3], nReps=1,
+                                    sequence=[[2, 1, 0], [0, 0, 1]],
+                                    autoLog=False)
+        order = [(trials.thisIndex, trials.thisTrialN, trials.thisRepN)
+                 for _ in trials]
+        assert order == [(2, 0, 1), (1, 1, 1), (0, 2, 1),
+                         (0, 0, 2), (0, 1, 2), (1, 2, 2)]
+        # flat list, repeats are counted per condition
+        trials = data.TrialHandler2(self.conditions[:3], nReps=1,
+                                    sequence=[1, 1, 2], autoLog=False)
+        order = [(trials.thisIndex, trials.thisRepN) for _ in trials]
+        assert order == [(1, 0), (1, 1), (2, 0)]
+        with pytest.raises(ValueError):
+            data.TrialHandler2(self.conditions[:3], 1, sequence=[0, 3])
+
+    @pytest.mark.parametrize('method', ['sequential', 'random', 'fullRandom'])
+    def test_unpickle_legacy_state(self, method):
+        # handlers pickled before the schedule was precomputed hold lists of
+        # the trials still to come and an RNG which has only shuffled the
+        # repeats started so far
+        order = _legacyOrder(7, 3, method, self.random_seed)
+        trials = data.TrialHandler2(self.conditions, nReps=3, method=method,
+                                    seed=self.random_seed, autoLog=False)
+        for _ in range(9):
+            trials.__next__()
+        rng = np.random.default_rng(seed=self.random_seed)
+        if method == 'fullRandom':
+            rng.permutation(list(range(7)) * 3)
+            remaining = [o[0] for o in order[9:]]
+        else:
+            for _ in range(trials.thisRepN):
+                if method == 'random':
+                    rng.shuffle(list(range(7)))
+            remaining = [o[0] for o in order[9:14]]
+        previous = [o[0] for o in order[:8]]
+        state = dict(trials.__dict__, _rng=rng, remainingIndices=remaining,
+                     prevIndices=previous)
+        del state['_sequence']
+        legacy = data.TrialHandler2.__new__(data.TrialHandler2)
+        legacy.__setstate__(state)
+        assert legacy.prevIndices == previous
+        assert legacy.remainingIndices == remaining
+        assert legacy.getEarlierTrial() == self.conditions[order[7][0]]
+        rest = [(legacy.thisIndex, legacy.thisTrialN, legacy.thisRepN)
+                for _ in legacy]
+        assert rest == order[9:]
+
+    def test_user_sequence_sets_nReps(self):
+        trials = data.TrialHandler2(self.conditions[:3], nReps=1,
+                                    sequence=[[2, 1, 0], [0, 0, 1]],
+                                    autoLog=False)
+        assert trials.nReps == 2
+        assert max(trials.thisRepN for _ in trials) == trials.nReps
+        trials = data.TrialHandler2(self.conditions[:3], nReps=5,
+                                    sequence=[1, 1, 2], autoLog=False)
+        assert trials.nReps == 2
+
+    def test_abort_appends_to_repeat(self):
+        trials = data.TrialHandler2(self.conditions[:3], nReps=2,
+                                    method='sequential', autoLog=False)
+        trials.__next__()
+        trials.abortCurrentTrial(action='append')
+        assert trials.trialAborted
+        order = [(trials.thisIndex, trials.thisTrialN, trials.thisRepN)
+                 for _ in trials]
+        assert order == [(1, 1, 1), (2, 2, 1), (0, 3, 1),
+                         (0, 0, 2), (1, 1, 2), (2, 2, 2)]
+
+    def test_speed_100k_trials(self):
+        """Benchmark a 100k-trial loop against the legacy sequencing"""
+        conditions = [dict(foo=n) for n in range(100)]
+        for method, nLegacy in (('random', 100000), ('fullRandom', 10000)):
+            start = time.perf_counter()
+            trials = data.TrialHandler2(conditions, nReps=1000, method=method,
+                                        seed=self.random_seed, autoLog=False)
+            for _ in trials:
+                trials.getFutureTrial(1)
+            dur = time.perf_counter() - start
+            # the legacy sequencing alone (no data storage), which is
+            # quadratic for fullRandom so only a tenth of the trials
+            start = time.perf_counter()
+            _legacyOrder(100, nLegacy // 100, method, self.random_seed)
+            legacyDur = time.perf_counter() - start
+            logging.info(
+                "TrialHandler2 100k %s trials: %.3fs (legacy sequencing of "
+                "%i trials: %.3fs)" % (method, dur, nLegacy, legacyDur))
+            assert dur < 20
+
+
 if __name__ == '__main__':
     pytest.main()
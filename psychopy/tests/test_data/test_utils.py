@@ -153,6 +153,105 @@ class Test_utilsClass:
         assert len(conds) == 6
         assert len(list(conds[0].keys())) == 6
 
+    def test_conditionsCache(self, tmp_path, monkeypatch):
+        fileName = str(tmp_path / 'conds.csv')
+        with open(fileName, 'w') as f:
+            f.write('ori,sf,pos\n0,"0,5","[0, 1]"\n90,,"[1, 0]"\n')
+        monkeypatch.setattr(utils, 'conditionsCacheDir', str(tmp_path / 'cache'))
+        utils.clearConditionsCache()
+        conds, fieldNames = utils.importConditions(fileName, returnFieldNames=True)
+        assert fieldNames == ['ori', 'sf', 'pos']
+        assert conds == [{'ori': 0, 'sf': 0.5, 'pos': [0, 1]},
+                         {'ori': 90, 'sf': None, 'pos': [1, 0]}]
+        # changing the conditions we were given doesn't change the cache
+        conds[0]['pos'].append(2)
+        conds[1]['ori'] = 180
+        again = utils.importConditions(fileName)
+        assert again == [{'ori': 0, 'sf': 0.5, 'pos': [0, 1]},
+                         {'ori': 90, 'sf': None, 'pos': [1, 0]}]
+        # a file on disk is used once the cache in memory is cleared
+        assert len(os.listdir(str(tmp_path / 'cache'))) == 1
+        utils.clearConditionsCache()
+        monkeypatch.setattr(utils, '_importDelimitedFile',
+                            lambda fileName: pytest.fail("file was parsed"))
+        assert utils.importConditions(fileName) == again
+        monkeypatch.undo()
+        # new contents are parsed again
+        with open(fileName, 'w') as f:
+            f.write('ori\n45\n')
+        assert utils.importConditions(fileName) == [{'ori': 45}]
+        utils.clearConditionsCache()
+
+    def test_conditionsCache_bounded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(utils, 'conditionsCacheSize', 2)
+        utils.clearConditionsCache()
+        fileNames = []
+        for n in range(3):
+            fileNames.append(str(tmp_path / ('conds%i.csv' % n)))
+            with open(fileNames[-1], 'w') as f:
+                f.write('n\n%i\n' % n)
+        for fileName in fileNames[:2] + fileNames[:1] + fileNames[2:]:
+            utils.importConditions(fileName)
+        # the least recently used file was dropped
+        assert len(utils._conditionsCache) == 2
+        assert utils._conditionsCacheKey(fileNames[1]) not in utils._conditionsCache
+        monkeypatch.setattr(utils, 'conditionsCacheSize', 0)
+        utils.clearConditionsCache()
+        assert utils.importConditions(fileNames[0]) == [{'n': 0}]
+        assert not utils._conditionsCache
+
+    def test_import_excel_with_pandas(self, tmp_path, monkeypatch):
+        import openpyxl
+        fileName = str(tmp_path / 'conds.xlsx')
+        wb = openpyxl.Workbook()
+        wb.active.append(['text', 'pos'])
+        wb.active.append(['two\\nlines', '[1, 2]'])
+        wb.save(fileName)
+        # read with pandas, as when xlrd is installed
+        monkeypatch.setattr(utils, 'haveXlrd', True)
+        utils.clearConditionsCache()
+        assert utils.importConditions(fileName) == [
+            {'text': 'two\nlines', 'pos': [1, 2]}]
+        utils.clearConditionsCache()
+
+    def test_speed_importConditions(self, tmp_path):
+        import time
+        import openpyxl
+        from psychopy import logging
+        nRows = 50000
+        header = ['text', 'ori', 'contrast', 'pos']
+        rows = [[['red', 'green', 'blue'][n % 3], n % 8 * 45, (n % 10) / 10.0,
+                 '[%i, 0]' % (n % 5)] for n in range(nRows)]
+        csvName = str(tmp_path / 'conds.csv')
+        with open(csvName, 'w') as f:
+            f.write(','.join(header) + '\n')
+            for row in rows:
+                f.write('%s,%i,%.1f,"%s"\n' % tuple(row))
+        xlsxName = str(tmp_path / 'conds.xlsx')
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+        wb.save(xlsxName)
+
+        utils.clearConditionsCache()
+        for fileName in (csvName, xlsxName):
+            t0 = time.perf_counter()
+            conds = utils.importConditions(fileName)
+            tParse = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            cached = utils.importConditions(fileName)
+            tCached = time.perf_counter() - t0
+            assert len(conds) == nRows
+            assert cached[-1] == conds[-1] == {
+                'text': 'green', 'ori': 315, 'contrast': 0.9, 'pos': [4, 0]}
+            logging.info("importConditions: %i rows from %s parsed in %.2fs, "
+                         "cached in %.2fs" % (nRows, os.path.basename(fileName),
+                                              tParse, tCached))
+            assert tCached < tParse
+        utils.clearConditionsCache()
+
 def test_listFromString():
     assert ['yes', 'no'] == utils.listFromString("yes, no")
     assert ['yes', 'no'] == utils.listFromString("[yes, no]")
@@ -65,6 +65,71 @@ class TestExperiment:
     # ---------
     # Utilities
 
+    @staticmethod
+    def _resourceExperiment(folder, conditionsFile):
+        """An experiment in `folder` with one loop over `conditionsFile`"""
+        from psychopy.experiment.loops import TrialHandler
+        exp = experiment.Experiment()
+        exp.filename = str(Path(folder) / 'resources.psyexp')
+        rt = exp.addRoutine('trial')
+        exp.flow.addRoutine(rt, 0)
+        loop = TrialHandler(exp, 'trials', conditionsFile=conditionsFile)
+        exp.flow.addLoop(loop, 0, 1)
+        return exp
+
+    def test_resource_files(self, tmp_path):
+        (tmp_path / 'stims').mkdir()
+        for name in ('a.png', 'b.png', 'c.png'):
+            (tmp_path / 'stims' / name).touch()
+        (tmp_path / 'blocks.csv').write_text(
+            'condsFile,image\nconds1.csv,stims/a.png\nconds2.csv,missing.png\n')
+        (tmp_path / 'conds1.csv').write_text(
+            'image,word\nstims/a.png,one\nstims/b.png,two\nstims/a.png,three\n')
+        # conditions files that refer back to each other are only searched once
+        (tmp_path / 'conds2.csv').write_text('image,next\nstims/b.png,blocks.csv\n')
+        exp = self._resourceExperiment(tmp_path, 'blocks.csv')
+        resources = exp.getResourceFiles()
+        assert [res['rel'] for res in resources] == [
+            'blocks.csv', 'conds1.csv', 'stims/a.png', 'stims/b.png',
+            'conds2.csv']
+        # a changed conditions file is read again
+        (tmp_path / 'conds1.csv').write_text(
+            'image,word\nstims/c.png,one\nstims/c.png,two\n')
+        resources = exp.getResourceFiles()
+        assert [res['rel'] for res in resources] == [
+            'blocks.csv', 'conds1.csv', 'stims/c.png', 'stims/a.png',
+            'conds2.csv', 'stims/b.png']
+        # conditions files chosen by a variable are all searched
+        exp = self._resourceExperiment(tmp_path, '$conditions_csv')
+        assert len(exp.getResourceFiles()) == 6
+
+    def test_speed_resource_files(self, tmp_path):
+        import time
+        from psychopy import logging
+        nStims = 10000
+        (tmp_path / 'stims').mkdir()
+        for n in range(nStims):
+            (tmp_path / 'stims' / ('img%04d.png' % n)).touch()
+        (tmp_path / 'blocks.csv').write_text('condsFile\nconds1.csv\nconds2.csv\n')
+        for block in (1, 2):
+            lines = ['image,mask']
+            lines += ['stims/img%04d.png,stims/img%04d.png'
+                      % ((n + block * 100) % nStims, n % 50)
+                      for n in range(nStims)]
+            (tmp_path / ('conds%i.csv' % block)).write_text('\n'.join(lines))
+        exp = self._resourceExperiment(tmp_path, 'blocks.csv')
+        times = []
+        for repeat in range(2):
+            t0 = time.perf_counter()
+            resources = exp.getResourceFiles()
+            times.append(time.perf_counter() - t0)
+            assert len(resources) == nStims + 3
+        logging.info("getResourceFiles: %i stimulus files found in %.2fs, "
+                     "%.2fs with the conditions files unchanged"
+                     % (nStims, times[0], times[1]))
+        # checking each path against a list of those found took ~15s
+        assert max(times) < 8.0
+
     def test_add_routine(self):
         exp = experiment.Experiment()
 
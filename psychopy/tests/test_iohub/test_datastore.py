@@ -0,0 +1,115 @@
+""" Test the buffered event writing of the iohub DataStoreFile, without
+starting the iohub server.
+"""
+import time
+
+import pytest
+
+from psychopy import logging
+
+tables = pytest.importorskip('tables')
+
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices.experiment import MessageEvent
+
+
+def _messageEvent(n):
+    return [0, 0, 0, n, EventConstants.MESSAGE, n * 0.001, 0, 0, 0.0, 0.0, 0,
+            0.0, 'cat', 'message %d' % n]
+
+
+class TestDataStoreFile():
+
+    @classmethod
+    def setup_class(cls):
+        EventConstants.addClassMappings([EventConstants.MESSAGE],
+                                        {'MessageEvent': MessageEvent})
+
+    def _createFile(self, tmp_path, **settings):
+        from psychopy.iohub.datastore import DataStoreFile
+        settings.setdefault('multiple_sessions', False)
+        dsfile = DataStoreFile('events.hdf5', str(tmp_path), 'w', settings)
+        dsfile.updateDataStoreStructure(object(), {'MessageEvent': MessageEvent})
+        dsfile.createOrUpdateExperimentEntry([0, 'exp', 'title', 'desc', '1.0'])
+        dsfile.createExperimentSessionEntry(dict(code='s1', name='s1', comments='',
+                                                 user_variables='{}'))
+        return dsfile
+
+    def _readMessages(self, tmp_path):
+        with tables.open_file(str(tmp_path / 'events.hdf5'), 'r') as hdf:
+            return hdf.root.data_collection.events.experiment.MessageEvent.read()
+
+    @pytest.mark.parametrize('threaded', [False, True])
+    def test_buffered_write(self, tmp_path, threaded):
+        dsfile = self._createFile(tmp_path, write_buffer_size=64,
+                                  threaded_writer=threaded)
+        for n in range(1000):
+            dsfile._handleEvent(_messageEvent(n))
+        dsfile._handleEvents([_messageEvent(n) for n in range(1000, 1100)])
+        dsfile.flush()
+
+        stats = dsfile.getWriteStats()
+        assert stats['queued_rows'] == 0
+        assert stats['rows_written'] == 1100
+        assert stats['threaded_writer'] == threaded
+        assert stats['write_latency_max'] >= stats['write_latency_mean'] > 0
+        dsfile.close()
+
+        rows = self._readMessages(tmp_path)
+        assert list(rows['event_id']) == list(range(1100))
+        assert rows['text'][-1] == b'message 1099'
+        assert (rows['session_id'] == 1).all()
+
+    def test_write_interval(self, tmp_path):
+        dsfile = self._createFile(tmp_path, write_buffer_size=1000,
+                                  write_interval=0.05)
+        dsfile._handleEvent(_messageEvent(0))
+        assert dsfile.getWriteStats()['queued_rows'] == 1
+        time.sleep(0.1)
+        dsfile._handleEvent(_messageEvent(1))
+        # the block was written because its first event is older than the interval
+        assert dsfile.getWriteStats()['queued_rows'] == 0
+        dsfile.close()
+        assert len(self._readMessages(tmp_path)) == 2
+
+    def test_write_aged_events(self, tmp_path):
+        # blocks are written once they are old enough, even if no more
+        # events are received
+        dsfile = self._createFile(tmp_path, write_buffer_size=1000,
+                                  write_interval=0.05)
+        dsfile._handleEvent(_messageEvent(0))
+        assert dsfile.writeAgedEvents() == 0
+        time.sleep(0.1)
+        assert dsfile.writeAgedEvents() == 1
+        assert dsfile.getWriteStats()['queued_rows'] == 0
+        dsfile.close()
+        assert len(self._readMessages(tmp_path)) == 1
+
+    def test_table_options(self, tmp_path):
+        options = {'default': {'complevel': 1},
+                   'MESSAGE': {'complib': 'blosc', 'chunkshape': 512}}
+        dsfile = self._createFile(tmp_path, event_table_options=options)
+        table = dsfile.TABLES['MESSAGE']
+        assert table.filters.complevel == 1
+        assert table.filters.complib == 'blosc'
+        assert table.chunkshape == (512,)
+        dsfile.close()
+
+    def test_speed_buffered_write(self, tmp_path):
+        nEvents = 20000
+        times = {}
+        for bufferSize in (1, 256):
+            path = tmp_path / str(bufferSize)
+            path.mkdir()
+            dsfile = self._createFile(path, write_buffer_size=bufferSize)
+            events = [_messageEvent(n) for n in range(nEvents)]
+            t0 = time.perf_counter()
+            for evt in events:
+                dsfile._handleEvent(evt)
+            dsfile.flush()
+            times[bufferSize] = time.perf_counter() - t0
+            dsfile.close()
+            logging.info("DataStoreFile: %i events with write_buffer_size=%i "
+                         "took %.3fs" % (nEvents, bufferSize,
+                                         times[bufferSize]))
+        assert times[256] < times[1]
@@ -0,0 +1,134 @@
+""" Test the ioHub event field filters, without starting the iohub server.
+"""
+import time
+
+import numpy as np
+import pytest
+
+from psychopy import logging
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices import eventfilters
+from psychopy.iohub.devices.eyetracker.eye_events import MonocularEyeSampleEvent
+
+_FILTERS = [
+    ('MovingWindowFilter', dict(length=5, knot_pos='center')),
+    ('RunningMeanFilter', dict(length=5, knot_pos='center')),
+    ('MedianFilter', dict(length=5, knot_pos=0)),
+    ('RunningMedianFilter', dict(length=5, knot_pos=0)),
+    ('RunningMedianFilter', dict(length=4, knot_pos='latest')),
+    ('WeightedAverageFilter', dict(weights=(17, 33, 50, 33, 17), knot_pos='center')),
+    ('PassThroughFilter', dict()),
+    ('StampFilter', dict(level=1)),
+    ('StampFilter', dict(level=3)),
+]
+
+
+def _createFilter(name, inplace=True, **kwargs):
+    return getattr(eventfilters, name)(event_type=None, event_field_name=None,
+                                       inplace=inplace, **kwargs)
+
+
+def _streamValues(field_filter, values):
+    filtered = []
+    for v in values:
+        r = field_filter.add(v)
+        if r:
+            filtered.append(r[1])
+    return np.asarray(filtered, dtype=np.float64)
+
+
+class TestEventFilters():
+
+    @classmethod
+    def setup_class(cls):
+        EventConstants.addClassMappings(
+            [EventConstants.MONOCULAR_EYE_SAMPLE],
+            {'MonocularEyeSampleEvent': MonocularEyeSampleEvent})
+
+    @pytest.mark.parametrize('name, kwargs', _FILTERS)
+    def test_block_mode_matches_add(self, name, kwargs):
+        values = np.random.RandomState(0).normal(100.0, 20.0, 500)
+        streamed = _streamValues(_createFilter(name, **kwargs), values)
+        block = _createFilter(name, **kwargs).filterValues(values)
+        assert np.allclose(block, streamed, rtol=1e-6)
+        assert len(_createFilter(name, **kwargs).filterValues(values[:1])) <= 1
+
+    @pytest.mark.parametrize('running, full', [
+        ('RunningMeanFilter', 'MovingWindowFilter'),
+        ('RunningMedianFilter', 'MedianFilter')])
+    def test_running_filters(self, running, full):
+        values = np.random.RandomState(1).normal(100.0, 20.0, 2000)
+        kwargs = dict(length=7, knot_pos='center')
+        running_filter = _createFilter(running, **kwargs)
+        assert np.allclose(_streamValues(running_filter, values),
+                           _streamValues(_createFilter(full, **kwargs), values),
+                           rtol=1e-6)
+        running_filter.clear()
+        assert running_filter.add(1.0) is None
+        assert np.allclose(_streamValues(running_filter, values[:20]),
+                           _createFilter(full, **kwargs).filterValues(
+                               np.append(1.0, values[:20])), rtol=1e-6)
+
+    def test_filter_events(self):
+        ix = MonocularEyeSampleEvent.CLASS_ATTRIBUTE_NAMES.index('gaze_x')
+        events = np.zeros(50, dtype=MonocularEyeSampleEvent.NUMPY_DTYPE)
+        events['event_id'] = np.arange(50)
+        events['gaze_x'] = np.random.RandomState(2).normal(0, 10.0, 50)
+        kwargs = dict(event_type=EventConstants.MONOCULAR_EYE_SAMPLE,
+                      event_field_name='gaze_x', inplace=True, length=3,
+                      knot_pos='center')
+        field_filter = eventfilters.RunningMedianFilter(**kwargs)
+        streamed = []
+        for event in events:
+            r = field_filter.add(list(event.tolist()))
+            if r:
+                streamed.append(r[0])
+        filtered, values = eventfilters.RunningMedianFilter(**kwargs).filterEvents(events)
+        assert list(filtered['event_id']) == [e[3] for e in streamed]
+        assert np.allclose(filtered['gaze_x'], [e[ix] for e in streamed])
+        assert np.allclose(filtered['gaze_x'], values)
+        # the source events are not changed
+        assert not np.allclose(events['gaze_x'][1:-1], values)
+
+    def test_stamp_filter_levels(self):
+        events = np.zeros(30, dtype=MonocularEyeSampleEvent.NUMPY_DTYPE)
+        events['event_id'] = np.arange(30)
+        events['gaze_x'] = np.random.RandomState(4).normal(0, 10.0, 30)
+        kwargs = dict(event_type=EventConstants.MONOCULAR_EYE_SAMPLE,
+                      event_field_name='gaze_x', inplace=True, level=2)
+        field_filter = eventfilters.StampFilter(**kwargs)
+        streamed = []
+        for event in events:
+            r = field_filter.add(list(event.tolist()))
+            if r:
+                streamed.append(r)
+        filtered, values = eventfilters.StampFilter(**kwargs).filterEvents(events)
+        # each level filters the values of the level below
+        level1 = eventfilters.StampFilter(**dict(kwargs, level=1))
+        assert np.allclose(values, level1.filterValues(
+            level1.filterValues(events['gaze_x'])))
+        assert list(filtered['event_id']) == [e[3] for e, v in streamed]
+        assert list(filtered['event_id']) == list(range(2, 28))
+        assert np.allclose(values, [v for e, v in streamed])
+
+    def test_speed_running_filters(self):
+        values = np.random.RandomState(3).normal(100.0, 20.0, 20000)
+        length = 101
+        times = {}
+        for name in ('MovingWindowFilter', 'RunningMeanFilter', 'MedianFilter',
+                     'RunningMedianFilter'):
+            field_filter = _createFilter(name, length=length, knot_pos='center')
+            t0 = time.perf_counter()
+            _streamValues(field_filter, values)
+            times[name] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            field_filter.filterValues(values)
+            tBlock = time.perf_counter() - t0
+            logging.info("%s: %i values, window length %i, add() %.1fus per "
+                         "value, filterValues() %.1fus per value"
+                         % (name, len(values), length,
+                            times[name] / len(values) * 1e6,
+                            tBlock / len(values) * 1e6))
+            assert tBlock < times[name]
+        assert times['RunningMeanFilter'] < times['MovingWindowFilter']
+        assert times['RunningMedianFilter'] < times['MedianFilter']
@@ -0,0 +1,215 @@
+""" Test the offline (numpy array) parsing of eye samples by the iohub
+EyeTrackerEventParser, without starting the iohub server.
+"""
+import time
+
+import numpy as np
+import pytest
+
+from psychopy import logging
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices.eyetracker.eye_events import (
+    MonocularEyeSampleEvent, BinocularEyeSampleEvent, FixationStartEvent,
+    FixationEndEvent, SaccadeStartEvent, SaccadeEndEvent, BlinkStartEvent,
+    BlinkEndEvent)
+
+_EVENT_CLASSES = (MonocularEyeSampleEvent, BinocularEyeSampleEvent,
+                  FixationStartEvent, FixationEndEvent, SaccadeStartEvent,
+                  SaccadeEndEvent, BlinkStartEvent, BlinkEndEvent)
+
+_DISPLAY = dict(mm_size=dict(width=500.0, height=280.0),
+                pixel_res=(1920, 1080), eye_distance=550.0)
+
+
+def _createParser(sampling_rate, history, **kwargs):
+    from psychopy.iohub.devices.eyetracker.filters.parser import \
+        EyeTrackerEventParser
+    return EyeTrackerEventParser(display_device=_DISPLAY,
+                                 sampling_rate=sampling_rate,
+                                 adaptive_vel_thresh_history=history,
+                                 **kwargs)
+
+
+def _binocularSamples(count, sampling_rate, seed=0):
+    """Fixations with small noise, joined by saccades, with some blinks and
+    one eye missing data now and then."""
+    rng = np.random.RandomState(seed)
+    samples = np.zeros(count, dtype=BinocularEyeSampleEvent.NUMPY_DTYPE)
+    samples['type'] = EventConstants.BINOCULAR_EYE_SAMPLE
+    samples['event_id'] = np.arange(count) + 1
+    samples['time'] = 10.0 + np.arange(count) / float(sampling_rate)
+    samples['device_time'] = samples['time']
+    samples['logged_time'] = samples['time']
+
+    gaze = np.zeros((count, 2))
+    target = np.zeros(2)
+    ix = 0
+    while ix < count:
+        fix_len = rng.randint(sampling_rate // 10, sampling_rate // 2)
+        gaze[ix:ix + fix_len] = target
+        ix += fix_len
+        new_target = rng.uniform(-400, 400, 2)
+        sac_len = rng.randint(sampling_rate // 100, sampling_rate // 25) + 2
+        steps = np.linspace(0.0, 1.0, sac_len)[:, None]
+        gaze[ix:ix + sac_len] = (target + steps * (new_target - target))[:count - ix]
+        ix += sac_len
+        target = new_target
+    gaze += rng.normal(0, 0.5, gaze.shape)
+
+    for eye in ('left', 'right'):
+        samples['%s_gaze_x' % eye] = gaze[:, 0] + rng.normal(0, 0.2, count)
+        samples['%s_gaze_y' % eye] = gaze[:, 1] + rng.normal(0, 0.2, count)
+        samples['%s_pupil_measure1' % eye] = 4.0 + rng.normal(0, 0.1, count)
+
+    status = np.zeros(count, dtype=np.uint8)
+    for start in rng.randint(0, count, count // 500):
+        status[start:start + rng.randint(sampling_rate // 20, sampling_rate // 8)] = 22
+    for start in rng.randint(0, count, count // 500):
+        status[start:start + rng.randint(1, 5)] = rng.choice([2, 20])
+    # start and end the recording with missing data
+    status[:3] = 22
+    status[-3:] = 22
+    samples['status'] = status
+    return samples
+
+
+def _parseOnline(parser, samples):
+    events = []
+    for sample in samples:
+        parser._addInputEvent(list(sample.tolist()))
+        events.extend(parser._removeOutputEvents())
+    return events
+
+
+class TestEyeTrackerEventParser():
+
+    @classmethod
+    def setup_class(cls):
+        EventConstants.addClassMappings(
+            [c.EVENT_TYPE_ID for c in _EVENT_CLASSES],
+            dict((c.__name__, c) for c in _EVENT_CLASSES))
+
+    def test_offline_matches_online(self):
+        sampling_rate = 500
+        samples = _binocularSamples(5000, sampling_rate)
+        parser = _createParser(sampling_rate, 1.0)
+        online = _parseOnline(parser, samples)
+        offline = _createParser(sampling_rate, 1.0).parseSampleArray(samples)
+
+        total = 0
+        for etype, events in offline.items():
+            dtype = EventConstants.getClass(etype).NUMPY_DTYPE
+            expected = np.array([tuple(e) for e in online if e[4] == etype],
+                                dtype=dtype)
+            assert len(events) == len(expected), EventConstants.getName(etype)
+            total += len(events)
+            for field in dtype.names:
+                if field == 'event_id':
+                    # the online parser gives output events new ids
+                    continue
+                assert np.allclose(events[field], expected[field],
+                                   equal_nan=True), field
+        # fixations, saccades and blinks were all found
+        assert all(len(events) for events in offline.values())
+        assert total > 50
+
+    def test_mono_samples(self):
+        sampling_rate = 500
+        binoc = _binocularSamples(2000, sampling_rate, seed=1)
+        samples = np.zeros(len(binoc), dtype=MonocularEyeSampleEvent.NUMPY_DTYPE)
+        for field in samples.dtype.names:
+            if field in binoc.dtype.names:
+                samples[field] = binoc[field]
+            elif field not in ('eye', 'type'):
+                samples[field] = binoc['left_%s' % field]
+        samples['type'] = EventConstants.MONOCULAR_EYE_SAMPLE
+        samples['status'] = np.where(binoc['status'] == 22, 2, 0)
+
+        online = _parseOnline(_createParser(sampling_rate, 1.0), samples)
+        offline = _createParser(sampling_rate, 1.0).parseSampleArray(samples)
+        for etype, events in offline.items():
+            expected = [e for e in online if e[4] == etype]
+            assert len(events) == len(expected)
+            assert np.allclose(events['time'], [e[7] for e in expected])
+
+    def test_speed_offline_parsing(self):
+        sampling_rate = 1000
+        count = 2000000
+        samples = _binocularSamples(count, sampling_rate)
+        onlineCount = 10000
+        parser = _createParser(sampling_rate, 0.1)
+        t0 = time.perf_counter()
+        _parseOnline(parser, samples[:onlineCount])
+        tOnline = (time.perf_counter() - t0) * count / onlineCount
+
+        t0 = time.perf_counter()
+        events = _createParser(sampling_rate, 0.1).parseSampleArray(samples)
+        tOffline = time.perf_counter() - t0
+        logging.info("EyeTrackerEventParser: %i samples parsed offline in "
+                     "%.2fs (%i events), online estimate %.1fs"
+                     % (count, tOffline, sum(len(e) for e in events.values()),
+                        tOnline))
+        assert tOffline < tOnline
+
+    def test_incremental_threshold(self):
+        from psychopy.iohub.devices.eyetracker.filters.parser import \
+            IncrementalVelocityThreshold, fullVelocityThreshold
+        rng = np.random.RandomState(2)
+        # mostly fixation velocities, with saccades
+        velocities = np.abs(rng.normal(0, 10, 5000))
+        velocities[rng.randint(0, 5000, 250)] += rng.uniform(50, 500, 250)
+        length = 200
+        incremental = IncrementalVelocityThreshold(length)
+        differences = []
+        for i, v in enumerate(velocities):
+            removed = velocities[i - length] if i >= length else None
+            threshold = incremental.update(v, removed)
+            if i < length - 1:
+                assert np.isnan(threshold)
+            else:
+                full = fullVelocityThreshold(velocities[i - length + 1:i + 1])
+                differences.append(threshold - full)
+        differences = np.abs(differences)
+        # both stop iterating once the threshold changes by less than 1
+        assert np.median(differences) < 0.5
+        assert differences.max() < 5.0
+
+    def test_vel_thresh_methods(self):
+        sampling_rate = 500
+        samples = _binocularSamples(3000, sampling_rate)
+        thresholds = {}
+        for method, kwargs in (('full', {}),
+                               ('periodic', dict(adaptive_vel_thresh_update_interval=1)),
+                               ('periodic', dict(adaptive_vel_thresh_update_interval=20)),
+                               ('incremental', {})):
+            parser = _createParser(sampling_rate, 1.0,
+                                   adaptive_vel_thresh_method=method, **kwargs)
+            events = _parseOnline(parser, samples)
+            stats = parser.getProcessingStats()
+            assert stats['sample_count'] == len(samples)
+            assert stats['vel_thresh_method'] == method
+            assert stats['max_sample_time'] >= stats['mean_sample_time'] > 0
+            ix = MonocularEyeSampleEvent.CLASS_ATTRIBUTE_NAMES.index('raw_x')
+            thresholds[method, kwargs.get('adaptive_vel_thresh_update_interval')] = \
+                np.array([e[ix] for e in events
+                          if e[4] == EventConstants.MONOCULAR_EYE_SAMPLE and e[12] != 22])
+        full = thresholds['full', None]
+        assert np.array_equal(full, thresholds['periodic', 1], equal_nan=True)
+        for key in (('periodic', 20), ('incremental', None)):
+            assert np.nanmedian(np.abs(thresholds[key] - full)) < 1.0
+        with pytest.raises(ValueError):
+            _createParser(sampling_rate, 1.0, adaptive_vel_thresh_method='fast')
+
+    def test_speed_vel_thresh_methods(self):
+        sampling_rate = 1000
+        samples = _binocularSamples(10000, sampling_rate)
+        times = {}
+        for method in ('full', 'periodic', 'incremental'):
+            parser = _createParser(sampling_rate, 2.0,
+                                   adaptive_vel_thresh_method=method)
+            _parseOnline(parser, samples)
+            times[method] = parser.getProcessingStats()['mean_sample_time']
+            logging.info("EyeTrackerEventParser: %s velocity threshold, "
+                         "%.1fus per sample" % (method, times[method] * 1e6))
+        assert times['incremental'] < times['full']
+        assert times['periodic'] < times['full']
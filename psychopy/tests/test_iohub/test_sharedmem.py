@@ -0,0 +1,170 @@
+""" Test the shared memory event transport, without starting the iohub
+server.
+"""
+import time
+
+import pytest
+
+from psychopy import logging
+from psychopy.iohub.sharedmem import SHARED_MEMORY_AVAILABLE
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices.experiment import MessageEvent
+
+pytestmark = pytest.mark.skipif(not SHARED_MEMORY_AVAILABLE,
+                                reason="needs multiprocessing.shared_memory")
+
+
+def _messageEvent(n):
+    return [0, 0, 0, n, EventConstants.MESSAGE, n * 0.001, 0, 0, 0.0, 0.0, 0,
+            0.0, 'cat', 'message %d' % n]
+
+
+def _getDtype(etype):
+    assert etype == EventConstants.MESSAGE
+    return MessageEvent.NUMPY_DTYPE
+
+
+class TestEventRingBuffer():
+
+    def setup_method(self):
+        from psychopy.iohub.sharedmem import EventRingBuffer
+        self.ring = EventRingBuffer(size=64 * 1024, create=True)
+        self.reader = EventRingBuffer(self.ring.name)
+
+    def teardown_method(self):
+        self.reader.close()
+        self.ring.close()
+
+    def test_round_trip(self):
+        events = [_messageEvent(n) for n in range(100)]
+        assert self.ring.write(EventConstants.MESSAGE,
+                               MessageEvent.NUMPY_DTYPE, events[:60])
+        assert self.ring.write(EventConstants.MESSAGE,
+                               MessageEvent.NUMPY_DTYPE, events[60:])
+        records = self.reader.read(_getDtype)
+        assert [len(r[1]) for r in records] == [60, 40]
+        etype, earray = records[1]
+        assert etype == EventConstants.MESSAGE
+        assert not earray.flags.writeable
+        assert earray['event_id'].tolist() == list(range(60, 100))
+        assert earray['text'][-1] == b'message 99'
+        assert self.reader.read(_getDtype) == []
+
+    def test_wrap_and_overflow(self):
+        itemsize = MessageEvent.NUMPY_DTYPE.itemsize
+        perWrite = 64 * 1024 // itemsize // 3
+        eventId = 0
+        for _ in range(20):
+            events = [_messageEvent(eventId + n) for n in range(perWrite)]
+            assert self.ring.write(EventConstants.MESSAGE,
+                                   MessageEvent.NUMPY_DTYPE, events)
+            (etype, earray), = self.reader.read(_getDtype)
+            assert earray['event_id'].tolist() == [e[3] for e in events]
+            eventId += perWrite
+        # the ring is not released until the next read, so it fills up
+        writes = 0
+        while self.ring.write(EventConstants.MESSAGE, MessageEvent.NUMPY_DTYPE,
+                              [_messageEvent(0)] * perWrite):
+            writes += 1
+        assert 0 < writes < 3
+        assert self.ring.overflowCount == 1
+        assert len(self.reader.read(_getDtype)) == writes
+
+    def test_client_getEvents(self):
+        from psychopy.iohub.client import ioHubConnection
+        EventConstants.addClassMappings([EventConstants.MESSAGE],
+                                        {'MessageEvent': MessageEvent})
+        events = [_messageEvent(n) for n in range(10)]
+        # stands in for the iohub server handling GET_EVENTS_SHM
+        def sendToHubServer(request):
+            assert request == ('GET_EVENTS_SHM',)
+            self.ring.write(EventConstants.MESSAGE, MessageEvent.NUMPY_DTYPE,
+                            events)
+            return ['GET_EVENTS_SHM_RESULT', 1, None]
+
+        conn = ioHubConnection.__new__(ioHubConnection)
+        conn.allEvents = []
+        conn._eventRing = self.reader
+        conn._sendToHubServer = sendToHubServer
+
+        received = conn.getEvents(as_type='list')
+        assert [e[3] for e in received] == list(range(10))
+        assert received[-1][-1] == 'message 9'
+        assert received[-1][-2] == 'cat'
+
+        arrays = conn.getEventArrays()
+        assert list(arrays) == [EventConstants.MESSAGE]
+        assert arrays[EventConstants.MESSAGE]['event_id'].tolist() == list(range(10))
+
+    def test_long_and_unicode_text(self):
+        from psychopy.iohub.sharedmem import splitEvents
+        from psychopy.iohub.client import ioHubConnection
+        EventConstants.addClassMappings([EventConstants.MESSAGE],
+                                        {'MessageEvent': MessageEvent})
+        events = [_messageEvent(n) for n in range(6)]
+        for n, evt in enumerate(events):
+            evt[7] = n * 0.001  # hub time, events are merged in this order
+        events[1][-1] = 'x' * 200  # longer than the text field
+        events[2][-2] = 'a long category name, over 32 bytes'
+        events[3][-1] = u'caf\xe9 \u2713'  # fits once UTF-8 encoded
+        events[4][-1] = u'\u00e9' * 100  # 100 characters, 200 bytes
+        fitting, others = splitEvents(MessageEvent.NUMPY_DTYPE, events)
+        assert [e[3] for e in fitting] == [0, 3, 5]
+        assert [e[3] for e in others] == [1, 2, 4]
+
+        # stands in for the iohub server handling GET_EVENTS_SHM
+        def sendToHubServer(request):
+            self.ring.write(EventConstants.MESSAGE, MessageEvent.NUMPY_DTYPE,
+                            fitting)
+            return ['GET_EVENTS_SHM_RESULT', 1, list(others)]
+
+        conn = ioHubConnection.__new__(ioHubConnection)
+        conn.allEvents = []
+        conn._eventRing = self.reader
+        conn._sendToHubServer = sendToHubServer
+        assert conn.getEvents(as_type='list') == events
+        # arrays are merged in the same order
+        arrays = conn.getEventArrays()
+        assert list(arrays) == [EventConstants.MESSAGE]
+        earray = arrays[EventConstants.MESSAGE]
+        assert earray['event_id'].tolist() == list(range(6))
+        assert earray['text'][3].decode('utf-8') == u'caf\xe9 \u2713'
+
+    def test_speed_vs_udp_encoding(self):
+        import msgpack
+        from psychopy.iohub.net import MAX_PACKET_SIZE
+        from psychopy.iohub.client import ioHubConnection
+
+        nEvents = 5000
+        events = [_messageEvent(n) for n in range(nEvents)]
+        # msgpack encoding, splitting into packets and conversion as done
+        # for GET_EVENTS over UDP
+        conn = ioHubConnection.__new__(ioHubConnection)
+        pktSize = int(MAX_PACKET_SIZE / 2 - 20)
+        t0 = time.perf_counter()
+        data = msgpack.Packer().pack(('GET_EVENTS_RESULT', events))
+        unpacker = msgpack.Unpacker(use_list=True)
+        for i in range(0, len(data), pktSize):
+            unpacker.feed(data[i:i + pktSize])
+        udpEvents = conn._convertList(unpacker.unpack())[1]
+        tUdp = time.perf_counter() - t0
+
+        from psychopy.iohub.sharedmem import EventRingBuffer
+        ring = EventRingBuffer(size=4 * 1024 * 1024, create=True)
+        reader = EventRingBuffer(ring.name)
+        earray = None
+        try:
+            t0 = time.perf_counter()
+            ring.write(EventConstants.MESSAGE, MessageEvent.NUMPY_DTYPE, events)
+            (etype, earray), = reader.read(_getDtype)
+            tArray = time.perf_counter() - t0
+            assert earray['text'][-1] == b'message %d' % (nEvents - 1)
+            assert len(udpEvents) == len(earray) == nEvents
+        finally:
+            del earray
+            reader.close()
+            ring.close()
+
+        logging.info("%i events: UDP encoding %.2fms, shared memory ring "
+                     "%.2fms" % (nEvents, tUdp * 1000, tArray * 1000))
+        assert tArray < tUdp
@@ -0,0 +1,96 @@
+import io
+import json
+import time
+
+from psychopy import logging
+
+
+def _logger(level=logging.INFO):
+    logger = logging._Logger()
+    stream = io.StringIO()
+    logging.LogFile(stream, level=level, logger=logger)
+    return logger, stream
+
+
+class TestLogging():
+
+    def test_flush(self):
+        logger, stream = _logger()
+        debugStream = io.StringIO()
+        logging.LogFile(debugStream, level=logging.DEBUG, logger=logger)
+        logger.log('first', logging.EXP, t=1.0)
+        logger.log('hidden', logging.DEBUG, t=2.0)
+        assert stream.getvalue() == ''
+        logger.flush()
+        assert stream.getvalue() == '1.0000 \tEXP \tfirst\n'
+        assert debugStream.getvalue().splitlines()[1] == '2.0000 \tDEBUG \thidden'
+        assert [e.message for e in logger.flushed] == ['first', 'hidden']
+
+    def test_retention(self):
+        logger, stream = _logger()
+        logger.setRetention(3)
+        for n in range(10):
+            logger.log('msg %i' % n, logging.INFO, t=n)
+            logger.flush()
+        assert [e.message for e in logger.flushed] == ['msg 7', 'msg 8', 'msg 9']
+        logger.setRetention(0)
+        logger.log('msg 10', logging.INFO, t=10)
+        logger.flush()
+        assert list(logger.flushed) == []
+        assert len(stream.getvalue().splitlines()) == 11
+        logger.setRetention(None)
+        assert logger.flushed == []
+
+    def test_async(self):
+        logger, stream = _logger()
+        logger.setAsync(True, maxQueueSize=2)
+        for n in range(100):
+            logger.log('msg %i' % n, logging.INFO, t=n)
+            if n % 10 == 9:
+                logger.flush()
+        logger.waitForWriter()
+        lines = stream.getvalue().splitlines()
+        assert lines == ['%i.0000 \tINFO \tmsg %i' % (n, n) for n in range(100)]
+        # stopping the writer writes anything still queued
+        logger.log('last', logging.INFO, t=100)
+        logger.flush()
+        logger.setAsync(False)
+        assert stream.getvalue().endswith('\tlast\n')
+        logger.log('sync', logging.INFO, t=101)
+        logger.flush()
+        assert stream.getvalue().endswith('\tsync\n')
+
+    def test_json_lines(self):
+        logger = logging._Logger()
+        stream = io.StringIO()
+        logging.JsonLogFile(stream, level=logging.EXP, logger=logger)
+        logger.log('trial 1', logging.EXP, t=1.5)
+        logger.log('ignored', logging.INFO, t=2.0)
+        logger.log(u'réponse', logging.DATA, t=2.5)
+        logger.flush()
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert entries == [
+            {'t': 1.5, 'level': logging.EXP, 'levelname': 'EXP', 'message': 'trial 1'},
+            {'t': 2.5, 'level': logging.DATA, 'levelname': 'DATA',
+             'message': u'réponse'}]
+
+    def test_speed_flush(self):
+        nEntries = 5000
+        times = {}
+        for asyncWriter in (False, True):
+            logger, stream = _logger()
+            logger.setRetention(0)
+            logger.setAsync(asyncWriter)
+            longest = 0
+            for n in range(nEntries):
+                logger.log('frame %i' % n, logging.EXP, t=n)
+                if n % 50 == 49:
+                    t0 = time.perf_counter()
+                    logger.flush()
+                    longest = max(longest, time.perf_counter() - t0)
+            logger.setAsync(False)
+            times[asyncWriter] = longest
+            assert len(stream.getvalue().splitlines()) == nEntries
+            logging.info("logging: longest flush() of 50 entries %.3fms "
+                         "(async=%s)" % (longest * 1000, asyncWriter))
+        assert times[True] < times[False] * 5
@@ -1,10 +1,14 @@
 """Tests for the `AudioClip` class.
 """
 import os
+import pickle
+import time
 from tempfile import mkdtemp
 import pytest
 import numpy as np
 import psychopy
+from psychopy import logging
+from psychopy.sound import audioclip
 from psychopy.sound import (
     AudioClip,
     AUDIO_CHANNELS_STEREO,
@@ -321,6 +325,64 @@ def test_audioclip_rms():
     assert isinstance(rmsResultMono, np.float32)
 
 
+@pytest.mark.audioclip
+def test_audioclip_memmap(monkeypatch):
+    """Test that large clips are memory-mapped and still behave like clips held
+    in RAM when concatenated.
+    """
+    segments = [AudioClip.whiteNoise(duration=0.1, sampleRateHz=SAMPLE_RATE_16kHz)
+                for _ in range(5)]
+    expected = np.vstack([seg.samples for seg in segments])
+
+    # anything over 8kB is memory-mapped
+    monkeypatch.setattr(audioclip, 'memmapThreshold', 8000)
+    clip = segments[0].copy()
+    for seg in segments[1:]:
+        clip.append(seg)
+    assert isinstance(clip._buffer, np.memmap)
+    assert np.array_equal(clip.samples, expected)
+    assert np.isclose(clip.duration, 0.5)
+
+    combined = segments[0] + segments[1]
+    assert isinstance(combined._buffer, np.memmap)
+    assert np.array_equal(combined.samples, expected[:len(combined.samples)])
+
+    # only the samples are pickled, not the map or spare room in the buffer
+    unpickled = pickle.loads(pickle.dumps(clip))
+    assert not isinstance(unpickled._buffer, np.memmap)
+    assert np.array_equal(unpickled.samples, expected)
+    unpickled += segments[0]
+    assert np.isclose(unpickled.duration, 0.6)
+
+
+@pytest.mark.audioclip
+def test_speed_audioclip_append():
+    """Time appending many short segments to a clip, as done when polling a
+    microphone.
+    """
+    nSegments = 2000
+    segment = AudioClip.whiteNoise(
+        duration=0.01, sampleRateHz=SAMPLE_RATE_48kHz)
+
+    t0 = time.perf_counter()
+    clip = segment.copy()
+    for _ in range(nSegments - 1):
+        clip.append(segment)
+    tAppend = time.perf_counter() - t0
+
+    # concatenating the arrays every time, as `append` used to do
+    t0 = time.perf_counter()
+    samples = segment.samples
+    for _ in range(nSegments - 1):
+        samples = np.vstack((samples, segment.samples))
+    tStack = time.perf_counter() - t0
+
+    assert np.array_equal(clip.samples, samples)
+    logging.info("AudioClip.append: %i segments of 10ms in %.3fs, vstack "
+                 "%.3fs" % (nSegments, tAppend, tStack))
+    assert tAppend < tStack
+
+
 if __name__ == "__main__":
     # runs if this script is directly executed
     test_audioclip_create()
@@ -0,0 +1,240 @@
+"""Tests for reading sound files in the psychtoolbox backend, without playing
+them.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('psychtoolbox')
+import soundfile as sf
+
+from psychopy import logging
+from psychopy.constants import NOT_STARTED
+from psychopy.sound import backend_ptb
+
+_SAMPLE_RATE = 22050
+
+
+@pytest.fixture
+def soundFile(tmp_path):
+    """One second of mono noise in a wav file."""
+    samples = np.random.RandomState(0).uniform(
+        -0.5, 0.5, _SAMPLE_RATE).astype(np.float32)
+    filename = str(tmp_path / 'noise.wav')
+    sf.write(filename, samples, _SAMPLE_RATE, subtype='FLOAT')
+    backend_ptb.clearSoundCache()
+    yield filename, samples
+    backend_ptb.clearSoundCache()
+
+
+def test_sound_cache(soundFile, monkeypatch):
+    filename, samples = soundFile
+    decoded = backend_ptb._decodeSoundFile(filename, 0, -1, -1)
+    assert decoded.sampleRate == _SAMPLE_RATE
+    assert decoded.channels == 1
+    assert np.isclose(decoded.duration, 1.0)
+    assert np.array_equal(decoded.samples[:, 0], samples)
+    assert not decoded.samples.flags.writeable
+    assert backend_ptb._decodeSoundFile(filename, 0, -1, -1) is decoded
+
+    # sections and channels are cached separately
+    section = backend_ptb._decodeSoundFile(filename, 0.25, 0.75, 2)
+    assert section.samples.shape == (_SAMPLE_RATE // 2, 2)
+    assert np.array_equal(section.samples[:, 1],
+                          samples[_SAMPLE_RATE // 4:3 * _SAMPLE_RATE // 4])
+    assert section.t == 0.25
+
+    # changing the file changes the key
+    sf.write(filename, samples[:100], _SAMPLE_RATE, subtype='FLOAT')
+    os.utime(filename, ns=(0, 0))
+    assert len(backend_ptb._decodeSoundFile(filename, 0, -1, -1).samples) == 100
+
+    # the least recently used sounds are removed to stay within the budget
+    monkeypatch.setattr(backend_ptb, 'soundCacheSize', 1000)
+    backend_ptb._decodeSoundFile(filename, 0, -1, 2)
+    assert len(backend_ptb._soundCache) == 1
+    backend_ptb.clearSoundCache()
+    assert len(backend_ptb._soundCache) == 0
+
+
+def test_streamer(soundFile):
+    filename, samples = soundFile
+    streamer = backend_ptb._SoundFileStreamer(filename, 0.5, -1, 2,
+                                              readAhead=0.1)
+    assert np.isclose(streamer.duration, 0.5)
+    written = [streamer.prime()]
+    assert len(written[0]) == int(0.1 * _SAMPLE_RATE)
+
+    # nothing is read ahead of playback by more than `readAhead`
+    played = [0]
+    streamer.start(written.append, lambda: played[0], loops=1)
+    time.sleep(0.2)
+    assert streamer.isStreaming
+    assert sum(len(w) for w in written) == len(written[0])
+    # as playback gets through the sound the rest is read, and repeated
+    played[0] = 10 * _SAMPLE_RATE
+    streamer._thread.join(5)
+    assert not streamer.isStreaming
+    assert streamer.error is None
+    streamed = np.concatenate(written)
+    section = samples[_SAMPLE_RATE // 2:]
+    assert np.array_equal(streamed[:, 0], np.concatenate([section, section]))
+    assert np.array_equal(streamed[:, 0], streamed[:, 1])
+
+    # priming again starts from the given frame, with the thread stopped
+    assert np.array_equal(streamer.prime(100)[:, 0], section[100:2305])
+    streamer.close()
+    assert streamer.sndFile.closed
+
+
+class _FakeTrack:
+    """Stands in for a psychtoolbox `audio.Slave`, without a sound device."""
+    handle = 1
+
+    def __init__(self):
+        self.playing = False
+        self.played = 0  # frames, as reported by its status
+        self.buffer = None
+        self.blocked = False  # set if a write waited on the stopped track
+
+    @property
+    def status(self):
+        return {'ElapsedOutSamples': self.played, 'Active': self.playing,
+                'State': int(self.playing)}
+
+    def start(self, repetitions=1, when=None):
+        self.playing = True
+
+    def stop(self, reset=True):
+        self.playing = False
+
+    def fill_buffer(self, samples):
+        self.buffer = [samples]
+
+    def refill(self, command, handle, samples, streamingRefill):
+        """Stands in for PsychPortAudio('FillBuffer', ...), which waits for
+        the track to play once its buffer is full."""
+        assert command == 'FillBuffer'
+        deadline = time.perf_counter() + 2
+        while not self.playing:
+            if time.perf_counter() > deadline:
+                self.blocked = True
+                return
+            time.sleep(0.001)
+        self.buffer.append(samples)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def streamingSound(soundFile, monkeypatch):
+    """A sound streamed from `soundFile`, playing on a `_FakeTrack`."""
+    filename, samples = soundFile
+    track = _FakeTrack()
+    # always behind, so the streamer keeps writing
+    track.played = 10 * _SAMPLE_RATE
+    monkeypatch.setattr(backend_ptb.ptb, 'PsychPortAudio', track.refill)
+    snd = backend_ptb.SoundPTB.__new__(backend_ptb.SoundPTB)
+    snd.__dict__.update(name='streamed', autoLog=False, win=None, loops=-1,
+                        _loopsRequested=-1, _loopsFinished=0,
+                        _tSoundRequestPlay=0, _isPlaying=False,
+                        sampleRate=_SAMPLE_RATE, status=NOT_STARTED)
+    snd._streamer = backend_ptb._SoundFileStreamer(filename, 0, -1, 1,
+                                                   readAhead=0.1)
+    snd.duration = snd._streamer.duration
+    snd.track = track
+    snd.seek(0)
+    yield snd, track, samples
+    snd._streamer.close()
+
+
+def test_streaming_play_pause_stop(streamingSound):
+    snd, track, samples = streamingSound
+    snd.play()
+    assert track.playing and snd._streamer.isStreaming
+    time.sleep(0.05)
+    assert len(track.buffer) > 1
+    # the streamer is stopped first, so its writes don't wait on the track
+    track.played = _SAMPLE_RATE // 4
+    snd.pause()
+    assert not track.blocked
+    assert not track.playing and not snd._streamer.isStreaming
+    assert snd.frameN == _SAMPLE_RATE // 4
+    assert np.array_equal(track.buffer[0][:, 0],
+                          samples[_SAMPLE_RATE // 4:][:len(track.buffer[0])])
+    snd.pause()  # resumes
+    assert track.playing and snd._streamer.isStreaming
+    time.sleep(0.05)
+    snd.stop()
+    assert not track.blocked
+    assert not track.playing and not snd._streamer.isStreaming
+    assert snd.t == 0
+    assert np.array_equal(track.buffer[0][:, 0],
+                          samples[:len(track.buffer[0])])
+
+
+def test_streaming_seek(streamingSound):
+    snd, track, samples = streamingSound
+    snd.play()
+    time.sleep(0.05)
+    snd.seek(0.5)
+    assert not track.blocked
+    assert track.playing and snd._streamer.isStreaming
+    assert np.array_equal(track.buffer[0][:, 0],
+                          samples[_SAMPLE_RATE // 2:][:len(track.buffer[0])])
+    snd.stop()
+    assert not track.blocked
+
+
+def test_streamer_stop_timeout(soundFile):
+    filename, samples = soundFile
+    streamer = backend_ptb._SoundFileStreamer(filename, 0, -1, 1,
+                                              readAhead=0.1)
+    streamer.prime()
+    release = threading.Event()
+    written = []
+
+    def write(samples):
+        written.append(samples)
+        release.wait(5)  # a write that is stuck
+
+    streamer.start(write, lambda: 10 * _SAMPLE_RATE)
+    while not written:
+        time.sleep(0.001)
+    thread = streamer._thread
+    t0 = time.perf_counter()
+    streamer.stop(timeout=0.1)
+    assert time.perf_counter() - t0 < 1
+    assert not streamer.isStreaming
+    # once its write returns the thread finishes, without reading more
+    release.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(written) == 1
+    streamer.close()
+
+
+def test_speed_sound_cache(tmp_path):
+    nFiles = 20
+    samples = np.random.RandomState(0).uniform(
+        -0.5, 0.5, (2 * 44100, 2)).astype(np.float32)
+    filenames = []
+    for n in range(nFiles):
+        filenames.append(str(tmp_path / ('sound%i.flac' % n)))
+        sf.write(filenames[-1], samples, 44100)
+
+    backend_ptb.clearSoundCache()
+    times = []
+    for trial in range(2):
+        t0 = time.perf_counter()
+        for filename in filenames:
+            backend_ptb._decodeSoundFile(filename, 0, -1, 2)
+        times.append(time.perf_counter() - t0)
+    backend_ptb.clearSoundCache()
+    logging.info("SoundPTB: decoding %i 2s flac files %.1fms, from the "
+                 "cache %.1fms" % (nFiles, times[0] * 1000, times[1] * 1000))
+    assert times[1] < times[0]
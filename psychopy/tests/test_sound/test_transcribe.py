@@ -0,0 +1,117 @@
+"""Tests for transcribing microphone recordings in the background.
+"""
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from psychopy import logging
+from psychopy.sound.microphone import Microphone, RecordingBuffer
+from psychopy.sound.transcribe import TranscriptionResult
+
+# NB `psychopy.sound.transcribe` is also the name of a function in
+# psychopy.sound, which hides the module when imported with `from`
+transcribeModule = importlib.import_module('psychopy.sound.transcribe')
+
+
+def _fakeTranscribe(audioClip, engine='sphinx', language='en-US',
+                    expectedWords=None, config=None):
+    """Stands in for a transcription engine: takes 0.1s per clip and
+    returns the number of samples as the transcript."""
+    time.sleep(0.1)
+    if audioClip.samples.max() > 1.0:
+        raise ValueError("Clipped recording")
+    return TranscriptionResult(
+        words=[str(len(audioClip.samples))], unknownValue=False,
+        requestFailed=False, engine='null', language=language)
+
+
+@pytest.fixture
+def mic(monkeypatch):
+    """A Microphone which banks what is written to its recording buffer,
+    without opening an audio stream. Clips are transcribed by
+    `_fakeTranscribe` in a thread pool in place of the process pool."""
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(transcribeModule, '_transcriptionPool', pool)
+    monkeypatch.setattr(transcribeModule, 'transcribe', _fakeTranscribe)
+    mic = Microphone.__new__(Microphone)
+    mic._recording = RecordingBuffer(sampleRateHz=16000, channels=1,
+                                     maxRecordingSize=100)
+    mic._isStarted = False
+    mic.clips = {}
+    mic.lastClip = None
+    mic.scripts = {}
+    mic.lastScript = None
+    mic._pendingScripts = {}
+    mic._scriptsLock = threading.Lock()
+    yield mic
+    pool.shutdown()
+
+
+def _bankSamples(mic, nSamples, tag='trial', value=0.0, **kwargs):
+    mic._recording.write(np.full((nSamples, 1), value, dtype=np.float32))
+    return mic.bank(tag=tag, **kwargs)
+
+
+def test_bank_without_blocking(mic):
+    clip, pending = _bankSamples(mic, 100, transcribe='sphinx', block=False)
+    assert clip.samples.shape[0] == 100
+    assert mic.scripts['trial'] == [pending]
+    assert mic.lastScript is pending
+    _bankSamples(mic, 200, transcribe='sphinx', block=False)
+    _bankSamples(mic, 300, tag='other', transcribe='sphinx', block=False)
+    assert mic.pendingScripts > 0
+
+    assert mic.waitForScripts()
+    assert mic.pendingScripts == 0
+    assert [str(s) for s in mic.scripts['trial']] == ['100', '200']
+    assert [str(s) for s in mic.scripts['other']] == ['300']
+    assert str(mic.lastScript) == '300'
+    # transcripts given by blocking calls are stored the same way
+    clip, script = _bankSamples(mic, 400, transcribe='sphinx')
+    assert str(script) == '400'
+    assert [str(s) for s in mic.scripts['trial']] == ['100', '200', '400']
+
+
+def test_wait_for_scripts(mic):
+    _bankSamples(mic, 100, transcribe='sphinx', block=False)
+    _bankSamples(mic, 200, transcribe='sphinx', block=False)
+    assert not mic.waitForScripts(timeout=0.01)
+    assert mic.waitForScripts()
+    # errors are raised when waiting, and only once
+    _bankSamples(mic, 100, value=2.0, transcribe='sphinx', block=False)
+    with pytest.raises(ValueError):
+        mic.waitForScripts()
+    assert mic.waitForScripts()
+    assert [str(s) for s in mic.scripts['trial'][:2]] == ['100', '200']
+
+
+def test_speed_bank(mic):
+    times = {}
+    for block in (True, False):
+        t0 = time.perf_counter()
+        for n in range(5):
+            _bankSamples(mic, 100, transcribe='sphinx', block=block)
+        times[block] = (time.perf_counter() - t0) / 5
+        mic.waitForScripts()
+        logging.info("Microphone.bank(block=%s): %.1fms per clip with a "
+                     "transcriber taking 100ms" % (block, times[block] * 1000))
+    assert times[False] < 0.05 < times[True]
+
+
+@pytest.mark.skipif(not transcribeModule.haveSphinx,
+                    reason="needs pocketsphinx")
+def test_transcribeAsync_process_pool():
+    from psychopy.sound import AudioClip
+    silence = AudioClip(np.zeros((16000, 1), dtype=np.float32), 16000)
+    try:
+        pending = transcribeModule.transcribeAsync(silence)
+        result = pending.result(timeout=60)
+        expected = transcribeModule.transcribe(silence)
+        assert result.words == expected.words
+        assert result.success == expected.success
+    finally:
+        transcribeModule.shutdownTranscriptionPool()
@@ -2,6 +2,10 @@
 """Tests for psychopy.tools.arraytools
 """
 
+import time
+
+from psychopy import logging
+from psychopy.tools import arraytools
 from psychopy.tools.arraytools import *
 import pytest
 import numpy
@@ -100,3 +104,58 @@ def test_val2array():
             case['ans'],
             equal_nan=True
         )
+
+
+def test_createLumPattern_cache(monkeypatch):
+    arraytools.clearLumPatternCache()
+    maskParams = {'fringeWidth': 0.2, 'sd': 3}
+    gauss = createLumPattern('gauss', 128, None, maskParams)
+    assert gauss.shape == (128, 128) and gauss.dtype == numpy.float64
+    assert not gauss.flags.writeable
+    with pytest.raises(ValueError):
+        gauss[0, 0] = 0
+    assert createLumPattern('gauss', 128, None, dict(maskParams)) is gauss
+    # parameters not used by the pattern don't matter
+    assert createLumPattern('gauss', 128, None, {'fringeWidth': 0.5}) is gauss
+    assert createLumPattern('gauss', 128, None, {'sd': 5}) is not gauss
+    assert createLumPattern('gauss', 64, None, maskParams).shape == (64, 64)
+
+    # float32 patterns are generated separately, with the same values
+    for patternType in ('sin', 'sqr', 'saw', 'tri', 'sinXsin', 'sqrXsqr',
+                        'circle', 'gauss', 'cross', 'radRamp', 'raisedCos'):
+        single = createLumPattern(patternType, 100, None, maskParams,
+                                  dtype=numpy.float32)
+        assert single.dtype == numpy.float32
+        assert numpy.allclose(
+            single, createLumPattern(patternType, 100, None, maskParams),
+            atol=1e-6)
+
+    # sizes beyond the cache budget are not kept
+    monkeypatch.setattr(arraytools, 'lumPatternCacheSize', 100000)
+    arraytools.clearLumPatternCache()
+    assert createLumPattern('sin', 256) is not createLumPattern('sin', 256)
+    createLumPattern('sin', 64)
+    createLumPattern('sqr', 64)
+    assert sum(a.nbytes for a in arraytools._lumPatternCache.values()) <= 100000
+    arraytools.clearLumPatternCache()
+
+
+def test_speed_createLumPattern(monkeypatch):
+    """Time making the textures of 100 stimuli with the same grating and mask,
+    as `_createTexture` does."""
+    maskParams = {'fringeWidth': 0.2, 'sd': 3}
+    times = {}
+    for cacheSize in (0, arraytools.lumPatternCacheSize):
+        monkeypatch.setattr(arraytools, 'lumPatternCacheSize', cacheSize)
+        arraytools.clearLumPatternCache()
+        t0 = time.perf_counter()
+        for n in range(100):
+            for patternType in ('sin', 'raisedCos'):
+                createLumPattern(patternType, 512, None, maskParams,
+                                 dtype=numpy.float32)
+        times[cacheSize] = time.perf_counter() - t0
+        logging.info("createLumPattern: 100 sin and raisedCos textures at "
+                     "512x512 in %.3fs (cache size %i)" % (times[cacheSize],
+                                                          cacheSize))
+    arraytools.clearLumPatternCache()
+    assert times[arraytools.lumPatternCacheSize] < times[0] / 10
@@ -1,9 +1,10 @@
 import json
+import time
 from pathlib import Path
 
 import pytest
 from psychopy import visual, layout, event
-from psychopy import colors
+from psychopy import colors, logging
 from psychopy.monitors import Monitor
 from copy import copy
 from psychopy.tests import utils
@@ -526,3 +527,28 @@ class _TestUnitsMixin:
 
         # Reset obj win
         self.obj.win = self.win
+
+
+def test_speed_texture_construction(monkeypatch):
+    """Time making gratings and element arrays which share their textures."""
+    from psychopy.tools import arraytools
+    win = visual.Window([128, 128], monitor="testMonitor", allowGUI=False,
+                        autoLog=False)
+    times = {}
+    try:
+        for cacheSize in (0, arraytools.lumPatternCacheSize):
+            monkeypatch.setattr(arraytools, 'lumPatternCacheSize', cacheSize)
+            arraytools.clearLumPatternCache()
+            t0 = time.perf_counter()
+            for n in range(20):
+                visual.GratingStim(win, tex='sin', mask='raisedCos', texRes=512)
+                visual.ElementArrayStim(win, nElements=10, elementTex='sin',
+                                        elementMask='gauss', texRes=512)
+            times[cacheSize] = time.perf_counter() - t0
+            logging.info("20 GratingStims and ElementArrayStims with 512x512 "
+                         "textures made in %.3fs (pattern cache size %i)"
+                         % (times[cacheSize], cacheSize))
+    finally:
+        arraytools.clearLumPatternCache()
+        win.close()
+    assert times[arraytools.lumPatternCacheSize] < times[0]
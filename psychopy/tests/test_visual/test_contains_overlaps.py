@@ -3,11 +3,13 @@
 py.test -k polygon --cov-report term-missing --cov visual/helpers.py
 """
 from pathlib import Path
+import time
 
-from psychopy import visual, monitors, layout
+from psychopy import visual, monitors, layout, logging
 from psychopy.tests import utils
 from psychopy.visual import helpers
 from numpy import sqrt
+import numpy as np
 import matplotlib
 
 mon = monitors.Monitor('testMonitor')
@@ -234,6 +236,171 @@ def test_line_contains():
     assert (line.contains(point_2) is False)
 
 
+def _testPoints(n, seed=0):
+    return np.random.RandomState(seed).uniform(-1.5, 1.5, (n, 2))
+
+
+# concave, with a spike
+_concavePoly = [(1, 1), (1, -1), (0, 0.2), (-1, -1), (-1, 1), (0, 1.4)]
+
+
+def test_points():
+    points = _testPoints(500)
+    for version in (mpl_version, '1.1', '0.0'):
+        if version == '1.1':
+            if not have_nxutils:
+                continue
+            helpers.nxutils = nxutils
+        matplotlib.__version__ = version
+        expected = [helpers.pointInPolygon(x, y, _concavePoly) for x, y in points]
+        assert list(helpers.pointsInPolygon(points, _concavePoly)) == expected
+        if version == '1.1':
+            del helpers.nxutils
+    matplotlib.__version__ = mpl_version
+    assert not helpers.pointsInPolygon(points, [(0, 0), (1, 1)]).any()
+
+    # one point against many polygons
+    polys = [_concavePoly, [(0, 0), (1, 1)], np.array(_concavePoly) + 0.5,
+             [(-1, -1), (1, -1), (0, 1)]]
+    for x, y in points:
+        expected = [len(p) > 2 and helpers.pointInPolygon(x, y, p)
+                    for p in polys]
+        assert list(helpers.pointInPolygons(x, y, polys)) == expected
+
+    # arrays changed in place aren't matched to the edges of their old values
+    square = np.array([(0, 0), (10, 0), (10, 10), (0, 10)], dtype=float)
+    assert list(helpers.pointInPolygons(5, 5, [square])) == [True]
+    square += 100
+    assert list(helpers.pointInPolygons(5, 5, [square])) == [False]
+
+
+def test_contains_points():
+    win.units = 'height'
+    shape = visual.ShapeStim(win, vertices=_concavePoly, size=0.2,
+                             autoLog=False)
+    points = _testPoints(200) * 0.2
+    expected = [shape.contains(p) for p in points]
+    assert list(shape.contains(points)) == expected
+    # the compiled polygon is reused until the shape moves
+    path = shape._polygonPathCache[1]
+    shape.contains(points[0])
+    assert shape._polygonPathCache[1] is path
+    shape.pos = (0.1, 0)
+    shape.contains(points[0])
+    assert shape._polygonPathCache[1] is not path
+
+    stims = [shape,
+             visual.Rect(win, size=0.3, pos=(-0.1, 0), ori=30, autoLog=False),
+             visual.Circle(win, radius=0.1, pos=(0.1, 0.1), autoLog=False),
+             visual.Line(win, start=(-1, -1), end=(1, 1), autoLog=False)]
+    for x, y in points:
+        expected = [stim.contains(x, y) for stim in stims]
+        assert list(helpers.pointInPolygons(x, y, stims, units='height')) == \
+            expected
+
+
+def test_speed_contains():
+    win.units = 'height'
+    rng = np.random.RandomState(0)
+    stims = [visual.Circle(win, radius=0.05, pos=rng.uniform(-0.4, 0.4, 2),
+                           autoLog=False)
+             for n in range(20)]
+    mouse = _testPoints(200, seed=1) * 0.4
+
+    t0 = time.perf_counter()
+    looped = [[stim.contains(x, y) for stim in stims] for x, y in mouse]
+    tLoop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batched = [helpers.pointInPolygons(x, y, stims, units='height')
+               for x, y in mouse]
+    tBatch = time.perf_counter() - t0
+    assert np.array_equal(looped, batched)
+    logging.info("contains: 20 stimuli, %.1fus per frame with contains(), "
+                 "%.1fus with pointInPolygons()"
+                 % (tLoop / len(mouse) * 1e6, tBatch / len(mouse) * 1e6))
+
+    gaze = _testPoints(10000, seed=2) * 0.4
+    t0 = time.perf_counter()
+    looped = [stims[0].contains(p) for p in gaze]
+    tLoop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batched = stims[0].contains(gaze)
+    tBatch = time.perf_counter() - t0
+    assert list(batched) == looped
+    logging.info("contains: 10000 points %.1fms one at a time, %.2fms as an "
+                 "array" % (tLoop * 1000, tBatch * 1000))
+    assert tBatch < tLoop
+
+
+def _randomLayout(n, seed=0, spread=1000):
+    """`n` randomly placed and rotated bars and triangles, in pixels."""
+    rng = np.random.RandomState(seed)
+    bar = np.array([(-20, -2), (20, -2), (20, 2), (-20, 2)], dtype=float)
+    triangle = np.array([(-10, -8), (10, -8), (0, 12)], dtype=float)
+    polys = []
+    for ii in range(n):
+        theta = rng.uniform(0, 2 * np.pi)
+        rot = np.array([[np.cos(theta), -np.sin(theta)],
+                        [np.sin(theta), np.cos(theta)]])
+        shape = bar if ii % 2 else triangle
+        polys.append(shape.dot(rot.T) + rng.uniform(0, spread, 2))
+    return polys
+
+
+def test_intersect():
+    # crossed bars: no vertex of either is inside the other
+    bar1 = [(-10, -1), (10, -1), (10, 1), (-10, 1)]
+    bar2 = [(-1, -10), (1, -10), (1, 10), (-1, 10)]
+    assert not helpers.polygonsOverlap(bar1, bar2)
+    assert helpers.polygonsIntersect(bar1, bar2)
+    # one inside the other, touching, apart, and lines
+    square = [(-5, -5), (5, -5), (5, 5), (-5, 5)]
+    assert helpers.polygonsIntersect(square, [(-1, -1), (1, -1), (0, 1)])
+    assert helpers.polygonsIntersect([(-1, -1), (1, -1), (0, 1)], square)
+    assert helpers.polygonsIntersect(square, [(5, 5), (6, 5), (6, 6)])
+    assert not helpers.polygonsIntersect(square, [(6, 6), (7, 6), (7, 7)])
+    assert helpers.polygonsIntersect(square, [(-10, 0), (10, 0)])
+    assert helpers.polygonsIntersect(square, [(0, 0), (1, 1)])
+    assert not helpers.polygonsIntersect(square, [(6, 0), (10, 0)])
+    assert helpers.polygonsIntersect([(5, 0), (10, 0)], [(6, 0), (7, 0)])
+
+    # whenever vertices are inside, the shapes intersect
+    polys = _randomLayout(80, spread=120)
+    pairs = helpers.findOverlaps(polys)
+    found = set(map(tuple, pairs))
+    for ii in range(len(polys)):
+        for jj in range(ii + 1, len(polys)):
+            intersect = helpers.polygonsIntersect(polys[ii], polys[jj])
+            assert intersect == ((ii, jj) in found)
+            if helpers.polygonsOverlap(polys[ii], polys[jj]):
+                assert intersect
+    assert len(found) > 0
+    assert len(helpers.findOverlaps(polys[:10], polys[10:])) > 0
+    assert len(helpers.findOverlaps([])) == 0
+
+
+def test_speed_findOverlaps():
+    polys = _randomLayout(500)
+    nPairs = len(polys) * (len(polys) - 1) // 2
+
+    # testing each pair with polygonsOverlap is slow, so time some and scale
+    t0 = time.perf_counter()
+    nTested = 0
+    for ii in range(50):
+        for jj in range(ii + 1, len(polys)):
+            helpers.polygonsOverlap(polys[ii], polys[jj])
+            nTested += 1
+    tPairwise = (time.perf_counter() - t0) * nPairs / nTested
+
+    t0 = time.perf_counter()
+    pairs = helpers.findOverlaps(polys)
+    tFind = time.perf_counter() - t0
+    logging.info("findOverlaps: 500 items, %.1fms, (%.0fms estimated for "
+                 "polygonsOverlap on each pair), %i overlapping"
+                 % (tFind * 1000, tPairwise * 1000, len(pairs)))
+    assert tFind < tPairwise
+
+
 if __name__ == '__main__':
     test_overlaps()
     test_contains()
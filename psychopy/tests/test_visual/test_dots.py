@@ -1,5 +1,9 @@
+import time
+
 import numpy as np
-from psychopy import visual, colors
+import pytest
+from psychopy import visual, colors, logging
+from psychopy.visual.dot import DotTrajectory
 
 
 class TestDots:
@@ -152,4 +156,101 @@ class TestDots:
         # If dots have moved, then there should be more white on the compound screen than on either original
         assert compound.mean() > screen1.mean() and compound.mean() > screen2.mean(), (
             "Dot stimulus does not appear to have moved across two frames."
-        )
\ No newline at end of file
+        )
+
+    def test_trajectory(self):
+        obj = visual.DotStim(
+            self.win, nDots=50, units="height", fieldSize=(0.5, 0.5),
+            dotLife=5, speed=0.01, coherence=0.5, autoLog=False)
+        obj.trajectory = obj.makeTrajectory(10, seed=1)
+        for frameN in range(12):
+            obj.draw()
+            # the last frame is held when the trajectory runs out
+            expected = obj.trajectory.frames[min(frameN, 9)]
+            assert np.allclose(obj._verticesBase, expected)
+        # setting it again starts from the beginning
+        obj.trajectory = obj.trajectory
+        obj.draw()
+        assert np.allclose(obj._verticesBase, obj.trajectory.frames[0])
+        with pytest.raises(ValueError):
+            obj.trajectory = DotTrajectory(10, 5)
+        obj.trajectory = None
+        obj.draw()
+
+
+@pytest.mark.parametrize('fieldShape', ['sqr', 'circle'])
+@pytest.mark.parametrize('signalDots, noiseDots', [
+    ('same', 'direction'), ('same', 'position'), ('same', 'walk'),
+    ('different', 'direction'), ('different', 'walk')])
+def test_dot_trajectory(fieldShape, signalDots, noiseDots):
+    kwargs = dict(coherence=0.5, dir=90, speed=0.01, dotLife=5,
+                  fieldSize=(1.0, 0.5), fieldShape=fieldShape,
+                  signalDots=signalDots, noiseDots=noiseDots)
+    traj = DotTrajectory(100, 60, seed=1, **kwargs)
+    assert traj.frames.shape == (60, 100, 2)
+    assert traj.frames.dtype == np.float32
+    # reproducible from the seed, also when made in the background
+    assert np.array_equal(traj.frames,
+                          DotTrajectory(100, 60, seed=1, **kwargs).frames)
+    background = DotTrajectory(100, 60, seed=1, background=True, **kwargs)
+    assert np.array_equal(background.frame(59), traj.frames[59])
+    assert not np.array_equal(traj.frames,
+                              DotTrajectory(100, 60, seed=2, **kwargs).frames)
+    # the dots stay in the field
+    if fieldShape == 'sqr':
+        assert (np.abs(traj.frames) <= np.array([0.5, 0.25]) + 1e-6).all()
+    else:
+        normXY = traj.frames / np.array([0.5, 0.25])
+        assert (np.hypot(normXY[..., 0], normXY[..., 1]) <= 1 + 1e-6).all()
+    # and the coherent ones move in the signal direction
+    if signalDots == 'same':
+        steps = np.diff(traj.frames[:, :50], axis=0)
+        moved = np.isclose(steps[..., 1], 0.01, atol=1e-6)
+        assert moved.mean() > 0.6
+        assert np.allclose(steps[moved][:, 0], 0, atol=1e-6)
+
+
+def test_dot_trajectory_errors(monkeypatch):
+    with pytest.raises(ValueError):
+        DotTrajectory(10, 0)
+
+    # errors in the background thread are raised when frames are asked for
+    def failingNewDotsXY(self, rng, nDots):
+        raise RuntimeError('failed')
+
+    monkeypatch.setattr(DotTrajectory, '_newDotsXY', failingNewDotsXY)
+    traj = DotTrajectory(10, 5, background=True)
+    with pytest.raises(RuntimeError):
+        traj.frame(0)
+    with pytest.raises(RuntimeError):
+        traj.wait()
+
+
+def test_dot_trajectory_save(tmp_path):
+    traj = DotTrajectory(20, 30, coherence=0.8, fieldShape='circle')
+    filename = str(tmp_path / 'dots.npz')
+    traj.save(filename)
+    loaded = DotTrajectory.load(filename)
+    assert np.array_equal(loaded.frames, traj.frames)
+    assert loaded.params == traj.params
+    # and can be made again from the seed
+    again = DotTrajectory(20, 30, coherence=0.8, fieldShape='circle',
+                          seed=loaded.seed)
+    assert np.array_equal(again.frames, traj.frames)
+
+
+def test_speed_dot_trajectory():
+    nFrames = 600
+    t0 = time.perf_counter()
+    traj = DotTrajectory(1000, nFrames, coherence=0.5, dotLife=10,
+                         noiseDots='walk', seed=0)
+    tGenerate = (time.perf_counter() - t0) / nFrames
+    verticesBase = np.zeros((1000, 2))
+    t0 = time.perf_counter()
+    for frameN in range(nFrames):
+        verticesBase[:] = traj.frame(frameN)
+    tCopy = (time.perf_counter() - t0) / nFrames
+    logging.info("DotTrajectory: 1000 dots, %.1fus per frame to update, "
+                 "%.1fus to copy in precomputed positions"
+                 % (tGenerate * 1e6, tCopy * 1e6))
+    assert tCopy < tGenerate
@@ -0,0 +1,159 @@
+"""Tests for the vertex, color and texture coordinate buffers of
+ElementArrayStim, without a window.
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from psychopy import logging
+from psychopy.tools.monitorunittools import convertToPix
+from psychopy.visual.elementarray import _ElementBuffers
+
+_win = SimpleNamespace(size=np.array([800, 600]), useRetina=False)
+
+
+def _referenceVertices(xys, fieldPos, sizes, oris, depths, units):
+    """Vertices as computed by ElementArrayStim before the buffers were kept
+    between updates."""
+    n = len(xys)
+    radians = 0.017453292519943295
+    verts = np.zeros([n * 4, 3], 'd')
+    wx = -sizes[:, 0] * np.cos(oris[:] * radians) / 2
+    wy = sizes[:, 0] * np.sin(oris[:] * radians) / 2
+    hx = sizes[:, 1] * np.sin(oris[:] * radians) / 2
+    hy = sizes[:, 1] * np.cos(oris[:] * radians) / 2
+    verts[0::4, 0] = -wx - hx
+    verts[1::4, 0] = +wx - hx
+    verts[2::4, 0] = +wx + hx
+    verts[3::4, 0] = -wx + hx
+    verts[0::4, 1] = -wy - hy
+    verts[1::4, 1] = +wy - hy
+    verts[2::4, 1] = +wy + hy
+    verts[3::4, 1] = -wy + hy
+    positions = (xys + fieldPos).repeat(4, 0)
+    verts[:, 2] = depths
+    verts[:, :2] = convertToPix(vertices=verts[:, :2], pos=positions,
+                                units=units, win=_win)
+    return verts.reshape([n, 4, 3])
+
+
+def _referenceTexCoords(sfs, phases, sizes=None):
+    n = len(sfs)
+    if sizes is None:
+        sizes = np.ones((n, 2))
+    L = -sfs[:, 0] * sizes[:, 0] / 2 - phases[:, 0] + 0.5
+    R = +sfs[:, 0] * sizes[:, 0] / 2 - phases[:, 0] + 0.5
+    T = +sfs[:, 1] * sizes[:, 1] / 2 - phases[:, 1] + 0.5
+    B = -sfs[:, 1] * sizes[:, 1] / 2 - phases[:, 1] + 0.5
+    return (np.concatenate([[R, B], [L, B], [L, T], [R, T]])
+            .transpose().reshape([n, 4, 2]))
+
+
+def _elements(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return dict(xys=rng.uniform(-0.5, 0.5, (n, 2)),
+                sizes=rng.uniform(0.01, 0.1, (n, 2)),
+                oris=rng.uniform(0, 360, n))
+
+
+@pytest.mark.parametrize('units', ['pix', 'norm', 'height'])
+def test_vertices(units):
+    n = 500
+    elements = _elements(n)
+    buffers = _ElementBuffers(n)
+    buffers.updateVertices(fieldPos=(0.1, -0.2), units=units, win=_win,
+                           **elements)
+    buffers.updateDepths(0, 0)
+    expected = _referenceVertices(fieldPos=(0.1, -0.2), depths=0,
+                                  units=units, **elements)
+    assert buffers.vertices.dtype == np.float32
+    assert np.allclose(buffers.vertices, expected, atol=1e-3)
+    vertices = buffers.vertices
+
+    # nothing changed, nothing updated
+    assert not buffers.updateVertices(fieldPos=(0.1, -0.2), units=units,
+                                      win=_win, **elements)
+    # changes to some elements (even in place) only update those
+    elements['xys'][10:20] += 0.1
+    elements['oris'][15] = 45
+    buffers.vertices[:10] = 0
+    assert buffers.updateVertices(fieldPos=(0.1, -0.2), units=units,
+                                  win=_win, **elements)
+    assert buffers.vertices is vertices
+    assert (buffers.vertices[:10, :, :2] == 0).all()
+    expected = _referenceVertices(fieldPos=(0.1, -0.2), depths=0,
+                                  units=units, **elements)
+    assert np.allclose(buffers.vertices[10:], expected[10:], atol=1e-3)
+    # moving the field updates them all
+    buffers.updateVertices(fieldPos=(0, 0), units=units, win=_win, **elements)
+    expected = _referenceVertices(fieldPos=(0, 0), depths=0, units=units,
+                                  **elements)
+    assert np.allclose(buffers.vertices, expected, atol=1e-3)
+
+    depths = np.arange(n)
+    buffers.updateDepths(depths, 2)
+    assert np.array_equal(buffers.vertices[:, :, 2], (depths + 2)[:, None]
+                          .repeat(4, 1))
+
+
+def test_colors_and_texCoords():
+    n = 200
+    rng = np.random.RandomState(1)
+    buffers = _ElementBuffers(n)
+    rgba = rng.uniform(0, 1, (n, 4))
+    opacities = rng.uniform(0, 1, n)
+    buffers.updateColors(rgba, opacities)
+    assert np.allclose(buffers.rgba[:, :, :3], rgba[:, None, :3])
+    assert np.allclose(buffers.rgba[:, :, 3], opacities[:, None])
+    opacities[5] = 0
+    assert buffers.updateColors(rgba, opacities)
+    assert buffers.rgba[5, 0, 3] == 0
+    assert not buffers.updateColors(rgba, opacities)
+    buffers.updateColors([1, 0, 0, 1], 1.0)
+    assert (buffers.rgba == [1, 0, 0, 1]).all()
+
+    sfs = rng.uniform(1, 5, (n, 2))
+    phases = rng.uniform(0, 1, (n, 2))
+    sizes = rng.uniform(0.5, 2, (n, 2))
+    buffers.updateTexCoords(sfs, phases)
+    assert np.allclose(buffers.texCoords, _referenceTexCoords(sfs, phases),
+                       atol=1e-5)
+    assert not buffers.updateTexCoords(sfs, phases)
+    phases[3] += 0.5
+    buffers.updateTexCoords(sfs, phases, sizes)
+    assert np.allclose(buffers.texCoords,
+                       _referenceTexCoords(sfs, phases, sizes), atol=1e-5)
+    assert buffers.maskCoords.shape == (n, 4, 2)
+
+
+def test_speed_element_buffers():
+    for n in (1000, 10000, 100000):
+        elements = _elements(n)
+        buffers = _ElementBuffers(n)
+        buffers.updateVertices(fieldPos=(0, 0), units='norm', win=_win,
+                               **elements)
+        nFrames = 20
+        times = {}
+        for method in ('reference', 'buffers', 'partial'):
+            t0 = time.perf_counter()
+            for frameN in range(nFrames):
+                if method == 'partial':
+                    # a tenth of the elements move each frame
+                    elements['xys'][:n // 10] += 0.001
+                else:
+                    elements['xys'] += 0.001
+                if method == 'reference':
+                    _referenceVertices(fieldPos=(0, 0), depths=0,
+                                       units='norm', **elements)
+                else:
+                    buffers.updateVertices(fieldPos=(0, 0), units='norm',
+                                           win=_win, **elements)
+            times[method] = (time.perf_counter() - t0) / nFrames
+        logging.info("ElementArrayStim vertices: %i elements, %.2fms per "
+                     "update before, %.2fms now, %.2fms with 10%% moving"
+                     % (n, times['reference'] * 1000, times['buffers'] * 1000,
+                        times['partial'] * 1000))
+        if n >= 10000:  # (small arrays are dominated by the overheads)
+            assert times['buffers'] < times['reference']
@@ -1,6 +1,11 @@
 from pathlib import Path
+import time
 
-from psychopy import visual, colors, core
+import numpy as np
+from PIL import Image
+
+from psychopy import visual, colors, core, logging
+from psychopy.visual import basevisual
 from .test_basevisual import _TestUnitsMixin
 from psychopy.tests.test_experiment.test_component_compile_python import _TestBoilerplateMixin
 from .. import utils
@@ -215,4 +220,68 @@ class TestImageAnimation:
             # Cleanup
             win.close()
             del img
-            
\ No newline at end of file
+            
+
+
+def _writeImages(folder, nImages, size=(600, 400), mode='RGB'):
+    rng = np.random.RandomState(0)
+    filenames = []
+    for n in range(nImages):
+        pixels = rng.randint(0, 256, (size[1], size[0], len(mode)), np.uint8)
+        filenames.append(str(Path(folder) / ('image%i.png' % n)))
+        Image.fromarray(pixels.squeeze(), mode).save(filenames[-1])
+    return filenames
+
+
+def test_prefetch_images(tmp_path):
+    """Images are decoded off the main thread, as `_createTexture` would, without
+    needing a window."""
+    GL = basevisual.GL
+    basevisual.clearImageCache()
+    rgb, = _writeImages(tmp_path, 1)
+    (tmp_path / 'lum').mkdir()
+    lum, = _writeImages(tmp_path / 'lum', 1, mode='L')
+    pending = visual.prefetchImages([rgb, lum, str(tmp_path / 'missing.png')])
+    decodedRGB, decodedLum = [f.result() for f in pending[:2]]
+    assert isinstance(pending[2].exception(), IOError)
+
+    im = Image.open(rgb).transpose(Image.FLIP_TOP_BOTTOM).convert('RGBA')
+    assert np.array_equal(decodedRGB.intensity, np.array(im))
+    assert decodedRGB.size == (600, 400)
+    assert decodedRGB.notSqr and not decodedRGB.wasLum
+    assert decodedRGB.dataType == GL.GL_UNSIGNED_BYTE
+    assert not decodedRGB.intensity.flags.writeable
+    # luminance images become floats, as for `ImageStim`
+    assert decodedLum.wasLum and decodedLum.dataType == GL.GL_FLOAT
+    assert decodedLum.intensity.min() >= -1 and decodedLum.intensity.max() <= 1
+
+    # setting the image then uses the cache
+    args = (GL.GL_RGB, GL.GL_UNSIGNED_BYTE, False)
+    assert basevisual._getDecodedImage(rgb, *args) is decodedRGB
+    assert visual.prefetchImages([rgb])[0].result() is decodedRGB
+    # other formats are decoded separately
+    mask = basevisual._getDecodedImage(rgb, GL.GL_ALPHA, GL.GL_UNSIGNED_BYTE, True)
+    assert mask.intensity.shape == (1024, 1024)
+    basevisual.clearImageCache()
+    assert basevisual._getDecodedImage(rgb, *args) is not decodedRGB
+
+
+def test_speed_prefetch_images(tmp_path):
+    """Setting images which were prefetched only costs a cache lookup."""
+    GL = basevisual.GL
+    filenames = _writeImages(tmp_path, 20, size=(1024, 768))
+    args = (GL.GL_RGB, GL.GL_UNSIGNED_BYTE, False)
+    times = {}
+    for prefetch in (False, True):
+        basevisual.clearImageCache()
+        if prefetch:
+            for future in visual.prefetchImages(filenames):
+                future.result()
+        t0 = time.perf_counter()
+        for filename in filenames:
+            basevisual._getDecodedImage(filename, *args)
+        times[prefetch] = (time.perf_counter() - t0) / len(filenames)
+        logging.info("ImageStim: decoding 1024x768 png %.2fms per image "
+                     "(prefetched=%s)" % (times[prefetch] * 1000, prefetch))
+    basevisual.clearImageCache()
+    assert times[True] < times[False] / 10
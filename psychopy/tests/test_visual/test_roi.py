@@ -1,8 +1,10 @@
+import time
+
 import numpy as np
 
 from .test_basevisual import _TestUnitsMixin
 from psychopy.tests.test_experiment.test_component_compile_python import _TestBoilerplateMixin
-from psychopy import visual, core
+from psychopy import visual, core, logging
 
 
 class TestROI(_TestUnitsMixin, _TestBoilerplateMixin):
@@ -97,3 +99,89 @@ class TestROI(_TestUnitsMixin, _TestBoilerplateMixin):
         )
         # Check that convenience functios return correct values
         assert self.obj.numLooks == looks.shape[0]
+
+
+class TestROIIndex:
+
+    def setup_class(self):
+        self.win = visual.Window([1280, 720], units="pix", allowGUI=False,
+                                 autoLog=False)
+        # one ROI per word, in lines of text
+        rng = np.random.RandomState(0)
+        self.rois = [
+            visual.ROI(self.win, name="word%i_%i" % (row, col), device=None,
+                       shape="rectangle", units='pix',
+                       pos=(col * 60 - 570, 300 - row * 40),
+                       size=(rng.uniform(20, 55), 30), autoLog=False)
+            for row in range(16) for col in range(20)]
+        self.points = rng.uniform(-620, 620, (2000, 2))
+
+    def teardown_class(self):
+        self.win.close()
+
+    def _firstHits(self, points):
+        found = []
+        for x, y in points:
+            hits = [ii for ii, roi in enumerate(self.rois) if roi.contains(x, y)]
+            found.append(hits[0] if hits else -1)
+        return np.array(found)
+
+    def test_lookup(self):
+        index = visual.ROIIndex(self.rois)
+        assert len(index) == len(self.rois)
+        assert np.array_equal(index.lookup(self.points),
+                              self._firstHits(self.points))
+        for x, y in self.points[:100]:
+            hits = [roi for roi in self.rois if roi.contains(x, y)]
+            assert index.roisAt(x, y) == hits
+            assert index.roiAt(x, y) == (hits[0] if hits else None)
+        # moved ROIs are re-indexed
+        original = [roi.pos.copy() for roi in self.rois[::7]]
+        for roi in self.rois[::7]:
+            roi.pos = roi.pos + (300, -200)
+        assert np.array_equal(index.lookup(self.points),
+                              self._firstHits(self.points))
+        for roi, pos in zip(self.rois[::7], original):
+            roi.pos = pos
+        index.clear()
+        assert len(index) == 0
+        assert self.rois[0]._roiIndex is None
+
+    def test_isLookedIn(self):
+        index = visual.ROIIndex(self.rois)
+        device = visual.Rect(self.win, size=(1, 1), units="pix", autoLog=False)
+        for roi in self.rois:
+            roi.device = device
+        for n, (x, y) in enumerate(self.points[:50]):
+            device.pos = (x, y)
+            if n % 10 == 5:
+                self.rois[n].pos = (x, y)
+            for roi in self.rois:
+                assert roi.isLookedIn == bool(roi.contains(x, y))
+        index.clear()
+
+    def test_speed_isLookedIn(self):
+        device = visual.Rect(self.win, size=(1, 1), units="pix", autoLog=False)
+        for roi in self.rois:
+            roi.device = device
+        times = {}
+        for indexed in (False, True):
+            index = visual.ROIIndex(self.rois if indexed else [])
+            t0 = time.perf_counter()
+            for x, y in self.points[:100]:
+                device.pos = (x, y)
+                for roi in self.rois:
+                    roi.isLookedIn
+            times[indexed] = (time.perf_counter() - t0) / 100
+            index.clear()
+            logging.info("ROI.isLookedIn: %i ROIs, %.2fms per frame (indexed=%s)"
+                         % (len(self.rois), times[indexed] * 1000, indexed))
+        assert times[True] < times[False]
+
+        index = visual.ROIIndex(self.rois)
+        t0 = time.perf_counter()
+        index.lookup(self.points)
+        logging.info("ROIIndex.lookup: %i samples, %i ROIs, %.1fms"
+                     % (len(self.points), len(self.rois),
+                        (time.perf_counter() - t0) * 1000))
+        index.clear()
@@ -1,5 +1,12 @@
+import time
+
+import numpy as np
 import pytest
-from psychopy import visual
+from pyglet import gl as GL
+from psychopy import logging, visual
+from psychopy.contrib import tesselate
+from psychopy.visual import shape
+from psychopy.visual.helpers import tesselatePolygon, clearTesselateCache
 from .test_basevisual import _TestColorMixin, _TestUnitsMixin
 from psychopy.tests.test_experiment.test_component_compile_python import _TestBoilerplateMixin
 
@@ -21,3 +28,144 @@ class TestShape(_TestColorMixin, _TestUnitsMixin, _TestBoilerplateMixin):
         self.fillUsed = True
         # Shape has no foreground color
         self.foreUsed = False
+
+    def test_tesselate(self, monkeypatch):
+        vertices = _star(7)
+        s1 = visual.ShapeStim(self.win, vertices=vertices, autoLog=False)
+        monkeypatch.setattr(shape, 'useGLUTesselator', True)
+        s2 = visual.ShapeStim(self.win, vertices=vertices, autoLog=False)
+        assert np.isclose(_area(s1._tesselVertices), _area(s2._tesselVertices))
+        # a line isn't filled, either way
+        s3 = visual.ShapeStim(self.win, vertices=[(0, 0), (0.5, 0.5)],
+                              autoLog=False)
+        assert not s3.closeShape
+        # shapes too complex for tesselatePolygon are tesselated with GLU
+        monkeypatch.setattr(shape, 'useGLUTesselator', False)
+        monkeypatch.setattr(visual.helpers, 'tesselateBudget', 10)
+        s4 = visual.ShapeStim(self.win, vertices=vertices, autoLog=False)
+        assert np.isclose(_area(s4._tesselVertices), _area(s2._tesselVertices))
+
+
+def _star(nPoints, inner=0.4):
+    angles = np.linspace(0, 2 * np.pi, 2 * nPoints, endpoint=False)
+    radii = np.where(np.arange(2 * nPoints) % 2, inner, 1.0)
+    return np.column_stack([np.cos(angles), np.sin(angles)]) * radii[:, None]
+
+
+_square = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=float)
+_shapes = {
+    'star': [_star(5)],
+    'cross': [visual.shape.knownShapes['cross']],
+    'pentagram': [_star(5, inner=1.0)[::2][[0, 2, 4, 1, 3]]],
+    'bowtie': [[(0, 0), (1, 1), (1, 0), (0, 1)]],
+    'hole': [_square, _square[::-1] * 0.5],
+    'sameWayHole': [_square, _square * 0.5],
+    'overlapping': [_square, _square + 0.5],
+    'random': [np.random.RandomState(0).uniform(-1, 1, (20, 2))],
+    'line': [[(0, 0), (1, 1)]],
+}
+_windingRules = [None, GL.GLU_TESS_WINDING_NONZERO, GL.GLU_TESS_WINDING_POSITIVE,
+                 GL.GLU_TESS_WINDING_NEGATIVE, GL.GLU_TESS_WINDING_ABS_GEQ_TWO]
+
+
+def _tesselateGLU(loops, windingRule=None):
+    if windingRule:
+        GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE, windingRule)
+    try:
+        triangles = tesselate.tesselate([np.asarray(loop).tolist()
+                                         for loop in loops])
+    finally:
+        GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
+                           tesselate.default_winding_rule)
+    return np.array(triangles, dtype=float).reshape((-1, 2))
+
+
+def _area(triangles):
+    a, b, c = np.asarray(triangles).reshape((-1, 3, 2)).transpose((1, 0, 2))
+    return 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                        (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])).sum()
+
+
+def _trianglesCovering(triangles, points):
+    """The number of triangles each point is in."""
+    a, b, c = triangles.reshape((-1, 3, 2)).transpose((1, 0, 2))[:, :, None]
+
+    def cross(o, p, q):
+        return ((p[..., 0] - o[..., 0]) * (q[..., 1] - o[..., 1]) -
+                (p[..., 1] - o[..., 1]) * (q[..., 0] - o[..., 0]))
+
+    d1, d2, d3 = cross(a, b, points), cross(b, c, points), cross(c, a, points)
+    inside = (((d1 >= 0) & (d2 >= 0) & (d3 >= 0)) |
+              ((d1 <= 0) & (d2 <= 0) & (d3 <= 0)))
+    return inside.sum(axis=0)
+
+
+@pytest.mark.parametrize('windingRule', _windingRules)
+@pytest.mark.parametrize('name', list(_shapes))
+def test_tesselatePolygon(name, windingRule):
+    loops = _shapes[name]
+    expected = _tesselateGLU(loops, windingRule)
+    triangles = tesselatePolygon(loops, windingRule)
+    assert triangles.shape[1] == 2 and len(triangles) % 3 == 0
+    assert np.isclose(_area(triangles), _area(expected))
+    # the same points are covered, by one triangle each
+    points = np.random.RandomState(1).uniform(-1.5, 1.5, (2000, 2))
+    covering = _trianglesCovering(triangles, points)
+    assert covering.max(initial=0) <= 1
+    assert np.array_equal(covering > 0,
+                          _trianglesCovering(expected, points) > 0)
+
+
+def test_tesselatePolygon_cache():
+    clearTesselateCache()
+    vertices = _star(5)
+    triangles = tesselatePolygon(vertices)
+    assert not triangles.flags.writeable
+    assert tesselatePolygon(vertices.copy()) is triangles
+    assert tesselatePolygon([vertices]) is triangles
+    assert tesselatePolygon(vertices, GL.GLU_TESS_WINDING_NEGATIVE) is not triangles
+    vertices[0] = (2, 0)
+    assert _area(tesselatePolygon(vertices)) > _area(triangles)
+    clearTesselateCache()
+    assert tesselatePolygon(_star(5)) is not triangles
+    with pytest.raises(ValueError):
+        tesselatePolygon(vertices, windingRule=1)
+    assert tesselatePolygon([]).shape == (0, 2)
+
+
+def test_tesselatePolygon_budget(monkeypatch):
+    clearTesselateCache()
+    # hundreds of random vertices cross each other thousands of times
+    vertices = np.random.RandomState(0).uniform(-1, 1, (400, 2))
+    for n in range(2):  # the second time from the cache
+        with pytest.raises(visual.helpers.TesselateBudgetError):
+            tesselatePolygon(vertices)
+    monkeypatch.setattr(visual.helpers, 'tesselateBudget', None)
+    assert len(tesselatePolygon(vertices[:50]))
+    clearTesselateCache()
+
+
+def test_speed_tesselate(monkeypatch):
+    shapes = {'20-point star': _star(20), '100-point star': _star(100),
+              '500-vertex circle': _star(250, inner=1.0)}
+    for name, vertices in shapes.items():
+        times = {}
+        t0 = time.perf_counter()
+        for n in range(10):
+            _tesselateGLU([vertices])
+        times['glu'] = (time.perf_counter() - t0) / 10
+        monkeypatch.setattr(visual.helpers, 'tesselateCacheSize', 0)
+        t0 = time.perf_counter()
+        for n in range(10):
+            tesselatePolygon(vertices)
+        times['numpy'] = (time.perf_counter() - t0) / 10
+        monkeypatch.undo()
+        tesselatePolygon(vertices)
+        t0 = time.perf_counter()
+        for n in range(10):
+            tesselatePolygon(vertices)
+        times['cached'] = (time.perf_counter() - t0) / 10
+        logging.info("tesselate %s: GLU %.2fms, numpy %.2fms, cached %.3fms"
+                     % (name, times['glu'] * 1000, times['numpy'] * 1000,
+                        times['cached'] * 1000))
+        assert times['cached'] < times['glu']
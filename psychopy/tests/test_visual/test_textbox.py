@@ -1,4 +1,5 @@
 from pathlib import Path
+import time
 
 import numpy as np
 
@@ -451,6 +452,62 @@ def test_font_manager():
         assert bool(mgr.getFontNamesSimilar("Hanalei"))
 
 
+def _resourceFont(name='OpenSans-Bold.ttf'):
+    from psychopy import prefs
+    return Path(prefs.paths['resources']) / 'fonts' / name
+
+
+def _glyphValues(glyph):
+    return glyph.size, glyph.offset, glyph.advance, glyph.texcoords
+
+
+def test_glyph_cache(tmp_path, monkeypatch):
+    from psychopy.visual.textbox2 import fontmanager
+    monkeypatch.setattr(fontmanager, 'glyphCacheDir', tmp_path)
+    fontFile = _resourceFont()
+    cold = fontmanager.GLFont(fontFile, 32)
+    assert not cold.glyphs
+    cold.fetch('PsychoPy')
+    cold.saveToCache()
+    assert cold.cacheFile.is_file()
+
+    warm = fontmanager.GLFont(fontFile, 32)
+    assert sorted(warm.glyphs) == sorted(cold.glyphs)
+    for charcode, glyph in cold.glyphs.items():
+        assert _glyphValues(warm.glyphs[charcode]) == _glyphValues(glyph)
+    assert (warm.atlas.data == cold.atlas.data).all()
+    # new glyphs are packed around the cached ones, as they would have been
+    cold.fetch('xyz')
+    warm.fetch('xyz')
+    for charcode in 'xyz':
+        assert _glyphValues(warm.glyphs[charcode]) == _glyphValues(cold.glyphs[charcode])
+    assert (warm.atlas.data == cold.atlas.data).all()
+    # other sizes have their own cache
+    assert not fontmanager.GLFont(fontFile, 24).glyphs
+    monkeypatch.setattr(fontmanager, 'useGlyphCache', False)
+    assert not fontmanager.GLFont(fontFile, 32).glyphs
+    # don't save the test fonts to the real cache at exit
+    fontmanager._unsavedFonts.clear()
+
+
+def test_speed_glyph_cache(tmp_path, monkeypatch):
+    from psychopy import logging
+    from psychopy.visual.textbox2 import fontmanager
+    monkeypatch.setattr(fontmanager, 'glyphCacheDir', tmp_path)
+    fontFile = _resourceFont()
+    times = {}
+    for start in ('cold', 'warm'):
+        t0 = time.perf_counter()
+        for size in (16, 32, 64):
+            glFont = fontmanager.GLFont(fontFile, size)
+            glFont.preload()
+            glFont.saveToCache()
+        times[start] = time.perf_counter() - t0
+        logging.info("GLFont: %s start of 3 sizes, %i glyphs each, took "
+                     "%.3fs" % (start, len(glFont.glyphs), times[start]))
+    assert times['warm'] < times['cold']
+
+
 @pytest.mark.uax14
 class Test_uax14_textbox(Test_textbox):
     """Runs the same tests as for Test_textbox, but with the textbox set to uax14 line breaking"""
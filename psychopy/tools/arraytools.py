@@ -19,6 +19,7 @@ __all__ = ["createXYs",
 
 import numpy
 import ctypes
+from collections import OrderedDict
 
 
 def createXYs(x, y=None):
@@ -268,7 +269,22 @@ def snapto(values, points):
     return snapped
 
 
-def createLumPattern(patternType, res, texParams=None, maskParams=None):
+# Patterns made by `createLumPattern` are cached, most recently used first, up
+# to this many bytes, so stimuli sharing a texture or mask only generate it
+# once. Set to 0 to disable the cache.
+lumPatternCacheSize = 64 * 1024 ** 2
+
+_lumPatternCache = OrderedDict()
+
+
+def clearLumPatternCache():
+    """Remove all patterns from the cache used by `createLumPattern`.
+    """
+    _lumPatternCache.clear()
+
+
+def createLumPattern(patternType, res, texParams=None, maskParams=None,
+                     dtype=None):
     """Create a luminance (single channel) defined pattern.
 
     Parameters
@@ -286,12 +302,17 @@ def createLumPattern(patternType, res, texParams=None, maskParams=None):
         Passing valid values to this parameter do nothing yet.
     maskParams : dict or None
         Additional parameters to control how the texture's mask is applied.
+    dtype : str, type or None
+        Data type of the returned array. Patterns are generated at this
+        precision (e.g. `numpy.float32` for textures). If `None`, the
+        pattern has the data type it's generated with, `float64` or `int`.
 
     Returns
     -------
     ndarray
         Array of normalized intensity values containing the desired pattern
-        specified by `mode`.
+        specified by `mode`. Patterns are cached and shared between calls, so
+        the array is read-only. Copy it to make changes.
 
     Examples
     --------
@@ -330,56 +351,98 @@ def createLumPattern(patternType, res, texParams=None, maskParams=None):
     else:
         raise TypeError('parameter `maskParams` must be type `dict` or `None`')
 
+    if patternType in (None, "none", "None", "color"):
+        patternType = None
+        res = 1
+
+    # only the mask parameter used by the pattern affects it
+    if patternType == "gauss":
+        usedParams = allMaskParams.get('sd')
+    elif patternType == "raisedCos":
+        usedParams = allMaskParams.get('fringeWidth')
+    else:
+        usedParams = None
+    key = (patternType, res, usedParams,
+           None if dtype is None else numpy.dtype(dtype))
+    try:
+        intensity = _lumPatternCache.pop(key)
+    except KeyError:
+        pass
+    except TypeError:  # parameters which can't be used as a key
+        key = None
+    else:
+        _lumPatternCache[key] = intensity  # now the most recently used
+        return intensity
+
+    intensity = _makeLumPattern(patternType, res, allMaskParams, dtype)
+    intensity.flags.writeable = False
+
+    if key is not None and intensity.nbytes <= lumPatternCacheSize:
+        _lumPatternCache[key] = intensity
+        cacheBytes = sum(a.nbytes for a in _lumPatternCache.values())
+        while cacheBytes > lumPatternCacheSize:
+            _, oldest = _lumPatternCache.popitem(last=False)
+            cacheBytes -= oldest.nbytes
+
+    return intensity
+
+
+def _makeLumPattern(patternType, res, allMaskParams, dtype):
+    """Generate a pattern for `createLumPattern`.
+
+    Patterns varying along one axis are computed for a single row or column
+    and repeated, and 2D patterns from the outer product or sum of 1D values.
+    """
+    ftype = numpy.float64 if dtype is None else dtype
+
     # correct `makeRadialMatrix` from filters, duplicated her to avoid importing
     # all of visual to test this function out
-    def _makeRadialMatrix(matrixSize, center=(0.0, 0.0), radius=1.0):
+    def _makeRadialMatrix(matrixSize, center=(0.0, 0.0), radius=1.0,
+                          ftype=ftype):
         if type(radius) in [int, float]:
             radius = [radius, radius]
 
         # NB need to add one step length because
-        yy, xx = numpy.mgrid[0:matrixSize, 0:matrixSize]
-        xx = ((1.0 - 2.0 / matrixSize * xx) + center[0]) / radius[0]
-        yy = ((1.0 - 2.0 / matrixSize * yy) + center[1]) / radius[1]
-        rad = numpy.sqrt(numpy.power(xx, 2) + numpy.power(yy, 2))
+        steps = numpy.arange(matrixSize, dtype=ftype)
+        xx = ((1.0 - 2.0 / matrixSize * steps) + center[0]) / radius[0]
+        yy = ((1.0 - 2.0 / matrixSize * steps) + center[1]) / radius[1]
+        rad = numpy.sqrt(numpy.power(xx, 2)[numpy.newaxis, :] +
+                         numpy.power(yy, 2)[:, numpy.newaxis])
+
+        return rad.astype(ftype, copy=False)
 
-        return rad
+    def _onePeriod():
+        # one period in `res` steps, as `numpy.mgrid[0:2 * pi:1j * res]`
+        return numpy.linspace(0, 2 * pi, res, dtype=ftype)
+
+    def _rows(row):
+        # repeat a row to make it 2D
+        return numpy.repeat(row[numpy.newaxis, :], res, axis=0)
 
     # here is where we generate textures
     pi = numpy.pi
-    if patternType in (None, "none", "None", "color"):
-        res = 1
+    if patternType is None:
         intensity = numpy.ones([res, res], numpy.float32)
     elif patternType == "sin":
-        # NB 1j*res is a special mgrid notation
-        onePeriodX, onePeriodY = numpy.mgrid[0:res, 0:2 * pi:1j * res]
-        intensity = numpy.sin(onePeriodY - pi / 2)
+        intensity = _rows(numpy.sin(_onePeriod() - pi / 2))
     elif patternType == "sqr":  # square wave (symmetric duty cycle)
-        # NB 1j*res is a special mgrid notation
-        onePeriodX, onePeriodY = numpy.mgrid[0:res, 0:2 * pi:1j * res]
-        sinusoid = numpy.sin(onePeriodY - pi / 2)
-        intensity = numpy.where(sinusoid > 0, 1, -1)
+        sinusoid = numpy.sin(_onePeriod() - pi / 2)
+        intensity = _rows(numpy.where(sinusoid > 0, 1, -1))
     elif patternType == "saw":
-        intensity = \
-            numpy.linspace(-1.0, 1.0, res, endpoint=True) * numpy.ones([res, 1])
+        intensity = _rows(
+            numpy.linspace(-1.0, 1.0, res, endpoint=True, dtype=ftype))
     elif patternType == "tri":
         # -1:3 means the middle is at +1
-        intens = numpy.linspace(-1.0, 3.0, res, endpoint=True)
+        intens = numpy.linspace(-1.0, 3.0, res, endpoint=True, dtype=ftype)
         # remove from 3 to get back down to -1
         intens[res // 2 + 1:] = 2.0 - intens[res // 2 + 1:]
-        intensity = intens * numpy.ones([res, 1])  # make 2D
+        intensity = _rows(intens)  # make 2D
     elif patternType == "sinXsin":
-        # NB 1j*res is a special mgrid notation
-        onePeriodX, onePeriodY = numpy.mgrid[0:2 * pi:1j * res,
-                                             0:2 * pi:1j * res]
-        intensity = \
-            numpy.sin(onePeriodX - pi / 2) * numpy.sin(onePeriodY - pi / 2)
+        sinusoid = numpy.sin(_onePeriod() - pi / 2)
+        intensity = numpy.outer(sinusoid, sinusoid)
     elif patternType == "sqrXsqr":
-        # NB 1j*res is a special mgrid notation
-        onePeriodX, onePeriodY = numpy.mgrid[0:2 * pi:1j * res,
-                                             0:2 * pi:1j * res]
-        sinusoid = \
-            numpy.sin(onePeriodX - pi / 2) * numpy.sin(onePeriodY - pi / 2)
-        intensity = numpy.where(sinusoid > 0, 1, -1)
+        sinusoid = numpy.sin(_onePeriod() - pi / 2)
+        intensity = numpy.where(numpy.outer(sinusoid, sinusoid) > 0, 1, -1)
     elif patternType == "circle":
         rad = _makeRadialMatrix(res)
         intensity = (rad <= 1) * 2 - 1
@@ -396,13 +459,10 @@ def createLumPattern(patternType, res, texParams=None, maskParams=None):
         invVar = (1.0 / maskStdev) ** 2.0
         intensity = numpy.exp(-rad ** 2.0 / (2.0 * invVar)) * 2 - 1
     elif patternType == "cross":
-        X, Y = numpy.mgrid[-1:1:1j * res, -1:1:1j * res]
-        tfNegCross = (((X < -0.2) & (Y < -0.2)) |
-                      ((X < -0.2) & (Y > 0.2)) |
-                      ((X > 0.2) & (Y < -0.2)) |
-                      ((X > 0.2) & (Y > 0.2)))
-        # tfNegCross == True at places where the cross is transparent,
-        # i.e. the four corners
+        steps = numpy.linspace(-1, 1, res, dtype=ftype)
+        # True where the cross is transparent, i.e. the four corners
+        outside = (steps < -0.2) | (steps > 0.2)
+        tfNegCross = numpy.logical_and.outer(outside, outside)
         intensity = numpy.where(tfNegCross, -1, 1)
     elif patternType == "radRamp":  # a radial ramp
         rad = _makeRadialMatrix(res)
@@ -411,7 +471,8 @@ def createLumPattern(patternType, res, texParams=None, maskParams=None):
         intensity = numpy.where(rad < -1, intensity, -1)
     elif patternType == "raisedCos":  # A raised cosine
         hammingLen = 1000  # affects the 'granularity' of the raised cos
-        rad = _makeRadialMatrix(res)
+        # at double precision, as texels are assigned to the fringe by radius
+        rad = _makeRadialMatrix(res, ftype=numpy.float64)
         intensity = numpy.zeros_like(rad)
         intensity[numpy.where(rad < 1)] = 1
 
@@ -454,8 +515,10 @@ def createLumPattern(patternType, res, texParams=None, maskParams=None):
     else:
         raise ValueError("invalid keyword or value for parameter `patternType`")
 
-    return intensity
+    if dtype is not None:
+        intensity = intensity.astype(dtype, copy=False)
 
+    return intensity
 
 if __name__ == "__main__":
     pass
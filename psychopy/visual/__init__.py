@@ -28,16 +28,18 @@ from psychopy import event  # import before visual or
 from psychopy.visual import filters
 from psychopy.visual.backends import gamma
 # absolute essentials (nearly all experiments will need these)
-from .basevisual import BaseVisualStim
+from .basevisual import BaseVisualStim, prefetchImages
 # non-private helpers
-from .helpers import pointInPolygon, polygonsOverlap
+from .helpers import (pointInPolygon, pointsInPolygon, pointInPolygons,
+                      polygonsOverlap, polygonsIntersect, findOverlaps,
+                      tesselatePolygon, clearTesselateCache)
 from .image import ImageStim
 from .text import TextStim
 from .form import Form
 from .brush import Brush
 from .textbox2.textbox2 import TextBox2
 from .button import ButtonStim
-from .roi import ROI
+from .roi import ROI, ROIIndex
 from .target import TargetStim
 # window, should always be loaded first
 from .window import Window, getMsPerFrame, openWindows
@@ -65,7 +67,7 @@ from psychopy.visual.slider import Slider
 from psychopy.visual.simpleimage import SimpleImageStim
 
 # stimuli derived from BaseVisualStim
-from psychopy.visual.dot import DotStim
+from psychopy.visual.dot import DotStim, DotTrajectory
 from psychopy.visual.grating import GratingStim
 from psychopy.visual.secondorder import EnvelopeGrating
 from psychopy.visual.movies import MovieStim
@@ -31,6 +31,9 @@ import copy
 import sys
 import os
 import ctypes
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 from psychopy import logging
 
 # tools must only be imported *after* event or MovieStim breaks on win32
@@ -41,7 +44,9 @@ from psychopy.tools.attributetools import (attributeSetter, logAttrib,
 from psychopy.tools.monitorunittools import (cm2pix, deg2pix, pix2cm,
                                              pix2deg, convertToPix)
 from psychopy.visual.helpers import (pointInPolygon, polygonsOverlap,
-                                     setColor, findImageFile)
+                                     polygonsIntersect, setColor,
+                                     findImageFile)
+from psychopy.visual.helpers import _pointInPolygon, _pointsInPolygon
 from psychopy.tools.typetools import float_uint8
 from psychopy.tools.arraytools import makeRadialMatrix, createLumPattern
 from psychopy.tools.colorspacetools import dkl2rgb, lms2rgb  # pylint: disable=W0611
@@ -79,6 +84,221 @@ Typically subclass BaseVisualStim to create new visual stim classes, and add
 mixin(s) as needed to add functionality.
 """
 
+# Image files decoded into texture data are cached, most recently used first,
+# up to this many bytes so that images shown again (or prefetched with
+# `prefetchImages`) are only decoded once. Set to 0 to disable the cache.
+imageCacheSize = 512 * 1024 ** 2
+
+_imageCache = OrderedDict()
+_imageCacheLock = threading.Lock()
+_pendingImages = {}  # futures of images being decoded by `_imagePool`
+_imagePool = None
+
+_DecodedImage = namedtuple(
+    '_DecodedImage', ['intensity', 'size', 'wasLum', 'dataType', 'notSqr'])
+
+
+def clearImageCache():
+    """Remove all decoded images from the cache used for image textures.
+    """
+    with _imageCacheLock:
+        _imageCache.clear()
+
+
+def _imageCacheKey(filename, pixFormat, dataType, forcePOW2):
+    """Key for a decoded image, which changes if the file is modified."""
+    filename = os.path.abspath(str(filename))
+    stat = os.stat(filename)
+    return (filename, stat.st_mtime_ns, stat.st_size, pixFormat, dataType,
+            bool(forcePOW2))
+
+
+def _imageToIntensity(im, pixFormat, dataType, forcePOW2, name):
+    """Convert a (flipped) PIL image to an array of texture data, as
+    `TextureMixin._createTexture` needs it.
+
+    Returns the array, whether it's luminance only, the data type for the
+    texture and whether it's not a square power of two.
+    """
+    notSqr = False
+    # is it 1D?
+    if im.size[0] == 1 or im.size[1] == 1:
+        logging.error("Only 2D textures are supported at the moment")
+    else:
+        maxDim = max(im.size)
+        powerOf2 = int(2**numpy.ceil(numpy.log2(maxDim)))
+        if im.size[0] != powerOf2 or im.size[1] != powerOf2:
+            if not forcePOW2:
+                notSqr = True
+            elif globalVars.nImageResizes < reportNImageResizes:
+                msg = ("Image '%s' was not a square power-of-two ' "
+                       "'image. Linearly interpolating to be %ix%i")
+                logging.warning(msg % (name, powerOf2, powerOf2))
+                globalVars.nImageResizes += 1
+                im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
+            elif globalVars.nImageResizes == reportNImageResizes:
+                logging.warning("Multiple images have needed resizing"
+                                " - I'll stop bothering you!")
+                im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
+
+    # is it Luminance or RGB?
+    if pixFormat == GL.GL_ALPHA and im.mode != 'L':
+        # we have RGB and need Lum
+        wasLum = True
+        im = im.convert("L")  # force to intensity (need if was rgb)
+    elif im.mode == 'L':  # we have lum and no need to change
+        wasLum = True
+        dataType = GL.GL_FLOAT
+    elif pixFormat == GL.GL_RGB:
+        # we want RGB and might need to convert from CMYK or Lm
+        # texture = im.tostring("raw", "RGB", 0, -1)
+        im = im.convert("RGBA")
+        wasLum = False
+    else:
+        raise ValueError('cannot determine if image is luminance or RGB')
+
+    if dataType == GL.GL_FLOAT:
+        # convert from ubyte to float
+        # much faster to avoid division 2/255
+        intensity = numpy.array(im).astype(
+            numpy.float32) * 0.0078431372549019607 - 1.0
+    else:
+        intensity = numpy.array(im)
+
+    return intensity, wasLum, dataType, notSqr
+
+
+def _decodeImageFile(filename, pixFormat, dataType, forcePOW2):
+    """Read an image file into texture data, without using the cache.
+
+    Doesn't need an OpenGL context, so can be called from any thread.
+    """
+    try:
+        im = Image.open(filename)
+        im = im.transpose(Image.FLIP_TOP_BOTTOM)
+    except IOError:
+        msg = "Found file '%s', failed to load as an image"
+        logging.error(msg % (filename))
+        logging.flush()
+        raise IOError(msg % (filename))
+    intensity, wasLum, dataType, notSqr = _imageToIntensity(
+        im, pixFormat, dataType, forcePOW2, filename)
+    intensity.flags.writeable = False  # shared by all stimuli using the file
+    return _DecodedImage(intensity, im.size, wasLum, dataType, notSqr)
+
+
+def _cacheImage(key, decoded):
+    if decoded.intensity.nbytes > imageCacheSize:
+        return
+    with _imageCacheLock:
+        _imageCache[key] = decoded
+        cacheBytes = sum(d.intensity.nbytes for d in _imageCache.values())
+        while cacheBytes > imageCacheSize:
+            _, oldest = _imageCache.popitem(last=False)
+            cacheBytes -= oldest.intensity.nbytes
+
+
+def _getDecodedImage(filename, pixFormat, dataType, forcePOW2):
+    """Texture data for an image file, from the cache if possible, waiting
+    for it if it's being prefetched.
+    """
+    key = _imageCacheKey(filename, pixFormat, dataType, forcePOW2)
+    with _imageCacheLock:
+        if key in _imageCache:
+            _imageCache.move_to_end(key)
+            return _imageCache[key]
+        pending = _pendingImages.get(key)
+
+    if pending is not None:
+        try:
+            return pending.result()
+        except Exception:
+            pass  # decode it again below, to raise the error here
+
+    decoded = _decodeImageFile(filename, pixFormat, dataType, forcePOW2)
+    _cacheImage(key, decoded)
+    return decoded
+
+
+def _prefetchImage(key, filename, pixFormat, dataType, forcePOW2):
+    try:
+        decoded = _decodeImageFile(filename, pixFormat, dataType, forcePOW2)
+        _cacheImage(key, decoded)
+        return decoded
+    finally:
+        with _imageCacheLock:
+            _pendingImages.pop(key, None)
+
+
+def prefetchImages(images, pixFormat=GL.GL_RGB, dataType=GL.GL_UNSIGNED_BYTE,
+                   forcePOW2=False):
+    """Decode image files in background threads, ready to be used as
+    textures.
+
+    Decoded images are kept in a cache (see `imageCacheSize`), so setting
+    them as the image of a stimulus later only uploads them to the graphics
+    card. Call this with the images of the coming trials (e.g. during the
+    inter-trial interval) to avoid dropping frames when they're set. The
+    default arguments match the images of `~psychopy.visual.ImageStim`.
+
+    Parameters
+    ----------
+    images : list of str or Path
+        Image files to decode, found as they would be by `ImageStim`.
+    pixFormat : int
+        Pixel format of the textures, `GL_RGB` or `GL_ALPHA` (for masks).
+    dataType : int
+        `GL_UNSIGNED_BYTE` or `GL_FLOAT`.
+    forcePOW2 : bool
+        Resize images to be a square power of two.
+
+    Returns
+    -------
+    list of `~concurrent.futures.Future`
+        The decoded images, in the same order as `images`. Files that can't
+        be found or decoded give futures holding the error, which is raised
+        again when the image is set.
+
+    Examples
+    --------
+    Decode the images for the next trial while waiting::
+
+        visual.prefetchImages([nextTrial['face'], nextTrial['scene']])
+
+    """
+    global _imagePool
+    if _imagePool is None:
+        _imagePool = ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            thread_name_prefix='ImagePrefetch')
+
+    futures = []
+    for image in images:
+        future = Future()
+        try:
+            filename = findImageFile(image, checkResources=True)
+            if not filename:
+                raise IOError("Couldn't find image %s; check path? "
+                              "(tried: %s)" % (image, os.path.abspath(image)))
+            key = _imageCacheKey(filename, pixFormat, dataType, forcePOW2)
+        except Exception as err:
+            future.set_exception(err)
+            futures.append(future)
+            continue
+
+        with _imageCacheLock:
+            if key in _imageCache:
+                future.set_result(_imageCache[key])
+            elif key in _pendingImages:
+                future = _pendingImages[key]
+            else:
+                future = _pendingImages[key] = _imagePool.submit(
+                    _prefetchImage, key, filename, pixFormat, dataType,
+                    forcePOW2)
+        futures.append(future)
+
+    return futures
+
 
 class MinimalStim:
     """Non-visual methods and attributes for BaseVisualStim and RatingScale.
@@ -870,6 +1090,9 @@ class ContainerMixin:
         there is no .border. This method handles
         complex shapes, including concavities and self-crossings.
 
+        If given an Nx2 array of points, returns a boolean array with a value
+        for each of them.
+
         Note that, if your stimulus uses a mask (such as a Gaussian) then
         this is not accounted for by the `contains` method; the extent of the
         stimulus is determined purely by the size, position (pos), and
@@ -891,6 +1114,13 @@ class ContainerMixin:
             units = x.units
         elif type(x) in [list, tuple, numpy.ndarray]:
             xy = numpy.array(x)
+            if xy.ndim == 2:  # many points
+                if units is None:
+                    units = self.units
+                if units != 'pix':
+                    xy = convertToPix(xy, pos=(0, 0), units=units,
+                                      win=self.win)
+                return _pointsInPolygon(xy, self._containsPolygon(), self)
         else:
             xy = numpy.array((x, y))
         # try to work out what units x,y has
@@ -901,21 +1131,23 @@ class ContainerMixin:
                 units = self.units
         if units != 'pix':
             xy = convertToPix(xy, pos=(0, 0), units=units, win=self.win)
-        # ourself in pixels
+
+        return _pointInPolygon(xy[0], xy[1], self._containsPolygon(), self)
+
+    def _containsPolygon(self):
+        """The polygon used by `contains()`, in pixels."""
         if hasattr(self, 'border'):
-            poly = self._borderPix  # e.g., outline vertices
+            return self._borderPix  # e.g., outline vertices
         elif hasattr(self, 'boundingBox'):
             if abs(self.ori) > 0.1:
                 raise RuntimeError("TextStim.contains() doesn't currently "
                                    "support rotated text.")
             w, h = self.boundingBox  # e.g., outline vertices
             x, y = self.posPix
-            poly = numpy.array([[x+w/2, y-h/2], [x-w/2, y-h/2],
+            return numpy.array([[x+w/2, y-h/2], [x-w/2, y-h/2],
                                 [x-w/2, y+h/2], [x+w/2, y+h/2]])
         else:
-            poly = self.verticesPix  # e.g., tessellated vertices
-
-        return pointInPolygon(xy[0], xy[1], poly=poly)
+            return self.verticesPix  # e.g., tessellated vertices
 
     def overlaps(self, polygon):
         """Returns `True` if this stimulus intersects another one.
@@ -930,10 +1162,24 @@ class ContainerMixin:
         of the stimulus is determined purely by the size, pos, and
         orientation settings (and by the vertices for shape stimuli).
 
-        See coder demo, shapeContains.py
+        See coder demo, shapeContains.py, and `intersects()` for an exact
+        test.
         """
         return polygonsOverlap(self, polygon)
 
+    def intersects(self, polygon):
+        """Returns `True` if this stimulus intersects another one, exactly.
+
+        Like `overlaps()`, but also detects shapes whose edges cross without
+        either containing a vertex of the other (e.g. pointy shapes in a
+        crossed-swords configuration). As with `overlaps()`, a mask is not
+        accounted for.
+
+        To find the overlapping pairs among many stimuli, use
+        :func:`~psychopy.visual.helpers.findOverlaps`.
+        """
+        return polygonsIntersect(self, polygon)
+
 
 class TextureMixin:
     """Mixin class for visual stim that have textures.
@@ -1033,7 +1279,8 @@ class TextureMixin:
                 wrapping = True  # override any wrapping setting for None
 
             # compute array of intensity value for desired pattern
-            intensity = createLumPattern(tex, res, None, allMaskParams)
+            intensity = createLumPattern(tex, res, None, allMaskParams,
+                                         dtype=numpy.float32)
             wasLum = True
         else:
             if isinstance(tex, (str, Path)):
@@ -1044,15 +1291,8 @@ class TextureMixin:
                     logging.error(msg % (tex, os.path.abspath(tex)))
                     logging.flush()
                     raise IOError(msg % (tex, os.path.abspath(tex)))
-                try:
-                    im = Image.open(filename)
-                    im = im.transpose(Image.FLIP_TOP_BOTTOM)
-                except IOError:
-                    msg = "Found file '%s', failed to load as an image"
-                    logging.error(msg % (filename))
-                    logging.flush()
-                    msg = "Found file '%s' [= %s], failed to load as an image"
-                    raise IOError(msg % (tex, os.path.abspath(tex)))
+                # decoded (or prefetched) images are cached
+                im = _getDecodedImage(filename, pixFormat, dataType, forcePOW2)
             elif hasattr(tex, 'getVideoFrame'):  # camera or movie textures
                 # get an image to configure the initial texture store
                 frame = tex.getVideoFrame()
@@ -1080,49 +1320,12 @@ class TextureMixin:
             # at this point we have a valid im
             stim._origSize = im.size
             wasImage = True
-            # is it 1D?
-            if im.size[0] == 1 or im.size[1] == 1:
-                logging.error("Only 2D textures are supported at the moment")
-            else:
-                maxDim = max(im.size)
-                powerOf2 = int(2**numpy.ceil(numpy.log2(maxDim)))
-                if im.size[0] != powerOf2 or im.size[1] != powerOf2:
-                    if not forcePOW2:
-                        notSqr = True
-                    elif globalVars.nImageResizes < reportNImageResizes:
-                        msg = ("Image '%s' was not a square power-of-two ' "
-                               "'image. Linearly interpolating to be %ix%i")
-                        logging.warning(msg % (tex, powerOf2, powerOf2))
-                        globalVars.nImageResizes += 1
-                        im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
-                    elif globalVars.nImageResizes == reportNImageResizes:
-                        logging.warning("Multiple images have needed resizing"
-                                        " - I'll stop bothering you!")
-                        im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
-
-            # is it Luminance or RGB?
-            if pixFormat == GL.GL_ALPHA and im.mode != 'L':
-                # we have RGB and need Lum
-                wasLum = True
-                im = im.convert("L")  # force to intensity (need if was rgb)
-            elif im.mode == 'L':  # we have lum and no need to change
-                wasLum = True
-                dataType = GL.GL_FLOAT
-            elif pixFormat == GL.GL_RGB:
-                # we want RGB and might need to convert from CMYK or Lm
-                # texture = im.tostring("raw", "RGB", 0, -1)
-                im = im.convert("RGBA")
-                wasLum = False
-            else:
-                raise ValueError('cannot determine if image is luminance or RGB')
-
-            if dataType == GL.GL_FLOAT:
-                # convert from ubyte to float
-                # much faster to avoid division 2/255
-                intensity = numpy.array(im).astype(
-                    numpy.float32) * 0.0078431372549019607 - 1.0
+            if isinstance(im, _DecodedImage):
+                intensity, wasLum, dataType, notSqr = (
+                    im.intensity, im.wasLum, im.dataType, im.notSqr)
             else:
-                intensity = numpy.array(im)
+                intensity, wasLum, dataType, notSqr = _imageToIntensity(
+                    im, pixFormat, dataType, forcePOW2, tex)
 
         if pixFormat == GL.GL_RGB and wasLum and dataType == GL.GL_FLOAT:
             # grating stim on good machine
@@ -26,6 +26,8 @@ determines how they change on every call to the .draw() method.
 import pyglet
 pyglet.options['debug_gl'] = False
 import ctypes
+import json
+import threading
 GL = pyglet.gl
 
 import psychopy  # so we can get the __path__
@@ -235,6 +237,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
                                       autoLog=False)  # set at end of init
 
         self.nDots = nDots
+        self.__dict__['trajectory'] = None
         # pos and size are ambiguous for dots so DotStim explicitly has
         # fieldPos = pos, fieldSize=size and then dotSize as additional param
         self.fieldPos = fieldPos  # self.pos is also set here
@@ -485,6 +488,47 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         """
         setAttribute(self, 'speed', val, log, op)
 
+    @attributeSetter
+    def trajectory(self, trajectory):
+        """*None* or a :class:`DotTrajectory` of precomputed dot positions.
+        If set, each call to `draw()` presents the next frame of the
+        trajectory (holding the last one when it runs out) instead of
+        updating the dots. Setting it (again) starts from its first frame.
+        See `makeTrajectory()`.
+        """
+        if trajectory is not None and trajectory.nDots != self.nDots:
+            raise ValueError("DotStim.trajectory must have the same number of "
+                             "dots as the stimulus (%i)" % self.nDots)
+        self.__dict__['trajectory'] = trajectory
+        self._trajectoryFrameN = 0
+
+    def makeTrajectory(self, nFrames, seed=None, background=False):
+        """Precompute the positions of the dots over `nFrames` frames, with
+        the current settings of the stimulus.
+
+        Parameters
+        ----------
+        nFrames : int
+            Number of frames.
+        seed : int or None
+            Seed for the random number generator, to reproduce a trial
+            exactly. If `None`, a random seed is used (see
+            `DotTrajectory.seed`).
+        background : bool
+            If `True`, generate the frames in a background thread.
+
+        Returns
+        -------
+        DotTrajectory
+            The trajectories, to set as the `trajectory` of the stimulus.
+
+        """
+        return DotTrajectory(
+            self.nDots, nFrames, coherence=self.coherence, dir=self.dir,
+            speed=self.speed, dotLife=self.dotLife, fieldSize=self.fieldSize,
+            fieldShape=self.fieldShape, signalDots=self.signalDots,
+            noiseDots=self.noiseDots, seed=seed, background=background)
+
     def draw(self, win=None):
         """Draw the stimulus in its relevant window. You must call this method
         after every MyWin.flip() if you want the stimulus to appear on that
@@ -585,6 +629,15 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
     def _update_dotsXY(self):
         """The user shouldn't call this - its gets done within draw().
         """
+        if self.trajectory is not None:
+            # precomputed, so just copy in the positions for this frame
+            frameN = min(self._trajectoryFrameN, len(self.trajectory) - 1)
+            self._verticesBase[:] = self.trajectory.frame(frameN)
+            self._trajectoryFrameN += 1
+            self.vertices = self._verticesBase / self.fieldSize
+            self._updateVertices()
+            return
+
         # Find dead dots, update positions, get new positions for
         # dead and out-of-bounds
         # renew dead dots
@@ -664,3 +717,214 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
 
         # update the pixel XY coordinates in pixels (using _BaseVisual class)
         self._updateVertices()
+
+
+class DotTrajectory:
+    """Precomputed trajectories of a field of dots, for `DotStim`.
+
+    Generates the positions of all the dots on every frame of a trial ahead
+    of time, with the same update rules as `DotStim` and its own random
+    number generator. Drawing a frame then only needs the positions to be
+    copied, the dots of a trial can be reproduced exactly from its seed, and
+    kinematograms can be saved to disk and replayed.
+
+    Usually made with `DotStim.makeTrajectory()`, and given to the stimulus
+    with its `trajectory` attribute.
+
+    Parameters
+    ----------
+    nDots : int
+        Number of dots.
+    nFrames : int
+        Number of frames to generate (at least 1).
+    coherence, dir, speed, dotLife, fieldSize, fieldShape, signalDots, noiseDots
+        As for `DotStim`. `speed` and `fieldSize` are in the units of the
+        stimulus.
+    seed : int or None
+        Seed for the random number generator. If `None`, one is chosen at
+        random (and stored as `seed`, so the trial can be reproduced).
+    background : bool
+        If `True`, generate the frames in a background thread. Frames which
+        are asked for before they are ready are waited for, and an error
+        while generating them is raised when they are asked for.
+
+    Attributes
+    ----------
+    frames : ndarray
+        nFrames x nDots x 2 float32 array of the positions of the dots, in
+        the units of the stimulus, relative to the centre of the field.
+
+    Examples
+    --------
+    Present a reproducible trial, and save it::
+
+        dots.trajectory = dots.makeTrajectory(nFrames=120, seed=trialN)
+        for frameN in range(120):
+            dots.draw()
+            win.flip()
+        dots.trajectory.save('trial%i.npz' % trialN)
+
+    """
+    def __init__(self, nDots, nFrames, coherence=0.5, dir=0.0, speed=0.5,
+                 dotLife=3, fieldSize=(1.0, 1.0), fieldShape='sqr',
+                 signalDots='same', noiseDots='direction', seed=None,
+                 background=False):
+        if int(nFrames) < 1:
+            raise ValueError('DotTrajectory needs at least 1 frame, not %s'
+                             % nFrames)
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+        self.params = dict(
+            nDots=int(nDots), nFrames=int(nFrames), coherence=float(coherence),
+            dir=float(dir), speed=float(speed), dotLife=int(dotLife),
+            fieldSize=[float(v) for v in val2array(fieldSize, False)],
+            fieldShape=fieldShape, signalDots=signalDots, noiseDots=noiseDots,
+            seed=int(seed))
+        self.frames = np.empty((nFrames, nDots, 2), dtype=np.float32)
+        self._generated = 0
+        self._error = None  # raised by `wait()` if generating failed
+        self._ready = threading.Condition()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._generateInBackground,
+                                            daemon=True)
+            self._thread.start()
+        else:
+            self._generate()
+
+    @property
+    def seed(self):
+        """Seed of the random number generator the dots were made with."""
+        return self.params['seed']
+
+    @property
+    def nFrames(self):
+        return len(self.frames)
+
+    @property
+    def nDots(self):
+        return self.frames.shape[1]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, frameN):
+        """Get the positions of the dots on a frame, as an nDots x 2 array,
+        waiting for it to be generated if need be."""
+        if frameN >= self._generated:
+            self.wait(frameN + 1)
+        return self.frames[frameN]
+
+    def wait(self, nFrames=None):
+        """Wait until `nFrames` (by default, all) have been generated."""
+        if nFrames is None:
+            nFrames = len(self.frames)
+        with self._ready:
+            self._ready.wait_for(lambda: self._generated >= nFrames or
+                                 self._error is not None)
+            if self._generated < nFrames:
+                raise self._error
+
+    def save(self, filename):
+        """Save the trajectories and the parameters they were made with to a
+        `.npz` file, to `load()` later."""
+        self.wait()
+        np.savez(filename, frames=self.frames,
+                 params=np.array(json.dumps(self.params)))
+
+    @classmethod
+    def load(cls, filename):
+        """Load trajectories saved with `save()`."""
+        with np.load(filename, allow_pickle=False) as data:
+            traj = cls.__new__(cls)
+            traj.params = json.loads(str(data['params']))
+            traj.frames = data['frames']
+        traj._generated = len(traj.frames)
+        traj._error = None
+        traj._ready = threading.Condition()
+        traj._thread = None
+        return traj
+
+    def _newDotsXY(self, rng, nDots):
+        """As `DotStim._newDotsXY`, using `rng`."""
+        fieldSize = np.asarray(self.params['fieldSize'])
+        if self.params['fieldShape'] == 'circle':
+            length = np.sqrt(rng.uniform(0, 1, (nDots,)))
+            angle = rng.uniform(0., _2pi, (nDots,))
+            newDots = np.empty((nDots, 2))
+            newDots[:, 0] = length * np.cos(angle)
+            newDots[:, 1] = length * np.sin(angle)
+            return newDots * fieldSize * .5
+        return rng.uniform(-0.5, 0.5, size=(nDots, 2)) * fieldSize
+
+    def _generateInBackground(self):
+        try:
+            self._generate()
+        except Exception as err:
+            with self._ready:
+                self._error = err
+                self._ready.notify_all()
+
+    def _generate(self):
+        """Generate the frames, with the update rules of
+        `DotStim._update_dotsXY`."""
+        p = self.params
+        rng = np.random.default_rng(p['seed'])
+        nDots, speed, dotLife = p['nDots'], p['speed'], p['dotLife']
+        fieldSize = np.asarray(p['fieldSize'])
+        signalDir = p['dir'] * _piOver180
+
+        xy = self._newDotsXY(rng, nDots)
+        dotsLife = abs(dotLife) * rng.random(nDots)
+        signal = np.zeros(nDots, dtype=bool)
+        signal[:int(round(p['coherence'] * nDots))] = True
+        dotsDir = rng.random(nDots) * _2pi
+        dotsDir[signal] = signalDir
+        cosDir, sinDir = np.cos(dotsDir), np.sin(dotsDir)
+
+        for frameN in range(len(self.frames)):
+            if dotLife > 0:
+                dotsLife -= 1
+                dead = dotsLife <= 0
+                dotsLife[dead] = dotLife
+            else:
+                dead = np.zeros(nDots, dtype=bool)
+
+            if p['signalDots'] == 'different':
+                order = rng.permutation(nDots)
+                dotsDir, cosDir, sinDir = (
+                    dotsDir[order], cosDir[order], sinDir[order])
+                signal = dotsDir == signalDir
+
+            if p['noiseDots'] == 'walk':
+                noise = ~signal
+                dotsDir[noise] = rng.random(noise.sum()) * _2pi
+                cosDir[noise] = np.cos(dotsDir[noise])
+                sinDir[noise] = np.sin(dotsDir[noise])
+                xy[:, 0] += speed * cosDir
+                xy[:, 1] += speed * sinDir
+            elif p['noiseDots'] == 'direction':
+                xy[:, 0] += speed * cosDir
+                xy[:, 1] += speed * sinDir
+            elif p['noiseDots'] == 'position':
+                xy[signal, 0] += speed * cosDir[signal]
+                xy[signal, 1] += speed * sinDir[signal]
+                dead |= ~signal
+
+            if p['fieldShape'] in (None, 'square', 'sqr'):
+                outOfBounds = (np.abs(xy) > .5 * fieldSize).any(axis=1)
+            else:
+                normXY = xy / .5 / fieldSize
+                outOfBounds = np.hypot(normXY[:, 0], normXY[:, 1]) > 1.
+
+            nDead = dead.sum()
+            if nDead:
+                xy[dead] = self._newDotsXY(rng, nDead)
+            nOutOfBounds = outOfBounds.sum()
+            if nOutOfBounds:
+                xy[outOfBounds] = self._newDotsXY(rng, nOutOfBounds)
+
+            self.frames[frameN] = xy
+            with self._ready:
+                self._generated = frameN + 1
+                self._ready.notify_all()
@@ -37,6 +37,223 @@ from . import globalVars
 import numpy
 
 
+# units which convertToPix scales linearly, so the conversion can be applied
+# to the vertex buffer in place
+_linearUnits = ('pix', 'pixels', 'norm', 'height', 'cm', 'deg', 'degs')
+
+
+class _ElementBuffers:
+    """The float32 arrays given to OpenGL by `ElementArrayStim`: vertices,
+    colors and texture coordinates for the 4 corners of each element.
+
+    The arrays are allocated once and updated in place. The inputs used for
+    the last update of each array are kept, so only the range of elements
+    whose inputs have changed since then is recomputed (e.g. if only some
+    elements move). The computations use preallocated scratch arrays (other
+    than for units which aren't converted linearly to pixels).
+    """
+    def __init__(self, nElements):
+        self.nElements = nElements
+        self.vertices = numpy.zeros((nElements, 4, 3), numpy.float32)
+        self.rgba = numpy.zeros((nElements, 4, 4), numpy.float32)
+        self.texCoords = numpy.zeros((nElements, 4, 2), numpy.float32)
+        self.maskCoords = numpy.empty((nElements, 4, 2), numpy.float32)
+        self.maskCoords[:] = [[1, 0], [0, 0], [0, 1], [1, 1]]
+        self._scratch = numpy.empty((6, nElements))
+        self._scratch32 = numpy.empty((6, nElements), numpy.float32)
+        self._applied = {}
+
+    def _changedRange(self, *inputs):
+        """Get the range (start, stop) of elements for which any of the
+        (name, value) `inputs` differ from those last applied, or None."""
+        start, stop = self.nElements, 0
+        for name, value in inputs:
+            applied = self._applied.get(name)
+            if applied is None or applied.shape != value.shape:
+                return 0, self.nElements
+            if value.ndim == 0 or len(value) != self.nElements:
+                if (applied != value).any():  # applies to all the elements
+                    return 0, self.nElements
+                continue
+            if value.ndim > 1:  # compare per element, one column at a time
+                columns = value.reshape((self.nElements, -1)).T
+                appliedColumns = applied.reshape((self.nElements, -1)).T
+                changed = appliedColumns[0] != columns[0]
+                for appliedColumn, column in zip(appliedColumns[1:],
+                                                 columns[1:]):
+                    changed |= appliedColumn != column
+            else:
+                changed = applied != value
+            if changed.any():
+                start = min(start, int(changed.argmax()))
+                stop = max(stop, self.nElements - int(changed[::-1].argmax()))
+        return (start, stop) if start < stop else None
+
+    def _commit(self, dirty, *inputs):
+        """Store the inputs applied to the `dirty` range of elements."""
+        start, stop = dirty
+        for name, value in inputs:
+            applied = self._applied.get(name)
+            if (applied is None or applied.shape != value.shape or
+                    value.ndim == 0 or len(value) != self.nElements):
+                self._applied[name] = numpy.array(value)
+            else:
+                applied[start:stop] = value[start:stop]
+
+    def updateVertices(self, xys, fieldPos, sizes, oris, units, win):
+        """Update the vertices (in pixels) of any elements which have moved,
+        rotated or changed size. Returns `True` if any were updated."""
+        if units in _linearUnits:
+            scale = convertToPix(vertices=numpy.ones(2), pos=numpy.zeros(2),
+                                 units=units, win=win)
+        else:
+            # not linear, so always convert (NaN never matches the last one)
+            scale = numpy.array(numpy.nan)
+        inputs = (('xys', numpy.asarray(xys, dtype=float)),
+                  ('oris', numpy.asarray(oris, dtype=float)),
+                  ('sizes', numpy.asarray(sizes, dtype=float)),
+                  ('fieldPos', numpy.asarray(fieldPos, dtype=float)),
+                  ('scale', numpy.asarray(scale, dtype=float)),
+                  ('units', numpy.array(units)))
+        dirty = self._changedRange(*inputs)
+        if dirty is None:
+            return False
+        start, stop = dirty
+        n = stop - start
+        a, b, c, d, px, py = self._scratch[:, :n]
+        xys = inputs[0][1][start:stop]
+        oris = inputs[1][1][start:stop]
+        sizes = inputs[2][1][start:stop]
+
+        # corners relative to the centroids: x is (a, b, -a, -b) and y is
+        # (c, d, -c, -d), from the width (w) and height (h) vectors
+        numpy.multiply(oris, numpy.pi / 180, out=px)
+        numpy.cos(px, out=py)  # cos
+        numpy.sin(px, out=px)  # sin
+        numpy.multiply(sizes[:, 0], py, out=a)  # -2 * wx
+        numpy.multiply(sizes[:, 1], px, out=b)  # 2 * hx
+        numpy.multiply(sizes[:, 0], px, out=c)  # 2 * wy
+        numpy.multiply(sizes[:, 1], py, out=d)  # 2 * hy
+        numpy.subtract(a, b, out=px)  # -wx - hx, doubled
+        numpy.add(a, b, out=b)
+        numpy.negative(b, out=b)  # wx - hx, doubled
+        numpy.multiply(px, 0.5, out=a)
+        b *= 0.5
+        numpy.add(c, d, out=px)
+        numpy.subtract(c, d, out=d)  # wy - hy, doubled
+        numpy.multiply(px, -0.5, out=c)  # -wy - hy
+        d *= 0.5
+
+        verts = self.vertices[start:stop]
+        if numpy.isnan(scale).any():
+            # positions and vertices have to be converted separately
+            corners = numpy.empty((n, 4, 2))
+            corners[:, 0, 0], corners[:, 1, 0] = a, b
+            corners[:, 2, 0], corners[:, 3, 0] = -a, -b
+            corners[:, 0, 1], corners[:, 1, 1] = c, d
+            corners[:, 2, 1], corners[:, 3, 1] = -c, -d
+            positions = (xys + fieldPos).repeat(4, 0)
+            verts[:, :, :2] = convertToPix(
+                vertices=corners.reshape((-1, 2)), pos=positions, units=units,
+                win=win).reshape((n, 4, 2))
+        else:
+            # scale to pixels before writing each corner into the buffer
+            numpy.add(xys[:, 0], fieldPos[0], out=px)
+            numpy.add(xys[:, 1], fieldPos[1], out=py)
+            for values, axisScale in ((px, scale[0]), (a, scale[0]),
+                                      (b, scale[0]), (py, scale[1]),
+                                      (c, scale[1]), (d, scale[1])):
+                values *= axisScale
+            # (writing float32 into the interleaved buffer is faster)
+            scratch32 = self._scratch32[:, :n]
+            scratch32[:] = self._scratch[:, :n]
+            a, b, c, d, px, py = scratch32
+            for corner, x, y in ((0, a, c), (1, b, d)):
+                numpy.add(px, x, out=verts[:, corner, 0])
+                numpy.add(py, y, out=verts[:, corner, 1])
+                numpy.subtract(px, x, out=verts[:, corner + 2, 0])
+                numpy.subtract(py, y, out=verts[:, corner + 2, 1])
+        self._commit(dirty, *inputs)
+        return True
+
+    def updateDepths(self, depths, fieldDepth):
+        """Update the depths of the vertices if they've changed."""
+        depths = numpy.asarray(depths + fieldDepth, dtype=float)
+        dirty = self._changedRange(('depths', depths))
+        if dirty is None:
+            return False
+        start, stop = dirty
+        if depths.ndim and len(depths) == self.nElements:
+            self.vertices[start:stop, :, 2] = depths[start:stop, None]
+        else:
+            self.vertices[:, :, 2] = depths.reshape((-1, 1))[:, :1]
+        self._commit(dirty, ('depths', depths))
+        return True
+
+    def updateColors(self, rgba, opacities):
+        """Update the colors of any elements whose color or opacity has
+        changed. `rgba` is a single color or one for each element; the alpha
+        is replaced by `opacities`."""
+        rgba = numpy.asarray(rgba, dtype=float)
+        inputs = (('rgb', rgba[..., :3]),
+                  ('opacities', numpy.asarray(opacities, dtype=float)))
+        dirty = self._changedRange(*inputs)
+        if dirty is None:
+            return False
+        start, stop = dirty
+        if rgba.ndim > 1 and len(rgba) == self.nElements:
+            self.rgba[start:stop, :, :3] = rgba[start:stop, None, :3]
+        else:
+            self.rgba[start:stop, :, :3] = rgba.reshape((-1, 4))[0, :3]
+        opacities = inputs[1][1]
+        if opacities.ndim and len(opacities) == self.nElements:
+            self.rgba[start:stop, :, 3] = opacities.reshape(
+                (self.nElements, -1))[start:stop, :1]
+        else:
+            self.rgba[start:stop, :, 3] = opacities.reshape(-1)[0]
+        self._commit(dirty, *inputs)
+        return True
+
+    def updateTexCoords(self, sfs, phases, sizes=None):
+        """Update the texture coordinates of any elements whose spatial
+        frequency or phase (or size, if given, for sfs per unit rather than
+        per element) has changed."""
+        inputs = [('sfs', numpy.asarray(sfs, dtype=float)),
+                  ('phases', numpy.asarray(phases, dtype=float))]
+        if sizes is not None:
+            inputs.append(('texSizes', numpy.asarray(sizes, dtype=float)))
+        else:
+            inputs.append(('texSizes', numpy.zeros(0)))
+        dirty = self._changedRange(*inputs)
+        if dirty is None:
+            return False
+        start, stop = dirty
+        n = stop - start
+        halfX, halfY, centreX, centreY = self._scratch[:4, :n]
+        sfs = inputs[0][1][start:stop]
+        phases = inputs[1][1][start:stop]
+        numpy.multiply(sfs[:, 0], 0.5, out=halfX)
+        numpy.multiply(sfs[:, 1], 0.5, out=halfY)
+        if sizes is not None:
+            halfX *= inputs[2][1][start:stop, 0]
+            halfY *= inputs[2][1][start:stop, 1]
+        numpy.subtract(0.5, phases[:, 0], out=centreX)
+        numpy.subtract(0.5, phases[:, 1], out=centreY)
+
+        # corners are (R, B), (L, B), (L, T), (R, T)
+        coords = self.texCoords[start:stop]
+        numpy.add(centreX, halfX, out=coords[:, 0, 0])
+        numpy.subtract(centreY, halfY, out=coords[:, 0, 1])
+        numpy.subtract(centreX, halfX, out=coords[:, 1, 0])
+        coords[:, 1, 1] = coords[:, 0, 1]
+        coords[:, 2, 0] = coords[:, 1, 0]
+        numpy.add(centreY, halfY, out=coords[:, 2, 1])
+        coords[:, 3, 0] = coords[:, 0, 0]
+        coords[:, 3, 1] = coords[:, 2, 1]
+        self._commit(dirty, *inputs)
+        return True
+
+
 class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
     """This stimulus class defines a field of elements whose behaviour can
     be independently controlled. Suitable for creating 'global form' stimuli
@@ -108,6 +325,7 @@ class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
             self.units = win.units
         self.__dict__['fieldShape'] = fieldShape
         self.nElements = nElements
+        self._buffers = _ElementBuffers(nElements)
         # info for each element
         self.__dict__['sizes'] = sizes
         self.verticesBase = xys
@@ -521,11 +739,11 @@ class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
         # GL.glLoadIdentity()
         self.win.setScale('pix')
 
-        cpcd = ctypes.POINTER(ctypes.c_double)
-        GL.glColorPointer(4, GL.GL_DOUBLE, 0,
-                          self._RGBAs.ctypes.data_as(cpcd))
-        GL.glVertexPointer(3, GL.GL_DOUBLE, 0,
-                           self.verticesPix.ctypes.data_as(cpcd))
+        cpcf = ctypes.POINTER(ctypes.c_float)
+        GL.glColorPointer(4, GL.GL_FLOAT, 0,
+                          self._RGBAs.ctypes.data_as(cpcf))
+        GL.glVertexPointer(3, GL.GL_FLOAT, 0,
+                           self.verticesPix.ctypes.data_as(cpcf))
 
         # setup the shaderprogram
         _prog = self.win._progSignedTexMask
@@ -545,10 +763,10 @@ class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
 
         # setup client texture coordinates first
         GL.glClientActiveTexture(GL.GL_TEXTURE0)
-        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0, self._texCoords.ctypes)
+        GL.glTexCoordPointer(2, GL.GL_FLOAT, 0, self._texCoords.ctypes)
         GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
         GL.glClientActiveTexture(GL.GL_TEXTURE1)
-        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0, self._maskCoords.ctypes)
+        GL.glTexCoordPointer(2, GL.GL_FLOAT, 0, self._maskCoords.ctypes)
         GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
 
         GL.glEnableClientState(GL.GL_COLOR_ARRAY)
@@ -575,52 +793,25 @@ class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
     def _updateVertices(self):
         """Sets Stim.verticesPix from fieldPos.
         """
-
-        # Handle the orientation, size and location of
-        # each element in native units
-
-        radians = 0.017453292519943295
-
-        # so we can do matrix rotation of coords we need shape=[n*4,3]
-        # but we'll convert to [n,4,3] after matrix math
-        verts = numpy.zeros([self.nElements * 4, 3], 'd')
-        wx = -self.sizes[:, 0] * numpy.cos(self.oris[:] * radians) / 2
-        wy = self.sizes[:, 0] * numpy.sin(self.oris[:] * radians) / 2
-        hx = self.sizes[:, 1] * numpy.sin(self.oris[:] * radians) / 2
-        hy = self.sizes[:, 1] * numpy.cos(self.oris[:] * radians) / 2
-
-        # X vals of each vertex relative to the element's centroid
-        verts[0::4, 0] = -wx - hx
-        verts[1::4, 0] = +wx - hx
-        verts[2::4, 0] = +wx + hx
-        verts[3::4, 0] = -wx + hx
-
-        # Y vals of each vertex relative to the element's centroid
-        verts[0::4, 1] = -wy - hy
-        verts[1::4, 1] = +wy - hy
-        verts[2::4, 1] = +wy + hy
-        verts[3::4, 1] = -wy + hy
-
-        # set of positions across elements
-        positions = self.xys + self.fieldPos
-
-        # depth
-        verts[:, 2] = self.depths + self.fieldDepth
-        # rotate, translate, scale by units
-        if positions.shape[0] * 4 == verts.shape[0]:
-            positions = positions.repeat(4, 0)
-        verts[:, :2] = convertToPix(vertices=verts[:, :2], pos=positions,
-                                    units=self.units, win=self.win)
-        verts = verts.reshape([self.nElements, 4, 3])
-
-        # assign to self attribute; make sure it's contiguous
-        self.__dict__['verticesPix'] = numpy.require(verts,
-                                                     requirements=['C'])
+        # Handle the orientation, size and location of each element; only
+        # the elements which have changed are updated, in place
+        buffers = self._getBuffers()
+        buffers.updateVertices(self.xys, self.fieldPos, self.sizes, self.oris,
+                               self.units, self.win)
+        buffers.updateDepths(self.depths, self.fieldDepth)
+        self.__dict__['verticesPix'] = buffers.vertices
         self._needVertexUpdate = False
 
+    def _getBuffers(self):
+        """The vertex, color and texture coordinate buffers, (re)allocated if
+        the number of elements has changed."""
+        if self._buffers.nElements != self.nElements:
+            self._buffers = _ElementBuffers(self.nElements)
+        return self._buffers
+
     # ----------------------------------------------------------------------
     def updateElementColors(self):
-        """Create a new array of self._RGBAs based on self.rgbs.
+        """Update self._RGBAs based on self.rgbs.
 
         Not needed by the user (simple call setColors())
 
@@ -628,45 +819,23 @@ class ElementArrayStim(MinimalStim, TextureMixin, ColorMixin):
         element so this function also converts them to be one for
         each vertex of each element.
         """
-        N = self.nElements
-        _RGBAs = numpy.zeros([len(self.verticesPix), 4], 'd')
-        _RGBAs[:,:] = self._colors.render('rgba1')
-        _RGBAs[:, -1] = self.opacities.reshape([N, ])
-        self._RGBAs = _RGBAs.reshape([len(self.verticesPix), 1, 4]).repeat(4, 1)
+        buffers = self._getBuffers()
+        buffers.updateColors(self._colors.render('rgba1'), self.opacities)
+        self._RGBAs = buffers.rgba
         self._needColorUpdate = False
 
     def updateTextureCoords(self):
-        """Create a new array of self._maskCoords
+        """Update self._texCoords and self._maskCoords
         """
-
-        N = self.nElements
-        self._maskCoords = numpy.array([[1, 0], [0, 0], [0, 1], [1, 1]],
-                                       'd').reshape([1, 4, 2])
-        self._maskCoords = self._maskCoords.repeat(N, 0)
-
-        # for the main texture
-        # sf is dependent on size (openGL default)
+        buffers = self._getBuffers()
+        # sf is dependent on size (openGL default) unless we scale to become
+        # independent of size
         if self.units in ['norm', 'pix', 'height']:
-            L = (-self.sfs[:, 0] / 2) - self.phases[:, 0] + 0.5
-            R = (+self.sfs[:, 0] / 2) - self.phases[:, 0] + 0.5
-            T = (+self.sfs[:, 1] / 2) - self.phases[:, 1] + 0.5
-            B = (-self.sfs[:, 1] / 2) - self.phases[:, 1] + 0.5
+            buffers.updateTexCoords(self.sfs, self.phases)
         else:
-            # we should scale to become independent of size
-            L = (-self.sfs[:, 0] * self.sizes[:, 0] / 2
-                 - self.phases[:, 0] + 0.5)
-            R = (+self.sfs[:, 0] * self.sizes[:, 0] / 2
-                 - self.phases[:, 0] + 0.5)
-            T = (+self.sfs[:, 1] * self.sizes[:, 1] / 2
-                 - self.phases[:, 1] + 0.5)
-            B = (-self.sfs[:, 1] * self.sizes[:, 1] / 2
-                 - self.phases[:, 1] + 0.5)
-
-        # self._texCoords=numpy.array([[1,1],[1,0],[0,0],[0,1]],
-        #           'd').reshape([1,4,2])
-        self._texCoords = (numpy.concatenate([[R, B], [L, B], [L, T], [R, T]])
-            .transpose().reshape([N, 4, 2]).astype('d'))
-        self._texCoords = numpy.ascontiguousarray(self._texCoords)
+            buffers.updateTexCoords(self.sfs, self.phases, self.sizes)
+        self._maskCoords = buffers.maskCoords
+        self._texCoords = buffers.texCoords
         self._needTexCoordUpdate = False
 
     @attributeSetter
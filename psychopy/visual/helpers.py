@@ -10,6 +10,7 @@
 
 import os
 import copy
+from collections import OrderedDict
 from pkg_resources import parse_version
 from pathlib import Path
 from psychopy import logging, colors, prefs
@@ -21,6 +22,7 @@ from psychopy.tools import filetools as ft
 from psychopy.tools.arraytools import val2array
 from psychopy.tools.attributetools import setAttribute
 from psychopy.tools.filetools import pathToString
+from psychopy.tools.monitorunittools import convertToPix
 
 import numpy as np
 
@@ -40,19 +42,62 @@ except Exception:
     haveMatplotlib = False
 
 
-def pointInPolygon(x, y, poly):
-    """Determine if a point is inside a polygon; returns True if inside.
+_mplVersionChecks = {}
 
-    (`x`, `y`) is the point to test. `poly` is a list of 3 or more vertices
-    as (x,y) pairs. If given an object, such as a `ShapeStim`, will try to
-    use its vertices and position as the polygon.
 
-    Same as the `.contains()` method elsewhere.
+def _useMplPath():
+    """`True` if matplotlib `Path` objects can be used (matplotlib > 1.2)."""
+    version = matplotlib.__version__
+    try:
+        return _mplVersionChecks[version]
+    except KeyError:
+        useIt = parse_version(version) > parse_version('1.2')
+        _mplVersionChecks[version] = useIt
+        return useIt
+
+
+def _polygonPath(poly, cacheOwner=None):
+    """Get a matplotlib `Path` for a polygon.
+
+    If `cacheOwner` (e.g. the stimulus the polygon came from) is given, the
+    path is stored on it and reused until it's called with other vertices.
+    Stimuli make new vertex arrays when their vertices, pos, size or ori
+    change, so the path is only built again when needed.
     """
-    try:  # do this using try:...except rather than hasattr() for speed
-        poly = poly.verticesPix  # we want to access this only once
-    except Exception:
-        pass
+    if cacheOwner is None:
+        return mplPath(poly)
+    cached = cacheOwner.__dict__.get('_polygonPathCache')
+    if cached is not None:
+        cachedPoly, path = cached
+        if cachedPoly is poly or (
+                len(cachedPoly) == len(poly) and
+                np.array_equal(cachedPoly, poly)):
+            return path
+    path = mplPath(poly)
+    cacheOwner.__dict__['_polygonPathCache'] = (poly, path)
+    return path
+
+
+def _rayCastPoints(points, poly):
+    """Test Nx2 points against a polygon with the same (even-odd) rule as the
+    pure python fallback of `pointInPolygon`, for all the points at once.
+    """
+    points = np.asarray(points, dtype=float).reshape((-1, 2))
+    poly = np.asarray(poly, dtype=float)
+    x, y = points[:, :1], points[:, 1:]
+    p1x, p1y = np.roll(poly, 1, axis=0).T
+    p2x, p2y = poly.T
+    crossed = ((y > np.minimum(p1y, p2y)) & (y <= np.maximum(p1y, p2y)) &
+               (x <= np.maximum(p1x, p2x)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xints = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+    crossed &= (p1x == p2x) | (x <= xints)
+    return np.count_nonzero(crossed, axis=1) % 2 == 1
+
+
+def _pointInPolygon(x, y, poly, cacheOwner=None):
+    """`pointInPolygon` for a polygon in vertices, optionally caching the
+    compiled polygon on `cacheOwner`."""
     nVert = len(poly)
     if nVert < 3:
         msg = 'pointInPolygon expects a polygon with 3 or more vertices'
@@ -61,8 +106,8 @@ def pointInPolygon(x, y, poly):
 
     # faster if have matplotlib tools:
     if haveMatplotlib:
-        if parse_version(matplotlib.__version__) > parse_version('1.2'):
-            return mplPath(poly).contains_point([x, y])
+        if _useMplPath():
+            return _polygonPath(poly, cacheOwner).contains_point([x, y])
         else:
             try:
                 return bool(nxutils.pnpoly(x, y, poly))
@@ -86,6 +131,185 @@ def pointInPolygon(x, y, poly):
     return inside
 
 
+def _pointsInPolygon(points, poly, cacheOwner=None):
+    """`pointsInPolygon` for a polygon in vertices, optionally caching the
+    compiled polygon on `cacheOwner`."""
+    points = np.asarray(points, dtype=float).reshape((-1, 2))
+    if len(poly) < 3:
+        msg = 'pointsInPolygon expects a polygon with 3 or more vertices'
+        logging.warning(msg)
+        return np.zeros(len(points), dtype=bool)
+
+    if haveMatplotlib:
+        if _useMplPath():
+            return _polygonPath(poly, cacheOwner).contains_points(points)
+        else:
+            try:
+                return np.asarray(nxutils.points_inside_poly(points, poly),
+                                  dtype=bool)
+            except Exception:
+                pass
+
+    return _rayCastPoints(points, poly)
+
+
+def pointInPolygon(x, y, poly):
+    """Determine if a point is inside a polygon; returns True if inside.
+
+    (`x`, `y`) is the point to test. `poly` is a list of 3 or more vertices
+    as (x,y) pairs. If given an object, such as a `ShapeStim`, will try to
+    use its vertices and position as the polygon.
+
+    Same as the `.contains()` method elsewhere. To test many points, use
+    `pointsInPolygon`, or `pointInPolygons` for many polygons.
+    """
+    cacheOwner = None
+    try:  # do this using try:...except rather than hasattr() for speed
+        poly, cacheOwner = poly.verticesPix, poly  # we want to access this only once
+    except Exception:
+        pass
+    return _pointInPolygon(x, y, poly, cacheOwner)
+
+
+def pointsInPolygon(points, poly):
+    """Determine which of a set of points are inside a polygon.
+
+    Like `pointInPolygon`, but tests all the points in a single call, which is
+    much faster than testing them one at a time (e.g. for gaze samples).
+
+    Parameters
+    ----------
+    points : array_like
+        Nx2 array of (x, y) points to test.
+    poly : array_like or object
+        Polygon as a list of 3 or more (x, y) vertices, or a stimulus whose
+        `verticesPix` are used (the points should then be in pixels). The
+        polygon of a stimulus is compiled once and reused until its vertices
+        change.
+
+    Returns
+    -------
+    ndarray
+        Boolean array of length N, `True` for points inside the polygon.
+
+    """
+    cacheOwner = None
+    try:  # do this using try:...except rather than hasattr() for speed
+        poly, cacheOwner = poly.verticesPix, poly
+    except Exception:
+        pass
+    return _pointsInPolygon(points, poly, cacheOwner)
+
+
+_polygonEdgesCache = [None]
+
+
+def _polygonEdges(polys):
+    """Get the edges of all the polygons, for ray casting, as arrays of
+    (yMin, yMax, xMax, x1, y1, dxdy, vertical, owners), where `owners` is
+    the index of the polygon each edge belongs to. Polygons with fewer than 3
+    vertices are left out.
+
+    The edges of the last set of polygons are kept, with a copy of their
+    vertices, and reused if called with the same vertices again. Comparing
+    the vertices is much quicker than working out the edges, and unlike
+    checking the arrays are the same objects it also catches arrays that
+    were changed in place.
+    """
+    cached = _polygonEdgesCache[0]
+    if cached is not None and len(cached[0]) == len(polys) and all(
+            a.shape == np.shape(b) and np.array_equal(a, b)
+            for a, b in zip(cached[0], polys)):
+        return cached[1]
+
+    edgeStarts, edgeEnds, owners = [], [], []
+    for ii, poly in enumerate(polys):
+        poly = np.asarray(poly, dtype=float)
+        if len(poly) < 3:
+            continue  # lines and points can't contain anything
+        edgeStarts.append(np.roll(poly, 1, axis=0))
+        edgeEnds.append(poly)
+        owners.append(np.full(len(poly), ii))
+    if owners:
+        p1x, p1y = np.concatenate(edgeStarts).T
+        p2x, p2y = np.concatenate(edgeEnds).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dxdy = (p2x - p1x) / (p2y - p1y)
+        edges = (np.minimum(p1y, p2y), np.maximum(p1y, p2y),
+                 np.maximum(p1x, p2x), p1x, p1y, dxdy, p1x == p2x,
+                 np.concatenate(owners))
+    else:
+        edges = (None,) * 7 + (np.zeros(0, dtype=int),)
+    if all(isinstance(poly, np.ndarray) for poly in polys):
+        _polygonEdgesCache[0] = ([poly.copy() for poly in polys], edges)
+    return edges
+
+
+def pointInPolygons(x, y, polys, units='pix', win=None):
+    """Determine which of a set of polygons (or stimuli) contain a point.
+
+    Tests the point against all the polygons in a single call, e.g. to find
+    which of the stimuli on the screen the mouse or gaze is on.
+
+    Parameters
+    ----------
+    x, y : float
+        The point to test.
+    polys : list
+        Polygons, as lists of 3 or more (x, y) vertices, and/or stimuli. For
+        stimuli, the same area as their `.contains()` method is tested (e.g.
+        the `border` of a `ShapeStim`).
+    units : str
+        Units of the point. If not 'pix', the point is converted to pixels
+        using `win` (by default, the window of the first stimulus).
+    win : `~psychopy.visual.Window` or None
+        Window to convert the point to pixels with.
+
+    Returns
+    -------
+    ndarray
+        Boolean array, `True` for the polygons containing the point.
+
+    Notes
+    -----
+    Points lying exactly on an edge may be counted differently from
+    `pointInPolygon`, which uses matplotlib when available.
+
+    Examples
+    --------
+    Find the stimuli the mouse is over::
+
+        xy = mouse.getPos()
+        isOver = pointInPolygons(xy[0], xy[1], stims, units=win.units)
+
+    """
+    if units != 'pix':
+        if win is None:
+            win = next(p.win for p in polys if hasattr(p, 'win'))
+        x, y = convertToPix(np.array((x, y), dtype=float), pos=(0, 0),
+                            units=units, win=win)
+
+    resolved = []
+    for poly in polys:
+        if isinstance(poly, np.ndarray):
+            resolved.append(poly)
+        elif hasattr(poly, '_containsPolygon'):
+            resolved.append(poly._containsPolygon())
+        else:
+            resolved.append(getattr(poly, 'verticesPix', poly))
+    yMin, yMax, xMax, p1x, p1y, dxdy, vertical, owners = _polygonEdges(
+        resolved)
+    if not len(owners):
+        return np.zeros(len(polys), dtype=bool)
+
+    # same (even-odd) rule as the pure python fallback of `pointInPolygon`
+    crossed = (y > yMin) & (y <= yMax) & (x <= xMax)
+    with np.errstate(invalid='ignore'):
+        crossed &= vertical | (x <= (y - p1y) * dxdy + p1x)
+    nCrossed = np.bincount(owners, weights=crossed, minlength=len(polys))
+    return nCrossed % 2 == 1
+
+
 def polygonsOverlap(poly1, poly2):
     """Determine if two polygons intersect; can fail for very pointy polygons.
 
@@ -93,7 +317,8 @@ def polygonsOverlap(poly1, poly2):
     with with (vertices + pos), will try to use that as the polygon.
 
     Checks if any vertex of one polygon is inside the other polygon. Same as
-    the `.overlaps()` method elsewhere.
+    the `.overlaps()` method elsewhere. See `polygonsIntersect` for an exact
+    test, and `findOverlaps` to test many polygons at once.
 
     :Notes:
 
@@ -157,6 +382,363 @@ def polygonsOverlap(poly1, poly2):
     return False
 
 
+def _polygonVertices(poly):
+    """Vertices of a polygon (or stimulus, using its `verticesPix`) as an
+    Nx2 float array."""
+    return np.asarray(getattr(poly, 'verticesPix', poly), dtype=float)
+
+
+def _polygonSegments(vertices):
+    """Edges of a polygon as (starts, ends) arrays. Two vertices are a line,
+    with a single edge (and one a point); polygons with 3 or more are closed.
+    """
+    if len(vertices) < 3:
+        return vertices[:1], vertices[-1:]
+    return vertices, np.roll(vertices, -1, axis=0)
+
+
+def _segmentsCross(starts1, ends1, starts2, ends2):
+    """`True` if any of the first set of line segments crosses or touches any
+    of the second. Tests all the pairs of segments at once."""
+    a, b = starts1[:, None, :], ends1[:, None, :]
+    c, d = starts2[None, :, :], ends2[None, :, :]
+
+    def cross(o, p, q):  # z of (p - o) x (q - o)
+        return ((p[..., 0] - o[..., 0]) * (q[..., 1] - o[..., 1]) -
+                (p[..., 1] - o[..., 1]) * (q[..., 0] - o[..., 0]))
+
+    o1, o2 = cross(a, b, c), cross(a, b, d)
+    o3, o4 = cross(c, d, a), cross(c, d, b)
+    # (all four are zero for a point on the line of the other segment, too)
+    collinear = (o1 == 0) & (o2 == 0) & (o3 == 0) & (o4 == 0)
+    if ((o1 * o2 <= 0) & (o3 * o4 <= 0) & ~collinear).any():
+        return True
+    if not collinear.any():
+        return False
+    # collinear segments cross if their extents overlap
+    return (collinear &
+            (np.maximum(a[..., 0], b[..., 0]) >= np.minimum(c[..., 0], d[..., 0])) &
+            (np.maximum(c[..., 0], d[..., 0]) >= np.minimum(a[..., 0], b[..., 0])) &
+            (np.maximum(a[..., 1], b[..., 1]) >= np.minimum(c[..., 1], d[..., 1])) &
+            (np.maximum(c[..., 1], d[..., 1]) >= np.minimum(a[..., 1], b[..., 1]))
+            ).any()
+
+
+def _verticesIntersect(vertices1, vertices2):
+    """`polygonsIntersect` for two polygons given as Nx2 vertex arrays."""
+    if not len(vertices1) or not len(vertices2):
+        return False
+    # the outlines cross...
+    if _segmentsCross(*(_polygonSegments(vertices1) +
+                        _polygonSegments(vertices2))):
+        return True
+    # ...or, if not, one is entirely inside the other
+    if len(vertices2) > 2 and _rayCastPoints(vertices1[:1], vertices2)[0]:
+        return True
+    if len(vertices1) > 2 and _rayCastPoints(vertices2[:1], vertices1)[0]:
+        return True
+    return False
+
+
+def polygonsIntersect(poly1, poly2):
+    """Determine if two polygons intersect, exactly.
+
+    Like `polygonsOverlap`, but also detects polygons whose edges cross
+    without either containing a vertex of the other (e.g. two thin bars
+    in a cross), and works for concave and self-crossing polygons. Polygons
+    touching at an edge or vertex count as intersecting.
+
+    Parameters
+    ----------
+    poly1, poly2 : array_like or object
+        Polygons as lists of (x, y) vertices, or stimuli whose `verticesPix`
+        are used. A polygon with two vertices is treated as a line segment
+        (e.g. a `Line` stimulus).
+
+    Returns
+    -------
+    bool
+        `True` if the polygons intersect.
+
+    See Also
+    --------
+    findOverlaps : Find all the intersecting pairs in a set of polygons.
+
+    """
+    return _verticesIntersect(_polygonVertices(poly1),
+                              _polygonVertices(poly2))
+
+
+def findOverlaps(polys, others=None):
+    """Find all the pairs of intersecting polygons (or stimuli).
+
+    Candidate pairs are first found by comparing the bounding boxes of all the
+    polygons at once, then only those are tested exactly, as with
+    `polygonsIntersect`. This is much faster than testing each pair in turn
+    for layouts of many items, e.g. to check a visual search array for
+    overlapping items.
+
+    Parameters
+    ----------
+    polys : list
+        Polygons, as lists of (x, y) vertices, and/or stimuli (using their
+        `verticesPix`).
+    others : list or None
+        If given, pairs of one polygon from `polys` and one from `others`
+        are tested, rather than all the pairs within `polys`.
+
+    Returns
+    -------
+    ndarray
+        Kx2 array of the indices (i, j) of each intersecting pair. Without
+        `others`, each pair is only listed once, with i < j; with `others`,
+        j is the index in `others`.
+
+    Examples
+    --------
+    Move items until none of them overlap::
+
+        pairs = findOverlaps(items)
+        while len(pairs):
+            for i in np.unique(pairs[:, 1]):
+                items[i].pos = randomPosition()
+            pairs = findOverlaps(items)
+
+    """
+    vertices1 = [_polygonVertices(poly) for poly in polys]
+    if others is None:
+        vertices2 = vertices1
+    else:
+        vertices2 = [_polygonVertices(poly) for poly in others]
+
+    def bounds(vertices):
+        boxes = np.full((len(vertices), 4), np.nan)
+        for ii, verts in enumerate(vertices):
+            if len(verts):
+                boxes[ii, :2] = verts.min(axis=0)
+                boxes[ii, 2:] = verts.max(axis=0)
+        return boxes
+
+    # broad phase: pairs whose bounding boxes overlap (NaN boxes never do)
+    boxes1 = bounds(vertices1)
+    boxes2 = boxes1 if others is None else bounds(vertices2)
+    candidates = ((boxes1[:, None, 0] <= boxes2[None, :, 2]) &
+                  (boxes2[None, :, 0] <= boxes1[:, None, 2]) &
+                  (boxes1[:, None, 1] <= boxes2[None, :, 3]) &
+                  (boxes2[None, :, 1] <= boxes1[:, None, 3]))
+    if others is None:
+        candidates = np.triu(candidates, k=1)
+
+    # narrow phase: exact tests of the candidates
+    pairs = [(ii, jj) for ii, jj in zip(*np.nonzero(candidates))
+             if _verticesIntersect(vertices1[ii], vertices2[jj])]
+    return np.array(pairs, dtype=int).reshape((-1, 2))
+
+
+# Winding rules for `tesselatePolygon`, with the values of the GLU constants
+# (GLU_TESS_WINDING_ODD etc.) so those can be used too. Each gives which
+# regions are filled, from their winding numbers.
+_windingRules = {
+    100130: lambda winding: winding % 2 == 1,  # ODD
+    100131: lambda winding: winding != 0,  # NONZERO
+    100132: lambda winding: winding > 0,  # POSITIVE
+    100133: lambda winding: winding < 0,  # NEGATIVE
+    100134: lambda winding: abs(winding) >= 2,  # ABS_GEQ_TWO
+}
+_defaultWindingRule = 100130
+
+# Tesselations are cached, most recently used first, for up to this many
+# shapes so that shapes made again (e.g. every trial) are only tesselated
+# once. Set to 0 to disable the cache.
+tesselateCacheSize = 256
+
+_tesselateCache = OrderedDict()
+
+# The work done by `tesselatePolygon` grows with the number of pieces the
+# edges are cut into, by horizontal lines through every vertex and every
+# crossing of two edges, so outlines which cross themselves many times (e.g.
+# hundreds of random vertices) are slow to tesselate. Beyond this many edge
+# pieces it gives up and raises TesselateBudgetError instead (ShapeStim then
+# uses the GLU tesselator). Set to None for no limit.
+tesselateBudget = 500000
+
+
+class TesselateBudgetError(RuntimeError):
+    """Raised by `tesselatePolygon` for polygons that would take more than
+    `tesselateBudget` edge pieces to tesselate.
+    """
+    pass
+
+
+def clearTesselateCache():
+    """Remove all the tesselations from the cache used by
+    `tesselatePolygon`.
+    """
+    _tesselateCache.clear()
+
+
+def _edgeXAt(starts, ends, y):
+    """x of each (non-horizontal) edge at y, exactly at its end points."""
+    x = starts[:, 0] + ((y - starts[:, 1]) * (ends[:, 0] - starts[:, 0]) /
+                        (ends[:, 1] - starts[:, 1]))
+    x = np.where(y == starts[:, 1], starts[:, 0], x)
+    return np.where(y == ends[:, 1], ends[:, 0], x)
+
+
+def _tesselateLoops(loops, isFilled):
+    """Triangles filling the loops, by cutting them into trapezoids between
+    horizontal lines through every vertex and crossing of the edges.
+    """
+    starts = np.concatenate(loops)
+    ends = np.concatenate([np.roll(loop, -1, axis=0) for loop in loops])
+    # horizontal edges don't change the winding number of any region
+    sloped = starts[:, 1] != ends[:, 1]
+    starts, ends = starts[sloped], ends[sloped]
+    if not len(starts):
+        return np.zeros((0, 2))
+    # winding number change when crossing an edge from left to right
+    direction = np.where(ends[:, 1] < starts[:, 1], 1, -1)
+    bottoms = np.minimum(starts[:, 1], ends[:, 1])
+    tops = np.maximum(starts[:, 1], ends[:, 1])
+    scale = np.abs(np.concatenate([starts, ends])).max()
+
+    levels = np.unique(np.concatenate([bottoms, tops]))
+    nPieces = 0
+    for iteration in range(len(starts) ** 2):
+        # the trapezoid bands each edge passes through
+        first = np.searchsorted(levels, bottoms)
+        count = np.searchsorted(levels, tops) - first
+        nPieces += count.sum()
+        if tesselateBudget is not None and nPieces > tesselateBudget:
+            raise TesselateBudgetError(
+                "Too many edge pieces to tesselate ({})".format(nPieces))
+        edge = np.repeat(np.arange(len(starts)), count)
+        band = (np.repeat(first - np.cumsum(count) + count, count) +
+                np.arange(count.sum()))
+        x0 = _edgeXAt(starts[edge], ends[edge], levels[band])
+        x1 = _edgeXAt(starts[edge], ends[edge], levels[band + 1])
+        # order the edges in each band from left to right (at the middle, as
+        # edges may meet at the bottom or top)
+        order = np.lexsort((x0 + x1, band))
+        edge, band, x0, x1 = edge[order], band[order], x0[order], x1[order]
+        sameBand = band[1:] == band[:-1]
+        # neighbouring edges which are out of order at the bottom or top of a
+        # band cross within it, so the band is split at the crossing and the
+        # edges ordered again
+        gap0, gap1 = x0[1:] - x0[:-1], x1[1:] - x1[:-1]
+        tolerance = scale * 1e-12
+        crossed = sameBand & ((gap0 < -tolerance) | (gap1 < -tolerance))
+        if not crossed.any():
+            break
+        gap0, gap1 = gap0[crossed], gap1[crossed]
+        y0, y1 = levels[band[:-1][crossed]], levels[band[:-1][crossed] + 1]
+        crossings = y0 + (y1 - y0) * gap0 / (gap0 - gap1)
+        levels = np.unique(np.concatenate([levels, crossings]))
+
+    # winding number to the right of each edge (within its band)
+    winding = np.cumsum(direction[edge])
+    bandStarts = np.flatnonzero(np.r_[True, ~sameBand])
+    winding -= np.repeat(winding[bandStarts] - direction[edge[bandStarts]],
+                         np.diff(np.r_[bandStarts, len(edge)]))
+    filled = sameBand & isFilled(winding[:-1])
+    left, right, band = edge[:-1][filled], edge[1:][filled], band[:-1][filled]
+    if not len(band):
+        return np.zeros((0, 2))
+
+    # the filled parts of neighbouring bands between the same two edges join
+    # up into one trapezoid
+    order = np.lexsort((band, right, left))
+    left, right, band = left[order], right[order], band[order]
+    joined = np.r_[False, (left[1:] == left[:-1]) & (right[1:] == right[:-1]) &
+                   (band[1:] == band[:-1] + 1)]
+    firsts = np.flatnonzero(~joined)
+    lasts = np.r_[firsts[1:], len(band)] - 1
+    left, right = left[firsts], right[firsts]
+    y0, y1 = levels[band[firsts]], levels[band[lasts] + 1]
+    left0 = _edgeXAt(starts[left], ends[left], y0)
+    right0 = _edgeXAt(starts[right], ends[right], y0)
+    left1 = _edgeXAt(starts[left], ends[left], y1)
+    right1 = _edgeXAt(starts[right], ends[right], y1)
+
+    # two triangles per trapezoid, leaving out those with no area (where the
+    # trapezoid is a triangle)
+    corners = np.stack([np.stack([left0, y0], axis=-1),
+                        np.stack([right0, y0], axis=-1),
+                        np.stack([right1, y1], axis=-1),
+                        np.stack([left1, y1], axis=-1)], axis=1)
+    triangles = np.concatenate([corners[left0 < right0][:, [0, 1, 2]],
+                                corners[left1 < right1][:, [0, 2, 3]]])
+    return triangles.reshape((-1, 2))
+
+
+def tesselatePolygon(vertices, windingRule=None):
+    """Convert a polygon into triangles, without needing OpenGL.
+
+    The polygon may be concave, cross itself, and have holes (given as
+    further loops of vertices), and which regions are filled is decided by
+    the winding rule, as for the GLU tesselator. Results are cached (see
+    `tesselateCacheSize`), so tesselating the same vertices again is fast.
+    Polygons which cross themselves very many times are slow to tesselate,
+    so there is a limit to the work done (see `tesselateBudget`).
+
+    Parameters
+    ----------
+    vertices : array_like
+        Nx2 vertices of the polygon, or a list of such loops (e.g. an outline
+        and its holes).
+    windingRule : int or None
+        Which regions to fill, as one of the GLU constants
+        `GLU_TESS_WINDING_ODD` (the default if `None`), `_NONZERO`,
+        `_POSITIVE`, `_NEGATIVE` or `_ABS_GEQ_TWO`. Counterclockwise loops
+        have positive winding numbers.
+
+    Returns
+    -------
+    ndarray
+        (3*K)x2 array of the vertices of K triangles, which is empty if the
+        polygon has no area (e.g. a line).
+
+    Raises
+    ------
+    TesselateBudgetError
+        If the polygon needs more work to tesselate than `tesselateBudget`.
+
+    """
+    if windingRule is None:
+        windingRule = _defaultWindingRule
+    if windingRule not in _windingRules:
+        raise ValueError("Unknown winding rule: {}".format(windingRule))
+    if len(vertices) and hasattr(vertices[0][0], '__iter__'):
+        loops = [np.asarray(loop, dtype=float) for loop in vertices]
+    else:
+        loops = [np.asarray(vertices, dtype=float)]
+    loops = [loop.reshape((-1, 2)) for loop in loops if len(loop)]
+    if not loops:
+        return np.zeros((0, 2))
+
+    key = (windingRule, tesselateBudget) + tuple((loop.shape, loop.tobytes())
+                                                 for loop in loops)
+    if key in _tesselateCache:
+        _tesselateCache.move_to_end(key)
+        triangles = _tesselateCache[key]
+    else:
+        try:
+            triangles = _tesselateLoops(loops, _windingRules[windingRule])
+            triangles.flags.writeable = False
+        except TesselateBudgetError:
+            triangles = None  # remember that it was over budget
+        if tesselateCacheSize > 0:
+            _tesselateCache[key] = triangles
+            while len(_tesselateCache) > tesselateCacheSize:
+                _tesselateCache.popitem(last=False)
+    if triangles is None:
+        raise TesselateBudgetError(
+            "Polygon with {} vertices is too complex to tesselate within "
+            "tesselateBudget ({})".format(sum(len(loop) for loop in loops),
+                                          tesselateBudget))
+    return triangles
+
+
 def setTexIfNoShaders(obj):
     """Useful decorator for classes that need to update Texture after
     other properties. This doesn't actually perform the update, but sets
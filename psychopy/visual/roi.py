@@ -1,8 +1,10 @@
 import numpy as np
 
 from .shape import ShapeStim
+from .helpers import _pointInPolygon, _pointsInPolygon
 from ..event import Mouse
 from ..core import Clock
+from ..tools.monitorunittools import convertToPix
 
 
 class ROI(ShapeStim):
@@ -55,7 +57,13 @@ class ROI(ShapeStim):
         List of times when the participant's gaze entered the ROI.
     timesOff : list
         List of times when the participant's gaze left the ROI.
+
+    See Also
+    --------
+    ROIIndex : To look up which of many ROIs a point is in.
     """
+    # the ROIIndex this ROI is in (if any), used by `isLookedIn`
+    _roiIndex = None
 
     def __init__(self, win, name=None, device=None,
                  debug=False,
@@ -100,6 +108,8 @@ class ROI(ShapeStim):
                 # If there's no valid device position, assume False
                 return False
             # Check contains
+            if self._roiIndex is not None:
+                return self._roiIndex._isHit(self, pos, self.win.units)
             return bool(self.contains(pos[0], pos[1], self.win.units))
         except Exception:
             # If there's an exception getting device position,
@@ -139,3 +149,275 @@ class ROI(ShapeStim):
         if self.debug:
             # Only draw if in debug mode
             ShapeStim.draw(self, win=win, keepMatrix=keepMatrix)
+
+
+class ROIIndex:
+    """A spatial index of ROIs, to find which of them a point (or each of
+    many gaze samples) is in without testing every ROI.
+
+    The bounding boxes of the ROIs are kept in a uniform grid, so only the
+    ROIs near a point are tested. ROIs which have moved, or changed size or
+    shape, are found and re-indexed when the index is next used.
+
+    Once added to an index, the `isLookedIn` property of the ROIs uses it:
+    the ROIs containing the device position are looked up once, and the
+    result is shared by all the ROIs until the position changes. This makes
+    checking `isLookedIn` for each of many ROIs (e.g. one per word of a
+    text) on every frame much cheaper.
+
+    Parameters
+    ----------
+    rois : list of :class:`~psychopy.visual.ROI`
+        ROIs to index. More can be added with `add()`. All should be on the
+        same window.
+    cellSize : float or None
+        Size of the grid cells, in pixels. By default, twice the median size
+        of the ROIs when the index is first built.
+
+    Examples
+    --------
+    Find the word being looked at, and the word of each gaze sample::
+
+        index = visual.ROIIndex(wordROIs)
+        roi = index.roiAt(gazeX, gazeY)
+        wordIndices = index.lookup(samples)  # -1 for samples outside them all
+
+    """
+    def __init__(self, rois=(), cellSize=None):
+        self._cellSize = cellSize
+        self._rois = []
+        self._entries = {}  # id(roi): [order, polygon, cells]
+        self._grid = {}  # cell: list of rois
+        self._order = 0
+        self._lastPos = None
+        self._lastHits = set()
+        rois = list(rois)
+        if cellSize is None and rois:
+            self._cellSize = self._defaultCellSize(rois)
+        for roi in rois:
+            self.add(roi)
+
+    @property
+    def cellSize(self):
+        """Size of the grid cells, in pixels. Setting it rebuilds the index.
+        """
+        return self._cellSize
+
+    @cellSize.setter
+    def cellSize(self, value):
+        self._cellSize = value
+        self._grid = {}
+        for roi in self._rois:
+            self._entries[id(roi)][2] = ()
+            self._insert(roi)
+
+    @property
+    def rois(self):
+        """The indexed ROIs, in the order they were added."""
+        return list(self._rois)
+
+    def __len__(self):
+        return len(self._rois)
+
+    def __contains__(self, roi):
+        return id(roi) in self._entries
+
+    def add(self, roi):
+        """Add an ROI to the index."""
+        if roi in self:
+            return
+        if roi._roiIndex is not None:
+            roi._roiIndex.remove(roi)
+        self._rois.append(roi)
+        self._entries[id(roi)] = [self._order, None, ()]
+        self._order += 1
+        if self._cellSize is None:
+            self._cellSize = self._defaultCellSize([roi])
+        self._insert(roi)
+        roi._roiIndex = self
+
+    def remove(self, roi):
+        """Remove an ROI from the index."""
+        entry = self._entries.pop(id(roi), None)
+        if entry is None:
+            return
+        for cell in entry[2]:
+            self._grid[cell].remove(roi)
+            if not self._grid[cell]:
+                del self._grid[cell]
+        self._rois.remove(roi)
+        roi._roiIndex = None
+        self._lastPos = None
+
+    def clear(self):
+        """Remove all the ROIs from the index."""
+        for roi in self.rois:
+            self.remove(roi)
+
+    def update(self):
+        """Re-index any ROIs which have moved or changed shape.
+
+        This is done automatically by `lookup()`, but can be called ahead of
+        time (e.g. before the start of a trial) to save time later.
+        """
+        for roi in self._rois:
+            if roi._containsPolygon() is not self._entries[id(roi)][1]:
+                self._insert(roi)
+
+    def roisAt(self, x, y, units=None):
+        """Get the ROIs which contain a point.
+
+        Parameters
+        ----------
+        x, y : float
+            The point.
+        units : str or None
+            Units of the point, by default the units of the window.
+
+        Returns
+        -------
+        list
+            The ROIs containing the point, in the order they were added.
+        """
+        if not self._rois:
+            return []
+        self.update()
+        x, y = self._toPix([(x, y)], units)[0]
+        return self._roisAt(x, y)
+
+    def roiAt(self, x, y, units=None):
+        """Get the first ROI (in the order they were added) containing a
+        point, or `None` if there isn't one."""
+        hits = self.roisAt(x, y, units)
+        return hits[0] if hits else None
+
+    def lookup(self, points, units=None):
+        """Find the ROI containing each of a set of points, e.g. gaze samples.
+
+        Parameters
+        ----------
+        points : array_like
+            Nx2 array of (x, y) points.
+        units : str or None
+            Units of the points, by default the units of the window.
+
+        Returns
+        -------
+        ndarray
+            For each point, the index (in `rois`) of the first ROI containing
+            it, or -1 if it's not in any of them.
+        """
+        points = np.asarray(points, dtype=float).reshape((-1, 2))
+        found = np.full(len(points), -1, dtype=int)
+        if not self._rois or not len(points):
+            return found
+        self.update()
+        points = self._toPix(points, units)
+        order = {id(roi): ii for ii, roi in enumerate(self._rois)}
+
+        # group the points by grid cell, then test each against the ROIs there
+        cells = np.floor(points / self.cellSize).astype(np.int64)
+        cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        sortedPoints = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(cells)))
+        start = 0
+        for cell, end in zip(map(tuple, cells), bounds):
+            rois = self._grid.get(cell)
+            if rois:
+                inCell = sortedPoints[start:end]
+                for roi in sorted(rois, key=lambda roi: order[id(roi)]):
+                    polygon = self._entries[id(roi)][1]
+                    if len(polygon) < 3:
+                        continue
+                    notFound = inCell[found[inCell] == -1]
+                    if not len(notFound):
+                        break
+                    hit = _pointsInPolygon(points[notFound], polygon, roi)
+                    found[notFound[hit]] = order[id(roi)]
+            start = end
+        return found
+
+    def _roisAt(self, x, y):
+        """`roisAt` for a point in pixels, without updating the index first.
+        """
+        cell = self._cellOf(x, y)
+        hits = []
+        for roi in list(self._grid.get(cell, ())):
+            polygon = roi._containsPolygon()
+            if polygon is not self._entries[id(roi)][1]:
+                # moved since it was indexed
+                if cell not in self._insert(roi):
+                    continue
+            if len(polygon) > 2 and _pointInPolygon(x, y, polygon, roi):
+                hits.append(roi)
+        hits.sort(key=lambda roi: self._entries[id(roi)][0])
+        return hits
+
+    def _isHit(self, roi, pos, units):
+        """Whether the ROI contains `pos`, for `ROI.isLookedIn`.
+
+        The ROIs containing each new position are looked up once, without
+        checking whether all the ROIs have moved, and the result is reused by
+        the other ROIs. An ROI which has moved since it was indexed is tested
+        directly instead, and re-indexed.
+        """
+        key = (float(pos[0]), float(pos[1]), units)
+        if key != self._lastPos:
+            x, y = self._toPix([pos[:2]], units)[0]
+            self._lastHits = set(id(hit) for hit in self._roisAt(x, y))
+            self._lastPos = key
+        if roi._containsPolygon() is not self._entries[id(roi)][1]:
+            self._insert(roi)
+            hit = bool(roi.contains(pos[0], pos[1], units))
+            if hit:
+                self._lastHits.add(id(roi))
+            else:
+                self._lastHits.discard(id(roi))
+            self._lastPos = key
+            return hit
+        return id(roi) in self._lastHits
+
+    def _toPix(self, points, units):
+        """Convert Nx2 points to pixels."""
+        points = np.asarray(points, dtype=float)
+        win = self._rois[0].win
+        if units is None:
+            units = win.units
+        if units != 'pix':
+            points = convertToPix(points, pos=(0, 0), units=units, win=win)
+        return points
+
+    def _cellOf(self, x, y):
+        return int(np.floor(x / self.cellSize)), int(np.floor(y / self.cellSize))
+
+    def _defaultCellSize(self, rois):
+        sizes = []
+        for roi in rois:
+            polygon = np.asarray(roi._containsPolygon(), dtype=float)
+            if len(polygon):
+                sizes.append((polygon.max(axis=0) - polygon.min(axis=0)).max())
+        return max(2 * float(np.median(sizes)), 1.0) if sizes else 100.0
+
+    def _insert(self, roi):
+        """(Re)insert an ROI into the cells its bounding box covers, and
+        return those cells."""
+        entry = self._entries[id(roi)]
+        for cell in entry[2]:
+            self._grid[cell].remove(roi)
+            if not self._grid[cell]:
+                del self._grid[cell]
+        polygon = roi._containsPolygon()
+        cells = []
+        if len(polygon):
+            vertices = np.asarray(polygon, dtype=float)
+            x0, y0 = np.floor(vertices.min(axis=0) / self.cellSize).astype(int)
+            x1, y1 = np.floor(vertices.max(axis=0) / self.cellSize).astype(int)
+            cells = [(cx, cy) for cx in range(x0, x1 + 1)
+                     for cy in range(y0, y1 + 1)]
+        for cell in cells:
+            self._grid.setdefault(cell, []).append(roi)
+        entry[1] = polygon
+        entry[2] = cells
+        self._lastPos = None
+        return cells
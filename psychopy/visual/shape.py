@@ -29,12 +29,20 @@ from psychopy.tools.arraytools import val2array
 from psychopy.visual.basevisual import (BaseVisualStim, ColorMixin,
                                         ContainerMixin, WindowMixin)
 # from psychopy.visual.helpers import setColor
+from psychopy.visual.helpers import tesselatePolygon, TesselateBudgetError
 import psychopy.visual
 from psychopy.contrib import tesselate
 
 pyglet.options['debug_gl'] = False
 GL = pyglet.gl
 
+# ShapeStim fills are tesselated with `psychopy.visual.helpers.tesselatePolygon`
+# (on the CPU, and cached). Set to True to use the GLU tesselator instead. The
+# GLU tesselator is also used for shapes too complex for tesselatePolygon (see
+# `psychopy.visual.helpers.tesselateBudget`).
+useGLUTesselator = False
+_warnedTesselateBudget = False
+
 
 knownShapes = {
     "triangle": [
@@ -568,21 +576,24 @@ class ShapeStim(BaseShapeStim):
         if self.closeShape:
             # convert original vertices to triangles (= tesselation) if
             # possible. (not possible if closeShape is False, don't even try)
-            GL.glPushMatrix()  # seemed to help at one point, superfluous?
-            if self.windingRule:
-                GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
-                                   self.windingRule)
             if hasattr(newVertices[0][0], '__iter__'):
                 loops = newVertices
             else:
                 loops = [newVertices]
-            tessVertices = tesselate.tesselate(loops)
-            GL.glPopMatrix()
-            if self.windingRule:
-                GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
-                                   tesselate.default_winding_rule)
-
-        if not self.closeShape or tessVertices == []:
+            if useGLUTesselator:
+                tessVertices = self._tesselateGLU(loops)
+            else:
+                try:
+                    tessVertices = tesselatePolygon(loops, self.windingRule)
+                except TesselateBudgetError as err:
+                    global _warnedTesselateBudget
+                    if not _warnedTesselateBudget:
+                        logging.warning("{}, using the GLU tesselator for "
+                                        "{}".format(err, self.name))
+                        _warnedTesselateBudget = True
+                    tessVertices = self._tesselateGLU(loops)
+
+        if not self.closeShape or len(tessVertices) == 0:
             # probably got a line if tesselate returned []
             initVertices = newVertices
             self.closeShape = False
@@ -592,6 +603,19 @@ class ShapeStim(BaseShapeStim):
             initVertices = tessVertices
         self.__dict__['_tesselVertices'] = numpy.array(initVertices, float)
 
+    def _tesselateGLU(self, loops):
+        """Tesselate the vertex loops with the GLU tesselator."""
+        GL.glPushMatrix()  # seemed to help at one point, superfluous?
+        if self.windingRule:
+            GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
+                               self.windingRule)
+        tessVertices = tesselate.tesselate(loops)
+        GL.glPopMatrix()
+        if self.windingRule:
+            GL.gluTessProperty(tesselate.tess, GL.GLU_TESS_WINDING_RULE,
+                               tesselate.default_winding_rule)
+        return tessVertices
+
     @property
     def vertices(self):
         """A list of lists or a numpy array (Nx2) specifying xy positions of
@@ -17,6 +17,9 @@
 import re
 import sys, os
 import math
+import atexit
+import hashlib
+import weakref
 import numpy as np
 import ctypes
 import freetype as ft
@@ -66,6 +69,17 @@ _weightMap = {
 
 supportedExtensions = ['ttf', 'otf', 'ttc', 'dfont', 'truetype']
 
+# Folder for the glyph atlas caches written by GLFont.saveToCache. Set
+# useGlyphCache to False to always render glyphs with FreeType.
+glyphCacheDir = Path(prefs.paths['userPrefsDir']) / 'cache' / 'glyphs'
+useGlyphCache = True
+# increase when the layout of the cache files changes
+_glyphCacheVersion = 1
+# hashes of font files, by (path, size, modification time)
+_fontFileHashes = {}
+# GLFonts with glyphs that are not in their cache yet, saved at exit
+_unsavedFonts = weakref.WeakSet()
+
 
 def unicode(s, fmt='utf-8'):
     """Force to unicode if bytes"""
@@ -380,6 +394,10 @@ class GLFont:
         self.height = metrics.height / self.scale
         # Set spacing
         self.lineSpacing = lineSpacing
+        # Glyphs rendered by a previous session
+        self._cachedGlyphCount = 0
+        if useGlyphCache:
+            self.loadFromCache()
 
     def __getitem__(self, charcode):
         """
@@ -554,6 +572,8 @@ class GLFont:
             texcoords = (u0, v0, u1, v1)
             glyph = TextureGlyph(charcode, size, offset, advance, texcoords)
             self.glyphs[charcode] = glyph
+            if useGlyphCache:
+                _unsavedFonts.add(self)
 
             # Generate kerning
             # for g in self.glyphs.values():
@@ -570,19 +590,92 @@ class GLFont:
         logging.debug("TextBox2 loaded {} chars with {} blanks and {} valid"
                      .format(len(charcodes), nBlanks, len(charcodes) - nBlanks))
 
-    def saveToCache(self):
-        """Store the current font texture as an image file.
+    @property
+    def cacheFile(self):
+        """Path of the glyph cache file for this font file, size and texture
+        format (see saveToCache).
+        """
+        key = "{}_{}_{}_{}_{}_{}".format(
+            _fontFileHash(self.filename), self.size, self.format,
+            self.atlas.width, self.atlas.height,
+            ".".join(str(v) for v in ft.version()))
+        return glyphCacheDir / "{}.npz".format(key)
 
-        As yet we aren't storing the offset, advance and texcoords as needed to
-        retrieve the necessary chars, but it's a start!
-            (see  TextureGlyph(charcode, size, offset, advance, texcoords) )
+    def saveToCache(self):
+        """Store the font texture and the size, offset, advance and texcoords
+        of its glyphs in the glyph cache, so that a GLFont for the same font
+        file, size and format can reload them with loadFromCache instead of
+        rendering them again.
 
+        This is called for fonts with new glyphs when Python exits.
+        """
+        _unsavedFonts.discard(self)
+        if len(self.glyphs) <= self._cachedGlyphCount:
+            return  # nothing new to save
+        glyphs = list(self.glyphs.values())
+        fname = self.cacheFile
+        tmpName = fname.with_name(fname.name + ".{}.tmp.npz".format(os.getpid()))
+        try:
+            fname.parent.mkdir(parents=True, exist_ok=True)
+            np.savez_compressed(
+                str(tmpName),
+                version=_glyphCacheVersion,
+                atlas=self.atlas.data,
+                nodes=np.array(self.atlas.nodes, dtype=np.int64),
+                used=self.atlas.used,
+                charcodes=np.array([g.charcode for g in glyphs], dtype=str),
+                sizes=np.array([g.size for g in glyphs], dtype=np.float64),
+                offsets=np.array([g.offset for g in glyphs], dtype=np.float64),
+                advances=np.array([g.advance for g in glyphs], dtype=np.float64),
+                texcoords=np.array([g.texcoords for g in glyphs], dtype=np.float64))
+            os.replace(str(tmpName), str(fname))
+        except (OSError, ValueError) as err:
+            logging.warning("Could not save glyph cache for Texture Font {}: {}"
+                            .format(self.name, err))
+            return
+        self._cachedGlyphCount = len(glyphs)
+        logging.debug("Saved {} glyphs of Texture Font {} to {}"
+                      .format(len(glyphs), self.name, fname))
+
+    def loadFromCache(self):
+        """Load the font texture and glyphs stored by saveToCache, if there is
+        a cache for this font file, size and format.
+
+        Returns
+        -------
+        bool
+            True if glyphs were loaded from the cache.
         """
-        from PIL import Image
-        im = Image.fromarray(self.atlas.data)
-        fname = "{}/.psychopy3/{}_{}_texture.png".format(
-            os.path.expanduser("~"), self.name, self.size)
-        im.save(fname)
+        fname = self.cacheFile
+        if not fname.is_file():
+            return False
+        try:
+            with np.load(str(fname)) as cache:
+                if int(cache['version']) != _glyphCacheVersion or \
+                        cache['atlas'].shape != self.atlas.data.shape:
+                    return False
+                self.atlas.data[...] = cache['atlas']
+                self.atlas.nodes = [tuple(int(v) for v in node)
+                                    for node in cache['nodes']]
+                self.atlas.used = int(cache['used'])
+                glyphs = zip(cache['charcodes'].tolist(),
+                             cache['sizes'].tolist(), cache['offsets'].tolist(),
+                             cache['advances'].tolist(),
+                             cache['texcoords'].tolist())
+                for charcode, size, offset, advance, texcoords in glyphs:
+                    self.glyphs[charcode] = TextureGlyph(
+                        charcode, tuple(int(v) for v in size),
+                        tuple(int(v) for v in offset), tuple(advance),
+                        tuple(texcoords))
+        except (OSError, KeyError, ValueError) as err:
+            logging.warning("Could not load glyph cache {}: {}"
+                            .format(fname, err))
+            return False
+        self._cachedGlyphCount = len(self.glyphs)
+        self._dirty = True
+        logging.debug("Loaded {} glyphs of Texture Font {} from {}"
+                      .format(len(self.glyphs), self.name, fname))
+        return True
 
     def upload(self):
         """Upload the font data into graphics card memory.
@@ -641,6 +734,25 @@ class TextureGlyph:
             return 0
 
 
+def _fontFileHash(filename):
+    """Return the sha1 hash of a font file, which is only calculated again
+    if the file changes.
+    """
+    stat = os.stat(str(filename))
+    key = (str(filename), stat.st_size, stat.st_mtime)
+    if key not in _fontFileHashes:
+        with open(str(filename), 'rb') as f:
+            _fontFileHashes[key] = hashlib.sha1(f.read()).hexdigest()
+    return _fontFileHashes[key]
+
+
+def _saveGlyphCaches():
+    for glFont in list(_unsavedFonts):
+        glFont.saveToCache()
+
+atexit.register(_saveGlyphCaches)
+
+
 def findFontFiles(folders=(), recursive=True):
     """Search for font files in the folder (or system folders)
 
@@ -1307,6 +1307,10 @@ class TextBox2(BaseVisualStim, ContainerMixin, ColorMixin):
         else:
             return self.box.contains(x, y, units)
 
+    def _containsPolygon(self):
+        """The polygon used by `contains()`, in pixels."""
+        return self.box._containsPolygon()
+
     def overlaps(self, polygon, tight=False):
         """Returns `True` if this stimulus intersects another one.
 